@@ -10,16 +10,21 @@ import time
 import socket
 import numpy as np
 import torch
-import torchaudio
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from typing import List, Dict, Optional
 
 # Import des modules NeuroSync
 from modules.neurosync_simple import NeuroSyncSimple
 from modules.audio_processor import AudioProcessor
+from modules.resampler_bank import resampler_bank, StreamSession, StreamSessions
 from modules.livelink_neurosync import LiveLinkNeuroSync  # Utiliser notre module validé
 from modules.pylivelinkface import PyLiveLinkFace, FaceBlendShape
+from modules.blendshape_remap import create_direct_remapper
+from modules.metrics import (metrics, PROMETHEUS_CONTENT_TYPE, STAGE_BODY_READ,
+                             STAGE_DECODE, STAGE_INFERENCE)
+from modules.profiler import profiler, ProfilerBusyError
+from modules.startup import startup
 
 app = Flask(__name__)
 CORS(app)
@@ -33,18 +38,27 @@ CONFIG = {
     "target_fps": 60,
     "blendshapes_count": 68,
     "model_path": "models/neurosync/model/model.pth",
+    "precision": "auto",  # auto, fp32, fp16 (GPU), bf16 / int8 (CPU)
     "livelink_port": 11111,
     "api_port": 6969,
     "livelink_ip": "192.168.1.14"  # IP d'Unreal Engine
 }
 
+# En-têtes de /stream_audio
+SESSION_HEADER = "X-Session-Id"
+END_OF_UTTERANCE_HEADER = "X-End-Of-Utterance"
+
 # Initialisation des composants
 model = None
 audio_processor = None
+stream_sessions = None
 livelink = None
 py_face = None
 socket_connection = None
 
+# Remapping vectorisé pour le mode socket direct (68 -> 52, clamp)
+remapper = create_direct_remapper(threshold=0.0)
+
 # Liste des 68 blendshapes ARKit standard
 BLENDSHAPE_NAMES = [
     "EyeBlink_L", "EyeBlink_R", "EyeLookDown_L", "EyeLookDown_R",
@@ -74,13 +88,17 @@ def health():
         "status": "healthy",
         "version": "1.0.0",
         "model": "NeuroSync v3",
+        "model_loaded": model is not None,
+        "startup": startup.stats(),
         "livelink_connected": socket_connection is not None,
         "config": {
             "sample_rate": CONFIG["sample_rate"],
             "livelink_port": CONFIG["livelink_port"],
             "livelink_ip": CONFIG["livelink_ip"],
             "api_port": CONFIG["api_port"]
-        }
+        },
+        "resampler": resampler_bank.stats(),
+        "stream_sessions": stream_sessions.stats() if stream_sessions else None
     })
 
 @app.route('/audio_to_blendshapes', methods=['POST'])
@@ -90,22 +108,25 @@ def audio_to_blendshapes():
     Input: audio WAV (48kHz, mono, 16-bit)
     Output: 68 blendshapes float32 + envoi direct à Unreal
     """
+    if not startup.ready:
+        return jsonify(startup.not_ready()), 503, {"Retry-After": "1"}
     try:
         # Récupérer l'audio depuis la requête
-        audio_data = request.data
+        with metrics.span(STAGE_BODY_READ):
+            audio_data = request.get_data()
         
         # Traiter l'audio
-        audio_np = np.frombuffer(audio_data, dtype=np.int16)
-        audio_float = audio_np.astype(np.float32) / 32768.0
+        with metrics.span(STAGE_DECODE):
+            audio_np = np.frombuffer(audio_data, dtype=np.int16)
+            audio_float = audio_np.astype(np.float32) / 32768.0
         
         # Rééchantillonner si nécessaire pour le modèle (88200Hz)
         if CONFIG["sample_rate"] != 88200:
-            resampler = torchaudio.transforms.Resample(
-                orig_freq=CONFIG["sample_rate"],
-                new_freq=88200
-            )
-            audio_tensor = torch.FloatTensor(audio_float).unsqueeze(0)
-            audio_resampled = resampler(audio_tensor).squeeze(0).numpy()
+            # Noyau sinc mis en cache par la banque (construit une seule fois)
+            audio_tensor = torch.from_numpy(audio_float).unsqueeze(0)
+            audio_resampled = resampler_bank.resample(
+                audio_tensor, CONFIG["sample_rate"], 88200
+            ).squeeze(0).numpy()
         else:
             audio_resampled = audio_float
             
@@ -113,7 +134,8 @@ def audio_to_blendshapes():
         audio_tensor = torch.FloatTensor(audio_resampled).unsqueeze(0)
         
         # Inférence avec le modèle via le wrapper
-        blendshapes = model.process_audio(audio_tensor)
+        with metrics.span(STAGE_INFERENCE):
+            blendshapes = model.process_audio(audio_tensor)
             
         # Convertir en liste float
         blendshapes_list = blendshapes.cpu().numpy().tolist()[0]
@@ -132,31 +154,69 @@ def audio_to_blendshapes():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/livez', methods=['GET'])
+def livez():
+    """Le processus répond (modèle éventuellement en cours de chargement)"""
+    return jsonify(startup.liveness())
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Prêt à traiter l'audio : modèle chargé et préchauffé"""
+    return jsonify(startup.stats()), 200 if startup.ready else 503
+
+@app.route('/metrics', methods=['GET'])
+def metrics_route():
+    """Durées par étape et niveaux au format Prometheus"""
+    return Response(metrics.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.route('/debug/profile', methods=['GET'])
+def debug_profile():
+    """Profil échantillonné de tous les threads (?seconds=N&mode=wall|cpu&format=collapsed|speedscope)"""
+    try:
+        return jsonify(profiler.profile_from_query(request.args))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except ProfilerBusyError as e:
+        return jsonify({"status": "busy", "message": str(e)}), 409
+
 @app.route('/stream_audio', methods=['POST'])
 def stream_audio():
     """
     Endpoint streaming : audio -> blendshapes -> LiveLink
     Accumule l'audio avant traitement
+    
+    En-têtes : X-Session-Id sépare les flux concurrents (un historique de
+    filtre par client), X-End-Of-Utterance: 1 traite le reste du buffer et
+    la queue du filtre puis réinitialise la session
     """
+    if not startup.ready:
+        return jsonify(startup.not_ready()), 503, {"Retry-After": "1"}
     try:
-        # Buffer d'accumulation
-        audio_buffer = audio_processor.get_buffer()
-        
-        # Ajouter l'audio reçu au buffer
-        audio_data = request.data
-        audio_buffer.append(audio_data)
+        session_id = request.headers.get(SESSION_HEADER, "default")
+        end = request.headers.get(END_OF_UTTERANCE_HEADER) == "1"
         
-        # Vérifier si on a assez d'audio (200ms min)
-        min_samples = int(CONFIG["sample_rate"] * CONFIG["min_audio_ms"] / 1000)
-        buffer_size = sum(len(chunk) for chunk in audio_buffer)
-        
-        if buffer_size >= min_samples * 2:  # int16 = 2 bytes
-            # Combiner le buffer
-            combined_audio = b''.join(audio_buffer)
-            audio_buffer.clear()
+        with stream_sessions.acquire(session_id) as session:
+            # Ajouter l'audio reçu au buffer de la session
+            audio_buffer = session.pending
+            audio_buffer.append(request.data)
+            
+            # Vérifier si on a assez d'audio (200ms min)
+            min_samples = int(CONFIG["sample_rate"] * CONFIG["min_audio_ms"] / 1000)
+            buffer_size = sum(len(chunk) for chunk in audio_buffer)
             
-            # Traiter l'audio
-            response = audio_to_blendshapes_internal(combined_audio)
+            if buffer_size >= min_samples * 2 or (end and (buffer_size or session.has_tail)):  # int16 = 2 bytes
+                # Combiner le buffer
+                combined_audio = b''.join(audio_buffer)
+                audio_buffer.clear()
+                
+                # Traiter l'audio
+                response = audio_to_blendshapes_internal(combined_audio, session, final=end)
+            else:
+                response = None
+            if end:
+                stream_sessions.end(session_id)
+        
+        if response is not None:
             blendshapes = response["blendshapes"]
             
             # Envoyer à LiveLink directement
@@ -169,27 +229,27 @@ def stream_audio():
             })
         else:
             return jsonify({
-                "status": "buffering",
+                "status": "ended" if end else "buffering",
                 "buffer_ms": buffer_size / (CONFIG["sample_rate"] * 2) * 1000
             })
             
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-def audio_to_blendshapes_internal(audio_data: bytes) -> Dict:
-    """Version interne pour le streaming"""
+def audio_to_blendshapes_internal(audio_data: bytes, session: StreamSession, final: bool = False) -> Dict:
+    """
+    Version interne pour le streaming
+    
+    Args:
+        audio_data: PCM int16 accumulé
+        session: Session du client (historique du filtre conservé entre chunks)
+        final: Dernier chunk de l'énoncé (queue du filtre incluse)
+    """
     audio_np = np.frombuffer(audio_data, dtype=np.int16)
     audio_float = audio_np.astype(np.float32) / 32768.0
     
-    if CONFIG["sample_rate"] != 88200:
-        resampler = torchaudio.transforms.Resample(
-            orig_freq=CONFIG["sample_rate"],
-            new_freq=88200
-        )
-        audio_tensor = torch.FloatTensor(audio_float).unsqueeze(0)
-        audio_resampled = resampler(audio_tensor).squeeze(0).numpy()
-    else:
-        audio_resampled = audio_float
+    # Resampling à état (identité si le flux est déjà à 88200 Hz)
+    audio_resampled = session.resample(torch.from_numpy(audio_float).unsqueeze(0), final).squeeze(0).numpy()
         
     audio_tensor = torch.FloatTensor(audio_resampled).unsqueeze(0)
     
@@ -216,30 +276,32 @@ def send_to_livelink_direct(blendshapes: List[float]):
     else:
         # Fallback: utiliser directement PyLiveLinkFace et socket
         if py_face and socket_connection:
-            # Reset des blendshapes
-            for i in range(52):  # Seulement 0-51 valides
-                py_face.set_blendshape(FaceBlendShape(i), 0.0)
-            
-            # Appliquer les nouvelles valeurs (68 -> 52)
-            for i in range(min(52, len(blendshapes))):
-                py_face.set_blendshape(FaceBlendShape(i), blendshapes[i])
-            
-            # Encoder et envoyer
-            data = py_face.encode()
-            socket_connection.sendall(data)
+            # Remapping vectorisé (68 -> 52), encoder et envoyer
+            frame = remapper.remap_frame(blendshapes)
+            socket_connection.sendall(py_face.encode_values_view(frame))
+
+def load_model():
+    """Charge le modèle NeuroSync avec NeuroSyncWrapper"""
+    global model
+    model = NeuroSyncSimple(CONFIG["model_path"], device="cuda" if torch.cuda.is_available() else "cpu",
+                            precision=CONFIG["precision"])
+
+def warmup_model():
+    """Chunks courants traités à blanc avant la première requête"""
+    return model.warmup()
 
 def init_components():
     """Initialise les composants de l'API"""
-    global model, audio_processor, livelink, py_face, socket_connection
+    global audio_processor, stream_sessions, livelink, py_face, socket_connection
     
     print("Initialisation des composants...")
     
-    # Charger le modèle NeuroSync avec NeuroSyncWrapper
-    model = NeuroSyncSimple(CONFIG["model_path"], device="cuda" if torch.cuda.is_available() else "cpu")
-    
     # Initialiser le processeur audio
     audio_processor = AudioProcessor(CONFIG)
     
+    # Sessions streaming de /stream_audio (noyau partagé avec la banque)
+    stream_sessions = StreamSessions(resampler_bank, CONFIG["sample_rate"], 88200)
+    
     # Initialiser LiveLink avec notre approche validée
     try:
         livelink = LiveLinkNeuroSync(
@@ -257,6 +319,10 @@ def init_components():
         socket_connection.connect((CONFIG["livelink_ip"], CONFIG["livelink_port"]))
         print("Utilisation du mode socket direct")
     
+    # Le serveur écoute tout de suite, le modèle se charge et se préchauffe
+    # en fond (/livez vivant, /readyz prêt)
+    startup.start(load_model, warmup_model)
+    
     print("Composants initialisés avec succès")
 
 if __name__ == "__main__":
@@ -11,7 +11,7 @@ import logging
 import warnings
 from typing import List
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 
 warnings.filterwarnings("ignore")
 
@@ -32,6 +32,10 @@ from models.neurosync.model.model import load_model
 
 # Module LiveLink style NeuroSync_Player
 from modules.livelink_neurosync import LiveLinkNeuroSync
+from modules.metrics import (metrics, PROMETHEUS_CONTENT_TYPE, STAGE_BODY_READ,
+                             STAGE_INFERENCE, STAGE_REQUEST)
+from modules.profiler import profiler, ProfilerBusyError
+from modules.startup import startup, mmap_weights, run_warmup
 
 # Paramètres de connexion
 LIVELINK_IP = "192.168.1.14"
@@ -57,12 +61,23 @@ def load_neurosync_model():
     logger.info(f"Chargement du modèle NeuroSync sur {device}")
 
     model_path = os.path.join(neurosync_path, "models/neurosync/model/model.pth")
-    blendshape_model = load_model(model_path, config, device)
+    with mmap_weights():
+        blendshape_model = load_model(model_path, config, device)
     logger.info("Modèle NeuroSync chargé")
 
     return blendshape_model
 
 
+def warmup_model():
+    """Inférences à blanc aux tailles de chunk courantes (sans émission LiveLink)."""
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+
+    def run(wav, sample_rate):
+        generate_facial_data_from_bytes(wav, blendshape_model, device, config)
+
+    return run_warmup(run, iterations=3, wav=True)
+
+
 def init_livelink():
     """Initialise la connexion LiveLink."""
     global livelink
@@ -87,6 +102,7 @@ def health():
     return jsonify({
         "status": "healthy",
         "model_loaded": blendshape_model is not None,
+        "startup": startup.stats(),
         "livelink_connected": livelink is not None,
         "port": API_PORT,
         "livelink_ip": LIVELINK_IP,
@@ -97,7 +113,12 @@ def health():
 @app.route('/audio_to_blendshapes', methods=['POST'])
 def audio_to_blendshapes_route():
     """Convertit un blob PCM/WAV en blendshapes et les envoie."""
-    audio_bytes = request.data
+    if not startup.ready:
+        return jsonify(startup.not_ready()), 503, {"Retry-After": "1"}
+
+    start = metrics.start()
+    with metrics.span(STAGE_BODY_READ):
+        audio_bytes = request.get_data()
 
     if not audio_bytes:
         return jsonify({"status": "error", "message": "No audio data"}), 400
@@ -105,12 +126,13 @@ def audio_to_blendshapes_route():
     device = "cuda" if torch.cuda.is_available() else "cpu"
 
     # Utilise la fonction officielle qui gère automatiquement le format
-    generated = generate_facial_data_from_bytes(
-        audio_bytes,
-        blendshape_model,
-        device,
-        config
-    )
+    with metrics.span(STAGE_INFERENCE):
+        generated = generate_facial_data_from_bytes(
+            audio_bytes,
+            blendshape_model,
+            device,
+            config
+        )
 
     # Convertir en liste
     if isinstance(generated, np.ndarray):
@@ -126,12 +148,44 @@ def audio_to_blendshapes_route():
 
     if first_frame:
         send_to_livelink(first_frame)
+    metrics.stop(STAGE_REQUEST, start)
 
     return jsonify({"blendshapes": blendshapes})
 
 
+@app.route('/livez', methods=['GET'])
+def livez():
+    """Le processus répond (modèle éventuellement en cours de chargement)."""
+    return jsonify(startup.liveness())
+
+
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Prêt à traiter l'audio : modèle chargé et préchauffé."""
+    return jsonify(startup.stats()), 200 if startup.ready else 503
+
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_route():
+    """Durées par étape et niveaux au format Prometheus."""
+    return Response(metrics.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@app.route('/debug/profile', methods=['GET'])
+def debug_profile():
+    """Profil échantillonné de tous les threads (?seconds=N&mode=wall|cpu&format=collapsed|speedscope)."""
+    try:
+        return jsonify(profiler.profile_from_query(request.args))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except ProfilerBusyError as e:
+        return jsonify({"status": "busy", "message": str(e)}), 409
+
+
 if __name__ == '__main__':
     logger.info("=== Démarrage API Codex v1 ===")
-    load_neurosync_model()
     init_livelink()
+    startup.start(load_neurosync_model, warmup_model)
     app.run(host='0.0.0.0', port=API_PORT, debug=False)
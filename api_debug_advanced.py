@@ -2,6 +2,8 @@
 """
 API avec système de debugging avancé pour diagnostiquer les problèmes LiveLink
 Inclut logging détaillé, validation et comparaison des formats
+Les données de debug passent par un DebugSink asynchrone (journal tournant,
+échantillonnage) et les graphiques sont rendus à la demande par /debug/report
 """
 
 import os
@@ -17,10 +19,7 @@ from datetime import datetime
 from pathlib import Path
 warnings.filterwarnings("ignore")
 
-from flask import Flask, request, jsonify
-import matplotlib.pyplot as plt
-import plotly.graph_objects as go
-import plotly.io as pio
+from flask import Flask, Response, request, jsonify
 
 # Configuration GPU
 os.environ["CUDA_VISIBLE_DEVICES"] = "0"
@@ -39,6 +38,13 @@ from models.neurosync.model.model import load_model
 # Module LiveLink
 sys.path.append('/home/gieidi-prime/Agents/Claude/Gala_v1')
 from modules.pylivelinkface import PyLiveLinkFace, FaceBlendShape
+from modules.blendshape_remap import create_direct_remapper
+from modules.frame_scheduler import create_frame_scheduler
+from modules.debug_sink import DebugSink, DEBUG_SINK_NAME, KIND_FRAMES
+from modules.metrics import (metrics, PROMETHEUS_CONTENT_TYPE, STAGE_BODY_READ,
+                             STAGE_INFERENCE, STAGE_REQUEST)
+from modules.profiler import profiler, ProfilerBusyError
+from modules.startup import startup, mmap_weights, run_warmup
 
 # Configuration
 LIVELINK_IP = "192.168.1.14"
@@ -46,6 +52,10 @@ LIVELINK_PORT = 11111
 API_PORT = 6969
 DEBUG_DIR = Path("debug_logs")
 DEBUG_DIR.mkdir(exist_ok=True)
+# Part des enregistrements gardés par type (les autres types : tous) ;
+# "frame" : une frame et son paquet LiveLink, KIND_FRAMES : frames [N, 61] de chaque requête
+DEBUG_SAMPLE_RATES = {"frame": 0.1, KIND_FRAMES: 0.1, "audio": 0.25}
+DEBUG_QUEUE_SIZE = 1024
 
 # Logging avancé
 logging.basicConfig(
@@ -65,8 +75,16 @@ app = Flask(__name__)
 blendshape_model = None
 py_face = None
 socket_connection = None
+frame_scheduler = None
 frame_counter = 0
 
+# Remapping vectorisé ARKit -> LiveLink (clamp seul)
+remapper = create_direct_remapper(threshold=0.0)
+
+# Écriture des données de debug hors du chemin des requêtes
+debug_sink = DebugSink(DEBUG_DIR, name=DEBUG_SINK_NAME, max_queue=DEBUG_QUEUE_SIZE,
+                       sample_rates=DEBUG_SAMPLE_RATES)
+
 # Mapping des blendshapes pour debug
 BLENDSHAPE_NAMES = [
     "EyeBlinkLeft", "EyeLookDownLeft", "EyeLookInLeft", "EyeLookOutLeft", "EyeLookUpLeft", 
@@ -82,12 +100,10 @@ BLENDSHAPE_NAMES = [
     "CheekSquintLeft", "CheekSquintRight", "NoseSneerLeft", "NoseSneerRight", "TongueOut"
 ]
 
-def save_debug_data(data, filename):
-    """Sauvegarde les données de debug"""
-    filepath = DEBUG_DIR / filename
-    with open(filepath, 'w') as f:
-        json.dump(data, f, indent=2)
-    logger.info(f"Debug data saved to: {filepath}")
+def save_debug_data(data, kind, blob=None, force=False):
+    """Dépose les données de debug dans le journal (sans attendre le disque)"""
+    if not debug_sink.record(kind, data, blob=blob, force=force):
+        logger.debug(f"Debug '{kind}' non journalisé (échantillonné ou file pleine)")
 
 def log_binary_format(data, name="data"):
     """Log le format binaire des données"""
@@ -156,7 +172,7 @@ def validate_blendshapes(blendshapes):
         elif blendshapes.ndim == 2:
             debug_info["first_frame_analysis"] = analyze_frame(blendshapes[0].tolist())
     
-    save_debug_data(debug_info, f"blendshapes_validation_{frame_counter}.json")
+    save_debug_data(debug_info, "validation")
     return debug_info
 
 def analyze_frame(values):
@@ -178,8 +194,14 @@ def analyze_frame(values):
     return analysis
 
 def visualize_blendshapes(blendshapes, frame_id):
-    """Crée une visualisation des blendshapes"""
+    """Crée une visualisation des blendshapes (hors requêtes : rendu lent)"""
     try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        import plotly.graph_objects as go
+        import plotly.io as pio
+        
         # Préparer les données
         if isinstance(blendshapes, list):
             if isinstance(blendshapes[0], list):
@@ -290,7 +312,8 @@ def load_neurosync_model():
     model_path = os.path.join(neurosync_path, 'models/neurosync/model/model.pth')
     logger.info(f"Chemin du modèle: {model_path}")
     
-    blendshape_model = load_model(model_path, config, device)
+    with mmap_weights():
+        blendshape_model = load_model(model_path, config, device)
     
     # Info sur le modèle
     logger.info("✅ Modèle NeuroSync chargé")
@@ -298,9 +321,18 @@ def load_neurosync_model():
     
     return blendshape_model
 
+def warmup_model():
+    """Inférences à blanc aux tailles de chunk courantes (sans cache ni émission LiveLink)"""
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+
+    def run(wav, sample_rate):
+        remapper.remap(generate_facial_data_from_bytes(wav, blendshape_model, device, config))
+
+    return run_warmup(run, iterations=3, wav=True)
+
 def init_livelink():
     """Initialise LiveLink avec tests de connexion"""
-    global py_face, socket_connection
+    global py_face, socket_connection, frame_scheduler
     
     logger.info(f"🔗 Initialisation LiveLink vers {LIVELINK_IP}:{LIVELINK_PORT}")
     
@@ -311,6 +343,9 @@ def init_livelink():
     socket_connection = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     socket_connection.connect((LIVELINK_IP, LIVELINK_PORT))
     
+    # Thread d'émission à 60 FPS (possède le socket)
+    frame_scheduler = create_frame_scheduler(socket_connection, py_face)
+    
     # Test de connexion
     try:
         py_face.reset()
@@ -329,7 +364,7 @@ def send_to_livelink_with_debug(blendshapes):
     
     logger.info(f"\n=== Send to LiveLink - Frame {frame_counter} ===")
     
-    if not py_face or not socket_connection:
+    if not py_face or not frame_scheduler:
         logger.error("LiveLink non initialisé")
         return
     
@@ -338,48 +373,36 @@ def send_to_livelink_with_debug(blendshapes):
         logger.debug(f"Input type: {type(blendshapes)}")
         logger.debug(f"Input length: {len(blendshapes) if hasattr(blendshapes, '__len__') else 'N/A'}")
         
-        # Reset
-        py_face.reset()
+        # Remapping vectorisé (reset + clamp)
+        frame = remapper.remap_frame(blendshapes)
+        py_face.set_blendshapes(frame)
         
-        # Appliquer les valeurs et logger les actives
-        active_count = 0
+        # Logger les blendshapes actifs
         active_shapes = {}
-        
-        for i in range(min(52, len(blendshapes))):
-            value = float(blendshapes[i])
-            value = max(0.0, min(1.0, value))
-            
-            if value > 0.01:
-                active_count += 1
-                shape_name = BLENDSHAPE_NAMES[i] if i < len(BLENDSHAPE_NAMES) else f"Shape_{i}"
-                active_shapes[shape_name] = value
-                logger.debug(f"  {shape_name}: {value:.3f}")
-            
-            py_face.set_blendshape(FaceBlendShape(i), value)
+        for i in np.flatnonzero(frame > 0.01):
+            shape_name = BLENDSHAPE_NAMES[i] if i < len(BLENDSHAPE_NAMES) else f"Shape_{i}"
+            active_shapes[shape_name] = float(frame[i])
+        active_count = len(active_shapes)
         
         logger.info(f"Active blendshapes: {active_count}")
         if active_count > 0:
             logger.info(f"Active values: {active_shapes}")
         
-        # Encoder et logger le paquet
+        # Encoder le paquet (journalisé avec la frame, décodable par analyze_livelink_capture.py)
         data = py_face.encode()
-        logger.debug(f"Encoded packet size: {len(data)} bytes")
-        log_binary_format(data, f"Frame {frame_counter} packet")
         
-        # Envoyer
-        socket_connection.sendall(data)
-        logger.info(f"✅ Frame {frame_counter} envoyée")
+        # Mise en file : le scheduler émet au prochain tick 60 FPS
+        frame_scheduler.submit(frame)
+        logger.info(f"✅ Frame {frame_counter} mise en file")
         
         # Sauvegarder les données de debug
         debug_data = {
             "frame_id": frame_counter,
-            "timestamp": datetime.now().isoformat(),
             "input_values": blendshapes[:52] if len(blendshapes) > 52 else blendshapes,
             "active_shapes": active_shapes,
-            "packet_size": len(data),
-            "packet_hex_preview": data[:64].hex()
+            "packet_size": len(data)
         }
-        save_debug_data(debug_data, f"frame_{frame_counter}_debug.json")
+        save_debug_data(debug_data, "frame", blob=data)
         
         frame_counter += 1
         
@@ -394,9 +417,12 @@ def health():
         "api_version": "1.0.0 Debug",
         "timestamp": datetime.now().isoformat(),
         "model_loaded": blendshape_model is not None,
+        "startup": startup.stats(),
         "livelink_connected": socket_connection is not None,
         "debug_dir": str(DEBUG_DIR),
         "frames_sent": frame_counter,
+        "scheduler": frame_scheduler.stats() if frame_scheduler else None,
+        "debug_sink": debug_sink.stats(),
         "config": {
             "port": API_PORT,
             "livelink_ip": LIVELINK_IP,
@@ -417,6 +443,8 @@ def health():
 @app.route('/audio_to_blendshapes', methods=['POST'])
 def audio_to_blendshapes_route():
     """Endpoint principal avec debug complet"""
+    if not startup.ready:
+        return jsonify(startup.not_ready()), 503, {"Retry-After": "1"}
     global frame_counter
     
     request_id = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
@@ -424,9 +452,11 @@ def audio_to_blendshapes_route():
     logger.info(f"🎯 NOUVELLE REQUÊTE - ID: {request_id}")
     logger.info(f"{'='*50}")
     
+    start = metrics.start()
     try:
         # Info requête
-        audio_bytes = request.data
+        with metrics.span(STAGE_BODY_READ):
+            audio_bytes = request.get_data()
         content_type = request.headers.get('Content-Type', 'unknown')
         content_length = len(audio_bytes) if audio_bytes else 0
         
@@ -445,15 +475,12 @@ def audio_to_blendshapes_route():
         logger.info(f"  - Premiers octets: {audio_bytes[:20]}")
         logger.info(f"  - Type: {type(audio_bytes)}")
         
-        # Sauvegarder l'audio pour debug
-        audio_file = DEBUG_DIR / f"audio_input_{request_id}.raw"
-        with open(audio_file, 'wb') as f:
-            f.write(audio_bytes)
-        logger.info(f"  - Audio sauvegardé: {audio_file}")
+        # Audio brut journalisé en arrière-plan (échantillonné)
+        save_debug_data({"request_id": request_id, "content_type": content_type}, "audio", blob=audio_bytes)
         
         # Traitement des blendshapes
         logger.info(f"🔄 Traitement des blendshapes...")
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         device = "cuda" if torch.cuda.is_available() else "cpu"
         generated_facial_data = generate_facial_data_from_bytes(
@@ -463,7 +490,8 @@ def audio_to_blendshapes_route():
             config
         )
         
-        processing_time = time.time() - start_time
+        processing_time = time.perf_counter() - start_time
+        metrics.observe(STAGE_INFERENCE, processing_time)
         logger.info(f"⏱️ Temps de traitement: {processing_time:.3f}s")
         
         # Conversion et validation
@@ -480,9 +508,9 @@ def audio_to_blendshapes_route():
         validation_info = validate_blendshapes(blendshapes)
         logger.info(f"  - Format: {validation_info.get('format', 'unknown')}")
         
-        # Visualisation
+        # Frames gardées pour les graphiques de /debug/report
         if blendshapes:
-            visualize_blendshapes(blendshapes, request_id)
+            debug_sink.record_frames(remapper.remap(blendshapes), request_id)
             
             # Envoi à LiveLink avec debug
             if isinstance(blendshapes, list):
@@ -492,7 +520,6 @@ def audio_to_blendshapes_route():
                     for i, frame in enumerate(blendshapes[:10]):  # Limiter à 10 pour debug
                         logger.info(f"\n--- Frame {i}/{len(blendshapes)} ---")
                         send_to_livelink_with_debug(frame)
-                        time.sleep(0.016)  # ~60 FPS
                 else:
                     # Envoyer comme frame unique
                     logger.info(f"📤 Envoi d'une frame unique à LiveLink")
@@ -509,6 +536,7 @@ def audio_to_blendshapes_route():
             }
         }
         
+        metrics.stop(STAGE_REQUEST, start)
         logger.info(f"✅ Requête {request_id} terminée avec succès")
         return jsonify(result)
     
@@ -522,10 +550,37 @@ def audio_to_blendshapes_route():
             "timestamp": datetime.now().isoformat(),
             "traceback": traceback.format_exc()
         }
-        save_debug_data(error_data, f"error_{request_id}.json")
+        save_debug_data(error_data, "error", force=True)
         
         return jsonify({"status": "error", "message": str(e), "request_id": request_id}), 500
 
+@app.route('/livez', methods=['GET'])
+def livez():
+    """Le processus répond (modèle éventuellement en cours de chargement)"""
+    return jsonify(startup.liveness())
+
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Prêt à traiter l'audio : modèle chargé et préchauffé"""
+    return jsonify(startup.stats()), 200 if startup.ready else 503
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_route():
+    """Durées par étape et niveaux au format Prometheus"""
+    return Response(metrics.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.route('/debug/profile', methods=['GET'])
+def debug_profile():
+    """Profil échantillonné de tous les threads (?seconds=N&mode=wall|cpu&format=collapsed|speedscope)"""
+    try:
+        return jsonify(profiler.profile_from_query(request.args))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except ProfilerBusyError as e:
+        return jsonify({"status": "busy", "message": str(e)}), 409
+
 @app.route('/debug/test_pattern', methods=['GET'])
 def test_pattern():
     """Endpoint de test avec un pattern connu"""
@@ -573,7 +628,7 @@ def test_pattern():
 
 @app.route('/debug/report', methods=['GET'])
 def debug_report():
-    """Génère un rapport de debug complet"""
+    """Génère un rapport de debug complet (?plots=0 pour ne pas rendre les graphiques)"""
     report = {
         "timestamp": datetime.now().isoformat(),
         "api_status": {
@@ -581,9 +636,17 @@ def debug_report():
             "model_loaded": blendshape_model is not None,
             "livelink_connected": socket_connection is not None
         },
+        "debug_sink": debug_sink.stats(),
         "files_created": []
     }
     
+    # Graphiques des dernières frames, rendus seulement maintenant
+    if request.args.get("plots", "1") != "0":
+        try:
+            report["plots"] = debug_sink.render_report(BLENDSHAPE_NAMES, prefix="debug_report")
+        except Exception as e:
+            logger.error(f"Error creating report plots: {e}")
+    
     # Lister les fichiers de debug
     for file in DEBUG_DIR.glob("*"):
         report["files_created"].append({
@@ -608,12 +671,12 @@ if __name__ == '__main__':
     logger.info("="*60)
     
     try:
-        # Charger le modèle
-        load_neurosync_model()
-        
         # Initialiser LiveLink avec tests
         init_livelink()
         
+        # Charger et préchauffer le modèle en fond (/readyz passe à 200 ensuite)
+        startup.start(load_neurosync_model, warmup_model)
+        
         # Créer des visualisations de test
         logger.info("\n📊 Création des visualisations de test...")
         test_data = [0.0] * 52
@@ -14,7 +14,7 @@ import wave
 import io
 warnings.filterwarnings("ignore")
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from datetime import datetime
 
 # Configuration GPU
@@ -34,12 +34,28 @@ from models.neurosync.model.model import load_model
 # Module LiveLink
 sys.path.append('/home/gieidi-prime/Agents/Claude/Gala_v1')
 from modules.pylivelinkface import PyLiveLinkFace, FaceBlendShape
+from modules.blendshape_remap import create_direct_remapper
+from modules.frame_scheduler import create_frame_scheduler
+from modules.livelink_transport import create_livelink_transport
+from modules.send_policy import create_send_policy
+from modules.facial_cache import create_facial_cache
+from modules.precision import PrecisionPolicy, synthetic_wav
+from modules.batch_scheduler import BatchedModel
+from modules.metrics import (metrics, PROMETHEUS_CONTENT_TYPE, STAGE_BODY_READ,
+                             STAGE_DECODE, STAGE_INFERENCE, STAGE_REQUEST)
+from modules.profiler import profiler, ProfilerBusyError
+from modules.startup import startup, mmap_weights, run_warmup
+from config import config as gala_config
 
 # Configuration
 LIVELINK_IP = "192.168.1.14"
 LIVELINK_PORT = 11111
 API_PORT = 6969
 
+# Micro-batching des requêtes concurrentes
+MAX_BATCH_SIZE = 8  # Fenêtres max par forward pass
+MAX_BATCH_WAIT_MS = 5  # Budget d'attente pour compléter un lot
+
 # Logging minimal
 logging.basicConfig(level=logging.INFO, format='%(levelname)s | %(message)s')
 logger = logging.getLogger(__name__)
@@ -47,10 +63,21 @@ logger = logging.getLogger(__name__)
 # Flask app
 app = Flask(__name__)
 
+# Instrumentation des étapes (GALA_METRICS=false pour la couper)
+metrics.enabled = gala_config.metrics_enabled
+
 # Variables globales
 blendshape_model = None
+precision_policy = None
+facial_cache = None  # Cache des blendshapes par contenu audio
+inference_model = None  # Proxy batché partagé par les requêtes
 py_face = None
 socket_connection = None
+livelink_transport = None  # Fan-out sujets x destinations (socket_connection = son adaptateur)
+frame_scheduler = None
+
+# Remapping vectorisé ARKit -> LiveLink (seuil 0.001 + clamp)
+remapper = create_direct_remapper()
 
 def create_wav_from_pcm(pcm_data, sample_rate=16000):
     """
@@ -98,52 +125,54 @@ def process_audio_input(audio_bytes):
 
 def load_neurosync_model():
     """Charge le modèle NeuroSync"""
-    global blendshape_model
+    global blendshape_model, precision_policy, inference_model, facial_cache
     
     device = "cuda" if torch.cuda.is_available() else "cpu"
     logger.info(f"Chargement du modèle NeuroSync sur {device}")
     
     model_path = os.path.join(neurosync_path, 'models/neurosync/model/model.pth')
-    blendshape_model = load_model(model_path, config, device)
+    with mmap_weights(gala_config.model.mmap_weights):
+        blendshape_model = load_model(model_path, config, device)
+    
+    # Politique de précision (ModelConfig.precision) avec contrôle de parité fp32
+    precision_policy = PrecisionPolicy.from_config(gala_config.model, device)
+    blendshape_model = precision_policy.apply(
+        blendshape_model,
+        run=lambda model: generate_facial_data_from_bytes(synthetic_wav(), model, device, config),
+        neurosync_config=config
+    )
+    facial_cache = create_facial_cache(model_path, config, gala_config, precision_policy.precision)
+    inference_model = BatchedModel(blendshape_model, max_batch_size=MAX_BATCH_SIZE,
+                                   max_wait_ms=MAX_BATCH_WAIT_MS)
     
     logger.info("✅ Modèle chargé")
     return blendshape_model
 
+def warmup_model():
+    """Inférences à blanc aux tailles de chunk courantes (sans cache ni émission LiveLink)"""
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+
+    def run(wav, sample_rate):
+        remapper.remap(generate_facial_data_from_bytes(wav, inference_model, device, config))
+
+    return run_warmup(run, gala_config.model.warmup_chunks, gala_config.model.warmup_iterations, wav=True)
+
 def init_livelink():
     """Initialise la connexion LiveLink"""
-    global py_face, socket_connection
+    global py_face, socket_connection, frame_scheduler, livelink_transport
     
     logger.info(f"Connexion LiveLink vers {LIVELINK_IP}:{LIVELINK_PORT}")
     
     py_face = PyLiveLinkFace(name="GalaFace", fps=60)
-    socket_connection = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    socket_connection.connect((LIVELINK_IP, LIVELINK_PORT))
-    
-    logger.info("✅ LiveLink connecté")
-
-def send_to_livelink_fast(blendshapes):
-    """Envoi rapide à LiveLink"""
-    global py_face, socket_connection
+    # Destinations de config.livelink (LIVELINK_IP:LIVELINK_PORT par défaut), un sendmmsg par frame
+    livelink_transport = create_livelink_transport(gala_config.livelink, LIVELINK_IP, LIVELINK_PORT)
+    socket_connection = livelink_transport.fanout()
     
-    if not py_face or not socket_connection:
-        return
+    # Thread d'émission à 60 FPS (possède le socket)
+    frame_scheduler = create_frame_scheduler(socket_connection, py_face,
+                                             send_policy=create_send_policy(gala_config.livelink))
     
-    try:
-        # Reset rapide
-        for i in range(52):
-            py_face._blend_shapes[i] = 0.0
-        
-        # Appliquer les valeurs
-        for i in range(min(52, len(blendshapes))):
-            value = blendshapes[i]
-            if value > 0.001:
-                py_face._blend_shapes[i] = max(0.0, min(1.0, value))
-        
-        # Envoyer
-        socket_connection.sendall(py_face.encode())
-        
-    except Exception as e:
-        logger.error(f"Erreur LiveLink: {e}")
+    logger.info("✅ LiveLink connecté")
 
 @app.route('/health', methods=['GET'])
 def health():
@@ -151,52 +180,53 @@ def health():
     return jsonify({
         "status": "healthy",
         "model_loaded": blendshape_model is not None,
-        "livelink_connected": socket_connection is not None
+        "startup": startup.stats(),
+        "livelink_connected": socket_connection is not None,
+        "livelink_transport": livelink_transport.stats() if livelink_transport else None,
+        "scheduler": frame_scheduler.stats() if frame_scheduler else None,
+        "precision": precision_policy.stats() if precision_policy else None,
+        "facial_cache": facial_cache.stats() if facial_cache else None,
+        "batching": inference_model.stats() if inference_model else None
     })
 
 @app.route('/audio_to_blendshapes', methods=['POST'])
 def audio_to_blendshapes_route():
     """Endpoint principal avec gestion audio fixée"""
+    if not startup.ready:
+        return jsonify(startup.not_ready()), 503, {"Retry-After": "1"}
+    start = metrics.start()
     try:
         # Récupérer les données audio
-        audio_bytes = request.data
+        with metrics.span(STAGE_BODY_READ):
+            audio_bytes = request.get_data()
         
         if not audio_bytes:
             return jsonify({"status": "error", "message": "No audio data"}), 400
         
         # Convertir l'audio au bon format
-        try:
-            wav_data = process_audio_input(audio_bytes)
-        except Exception as e:
-            logger.error(f"Erreur conversion audio: {e}")
-            # Fallback: essayer directement comme PCM 16kHz
-            wav_data = create_wav_from_pcm(audio_bytes, 16000)
+        with metrics.span(STAGE_DECODE):
+            try:
+                wav_data = process_audio_input(audio_bytes)
+            except Exception as e:
+                logger.error(f"Erreur conversion audio: {e}")
+                # Fallback: essayer directement comme PCM 16kHz
+                wav_data = create_wav_from_pcm(audio_bytes, 16000)
         
         # Traitement des blendshapes
         device = "cuda" if torch.cuda.is_available() else "cpu"
-        generated_facial_data = generate_facial_data_from_bytes(
-            wav_data, 
-            blendshape_model, 
-            device, 
-            config
-        )
+        # Phrases répétées servies depuis le cache (hash PCM + version du modèle)
+        with metrics.span(STAGE_INFERENCE):
+            generated_facial_data = facial_cache.get_or_compute(
+                wav_data,
+                lambda: generate_facial_data_from_bytes(wav_data, inference_model, device, config)
+            )
         
-        # Conversion si nécessaire
-        if isinstance(generated_facial_data, np.ndarray):
-            blendshapes = generated_facial_data.tolist()
-        else:
-            blendshapes = generated_facial_data
+        # Remapping vectorisé de tout le bloc
+        livelink_frames = remapper.remap(generated_facial_data)
         
-        # Envoi à LiveLink
-        if blendshapes:
-            if isinstance(blendshapes, list):
-                if isinstance(blendshapes[0], list):
-                    # Multiple frames
-                    for frame in blendshapes:
-                        send_to_livelink_fast(frame)
-                else:
-                    # Frame unique
-                    send_to_livelink_fast(blendshapes)
+        # Cadencement à 60 FPS par le scheduler, la requête retourne immédiatement
+        frame_scheduler.submit(livelink_frames)
+        metrics.stop(STAGE_REQUEST, start)
         
         return jsonify({'status': 'ok'})
     
@@ -204,20 +234,50 @@ def audio_to_blendshapes_route():
         logger.error(f"Erreur: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@app.route('/livez', methods=['GET'])
+def livez():
+    """Le processus répond (modèle éventuellement en cours de chargement)"""
+    return jsonify(startup.liveness())
+
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Prêt à traiter l'audio : modèle chargé et préchauffé"""
+    return jsonify(startup.stats()), 200 if startup.ready else 503
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_route():
+    """Durées par étape et niveaux au format Prometheus"""
+    return Response(metrics.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.route('/debug/profile', methods=['GET'])
+def debug_profile():
+    """Profil échantillonné de tous les threads (?seconds=N&mode=wall|cpu&format=collapsed|speedscope)"""
+    if not gala_config.profiling_enabled:
+        return jsonify({"status": "error", "message": "Profiling disabled"}), 404
+    try:
+        return jsonify(profiler.profile_from_query(request.args))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except ProfilerBusyError as e:
+        return jsonify({"status": "busy", "message": str(e)}), 409
+
 if __name__ == '__main__':
     print("\n" + "="*50)
     print("🚀 API GALA - Audio Fix")
     print("="*50 + "\n")
     
-    # Initialisation
-    load_neurosync_model()
-    init_livelink()
-    
-    # Optimisations CUDA
+    # Optimisations CUDA (avant le préchauffage, qui paie l'autotune cuDNN)
     if torch.cuda.is_available():
         torch.backends.cuda.matmul.allow_tf32 = True
         torch.backends.cudnn.benchmark = True
     
+    # Initialisation : le serveur écoute tout de suite, le modèle se charge
+    # et se préchauffe en fond (/livez vivant, /readyz prêt)
+    init_livelink()
+    startup.start(load_neurosync_model, warmup_model)
+    
     print(f"API en écoute sur le port {API_PORT}")
     print(f"LiveLink: {LIVELINK_IP}:{LIVELINK_PORT}")
     print("\n" + "="*50 + "\n")
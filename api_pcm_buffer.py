@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 API optimisée avec PCM direct et système de buffer
-192ms de données audio avant traitement
+192ms de données audio avant traitement, ou fenêtre glissante (hop 64ms)
 """
 
 import os
@@ -12,10 +12,11 @@ import warnings
 import numpy as np
 import time
 import threading
+import asyncio
 from collections import deque
 warnings.filterwarnings("ignore")
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from datetime import datetime
 
 # Configuration GPU 1
@@ -31,10 +32,28 @@ sys.path.insert(0, neurosync_path)
 from models.neurosync.config import config
 from models.neurosync.generate_face_shapes import generate_facial_data_from_bytes
 from models.neurosync.model.model import load_model
+from models.neurosync.audio.extraction.extract_features import extract_and_combine_features
+from models.neurosync.audio.processing.audio_processing import process_audio_features
 
 # Module LiveLink
 sys.path.append('/home/gieidi-prime/Agents/Claude/Gala_v1')
 from modules.pylivelinkface import PyLiveLinkFace, FaceBlendShape
+from modules.blendshape_remap import create_direct_remapper
+from modules.frame_scheduler import create_frame_scheduler
+from modules.livelink_transport import create_livelink_transport
+from modules.send_policy import create_send_policy
+from modules.layer_compositor import create_idle_compositor
+from modules.precision import PrecisionPolicy, synthetic_pcm
+from modules.pcm_ring_buffer import PCMRingBuffer, BufferOverflowError
+from modules.audio_stream import AudioStreamServer
+from modules.resampler_bank import resampler_bank
+from modules.streaming_inference import SlidingWindowInference
+from modules.av_sync import AudioTimeline
+from modules.metrics import (metrics, PROMETHEUS_CONTENT_TYPE, STAGE_BODY_READ,
+                             STAGE_DECODE, STAGE_INFERENCE)
+from modules.profiler import profiler, ProfilerBusyError
+from modules.startup import startup, mmap_weights, run_warmup
+from config import config as gala_config
 
 # Configuration
 LIVELINK_IP = "192.168.1.14"
@@ -45,6 +64,25 @@ API_PORT = 6969
 SAMPLE_RATE = 16000  # Gala envoie du 16kHz
 BUFFER_DURATION_MS = 192  # Durée du buffer en ms
 BUFFER_SIZE = int(SAMPLE_RATE * BUFFER_DURATION_MS / 1000 * 2)  # *2 pour 16-bit
+BUFFER_CAPACITY_MS = 2000  # Capacité du ring buffer
+BUFFER_OVERFLOW_POLICY = "drop_oldest"  # ou "block" (backpressure HTTP 503)
+BUFFER_BLOCK_TIMEOUT = 0.5  # Attente max du producteur en mode block (s)
+WS_PORT = 6970  # Streaming audio WebSocket (en-tête binaire + PCM)
+
+# Mode d'inférence : "sliding" (fenêtre glissante) ou "blocks" (blocs disjoints de 192 ms)
+INFERENCE_MODE = "sliding"
+HOP_MS = 64  # Nouvel audio par inférence
+LOOKBACK_MS = 320  # Contexte passé vu par le modèle
+CROSSFADE_FRAMES = 2  # Frames fondues entre deux inférences
+HOP_SIZE = int(SAMPLE_RATE * HOP_MS / 1000 * 2)
+
+# Synchronisation A/V : les frames partent à (instant de lecture de l'audio + offset).
+# L'offset doit couvrir bufferisation + inférence ; le client retarde sa lecture d'autant
+AV_OFFSET_MS = 250
+
+# Idle continu sous la parole (fondus automatiques dans le thread d'émission)
+IDLE_ANIMATION = True
+OUTPUT_FPS = 60
 
 # Logging minimal
 logging.basicConfig(level=logging.INFO, format='%(levelname)s | %(message)s')
@@ -53,109 +91,242 @@ logger = logging.getLogger(__name__)
 # Flask app
 app = Flask(__name__)
 
+# Instrumentation des étapes (GALA_METRICS=false pour la couper)
+metrics.enabled = gala_config.metrics_enabled
+
 # Variables globales
 blendshape_model = None
+precision_policy = None
 py_face = None
 socket_connection = None
-audio_buffer = bytearray()
-buffer_lock = threading.Lock()
+livelink_transport = None  # Fan-out sujets x destinations (socket_connection = son adaptateur)
+frame_scheduler = None
+audio_buffer = PCMRingBuffer(
+    capacity=int(SAMPLE_RATE * BUFFER_CAPACITY_MS / 1000 * 2),
+    window=BUFFER_SIZE,
+    overflow=BUFFER_OVERFLOW_POLICY
+)
+# Instant de lecture (pts) de chaque chunk, horodaté à l'écriture dans le buffer
+audio_timeline = AudioTimeline(SAMPLE_RATE)
+audio_buffer.on_write = audio_timeline.stamp
 processing_thread = None
+audio_stream_server = None
 running = True
 
+# Inférence streaming (mode "sliding")
+sliding_inference = None
+stream_resampler = None
+stream_reset = threading.Event()
+stream_origin = None  # pts de la frame 0 du flux glissant
+stream_samples = 0  # Échantillons poussés depuis le début du flux
+stream_frames = 0  # Frames émises depuis le début du flux
+
+# Remapping vectorisé ARKit -> LiveLink (seuil 0.001 + clamp)
+remapper = create_direct_remapper()
+
 def load_neurosync_model():
     """Charge le modèle NeuroSync"""
-    global blendshape_model
+    global blendshape_model, precision_policy
     
     device = "cuda" if torch.cuda.is_available() else "cpu"
     logger.info(f"Chargement du modèle NeuroSync sur {device} (GPU {os.environ.get('CUDA_VISIBLE_DEVICES', 'default')})")
     
     model_path = os.path.join(neurosync_path, 'models/neurosync/model/model.pth')
-    blendshape_model = load_model(model_path, config, device)
+    with mmap_weights(gala_config.model.mmap_weights):
+        blendshape_model = load_model(model_path, config, device)
+    
+    # Politique de précision (ModelConfig.precision) avec contrôle de parité fp32
+    precision_policy = PrecisionPolicy.from_config(gala_config.model, device)
+    blendshape_model = precision_policy.apply(
+        blendshape_model,
+        run=lambda model: generate_facial_data_from_bytes(synthetic_pcm(), model, device, config),
+        neurosync_config=config
+    )
     
     logger.info("✅ Modèle chargé")
     return blendshape_model
 
+def init_sliding_inference():
+    """Initialise l'inférence par fenêtre glissante"""
+    global sliding_inference, stream_resampler
+    
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    frame_length = int(0.01667 * 88200)  # ~60 fps
+    hop_length = frame_length // 2
+    
+    sliding_inference = SlidingWindowInference(
+        extract_features=lambda audio: extract_and_combine_features(audio, 88200, frame_length, hop_length),
+        infer=lambda features: process_audio_features(features, blendshape_model, device, config),
+        sample_rate=88200,
+        feature_rate=88200 / hop_length,
+        hop_ms=HOP_MS,
+        lookback_ms=LOOKBACK_MS,
+        output_fps=60,
+        crossfade_frames=CROSSFADE_FRAMES
+    )
+    # 16kHz -> 88.2kHz sans artefacts entre hops
+    stream_resampler = resampler_bank.stream(SAMPLE_RATE, 88200)
+    
+    logger.info(f"✅ Inférence glissante: hop {HOP_MS}ms, look-back {LOOKBACK_MS}ms")
+
+def infer_sliding(pcm_bytes, pts):
+    """
+    Ajoute un hop PCM à l'inférence glissante
+    
+    Args:
+        pcm_bytes: Hop PCM 16 bits
+        pts: Instant de lecture du premier échantillon du hop
+    
+    Returns:
+        (nouvelles frames, pts de la première d'entre elles)
+    """
+    global stream_origin, stream_samples, stream_frames
+    
+    if stream_reset.is_set():
+        stream_reset.clear()
+        sliding_inference.reset()
+        stream_resampler.reset()
+        stream_origin = None
+    
+    # Les frames sortent dans l'ordre depuis la frame 0 : pts = origine + k/fps
+    if stream_origin is None:
+        stream_origin, stream_samples, stream_frames = pts, 0, 0
+    expected = stream_origin + stream_samples / SAMPLE_RATE
+    if pts > expected + 1 / OUTPUT_FPS:
+        stream_origin += pts - expected  # Trou dans l'audio : la lecture a pris du retard
+    
+    with metrics.span(STAGE_DECODE):
+        audio = np.frombuffer(pcm_bytes, dtype=np.int16).astype(np.float32) / 32768.0
+    stream_samples += len(audio)
+    audio_88k = stream_resampler.process(torch.from_numpy(audio)).numpy()
+    frames = sliding_inference.push(audio_88k)
+    
+    start_pts = stream_origin + stream_frames / OUTPUT_FPS
+    stream_frames += len(frames)
+    return frames, start_pts
+
+def finish_sliding(pcm_bytes, pts):
+    """
+    Fin d'énoncé : hop partiel puis frames retenues pour le fondu
+    
+    Args:
+        pcm_bytes: Reste PCM de l'énoncé (moins d'un hop, éventuellement vide)
+        pts: Instant de lecture du premier échantillon du reste
+    
+    Returns:
+        (dernières frames, pts de la première d'entre elles)
+    """
+    global stream_frames
+    
+    frames, start_pts = infer_sliding(pcm_bytes, pts)
+    # Échantillons retenus par le filtre du resampler, puis hop partiel et fondu
+    parts = [frames, sliding_inference.push(stream_resampler.flush().numpy()), sliding_inference.flush()]
+    for part in parts[1:]:
+        stream_frames += len(part)
+    parts = [part for part in parts if len(part)]
+    frames = np.concatenate(parts) if parts else frames
+    # Énoncé suivant sans contexte (flush() a déjà réinitialisé les fenêtres)
+    stream_reset.set()
+    return frames, start_pts
+
+def warmup_model():
+    """Inférences à blanc sur les chunks 16 kHz courants, par le chemin du mode configuré"""
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+
+    def run(pcm, sample_rate):
+        if sliding_inference is not None:
+            audio = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+            frames = sliding_inference.push(stream_resampler.process(torch.from_numpy(audio)).numpy())
+        else:
+            frames = generate_facial_data_from_bytes(pcm, blendshape_model, device, config)
+        if len(frames):
+            remapper.remap(frames)
+
+    results = run_warmup(run, gala_config.model.warmup_chunks, gala_config.model.warmup_iterations,
+                         sample_rates=(SAMPLE_RATE,))
+    if sliding_inference is not None:
+        # Le premier énoncé repart sans le contexte du préchauffage
+        sliding_inference.reset()
+        stream_resampler.reset()
+    return results
+
 def init_livelink():
     """Initialise la connexion LiveLink"""
-    global py_face, socket_connection
+    global py_face, socket_connection, frame_scheduler, livelink_transport
     
     logger.info(f"Connexion LiveLink vers {LIVELINK_IP}:{LIVELINK_PORT}")
     
     py_face = PyLiveLinkFace(name="GalaFace", fps=60)
-    socket_connection = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    socket_connection.connect((LIVELINK_IP, LIVELINK_PORT))
-    
-    logger.info("✅ LiveLink connecté")
-
-def send_to_livelink(blendshapes):
-    """Envoi des blendshapes à LiveLink"""
-    global py_face, socket_connection
+    # Destinations de config.livelink (LIVELINK_IP:LIVELINK_PORT par défaut), un sendmmsg par frame
+    livelink_transport = create_livelink_transport(gala_config.livelink, LIVELINK_IP, LIVELINK_PORT)
+    socket_connection = livelink_transport.fanout()
     
-    if not py_face or not socket_connection:
-        return
+    # Thread d'émission à 60 FPS (possède le socket), idle mélangé à la parole
+    compositor = create_idle_compositor(py_face.encoder) if IDLE_ANIMATION else None
+    frame_scheduler = create_frame_scheduler(socket_connection, py_face, compositor=compositor,
+                                             send_policy=create_send_policy(gala_config.livelink))
     
-    try:
-        # Reset
-        for i in range(52):
-            py_face._blend_shapes[i] = 0.0
-        
-        # Appliquer les valeurs
-        for i in range(min(52, len(blendshapes))):
-            value = blendshapes[i]
-            if value > 0.001:
-                py_face._blend_shapes[i] = max(0.0, min(1.0, value))
-        
-        # Envoyer
-        socket_connection.sendall(py_face.encode())
-        
-    except Exception as e:
-        logger.error(f"Erreur LiveLink: {e}")
+    logger.info("✅ LiveLink connecté")
 
 def process_audio_buffer():
     """Thread de traitement du buffer audio"""
-    global running, audio_buffer, buffer_lock
+    global running
     
-    logger.info("Thread de traitement audio démarré")
+    sliding = INFERENCE_MODE == "sliding"
+    read_size = HOP_SIZE if sliding else BUFFER_SIZE
+    logger.info(f"Thread de traitement audio démarré (mode {INFERENCE_MODE})")
     
     while running:
         try:
-            # Attendre d'avoir assez de données
-            with buffer_lock:
-                if len(audio_buffer) >= BUFFER_SIZE:
-                    # Extraire le buffer
-                    audio_data = bytes(audio_buffer[:BUFFER_SIZE])
-                    audio_buffer[:BUFFER_SIZE] = []  # Retirer les données traitées
-                else:
-                    time.sleep(0.01)  # Attendre plus de données
-                    continue
+            # Attendre d'avoir assez de données ou une fin d'énoncé (réveil par le producteur)
+            if not audio_buffer.wait_for(read_size, timeout=0.5):
+                continue
+            
+            # Fin d'énoncé avant la prochaine fenêtre : le reste est traité, pas abandonné
+            remaining = audio_buffer.pending_end()
+            utterance_end = remaining is not None and remaining < read_size
+            length = remaining if utterance_end else read_size
+            
+            # Fenêtre sans copie, libérée dès la fin de l'inférence
+            audio_data = audio_buffer.peek(length)
+            if audio_data is None:
+                continue  # Buffer vidé entre-temps (interruption)
+            pts = audio_timeline.pts_at(audio_buffer.position)
+            if pts is None:
+                pts = time.monotonic()
             
             # Traiter les données PCM directement
             device = "cuda" if torch.cuda.is_available() else "cpu"
             
-            # NeuroSync accepte directement le PCM
-            generated_facial_data = generate_facial_data_from_bytes(
-                audio_data, 
-                blendshape_model, 
-                device, 
-                config
-            )
-            
-            # Envoyer les blendshapes
-            if generated_facial_data is not None:
-                if isinstance(generated_facial_data, np.ndarray):
-                    blendshapes = generated_facial_data.tolist()
-                else:
-                    blendshapes = generated_facial_data
-                
-                if isinstance(blendshapes, list):
-                    if isinstance(blendshapes[0], list):
-                        # Multiple frames
-                        for frame in blendshapes:
-                            send_to_livelink(frame)
-                            time.sleep(0.016)  # ~60 FPS
+            try:
+                with metrics.span(STAGE_INFERENCE):
+                    if sliding and utterance_end:
+                        # Hop partiel + frames retenues par le fondu enchaîné
+                        generated_facial_data, pts = finish_sliding(audio_data, pts)
+                    elif sliding:
+                        # Hop avec look-back : seules les nouvelles frames sont retournées
+                        generated_facial_data, pts = infer_sliding(audio_data, pts)
+                    elif length > 0:
+                        # NeuroSync accepte directement le PCM
+                        generated_facial_data = generate_facial_data_from_bytes(
+                            audio_data, 
+                            blendshape_model, 
+                            device, 
+                            config
+                        )
                     else:
-                        # Frame unique
-                        send_to_livelink(blendshapes)
+                        generated_facial_data = None
+            finally:
+                audio_buffer.consume(length)
+                if utterance_end:
+                    audio_buffer.pop_end()
+            
+            # Remapper tout le bloc [frames, 68] puis le planifier à l'instant de lecture
+            if generated_facial_data is not None and len(generated_facial_data):
+                livelink_frames = remapper.remap(generated_facial_data)
+                frame_scheduler.submit(livelink_frames, start_time=pts + AV_OFFSET_MS / 1000)
+                if audio_stream_server:
+                    audio_stream_server.publish(livelink_frames)
             
         except Exception as e:
             logger.error(f"Erreur traitement buffer: {e}")
@@ -164,34 +335,49 @@ def process_audio_buffer():
 @app.route('/health', methods=['GET'])
 def health():
     """Endpoint de santé"""
-    with buffer_lock:
-        buffer_level = len(audio_buffer)
+    buffer_stats = audio_buffer.stats()
     
     return jsonify({
         "status": "healthy",
         "model_loaded": blendshape_model is not None,
+        "startup": startup.stats(),
         "livelink_connected": socket_connection is not None,
+        "livelink_transport": livelink_transport.stats() if livelink_transport else None,
         "gpu": os.environ.get('CUDA_VISIBLE_DEVICES', 'default'),
-        "buffer_level": buffer_level,
-        "buffer_max": BUFFER_SIZE
+        "buffer_level": buffer_stats["level"],
+        "buffer_max": BUFFER_SIZE,
+        "buffer": buffer_stats,
+        "inference_mode": INFERENCE_MODE,
+        "inference": sliding_inference.stats() if sliding_inference else None,
+        "scheduler": frame_scheduler.stats() if frame_scheduler else None,
+        "av_offset_ms": AV_OFFSET_MS,
+        "audio_underruns": audio_timeline.underruns,
+        "precision": precision_policy.stats() if precision_policy else None,
+        "websocket": audio_stream_server.stats() if audio_stream_server else None
     })
 
 @app.route('/audio_to_blendshapes', methods=['POST'])
 def audio_to_blendshapes_route():
     """Endpoint principal - ajoute au buffer audio"""
-    global audio_buffer
-    
+    if not startup.ready:
+        return jsonify(startup.not_ready()), 503, {"Retry-After": "1"}
     try:
         # Récupérer les données audio PCM
-        audio_bytes = request.data
+        with metrics.span(STAGE_BODY_READ):
+            audio_bytes = request.get_data()
         
         if not audio_bytes:
             return jsonify({"status": "error", "message": "No audio data"}), 400
         
         # Ajouter au buffer
-        with buffer_lock:
-            audio_buffer.extend(audio_bytes)
-            buffer_level = len(audio_buffer)
+        try:
+            audio_buffer.write(audio_bytes, timeout=BUFFER_BLOCK_TIMEOUT)
+        except BufferOverflowError as e:
+            # Backpressure : le client doit ralentir
+            logger.warning(f"Buffer plein: {e}")
+            metrics.count("pcm_buffer_rejected")
+            return jsonify({"status": "busy", "message": str(e)}), 503
+        buffer_level = audio_buffer.available
         
         # Logger occasionnellement le niveau du buffer
         if buffer_level % (BUFFER_SIZE // 2) < len(audio_bytes):
@@ -207,27 +393,80 @@ def audio_to_blendshapes_route():
         logger.error(f"Erreur: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@app.route('/livez', methods=['GET'])
+def livez():
+    """Le processus répond (modèle éventuellement en cours de chargement)"""
+    return jsonify(startup.liveness())
+
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Prêt à traiter l'audio : modèle chargé et préchauffé"""
+    return jsonify(startup.stats()), 200 if startup.ready else 503
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_route():
+    """Durées par étape et niveaux au format Prometheus"""
+    return Response(metrics.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.route('/debug/profile', methods=['GET'])
+def debug_profile():
+    """Profil échantillonné de tous les threads (?seconds=N&mode=wall|cpu&format=collapsed|speedscope)"""
+    if not gala_config.profiling_enabled:
+        return jsonify({"status": "error", "message": "Profiling disabled"}), 404
+    try:
+        return jsonify(profiler.profile_from_query(request.args))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except ProfilerBusyError as e:
+        return jsonify({"status": "busy", "message": str(e)}), 409
+
+def flush_audio():
+    """Fin d'énoncé (HTTP ou WebSocket) : le thread de traitement termine la phrase"""
+    # Reste du buffer et frames retenues émis par process_audio_buffer, puis
+    # l'énoncé suivant repart sans contexte
+    remaining = audio_buffer.mark_end()
+    if remaining > 0:
+        logger.info(f"Fin d'énoncé: {remaining} bytes restant à traiter")
+    return remaining
+
 @app.route('/flush_buffer', methods=['POST'])
 def flush_buffer():
     """Force le traitement du buffer même s'il n'est pas plein"""
-    global audio_buffer
-    
-    with buffer_lock:
-        if len(audio_buffer) > 0:
-            # Traiter ce qu'il y a dans le buffer
-            logger.info(f"Flush du buffer: {len(audio_buffer)} bytes")
-            audio_buffer.clear()
+    flush_audio()
     
     return jsonify({'status': 'ok', 'flushed': True})
 
+def ingest_stream_audio(pcm, sample_rate):
+    """Chunk PCM reçu sur le WebSocket -> ring buffer"""
+    if sample_rate != SAMPLE_RATE:
+        raise ValueError(f"Sample rate {sample_rate} non supporté (attendu {SAMPLE_RATE})")
+    if not startup.ready:
+        # Pas de 503 possible sur le flux : le chunk est écarté et compté
+        metrics.count("audio_dropped_starting")
+        return
+    
+    if BUFFER_OVERFLOW_POLICY == "block":
+        # Backpressure hors de la boucle asyncio
+        return asyncio.to_thread(audio_buffer.write, pcm, BUFFER_BLOCK_TIMEOUT)
+    audio_buffer.write(pcm)
+
 def cleanup():
     """Nettoyage lors de l'arrêt"""
     global running, socket_connection
     
     running = False
+    audio_buffer.close()
     if processing_thread:
         processing_thread.join(timeout=2)
     
+    if frame_scheduler:
+        frame_scheduler.stop()
+    
+    if audio_stream_server:
+        audio_stream_server.stop()
+    
     if socket_connection:
         socket_connection.close()
 
@@ -236,22 +475,31 @@ if __name__ == '__main__':
     print("🚀 API GALA - PCM Direct avec Buffer")
     print("="*50 + "\n")
     
-    # Initialisation
-    load_neurosync_model()
+    # Optimisations CUDA (avant le préchauffage, qui paie l'autotune cuDNN)
+    if torch.cuda.is_available():
+        torch.backends.cuda.matmul.allow_tf32 = True
+        torch.backends.cudnn.benchmark = True
+    
+    # Initialisation : le serveur écoute tout de suite, le modèle se charge
+    # et se préchauffe en fond (/livez vivant, /readyz prêt)
     init_livelink()
+    if INFERENCE_MODE == "sliding":
+        init_sliding_inference()
+    startup.start(load_neurosync_model, warmup_model)
     
     # Démarrer le thread de traitement
-    processing_thread = threading.Thread(target=process_audio_buffer)
+    processing_thread = threading.Thread(target=process_audio_buffer, name="AudioBuffer")
     processing_thread.start()
     
-    # Optimisations CUDA
-    if torch.cuda.is_available():
-        torch.backends.cuda.matmul.allow_tf32 = True
-        torch.backends.cudnn.benchmark = True
+    # Ingestion streaming WebSocket à côté de /audio_to_blendshapes
+    audio_stream_server = AudioStreamServer(ingest_stream_audio, on_flush=flush_audio, port=WS_PORT)
+    audio_stream_server.start()
     
     print(f"API en écoute sur le port {API_PORT}")
     print(f"LiveLink: {LIVELINK_IP}:{LIVELINK_PORT}")
     print(f"Buffer: {BUFFER_DURATION_MS}ms ({BUFFER_SIZE} bytes)")
+    print(f"WebSocket audio: ws://0.0.0.0:{WS_PORT}")
+    print(f"Inférence: {INFERENCE_MODE} (hop {HOP_MS}ms, look-back {LOOKBACK_MS}ms)")
     print(f"GPU utilisé: {os.environ.get('CUDA_VISIBLE_DEVICES', 'default')}")
     print("\n" + "="*50 + "\n")
     
@@ -8,13 +8,13 @@ import sys
 import socket
 import logging
 import warnings
-import numpy as np
 import time
 import threading
+import asyncio
 import io
 warnings.filterwarnings("ignore")
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from datetime import datetime
 
 # Configuration GPU 1
@@ -29,6 +29,20 @@ sys.path.insert(0, neurosync_path)
 # Module LiveLink
 sys.path.append('/home/gieidi-prime/Agents/Claude/Gala_v1')
 from modules.pylivelinkface import PyLiveLinkFace, FaceBlendShape
+from modules.blendshape_remap import create_direct_remapper
+from modules.frame_scheduler import create_frame_scheduler
+from modules.livelink_transport import create_livelink_transport
+from modules.send_policy import create_send_policy
+from modules.layer_compositor import create_idle_compositor
+from modules.precision import PrecisionPolicy, synthetic_pcm
+from modules.pcm_ring_buffer import PCMRingBuffer, BufferOverflowError
+from modules.audio_stream import AudioStreamServer
+from modules.av_sync import AudioTimeline
+from modules.metrics import (metrics, PROMETHEUS_CONTENT_TYPE, STAGE_BODY_READ,
+                             STAGE_DECODE, STAGE_FEATURES, STAGE_INFERENCE)
+from modules.profiler import profiler, ProfilerBusyError
+from modules.startup import startup, mmap_weights, run_warmup
+from config import config as gala_config
 
 # Import direct des modules NeuroSync nécessaires
 from models.neurosync.config import config
@@ -45,6 +59,17 @@ API_PORT = 6969
 SAMPLE_RATE = 16000  # Gala envoie du 16kHz
 BUFFER_DURATION_MS = 192  # Durée du buffer en ms
 BUFFER_SIZE = int(SAMPLE_RATE * BUFFER_DURATION_MS / 1000 * 2)  # *2 pour 16-bit
+BUFFER_CAPACITY_MS = 2000  # Capacité du ring buffer
+BUFFER_OVERFLOW_POLICY = "drop_oldest"  # ou "block" (backpressure HTTP 503)
+BUFFER_BLOCK_TIMEOUT = 0.5  # Attente max du producteur en mode block (s)
+WS_PORT = 6970  # Streaming audio WebSocket (en-tête binaire + PCM)
+
+# Synchronisation A/V : les frames partent à (instant de lecture de l'audio + offset).
+# L'offset doit couvrir bufferisation + inférence ; le client retarde sa lecture d'autant
+AV_OFFSET_MS = 250
+
+# Idle continu sous la parole (fondus automatiques dans le thread d'émission)
+IDLE_ANIMATION = True
 
 # Logging minimal
 logging.basicConfig(level=logging.INFO, format='%(levelname)s | %(message)s')
@@ -53,120 +78,137 @@ logger = logging.getLogger(__name__)
 # Flask app
 app = Flask(__name__)
 
+# Instrumentation des étapes (GALA_METRICS=false pour la couper)
+metrics.enabled = gala_config.metrics_enabled
+
 # Variables globales
 blendshape_model = None
+precision_policy = None
 py_face = None
 socket_connection = None
-audio_buffer = bytearray()
-buffer_lock = threading.Lock()
+livelink_transport = None  # Fan-out sujets x destinations (socket_connection = son adaptateur)
+frame_scheduler = None
+audio_buffer = PCMRingBuffer(
+    capacity=int(SAMPLE_RATE * BUFFER_CAPACITY_MS / 1000 * 2),
+    window=BUFFER_SIZE,
+    overflow=BUFFER_OVERFLOW_POLICY
+)
+# Instant de lecture (pts) de chaque chunk, horodaté à l'écriture dans le buffer
+audio_timeline = AudioTimeline(SAMPLE_RATE)
+audio_buffer.on_write = audio_timeline.stamp
 processing_thread = None
+audio_stream_server = None
 running = True
 
-def process_pcm_directly(pcm_bytes):
-    """Traite directement les données PCM sans passer par WAV"""
+# Remapping vectorisé ARKit -> LiveLink (seuil 0.001 + clamp)
+remapper = create_direct_remapper()
+
+def process_pcm_directly(pcm_bytes, model=None):
+    """
+    Traite directement les données PCM sans passer par WAV
+    
+    Args:
+        pcm_bytes: PCM int16 mono 16kHz
+        model: Modèle à utiliser (proxy batché partagé si None)
+    """
     # Utiliser directement la fonction PCM de NeuroSync
-    audio_array = load_pcm_audio_from_bytes(pcm_bytes, sr=SAMPLE_RATE, channels=1, sample_width=2)
+    with metrics.span(STAGE_DECODE):
+        audio_array = load_pcm_audio_from_bytes(pcm_bytes, sr=SAMPLE_RATE, channels=1, sample_width=2)
     
     # Paramètres pour l'extraction des features
     frame_length = int(0.01667 * 88200)  # Frame length set to 0.01667 seconds (~60 fps)
     hop_length = frame_length // 2  # 2x overlap for smoother transitions
     
     # Extraire les features
-    combined_features = extract_and_combine_features(audio_array, 88200, frame_length, hop_length)
+    with metrics.span(STAGE_FEATURES):
+        combined_features = extract_and_combine_features(audio_array, 88200, frame_length, hop_length)
     
     # Traiter avec le modèle
     device = "cuda" if torch.cuda.is_available() else "cpu"
-    final_decoded_outputs = process_audio_features(combined_features, blendshape_model, device, config)
+    with metrics.span(STAGE_INFERENCE):
+        final_decoded_outputs = process_audio_features(combined_features, model or blendshape_model, device, config)
     
     return final_decoded_outputs
 
 def load_neurosync_model():
     """Charge le modèle NeuroSync"""
-    global blendshape_model
+    global blendshape_model, precision_policy
     
     device = "cuda" if torch.cuda.is_available() else "cpu"
     logger.info(f"Chargement du modèle NeuroSync sur {device} (GPU {os.environ.get('CUDA_VISIBLE_DEVICES', 'default')})")
     
     model_path = os.path.join(neurosync_path, 'models/neurosync/model/model.pth')
-    blendshape_model = load_model(model_path, config, device)
+    with mmap_weights(gala_config.model.mmap_weights):
+        blendshape_model = load_model(model_path, config, device)
+    
+    # Politique de précision (ModelConfig.precision) avec contrôle de parité fp32
+    precision_policy = PrecisionPolicy.from_config(gala_config.model, device)
+    blendshape_model = precision_policy.apply(
+        blendshape_model,
+        run=lambda model: process_pcm_directly(synthetic_pcm(), model),
+        neurosync_config=config
+    )
     
     logger.info("✅ Modèle chargé")
     return blendshape_model
 
+def warmup_model():
+    """Inférences à blanc sur les chunks 16 kHz courants (sans émission LiveLink)"""
+    return run_warmup(lambda pcm, sample_rate: remapper.remap(process_pcm_directly(pcm)),
+                      gala_config.model.warmup_chunks, gala_config.model.warmup_iterations,
+                      sample_rates=(SAMPLE_RATE,))
+
 def init_livelink():
     """Initialise la connexion LiveLink"""
-    global py_face, socket_connection
+    global py_face, socket_connection, frame_scheduler, livelink_transport
     
     logger.info(f"Connexion LiveLink vers {LIVELINK_IP}:{LIVELINK_PORT}")
     
     py_face = PyLiveLinkFace(name="GalaFace", fps=60)
-    socket_connection = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    socket_connection.connect((LIVELINK_IP, LIVELINK_PORT))
+    # Destinations de config.livelink (LIVELINK_IP:LIVELINK_PORT par défaut), un sendmmsg par frame
+    livelink_transport = create_livelink_transport(gala_config.livelink, LIVELINK_IP, LIVELINK_PORT)
+    socket_connection = livelink_transport.fanout()
     
-    logger.info("✅ LiveLink connecté")
-
-def send_to_livelink(blendshapes):
-    """Envoi des blendshapes à LiveLink"""
-    global py_face, socket_connection
-    
-    if not py_face or not socket_connection:
-        return
+    # Thread d'émission à 60 FPS (possède le socket), idle mélangé à la parole
+    compositor = create_idle_compositor(py_face.encoder) if IDLE_ANIMATION else None
+    frame_scheduler = create_frame_scheduler(socket_connection, py_face, compositor=compositor,
+                                             send_policy=create_send_policy(gala_config.livelink))
     
-    try:
-        # Reset
-        for i in range(52):
-            py_face._blend_shapes[i] = 0.0
-        
-        # Appliquer les valeurs
-        for i in range(min(52, len(blendshapes))):
-            value = blendshapes[i]
-            if value > 0.001:
-                py_face._blend_shapes[i] = max(0.0, min(1.0, value))
-        
-        # Envoyer
-        socket_connection.sendall(py_face.encode())
-        
-    except Exception as e:
-        logger.error(f"Erreur LiveLink: {e}")
+    logger.info("✅ LiveLink connecté")
 
 def process_audio_buffer():
     """Thread de traitement du buffer audio"""
-    global running, audio_buffer, buffer_lock
+    global running
     
     logger.info("Thread de traitement audio démarré")
     
     while running:
         try:
-            # Attendre d'avoir assez de données
-            with buffer_lock:
-                if len(audio_buffer) >= BUFFER_SIZE:
-                    # Extraire le buffer
-                    audio_data = bytes(audio_buffer[:BUFFER_SIZE])
-                    audio_buffer[:BUFFER_SIZE] = []  # Retirer les données traitées
-                else:
-                    time.sleep(0.01)  # Attendre plus de données
-                    continue
+            # Attendre d'avoir assez de données (réveil par le producteur)
+            if not audio_buffer.wait_for(BUFFER_SIZE, timeout=0.5):
+                continue
+            
+            # Fenêtre sans copie, libérée dès la fin de l'inférence
+            audio_data = audio_buffer.peek(BUFFER_SIZE)
+            if audio_data is None:
+                continue  # Buffer vidé entre-temps (flush)
+            pts = audio_timeline.pts_at(audio_buffer.position)
+            if pts is None:
+                pts = time.monotonic()
             
             # Traiter les données PCM directement
             try:
-                generated_facial_data = process_pcm_directly(audio_data)
+                try:
+                    generated_facial_data = process_pcm_directly(audio_data)
+                finally:
+                    audio_buffer.consume(BUFFER_SIZE)
                 
-                # Envoyer les blendshapes
+                # Remapper tout le bloc [frames, 68] puis le planifier à l'instant de lecture
                 if generated_facial_data is not None:
-                    if isinstance(generated_facial_data, np.ndarray):
-                        blendshapes = generated_facial_data.tolist()
-                    else:
-                        blendshapes = generated_facial_data
-                    
-                    if isinstance(blendshapes, list):
-                        if isinstance(blendshapes[0], list):
-                            # Multiple frames
-                            for frame in blendshapes:
-                                send_to_livelink(frame)
-                                time.sleep(0.016)  # ~60 FPS
-                        else:
-                            # Frame unique
-                            send_to_livelink(blendshapes)
+                    livelink_frames = remapper.remap(generated_facial_data)
+                    frame_scheduler.submit(livelink_frames, start_time=pts + AV_OFFSET_MS / 1000)
+                    if audio_stream_server:
+                        audio_stream_server.publish(livelink_frames)
                 
                 logger.debug("Buffer traité avec succès")
                 
@@ -180,35 +222,48 @@ def process_audio_buffer():
 @app.route('/health', methods=['GET'])
 def health():
     """Endpoint de santé"""
-    with buffer_lock:
-        buffer_level = len(audio_buffer)
+    buffer_stats = audio_buffer.stats()
     
     return jsonify({
         "status": "healthy",
         "model_loaded": blendshape_model is not None,
+        "startup": startup.stats(),
         "livelink_connected": socket_connection is not None,
+        "livelink_transport": livelink_transport.stats() if livelink_transport else None,
         "gpu": os.environ.get('CUDA_VISIBLE_DEVICES', 'default'),
-        "buffer_level": buffer_level,
+        "buffer_level": buffer_stats["level"],
         "buffer_max": BUFFER_SIZE,
+        "buffer": buffer_stats,
+        "scheduler": frame_scheduler.stats() if frame_scheduler else None,
+        "av_offset_ms": AV_OFFSET_MS,
+        "audio_underruns": audio_timeline.underruns,
+        "precision": precision_policy.stats() if precision_policy else None,
+        "websocket": audio_stream_server.stats() if audio_stream_server else None,
         "sample_rate": SAMPLE_RATE
     })
 
 @app.route('/audio_to_blendshapes', methods=['POST'])
 def audio_to_blendshapes_route():
     """Endpoint principal - ajoute au buffer audio"""
-    global audio_buffer
-    
+    if not startup.ready:
+        return jsonify(startup.not_ready()), 503, {"Retry-After": "1"}
     try:
         # Récupérer les données audio PCM
-        audio_bytes = request.data
+        with metrics.span(STAGE_BODY_READ):
+            audio_bytes = request.get_data()
         
         if not audio_bytes:
             return jsonify({"status": "error", "message": "No audio data"}), 400
         
         # Ajouter au buffer
-        with buffer_lock:
-            audio_buffer.extend(audio_bytes)
-            buffer_level = len(audio_buffer)
+        try:
+            audio_buffer.write(audio_bytes, timeout=BUFFER_BLOCK_TIMEOUT)
+        except BufferOverflowError as e:
+            # Backpressure : le client doit ralentir
+            logger.warning(f"Buffer plein: {e}")
+            metrics.count("pcm_buffer_rejected")
+            return jsonify({"status": "busy", "message": str(e)}), 503
+        buffer_level = audio_buffer.available
         
         # Logger occasionnellement le niveau du buffer
         if buffer_level % (BUFFER_SIZE // 2) < len(audio_bytes):
@@ -224,18 +279,63 @@ def audio_to_blendshapes_route():
         logger.error(f"Erreur: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@app.route('/livez', methods=['GET'])
+def livez():
+    """Le processus répond (modèle éventuellement en cours de chargement)"""
+    return jsonify(startup.liveness())
+
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Prêt à traiter l'audio : modèle chargé et préchauffé"""
+    return jsonify(startup.stats()), 200 if startup.ready else 503
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_route():
+    """Durées par étape et niveaux au format Prometheus"""
+    return Response(metrics.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.route('/debug/profile', methods=['GET'])
+def debug_profile():
+    """Profil échantillonné de tous les threads (?seconds=N&mode=wall|cpu&format=collapsed|speedscope)"""
+    if not gala_config.profiling_enabled:
+        return jsonify({"status": "error", "message": "Profiling disabled"}), 404
+    try:
+        return jsonify(profiler.profile_from_query(request.args))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except ProfilerBusyError as e:
+        return jsonify({"status": "busy", "message": str(e)}), 409
+
+def flush_audio():
+    """Vide le buffer audio (fin d'énoncé, HTTP ou WebSocket)"""
+    flushed = audio_buffer.clear()
+    if flushed > 0:
+        logger.info(f"Flush du buffer: {flushed} bytes")
+    return flushed
+
 @app.route('/flush_buffer', methods=['POST'])
 def flush_buffer():
     """Force le traitement du buffer même s'il n'est pas plein"""
-    global audio_buffer
-    
-    with buffer_lock:
-        if len(audio_buffer) > 0:
-            logger.info(f"Flush du buffer: {len(audio_buffer)} bytes")
-            audio_buffer.clear()
+    flush_audio()
     
     return jsonify({'status': 'ok', 'flushed': True})
 
+def ingest_stream_audio(pcm, sample_rate):
+    """Chunk PCM reçu sur le WebSocket -> ring buffer"""
+    if sample_rate != SAMPLE_RATE:
+        raise ValueError(f"Sample rate {sample_rate} non supporté (attendu {SAMPLE_RATE})")
+    if not startup.ready:
+        # Pas de 503 possible sur le flux : le chunk est écarté et compté
+        metrics.count("audio_dropped_starting")
+        return
+    
+    if BUFFER_OVERFLOW_POLICY == "block":
+        # Backpressure hors de la boucle asyncio
+        return asyncio.to_thread(audio_buffer.write, pcm, BUFFER_BLOCK_TIMEOUT)
+    audio_buffer.write(pcm)
+
 @app.route('/test_direct_pcm', methods=['POST'])
 def test_direct_pcm():
     """Test direct avec données PCM"""
@@ -266,9 +366,16 @@ def cleanup():
     global running, socket_connection
     
     running = False
+    audio_buffer.close()
     if processing_thread:
         processing_thread.join(timeout=2)
     
+    if frame_scheduler:
+        frame_scheduler.stop()
+    
+    if audio_stream_server:
+        audio_stream_server.stop()
+    
     if socket_connection:
         socket_connection.close()
 
@@ -277,22 +384,28 @@ if __name__ == '__main__':
     print("🚀 API GALA - PCM Direct (Sans WAV)")
     print("="*50 + "\n")
     
-    # Initialisation
-    load_neurosync_model()
+    # Optimisations CUDA (avant le préchauffage, qui paie l'autotune cuDNN)
+    if torch.cuda.is_available():
+        torch.backends.cuda.matmul.allow_tf32 = True
+        torch.backends.cudnn.benchmark = True
+    
+    # Initialisation : le serveur écoute tout de suite, le modèle se charge
+    # et se préchauffe en fond (/livez vivant, /readyz prêt)
     init_livelink()
+    startup.start(load_neurosync_model, warmup_model)
     
     # Démarrer le thread de traitement
-    processing_thread = threading.Thread(target=process_audio_buffer)
+    processing_thread = threading.Thread(target=process_audio_buffer, name="AudioBuffer")
     processing_thread.start()
     
-    # Optimisations CUDA
-    if torch.cuda.is_available():
-        torch.backends.cuda.matmul.allow_tf32 = True
-        torch.backends.cudnn.benchmark = True
+    # Ingestion streaming WebSocket à côté de /audio_to_blendshapes
+    audio_stream_server = AudioStreamServer(ingest_stream_audio, on_flush=flush_audio, port=WS_PORT)
+    audio_stream_server.start()
     
     print(f"API en écoute sur le port {API_PORT}")
     print(f"LiveLink: {LIVELINK_IP}:{LIVELINK_PORT}")
     print(f"Buffer: {BUFFER_DURATION_MS}ms ({BUFFER_SIZE} bytes)")
+    print(f"WebSocket audio: ws://0.0.0.0:{WS_PORT}")
     print(f"Sample Rate: {SAMPLE_RATE}Hz")
     print(f"GPU utilisé: {os.environ.get('CUDA_VISIBLE_DEVICES', 'default')}")
     print("\n" + "="*50 + "\n")
@@ -13,7 +13,7 @@ import logging
 import warnings
 warnings.filterwarnings("ignore")
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from datetime import datetime
 
 # Configuration GPU
@@ -34,6 +34,17 @@ from models.neurosync.model.model import load_model
 # Module LiveLink from Gala v1
 sys.path.append('/home/gieidi-prime/Agents/Claude/Gala_v1')
 from modules.pylivelinkface import PyLiveLinkFace, FaceBlendShape
+from modules.blendshape_remap import create_direct_remapper
+from modules.frame_scheduler import create_frame_scheduler
+from modules.livelink_transport import create_livelink_transport
+from modules.send_policy import create_send_policy
+from modules.facial_cache import create_facial_cache
+from modules.precision import PrecisionPolicy, synthetic_wav
+from modules.metrics import (metrics, PROMETHEUS_CONTENT_TYPE, STAGE_BODY_READ,
+                             STAGE_INFERENCE, STAGE_REQUEST)
+from modules.profiler import profiler, ProfilerBusyError
+from modules.startup import startup, mmap_weights, run_warmup
+from config import config as gala_config
 
 # Configuration
 LIVELINK_IP = "192.168.1.14"
@@ -52,63 +63,79 @@ if torch.cuda.is_available():
 # Flask app
 app = Flask(__name__)
 
+# Instrumentation des étapes (GALA_METRICS=false pour la couper)
+metrics.enabled = gala_config.metrics_enabled
+
 # Variables globales pour le modèle et LiveLink
 blendshape_model = None
+precision_policy = None
+facial_cache = None  # Cache des blendshapes par contenu audio
 py_face = None
 socket_connection = None
+livelink_transport = None  # Fan-out sujets x destinations (socket_connection = son adaptateur)
+frame_scheduler = None
+
+# Remapping vectorisé ARKit -> LiveLink (clamp seul, comme l'original)
+remapper = create_direct_remapper(threshold=0.0)
 
 def load_neurosync_model():
     """Charge le modèle NeuroSync exactement comme l'API originale"""
-    global blendshape_model
+    global blendshape_model, precision_policy, facial_cache
     
     device = "cuda" if torch.cuda.is_available() else "cpu"
     logger.info(f"Chargement du modèle NeuroSync sur {device}")
     
     # Charger le modèle comme dans l'original
     model_path = os.path.join(neurosync_path, 'models/neurosync/model/model.pth')
-    blendshape_model = load_model(model_path, config, device)
+    with mmap_weights(gala_config.model.mmap_weights):
+        blendshape_model = load_model(model_path, config, device)
+    
+    # Politique de précision (ModelConfig.precision) avec contrôle de parité fp32
+    precision_policy = PrecisionPolicy.from_config(gala_config.model, device)
+    blendshape_model = precision_policy.apply(
+        blendshape_model,
+        run=lambda model: generate_facial_data_from_bytes(synthetic_wav(), model, device, config),
+        neurosync_config=config
+    )
+    facial_cache = create_facial_cache(model_path, config, gala_config, precision_policy.precision)
     
     logger.info("Modèle NeuroSync chargé avec succès")
     return blendshape_model
 
+def warmup_model():
+    """Inférences à blanc aux tailles de chunk courantes (sans cache ni émission LiveLink)"""
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+
+    def run(wav, sample_rate):
+        remapper.remap(generate_facial_data_from_bytes(wav, blendshape_model, device, config))
+
+    return run_warmup(run, gala_config.model.warmup_chunks, gala_config.model.warmup_iterations, wav=True)
+
 def init_livelink():
     """Initialise la connexion LiveLink"""
-    global py_face, socket_connection
+    global py_face, socket_connection, frame_scheduler, livelink_transport
     
     logger.info(f"Initialisation LiveLink vers {LIVELINK_IP}:{LIVELINK_PORT}")
     
     py_face = PyLiveLinkFace(name="GalaFace", fps=60)
-    socket_connection = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    socket_connection.connect((LIVELINK_IP, LIVELINK_PORT))
+    # Destinations de config.livelink (LIVELINK_IP:LIVELINK_PORT par défaut), un sendmmsg par frame
+    livelink_transport = create_livelink_transport(gala_config.livelink, LIVELINK_IP, LIVELINK_PORT)
+    socket_connection = livelink_transport.fanout()
+    
+    # Thread d'émission à 60 FPS (possède le socket)
+    frame_scheduler = create_frame_scheduler(socket_connection, py_face,
+                                             send_policy=create_send_policy(gala_config.livelink))
     
     logger.info("LiveLink initialisé avec succès")
 
 def send_to_livelink(blendshapes):
     """Envoie les blendshapes à Unreal via LiveLink"""
-    global py_face, socket_connection
-    
-    if not py_face or not socket_connection:
+    if not frame_scheduler:
         logger.error("LiveLink non initialisé")
         return
     
-    try:
-        # Reset tous les blendshapes
-        for i in range(52):  # 0-51 valides
-            py_face.set_blendshape(FaceBlendShape(i), 0.0)
-        
-        # Appliquer les nouvelles valeurs
-        for i in range(min(52, len(blendshapes))):
-            value = float(blendshapes[i])
-            # Limiter entre 0 et 1
-            value = max(0.0, min(1.0, value))
-            py_face.set_blendshape(FaceBlendShape(i), value)
-        
-        # Encoder et envoyer
-        data = py_face.encode()
-        socket_connection.sendall(data)
-        
-    except Exception as e:
-        logger.error(f"Erreur LiveLink: {e}")
+    # Remapper (reset + clamp vectorisés) puis émettre au prochain tick
+    frame_scheduler.submit(remapper.remap_frame(blendshapes))
 
 @app.route('/health', methods=['GET'])
 def health():
@@ -117,7 +144,12 @@ def health():
         "status": "healthy",
         "api_version": "1.0.0",
         "model_loaded": blendshape_model is not None,
+        "startup": startup.stats(),
         "livelink_connected": socket_connection is not None,
+        "livelink_transport": livelink_transport.stats() if livelink_transport else None,
+        "scheduler": frame_scheduler.stats() if frame_scheduler else None,
+        "precision": precision_policy.stats() if precision_policy else None,
+        "facial_cache": facial_cache.stats() if facial_cache else None,
         "config": {
             "port": API_PORT,
             "livelink_ip": LIVELINK_IP,
@@ -128,9 +160,13 @@ def health():
 @app.route('/audio_to_blendshapes', methods=['POST'])
 def audio_to_blendshapes_route():
     """Endpoint principal - reproduit exactement l'API originale"""
+    if not startup.ready:
+        return jsonify(startup.not_ready()), 503, {"Retry-After": "1"}
+    start = metrics.start()
     try:
         # Récupérer les données audio
-        audio_bytes = request.data
+        with metrics.span(STAGE_BODY_READ):
+            audio_bytes = request.get_data()
         content_type = request.headers.get('Content-Type', 'unknown')
         content_length = len(audio_bytes) if audio_bytes else 0
         
@@ -148,12 +184,12 @@ def audio_to_blendshapes_route():
         logger.info(f"🔄 Traitement des blendshapes en cours...")
         
         device = "cuda" if torch.cuda.is_available() else "cpu"
-        generated_facial_data = generate_facial_data_from_bytes(
-            audio_bytes, 
-            blendshape_model, 
-            device, 
-            config
-        )
+        # Phrases répétées servies depuis le cache (hash PCM + version du modèle)
+        with metrics.span(STAGE_INFERENCE):
+            generated_facial_data = facial_cache.get_or_compute(
+                audio_bytes,
+                lambda: generate_facial_data_from_bytes(audio_bytes, blendshape_model, device, config)
+            )
         
         # Convertir en liste si c'est un numpy array
         if isinstance(generated_facial_data, np.ndarray):
@@ -192,6 +228,7 @@ def audio_to_blendshapes_route():
         
         # Retourner le résultat comme l'API originale
         result = {'blendshapes': blendshapes}
+        metrics.stop(STAGE_REQUEST, start)
         logger.info(f"📤 Envoi de la réponse : {len(str(result))} caractères")
         
         return jsonify(result)
@@ -200,16 +237,45 @@ def audio_to_blendshapes_route():
         logger.error(f"❌❌❌ Exception critique: {str(e)}", exc_info=True)
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@app.route('/livez', methods=['GET'])
+def livez():
+    """Le processus répond (modèle éventuellement en cours de chargement)"""
+    return jsonify(startup.liveness())
+
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Prêt à traiter l'audio : modèle chargé et préchauffé"""
+    return jsonify(startup.stats()), 200 if startup.ready else 503
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_route():
+    """Durées par étape et niveaux au format Prometheus"""
+    return Response(metrics.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.route('/debug/profile', methods=['GET'])
+def debug_profile():
+    """Profil échantillonné de tous les threads (?seconds=N&mode=wall|cpu&format=collapsed|speedscope)"""
+    if not gala_config.profiling_enabled:
+        return jsonify({"status": "error", "message": "Profiling disabled"}), 404
+    try:
+        return jsonify(profiler.profile_from_query(request.args))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except ProfilerBusyError as e:
+        return jsonify({"status": "busy", "message": str(e)}), 409
+
 if __name__ == '__main__':
     # Initialisation
     logger.info("=== Démarrage de l'API Real-Time Clone ===")
     
-    # Charger le modèle
-    load_neurosync_model()
-    
     # Initialiser LiveLink
     init_livelink()
     
+    # Charger et préchauffer le modèle en fond (/readyz passe à 200 ensuite)
+    startup.start(load_neurosync_model, warmup_model)
+    
     # Lancer l'API
     logger.info(f"API en écoute sur le port {API_PORT}")
     app.run(host='0.0.0.0', port=API_PORT, debug=False)
\ No newline at end of file
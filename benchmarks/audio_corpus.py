@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Corpus audio pour les bancs de charge Gala v1
+Indexe les corps de requête capturés par api_debug_advanced.py (fichiers
+audio_input_*.raw historiques et blobs 'audio' du journal binaire
+api_debug.bin* de DebugSink) ainsi que des dossiers de WAV. Les captures successives d'un
+même flux (écart <= group_gap) sont regroupées en énoncés. Tout l'audio
+est ramené en PCM int16 mono 16 kHz, le format envoyé par Gala
+"""
+
+import io
+import json
+import re
+import struct
+import sys
+import wave
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modules.debug_sink import DEBUG_SINK_NAME
+
+
+SAMPLE_RATE = 16000
+
+_RAW_PATTERN = re.compile(r"audio_input_(\d{8}_\d{6}_\d{6})\.raw$")
+_BLOB_STRUCT = struct.Struct('<dI')  # En-tête d'un blob DebugSink : horodatage, taille
+
+
+class Clip(NamedTuple):
+    """Énoncé rejouable"""
+    name: str
+    source: str  # "raw", "debug_sink" ou "wav"
+    pcm: bytes
+    timestamp: Optional[float] = None
+    parts: int = 1  # Captures regroupées
+
+    @property
+    def seconds(self) -> float:
+        return len(self.pcm) / 2 / SAMPLE_RATE
+
+
+def _to_pcm16k(audio: np.ndarray, sample_rate: int) -> bytes:
+    """Audio float32 [-1, 1] mono -> PCM int16 16 kHz"""
+    if sample_rate != SAMPLE_RATE:
+        import torch
+        from modules.resampler_bank import resampler_bank
+        audio = resampler_bank.resample(torch.from_numpy(audio.astype(np.float32)), sample_rate, SAMPLE_RATE).numpy()
+    return (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16).tobytes()
+
+
+def read_wav(path) -> bytes:
+    """WAV 8/16/32 bits, mono ou multicanal, à n'importe quelle fréquence -> PCM 16 kHz mono"""
+    with wave.open(path if hasattr(path, "read") else str(path), "rb") as wav_file:
+        channels, width, rate = wav_file.getnchannels(), wav_file.getsampwidth(), wav_file.getframerate()
+        data = wav_file.readframes(wav_file.getnframes())
+    if width == 2 and channels == 1 and rate == SAMPLE_RATE:
+        return data
+    dtype = {1: np.uint8, 2: np.int16, 4: np.int32}[width]
+    audio = np.frombuffer(data, dtype=dtype).astype(np.float32)
+    audio = (audio - 128) / 128 if width == 1 else audio / float(2 ** (8 * width - 1))
+    audio = audio[:len(audio) // channels * channels].reshape(-1, channels).mean(axis=1)
+    return _to_pcm16k(audio, rate)
+
+
+def read_raw_captures(directory) -> List[Clip]:
+    """Fichiers audio_input_<date>_<heure>_<µs>.raw (un corps de requête chacun)"""
+    clips = []
+    for path in sorted(Path(directory).glob("audio_input_*.raw")):
+        match = _RAW_PATTERN.search(path.name)
+        timestamp = datetime.strptime(match.group(1), "%Y%m%d_%H%M%S_%f").timestamp() if match else None
+        pcm = path.read_bytes()
+        clips.append(Clip(path.stem, "raw", pcm[:len(pcm) // 2 * 2], timestamp))
+    return clips
+
+
+def _rotated(directory: Path, filename: str) -> List[Path]:
+    """Fichier tourné le plus ancien d'abord, fichier courant en dernier"""
+    paths = sorted(directory.glob(f"{filename}.*"), key=lambda path: -int(path.suffix[1:]))
+    if (directory / filename).exists():
+        paths.append(directory / filename)
+    return paths
+
+
+def _blob_kinds(directory: Path, name: str) -> Dict[Tuple[int, int], str]:
+    """Type de chaque blob d'après le journal JSONL : {(horodatage µs, taille): type}"""
+    kinds = {}
+    for path in _rotated(directory, f"{name}.jsonl"):
+        with open(path, "rb") as log_file:
+            for line in log_file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Ligne tronquée (écriture interrompue)
+                blob = entry.get("blob")
+                if blob:
+                    micros = round(datetime.fromisoformat(entry["time"]).timestamp() * 1e6)
+                    kinds[(micros, blob["length"])] = entry.get("kind")
+    return kinds
+
+
+def read_debug_sink_blobs(directory, name: str = DEBUG_SINK_NAME, kind: str = "audio") -> List[Clip]:
+    """
+    Blobs audio du journal binaire de DebugSink (<name>.bin et ses rotations)
+
+    Chaque blob est précédé de son horodatage et de sa taille : le journal se
+    relit séquentiellement, du fichier tourné le plus ancien au courant. Le
+    .bin contient aussi d'autres blobs (paquets LiveLink des enregistrements
+    'frame') : seuls ceux que le JSONL déclare du type `kind` sont gardés,
+    les blobs sans entrée JSONL (journal déjà tourné) sont ignorés.
+    """
+    directory = Path(directory)
+    kinds = _blob_kinds(directory, name)
+
+    clips = []
+    for path in _rotated(directory, f"{name}.bin"):
+        data = path.read_bytes()
+        offset = 0
+        while offset + _BLOB_STRUCT.size <= len(data):
+            timestamp, length = _BLOB_STRUCT.unpack_from(data, offset)
+            offset += _BLOB_STRUCT.size
+            if offset + length > len(data):
+                break  # Blob tronqué (écriture interrompue)
+            blob = data[offset:offset + length]
+            offset += length
+            # Le JSONL garde l'horodatage à la microseconde (arrondi)
+            micros = round(timestamp * 1e6)
+            blob_kind = next((kinds[key] for key in ((micros, length), (micros - 1, length), (micros + 1, length))
+                              if key in kinds), None)
+            if blob_kind != kind:
+                continue
+            pcm = read_wav(io.BytesIO(blob)) if blob[:4] == b"RIFF" else blob[:len(blob) // 2 * 2]
+            clips.append(Clip(f"{path.name}@{offset - length}", "debug_sink", pcm, timestamp))
+    return clips
+
+
+def read_wav_directory(directory) -> List[Clip]:
+    """Tous les .wav d'un dossier (récursif), un énoncé par fichier"""
+    directory = Path(directory)
+    return [Clip(str(path.relative_to(directory)), "wav", read_wav(path))
+            for path in sorted(directory.rglob("*.wav"))]
+
+
+def group_clips(clips: List[Clip], group_gap: float) -> List[Clip]:
+    """
+    Regroupe les captures horodatées successives en énoncés
+
+    Deux captures d'une même source sont fusionnées si la seconde commence
+    moins de group_gap secondes après la fin de la première.
+    """
+    if group_gap <= 0:
+        return list(clips)
+    grouped: List[Clip] = []
+    for clip in sorted(clips, key=lambda clip: (clip.source, clip.timestamp or 0.0)):
+        previous = grouped[-1] if grouped else None
+        if (previous is not None and clip.timestamp is not None and previous.timestamp is not None
+                and previous.source == clip.source
+                and clip.timestamp - (previous.timestamp + previous.seconds) <= group_gap):
+            grouped[-1] = previous._replace(pcm=previous.pcm + clip.pcm, parts=previous.parts + 1)
+        else:
+            grouped.append(clip)
+    return grouped
+
+
+class Corpus:
+    """Ensemble d'énoncés, tirés au hasard par les sessions simulées"""
+
+    def __init__(self, clips: List[Clip], min_seconds: float = 0.0):
+        self.clips = [clip for clip in clips if clip.seconds > 0 and clip.seconds >= min_seconds]
+        if not self.clips:
+            raise ValueError("Corpus audio vide")
+
+    def pick(self, rng: np.random.Generator) -> Clip:
+        return self.clips[int(rng.integers(len(self.clips)))]
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(clip.seconds for clip in self.clips)
+
+    def summary(self) -> Dict:
+        durations = np.array([clip.seconds for clip in self.clips])
+        sources: Dict[str, int] = {}
+        for clip in self.clips:
+            sources[clip.source] = sources.get(clip.source, 0) + 1
+        return {
+            "clips": len(self.clips),
+            "sources": sources,
+            "total_seconds": float(durations.sum()),
+            "mean_seconds": float(durations.mean()),
+            "min_seconds": float(durations.min()),
+            "max_seconds": float(durations.max())
+        }
+
+    def write_index(self, path):
+        """Index JSON des énoncés (nom, source, durée, captures regroupées)"""
+        index = {"summary": self.summary(),
+                 "clips": [{"name": clip.name, "source": clip.source, "seconds": clip.seconds,
+                            "timestamp": clip.timestamp, "parts": clip.parts} for clip in self.clips]}
+        Path(path).write_text(json.dumps(index, indent=2))
+
+
+def build_corpus(paths: List[str], group_gap: float = 1.0, min_seconds: float = 0.0,
+                 sink_name: str = DEBUG_SINK_NAME) -> Corpus:
+    """
+    Indexe des dossiers de captures et/ou de WAV
+
+    Args:
+        paths: Dossiers (debug_logs, dossiers de WAV) ou fichiers .wav
+        group_gap: Écart max (s) entre deux captures d'un même énoncé (0 = pas de regroupement)
+        min_seconds: Durée minimale d'un énoncé retenu
+        sink_name: Préfixe des journaux DebugSink (<sink_name>.jsonl / .bin)
+    """
+    clips: List[Clip] = []
+    for entry in paths:
+        path = Path(entry)
+        if path.is_file():
+            clips.append(Clip(path.name, "wav", read_wav(path)))
+            continue
+        clips += group_clips(read_raw_captures(path) + read_debug_sink_blobs(path, sink_name), group_gap)
+        clips += read_wav_directory(path)
+    return Corpus(clips, min_seconds)
@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+"""
+Banc de latence de bout en bout : chunk PCM -> paquet UDP LiveLink
+Démarre une variante de serveur dans le processus avec le modèle NeuroSync
+de substitution (benchmarks/neurosync_standin.py) et un récepteur LiveLink
+local, rejoue de l'audio en temps réel ou accéléré par chunks, puis mesure :
+chunk reçu -> premier paquet portant ses frames, début d'énoncé -> premier
+paquet, durée des requêtes, de l'extraction et de l'inférence, et jitter
+d'émission. Le résultat est sauvé en JSON (commit git inclus) pour comparer
+les variantes et les commits
+
+Usage:
+    python benchmarks/latency_benchmark.py --variant api_pcm_buffer --variant api_optimized
+    python benchmarks/latency_benchmark.py --variant api_pcm_buffer --set AV_OFFSET_MS=0 --speed 2
+    python benchmarks/latency_benchmark.py --compare results/a.json results/b.json
+"""
+
+import argparse
+import ast
+import concurrent.futures
+import importlib
+import json
+import logging
+import multiprocessing
+import platform
+import subprocess
+import sys
+import threading
+import time
+import wave
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from debug_tools.livelink_receiver import LiveLinkReceiver
+from benchmarks import neurosync_standin
+from modules.startup import startup
+
+
+SAMPLE_RATE = 16000
+FRAME_PERIOD = 1 / 60
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+# Variantes mesurables : "stream" = ring buffer + thread de traitement (chunks courts),
+# "request" = inférence dans la requête HTTP (blocs plus longs)
+VARIANTS = {
+    "api_pcm_buffer": {"mode": "stream", "chunk_ms": 20},
+    "api_pcm_direct": {"mode": "stream", "chunk_ms": 20},
+    "api_optimized": {"mode": "request", "chunk_ms": 200},
+    "api_optimized_fixed": {"mode": "request", "chunk_ms": 200},
+    "api_gpu1": {"mode": "request", "chunk_ms": 200},
+    "api_fixed_audio": {"mode": "request", "chunk_ms": 200},
+    "api_realtime_clone": {"mode": "request", "chunk_ms": 200},
+}
+
+METRICS = ("first_packet_ms", "chunk_to_packet_ms", "request_ms", "features_ms", "inference_ms", "send_jitter_ms")
+
+
+def speech_pcm(seconds: float, seed: int, sample_rate: int = SAMPLE_RATE) -> bytes:
+    """
+    Audio synthétique proche de la parole : syllabes à ~4 Hz, f0 et formants variables
+
+    Chaque graine donne un énoncé différent (pas de hit du cache facial).
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    f0 = rng.uniform(100, 220) * (1 + 0.1 * np.sin(2 * np.pi * rng.uniform(0.3, 1.0) * t))
+    phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+    signal = sum(np.sin(k * phase) / k for k in range(1, 8))
+    syllables = np.clip(np.sin(2 * np.pi * rng.uniform(3.0, 5.0) * t + rng.uniform(0, np.pi)), 0, None)
+    signal = signal * syllables + 0.02 * rng.standard_normal(len(t))
+    return (np.clip(signal / np.max(np.abs(signal)), -1, 1) * 0.6 * 32767).astype(np.int16).tobytes()
+
+
+def load_wav_pcm(path) -> bytes:
+    """PCM d'un WAV mono 16 bits 16 kHz"""
+    with wave.open(str(path), "rb") as wav_file:
+        if (wav_file.getnchannels(), wav_file.getsampwidth(), wav_file.getframerate()) != (1, 2, SAMPLE_RATE):
+            raise ValueError(f"{path}: WAV mono 16 bits {SAMPLE_RATE} Hz attendu")
+        return wav_file.readframes(wav_file.getnframes())
+
+
+def summarize(values_ms) -> Optional[Dict[str, float]]:
+    """Percentiles d'une série de mesures (ms)"""
+    values = np.asarray(values_ms, dtype=np.float64)
+    if len(values) == 0:
+        return None
+    return {
+        "count": int(len(values)),
+        "mean": float(values.mean()),
+        "p50": float(np.percentile(values, 50)),
+        "p95": float(np.percentile(values, 95)),
+        "p99": float(np.percentile(values, 99)),
+        "max": float(values.max())
+    }
+
+
+def git_revision() -> Dict:
+    """Commit courant et état du dépôt"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                                    capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": "unknown", "dirty": None}
+    return {"commit": commit, "dirty": dirty}
+
+
+class PacketLog:
+    """Instants d'arrivée (monotonic) des paquets reçus"""
+
+    def __init__(self):
+        self.arrivals: List[float] = []
+
+    def __call__(self, arrival: float, packet):
+        self.arrivals.append(arrival)
+
+    def wait_idle(self, since: int, not_before: float, quiet: float = 0.5, timeout: float = 5.0) -> List[float]:
+        """
+        Attend la fin des paquets d'un énoncé
+
+        Args:
+            since: Index du premier paquet de l'énoncé
+            not_before: Dernier chunk envoyé (monotonic)
+            quiet: Silence qui clôt l'énoncé (s)
+            timeout: Attente maximale après le dernier chunk (s)
+
+        Returns:
+            Arrivées des paquets de l'énoncé
+        """
+        while time.monotonic() - not_before < timeout:
+            now = time.monotonic()
+            last = self.arrivals[-1] if len(self.arrivals) > since else not_before
+            if len(self.arrivals) > since and now - max(last, not_before) >= quiet:
+                break
+            time.sleep(0.05)
+        return self.arrivals[since:]
+
+
+def start_server(module, mode: str):
+    """Initialise la variante comme son __main__ (sans serveur HTTP ni WebSocket)"""
+    if hasattr(module, "IDLE_ANIMATION"):
+        module.IDLE_ANIMATION = False  # Seules les frames de parole sont émises
+    module.init_livelink()
+    if mode == "stream" and getattr(module, "INFERENCE_MODE", None) == "sliding":
+        module.init_sliding_inference()
+    # Chargement et préchauffage bloquants : les mesures commencent serveur prêt
+    if not startup.run(module.load_neurosync_model, getattr(module, "warmup_model", None)):
+        raise RuntimeError(f"Démarrage de {module.__name__} en échec: {startup.error}")
+    if mode == "stream":
+        # Le module est réutilisé d'un lancement à l'autre : annuler le cleanup() précédent
+        module.running = True
+        module.audio_buffer.reopen()
+        module.processing_thread = threading.Thread(target=module.process_audio_buffer, name="AudioBuffer",
+                                                  daemon=True)
+        module.processing_thread.start()
+
+
+def stop_server(module):
+    if hasattr(module, "cleanup"):
+        module.cleanup()
+        return
+    for name in ("frame_scheduler", "inference_model", "socket_connection"):
+        component = getattr(module, name, None)
+        if component is not None:
+            component.close() if name == "socket_connection" else component.stop()
+
+
+def measure_utterance(arrivals: List[float], chunk_times: List[float], chunk_seconds: float) -> Dict[str, List[float]]:
+    """
+    Latences d'un énoncé (ms)
+
+    Le chunk k porte l'audio [k * durée, (k + 1) * durée[ : sa première frame
+    est la frame ceil(k * durée * 60) de l'énoncé, c'est-à-dire le paquet de
+    même rang (les frames sautées par le scheduler décalent cette
+    correspondance, voir scheduler.frames_dropped).
+    """
+    result = {"first_packet_ms": [], "chunk_to_packet_ms": [], "send_jitter_ms": []}
+    if not arrivals:
+        return result
+    result["first_packet_ms"].append((arrivals[0] - chunk_times[0]) * 1000)
+    for index, sent in enumerate(chunk_times):
+        frame = int(np.ceil(index * chunk_seconds / FRAME_PERIOD - 1e-9))
+        if frame < len(arrivals) and frame * FRAME_PERIOD < (index + 1) * chunk_seconds:
+            result["chunk_to_packet_ms"].append((arrivals[frame] - sent) * 1000)
+    result["send_jitter_ms"] = list(np.abs(np.diff(arrivals) - FRAME_PERIOD) * 1000)
+    return result
+
+
+def load_variant(variant: str, livelink_address, overrides: Optional[Dict] = None,
+                 infer_delay_ms: float = 0.0, verbose: bool = False):
+    """
+    Importe une variante avec le modèle de substitution, LiveLink vers livelink_address
+
+    Args:
+        variant: Module serveur (clé de VARIANTS)
+        livelink_address: (ip, port) du récepteur LiveLink
+        overrides: Constantes du module à remplacer ({"AV_OFFSET_MS": 0, ...})
+        infer_delay_ms: Attente ajoutée par fenêtre du modèle de substitution
+        verbose: Garde les logs INFO des serveurs
+
+    Returns:
+        Module serveur prêt pour start_server()
+    """
+    neurosync_standin.install()
+    neurosync_standin.config["infer_delay_ms"] = infer_delay_ms
+
+    module = importlib.import_module(variant)
+    if not verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+    module.LIVELINK_IP, module.LIVELINK_PORT = livelink_address
+    for name, value in (overrides or {}).items():
+        if not hasattr(module, name):
+            raise ValueError(f"{variant} n'a pas de constante {name}")
+        setattr(module, name, value)
+    gala_config = module.gala_config
+    gala_config.facial_cache_on_disk = False
+    gala_config.livelink.destinations, gala_config.livelink.subjects = [], []
+    gala_config.livelink.delta_send = False  # Une frame = un paquet
+    return module
+
+
+def run_benchmark(variant: str, utterances: int = 5, seconds: float = 3.0, chunk_ms: Optional[float] = None,
+                  speed: float = 1.0, pause: float = 0.5, overrides: Optional[Dict] = None,
+                  infer_delay_ms: float = 0.0, audio_path: Optional[str] = None, cuda: bool = False,
+                  verbose: bool = False) -> Dict:
+    """
+    Mesure une variante dans le processus courant
+
+    Args:
+        variant: Module serveur (clé de VARIANTS)
+        utterances: Nombre d'énoncés rejoués
+        seconds: Durée de chaque énoncé synthétique
+        chunk_ms: Durée d'un chunk envoyé (défaut de la variante si None)
+        speed: 1.0 = temps réel, 2.0 = deux fois plus vite, etc.
+        pause: Silence entre deux énoncés (s)
+        overrides: Constantes du module à remplacer ({"AV_OFFSET_MS": 0, ...})
+        infer_delay_ms: Attente ajoutée par fenêtre du modèle de substitution
+        audio_path: WAV 16 kHz mono rejoué à la place de l'audio synthétique
+        cuda: Laisse le serveur utiliser CUDA si disponible (CPU forcé sinon)
+        verbose: Garde les logs INFO des serveurs
+
+    Returns:
+        Rapport JSON-sérialisable
+    """
+    import torch
+    cuda_available = torch.cuda.is_available
+    if not cuda:
+        torch.cuda.is_available = lambda: False  # Le serveur choisit son device via cet appel
+
+    spec = VARIANTS[variant]
+    chunk_ms = chunk_ms or spec["chunk_ms"]
+    chunk_bytes = int(SAMPLE_RATE * chunk_ms / 1000) * 2
+    chunk_seconds = chunk_bytes / 2 / SAMPLE_RATE
+
+    packets = PacketLog()
+    receiver = LiveLinkReceiver("127.0.0.1", 0, on_packet=packets).start()
+    module = load_variant(variant, receiver.address, overrides, infer_delay_ms, verbose)
+
+    start_server(module, spec["mode"])
+    client = module.app.test_client()
+    source = load_wav_pcm(audio_path) if audio_path else None
+
+    def replay(pcm: bytes, measured: bool, collected: Dict[str, List[float]]):
+        chunks = [pcm[offset:offset + chunk_bytes] for offset in range(0, len(pcm), chunk_bytes)]
+        since = len(packets.arrivals)
+        chunk_times = []
+        start = time.monotonic()
+        for index, chunk in enumerate(chunks):
+            delay = start + index * chunk_seconds / speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            sent = time.monotonic()
+            response = client.post("/audio_to_blendshapes", data=chunk, content_type="application/octet-stream")
+            chunk_times.append(sent)
+            if measured:
+                collected["request_ms"].append((time.monotonic() - sent) * 1000)
+                if response.status_code != 200:
+                    collected["errors"] += 1
+        if hasattr(module, "flush_audio"):
+            client.post("/flush_buffer")  # Fin d'énoncé : le reste du buffer est émis
+        arrivals = packets.wait_idle(since, chunk_times[-1])
+        if measured:
+            for name, values in measure_utterance(arrivals, chunk_times, chunk_seconds).items():
+                collected[name].extend(values)
+            collected["chunks"] += len(chunks)
+            collected["packets"] += len(arrivals)
+            collected["frames_expected"] += int(len(pcm) / 2 / SAMPLE_RATE / FRAME_PERIOD)
+        time.sleep(pause)
+
+    collected = {name: [] for name in METRICS}
+    collected.update(chunks=0, packets=0, frames_expected=0, errors=0)
+    try:
+        replay(speech_pcm(1.0, seed=0), measured=False, collected=collected)  # Chauffe
+        neurosync_standin.reset_timings()
+        for index in range(utterances):
+            pcm = source if source is not None else speech_pcm(seconds, seed=index + 1)
+            replay(pcm, measured=True, collected=collected)
+        server = client.get("/health").get_json()
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+    finally:
+        stop_server(module)
+        receiver.stop()
+        torch.cuda.is_available = cuda_available
+
+    timings = neurosync_standin.timings()
+    collected["features_ms"] = [value * 1000 for value in timings["features"]]
+    collected["inference_ms"] = [value * 1000 for value in timings["inference"]]
+
+    return {
+        "benchmark": "latency",
+        "variant": variant,
+        "mode": spec["mode"],
+        **git_revision(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "device": device,
+        "settings": {
+            "utterances": utterances,
+            "seconds": seconds if source is None else len(source) / 2 / SAMPLE_RATE,
+            "audio": audio_path or "synthetic",
+            "chunk_ms": chunk_ms,
+            "speed": speed,
+            "pause": pause,
+            "infer_delay_ms": infer_delay_ms,
+            "overrides": overrides or {},
+            "av_offset_ms": getattr(module, "AV_OFFSET_MS", None),
+            "inference_mode": getattr(module, "INFERENCE_MODE", None)
+        },
+        "metrics": {name: summarize(collected[name]) for name in METRICS},
+        "counts": {name: collected[name] for name in ("chunks", "packets", "frames_expected", "errors")},
+        "server": {
+            "scheduler": server.get("scheduler"),
+            "inference": server.get("inference"),
+            "batching": server.get("batching")
+        }
+    }
+
+
+def run_isolated(variant: str, **kwargs) -> Dict:
+    """Lance run_benchmark dans un processus neuf (une variante par processus)"""
+    context = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(run_benchmark, variant, **kwargs).result()
+
+
+def save_result(result: Dict, directory=RESULTS_DIR) -> Path:
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    stamp = result["timestamp"].replace(":", "").replace("-", "")
+    path = directory / f"{result['variant']}_{result['commit']}_{stamp}.json"
+    path.write_text(json.dumps(result, indent=2))
+    return path
+
+
+def print_result(result: Dict):
+    settings = result["settings"]
+    print(f"\n=== {result['variant']} ({result['mode']}) @ {result['commit']}"
+          f"{' (modifié)' if result.get('dirty') else ''} ===")
+    print(f"chunks {settings['chunk_ms']} ms, vitesse x{settings['speed']}, {settings['utterances']} énoncés, "
+          f"offset A/V {settings['av_offset_ms']} ms, device {result['device']}")
+    print(f"{'mesure':<22}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}{'n':>8}")
+    for name in METRICS:
+        summary = result["metrics"][name]
+        if summary is None:
+            print(f"{name:<22}{'-':>10}")
+            continue
+        print(f"{name:<22}{summary['p50']:>10.2f}{summary['p95']:>10.2f}{summary['p99']:>10.2f}"
+              f"{summary['max']:>10.2f}{summary['count']:>8}")
+    counts = result["counts"]
+    scheduler = result["server"]["scheduler"] or {}
+    print(f"paquets {counts['packets']}/{counts['frames_expected']} frames attendues, "
+          f"{scheduler.get('frames_dropped', 0)} frames sautées, {counts['errors']} erreurs HTTP")
+
+
+def compare_results(paths: List[str]):
+    """Tableau p50/p95/p99 de plusieurs rapports, écart relatif au premier"""
+    results = [json.loads(Path(path).read_text()) for path in paths]
+    labels = [f"{result['variant']}@{result['commit']}" for result in results]
+    print(" | ".join(f"[{index}] {label}" for index, label in enumerate(labels)))
+    for name in METRICS:
+        print(f"\n{name}")
+        for percentile in ("p50", "p95", "p99"):
+            values = [(result["metrics"].get(name) or {}).get(percentile) for result in results]
+            cells = []
+            for index, value in enumerate(values):
+                if value is None:
+                    cells.append(f"{'-':>18}")
+                elif index == 0 or not values[0]:
+                    cells.append(f"{value:>18.2f}")
+                else:
+                    cells.append(f"{value:>9.2f} ({(value / values[0] - 1) * 100:+5.0f}%)")
+            print(f"  {percentile:<5}" + "".join(cells))
+
+
+def parse_override(text: str):
+    name, _, value = text.partition("=")
+    try:
+        return name, ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return name, value
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Banc de latence chunk PCM -> paquet LiveLink")
+    parser.add_argument("--variant", action="append", choices=sorted(VARIANTS),
+                        help="Variante à mesurer (répétable)")
+    parser.add_argument("--utterances", type=int, default=5)
+    parser.add_argument("--seconds", type=float, default=3.0, help="Durée d'un énoncé synthétique")
+    parser.add_argument("--chunk-ms", type=float, default=None, help="Durée des chunks (défaut par variante)")
+    parser.add_argument("--speed", type=float, default=1.0, help="1 = temps réel, 2 = deux fois plus vite")
+    parser.add_argument("--pause", type=float, default=0.5, help="Silence entre énoncés (s)")
+    parser.add_argument("--set", action="append", default=[], metavar="NOM=VALEUR",
+                        help="Remplace une constante du serveur (ex: AV_OFFSET_MS=0)")
+    parser.add_argument("--infer-delay-ms", type=float, default=0.0,
+                        help="Attente par fenêtre du modèle de substitution (simule un modèle lent)")
+    parser.add_argument("--audio", help="WAV 16 kHz mono à rejouer")
+    parser.add_argument("--cuda", action="store_true", help="Autorise CUDA (CPU forcé par défaut)")
+    parser.add_argument("--output-dir", default=str(RESULTS_DIR))
+    parser.add_argument("--verbose", action="store_true")
+    parser.add_argument("--compare", nargs="+", metavar="JSON", help="Compare des rapports existants")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare_results(args.compare)
+        return
+    if not args.variant:
+        parser.error("--variant ou --compare requis")
+
+    kwargs = dict(utterances=args.utterances, seconds=args.seconds, chunk_ms=args.chunk_ms, speed=args.speed,
+                  pause=args.pause, overrides=dict(parse_override(item) for item in args.set),
+                  infer_delay_ms=args.infer_delay_ms, audio_path=args.audio, cuda=args.cuda,
+                  verbose=args.verbose)
+    paths = []
+    for variant in args.variant:
+        result = run_benchmark(variant, **kwargs) if len(args.variant) == 1 else run_isolated(variant, **kwargs)
+        print_result(result)
+        paths.append(save_result(result, args.output_dir))
+        print(f"→ {paths[-1]}")
+    if len(paths) > 1:
+        print()
+        compare_results(paths)
+
+
+if __name__ == "__main__":
+    main()
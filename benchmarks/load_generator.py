@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+Générateur de charge par rejeu du corpus audio capturé
+Simule K sessions d'avatar qui envoient chacune des énoncés du corpus
+(debug_logs/, dossiers de WAV) par chunks de 32 ms en temps réel, comme
+GalaAudioSender, et cherche le nombre de locuteurs simultanés qu'un
+processus d'API (ou un cœur) tient avant que l'animation ne prenne du
+retard sur le temps réel.
+
+Arrivée des énoncés :
+  - closed : K sessions, chacune enchaîne énoncé puis pause (niveaux = K)
+  - open   : énoncés lancés selon un processus de Poisson, quelle que soit
+             la charge (niveaux = énoncés par seconde)
+
+Chaque niveau monte en charge sur --ramp-up secondes (exclues des mesures)
+puis est mesuré sur --step-seconds : débit d'audio accepté, latence des
+requêtes, retard sur le temps réel (fin de requête - instant prévu du
+chunk), erreurs et compteurs du serveur (/health). La courbe débit /
+latence est sauvée en JSON (et en PNG si matplotlib est installé).
+
+Usage:
+    python benchmarks/load_generator.py --url http://127.0.0.1:6969 --levels 1,2,4,8
+    python benchmarks/load_generator.py --variant api_optimized --cpus 0 --levels 1,2,4,8,16
+    python benchmarks/load_generator.py --arrival open --levels 0.5,1,2,4 --variant api_pcm_direct
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+import aiohttp
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.audio_corpus import Corpus, build_corpus, SAMPLE_RATE
+from modules.debug_sink import DEBUG_SINK_NAME
+from benchmarks.latency_benchmark import RESULTS_DIR, VARIANTS, git_revision, parse_override, summarize
+
+
+CHUNK_MS = 32  # Comme GalaAudioSender
+DEFAULT_CORPUS = str(Path(__file__).resolve().parent.parent / "debug_logs")
+
+
+class ChunkResult(NamedTuple):
+    """Un chunk envoyé (instants time.monotonic)"""
+    scheduled: float  # Instant prévu en temps réel
+    sent: float
+    done: float
+    status: int  # 0 : erreur réseau / timeout
+    size: int
+
+
+class LoadGenerator:
+    """
+    Sessions simulées contre une API Gala
+
+    Une seule ClientSession aiohttp (une connexion keep-alive par session
+    active). Chaque énoncé est envoyé chunk par chunk : un chunk part à son
+    instant prévu, ou dès la réponse au précédent si celle-ci arrive en
+    retard (un client de streaming n'a qu'une requête en vol).
+    """
+
+    def __init__(self, url: str, corpus: Corpus, chunk_ms: float = CHUNK_MS, think: float = 0.5,
+                 flush: bool = False, timeout: float = 10.0, seed: int = 0):
+        """
+        Args:
+            url: URL de l'API (ex: http://127.0.0.1:6969)
+            corpus: Énoncés à rejouer
+            chunk_ms: Durée d'un chunk
+            think: Pause moyenne entre deux énoncés d'une session (s, loi exponentielle)
+            flush: Appelle /flush_buffer en fin d'énoncé (vide le buffer partagé des
+                   serveurs PCM : à éviter avec plusieurs sessions)
+            timeout: Timeout d'une requête (s)
+            seed: Graine des tirages (énoncés, pauses, arrivées)
+        """
+        self.url = url.rstrip("/")
+        self.corpus = corpus
+        self.chunk_bytes = int(SAMPLE_RATE * chunk_ms / 1000) * 2
+        self.chunk_seconds = self.chunk_bytes / 2 / SAMPLE_RATE
+        self.think = think
+        self.flush = flush
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.rng = np.random.default_rng(seed)
+        self.results: List[ChunkResult] = []
+        self.active = 0
+        self.max_active = 0
+
+    async def _post(self, http: aiohttp.ClientSession, path: str, data: bytes) -> int:
+        try:
+            async with http.post(f"{self.url}{path}", data=data, headers={"Content-Type": "audio/pcm"},
+                                 timeout=self.timeout) as response:
+                await response.read()
+                return response.status
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return 0
+
+    async def utterance(self, http: aiohttp.ClientSession):
+        """Envoie un énoncé tiré du corpus au rythme du temps réel"""
+        pcm = self.corpus.pick(self.rng).pcm
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            start = time.monotonic()
+            for index, offset in enumerate(range(0, len(pcm), self.chunk_bytes)):
+                scheduled = start + index * self.chunk_seconds
+                delay = scheduled - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                chunk = pcm[offset:offset + self.chunk_bytes]
+                sent = time.monotonic()
+                status = await self._post(http, "/audio_to_blendshapes", chunk)
+                self.results.append(ChunkResult(scheduled, sent, time.monotonic(), status, len(chunk)))
+            if self.flush:
+                await self._post(http, "/flush_buffer", b"")
+        finally:
+            self.active -= 1
+
+    async def closed_loop(self, http: aiohttp.ClientSession, sessions: int, ramp_up: float, stop_at: float):
+        """K sessions démarrées progressivement sur ramp_up secondes"""
+        async def session(delay: float):
+            await asyncio.sleep(delay)
+            while time.monotonic() < stop_at:
+                await self.utterance(http)
+                await asyncio.sleep(self.rng.exponential(self.think) if self.think > 0 else 0)
+
+        await asyncio.gather(*(session(index * ramp_up / sessions) for index in range(sessions)))
+
+    async def open_loop(self, http: aiohttp.ClientSession, rate: float, ramp_up: float, stop_at: float):
+        """Énoncés lancés selon un processus de Poisson ; le taux monte linéairement sur ramp_up"""
+        tasks = []
+        start = time.monotonic()
+        while True:
+            await asyncio.sleep(self.rng.exponential(1 / rate))
+            now = time.monotonic()
+            if now >= stop_at:
+                break
+            if ramp_up > 0 and self.rng.random() > (now - start) / ramp_up:
+                continue  # Amincissement : taux effectif rate * progression de la rampe
+            tasks.append(asyncio.ensure_future(self.utterance(http)))
+        await asyncio.gather(*tasks)
+
+
+async def fetch_health(http: aiohttp.ClientSession, url: str) -> Optional[Dict]:
+    try:
+        async with http.get(f"{url.rstrip('/')}/health") as response:
+            return await response.json(content_type=None)
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+        return None
+
+
+def server_counters(health: Optional[Dict]) -> Dict:
+    """Compteurs utiles de /health (absents selon la variante)"""
+    health = health or {}
+    scheduler = health.get("scheduler") or {}
+    buffer = health.get("buffer") or {}
+    return {
+        "frames_sent": scheduler.get("frames_sent"),
+        "frames_dropped": scheduler.get("frames_dropped"),
+        "frames_pending": scheduler.get("frames_pending"),
+        "buffer_level": buffer.get("level"),
+        "buffer_bytes_dropped": buffer.get("bytes_dropped"),
+        "buffer_overflows": buffer.get("overflows")
+    }
+
+
+def _delta(after: Dict, before: Dict, name: str) -> Optional[int]:
+    if after.get(name) is None or before.get(name) is None:
+        return None
+    return after[name] - before[name]
+
+
+def summarize_step(level: float, results: List[ChunkResult], window: float, before: Dict, after: Dict,
+                   max_lag_ms: float, max_error_rate: float, max_active: int) -> Dict:
+    """
+    Mesures d'un niveau de charge
+
+    Le retard (lag) d'un chunk est la fin de sa requête moins son instant
+    prévu en temps réel : il croît sans borne dès que le serveur ne suit
+    plus. Le niveau est tenu si le p95 du retard reste sous max_lag_ms, le
+    taux d'erreur sous max_error_rate et si le serveur n'a jeté aucun audio.
+    """
+    ok = [result for result in results if result.status == 200]
+    lag = [(result.done - result.scheduled) * 1000 for result in results]
+    latency = [(result.done - result.sent) * 1000 for result in results]
+    error_rate = (len(results) - len(ok)) / len(results) if results else 1.0
+    audio_seconds = sum(result.size for result in ok) / 2 / SAMPLE_RATE
+
+    server = {name: _delta(after, before, name)
+              for name in ("frames_sent", "frames_dropped", "buffer_bytes_dropped", "buffer_overflows")}
+    server["frames_pending"] = after.get("frames_pending")
+    server["buffer_level"] = after.get("buffer_level")
+    if server["frames_sent"] is not None:
+        server["output_fps"] = server["frames_sent"] / window
+
+    lag_summary = summarize(lag)
+    sustained = (lag_summary is not None and lag_summary["p95"] <= max_lag_ms
+                 and error_rate <= max_error_rate and not server["buffer_bytes_dropped"])
+    return {
+        "level": level,
+        "chunks": len(results),
+        "max_active_sessions": max_active,
+        "throughput": {
+            "audio_seconds_per_second": audio_seconds / window,  # = locuteurs servis en temps réel
+            "requests_per_second": len(results) / window
+        },
+        "latency_ms": summarize(latency),
+        "lag_ms": lag_summary,
+        "errors": len(results) - len(ok),
+        "busy": sum(result.status == 503 for result in results),
+        "error_rate": error_rate,
+        "server": server,
+        "sustained": sustained
+    }
+
+
+async def run_levels(url: str, corpus: Corpus, levels: List[float], arrival: str = "closed",
+                     ramp_up: float = 2.0, step_seconds: float = 10.0, chunk_ms: float = CHUNK_MS,
+                     think: float = 0.5, flush: bool = False, max_lag_ms: float = 100.0,
+                     max_error_rate: float = 0.01, keep_going: bool = False, seed: int = 0,
+                     progress=print) -> List[Dict]:
+    """
+    Mesure chaque niveau de charge l'un après l'autre
+
+    Returns:
+        Une entrée summarize_step() par niveau mesuré
+    """
+    steps = []
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as http:
+        for level in levels:
+            generator = LoadGenerator(url, corpus, chunk_ms, think, flush, seed=seed)
+            start = time.monotonic()
+            measure_from, stop_at = start + ramp_up, start + ramp_up + step_seconds
+
+            async def snapshot_at(when: float):
+                await asyncio.sleep(max(0.0, when - time.monotonic()))
+                return server_counters(await fetch_health(http, url))
+
+            before_task = asyncio.ensure_future(snapshot_at(measure_from))
+            after_task = asyncio.ensure_future(snapshot_at(stop_at))
+            if arrival == "closed":
+                await generator.closed_loop(http, int(level), ramp_up, stop_at)
+            else:
+                await generator.open_loop(http, level, ramp_up, stop_at)
+
+            results = [result for result in generator.results if measure_from <= result.scheduled < stop_at]
+            step = summarize_step(level, results, step_seconds, await before_task, await after_task,
+                                  max_lag_ms, max_error_rate, generator.max_active)
+            steps.append(step)
+            progress(format_step(step, arrival))
+            if not step["sustained"] and not keep_going:
+                break
+            await asyncio.sleep(1.0)  # Laisser le serveur vider ses files
+    return steps
+
+
+def format_step(step: Dict, arrival: str) -> str:
+    unit = "sessions" if arrival == "closed" else "énoncés/s"
+    lag, latency = step["lag_ms"] or {}, step["latency_ms"] or {}
+    return (f"{step['level']:>6g} {unit:<9} | débit {step['throughput']['audio_seconds_per_second']:6.2f} s/s "
+            f"| latence p50 {latency.get('p50', float('nan')):7.1f} p95 {latency.get('p95', float('nan')):7.1f} ms "
+            f"| retard p95 {lag.get('p95', float('nan')):8.1f} ms | erreurs {step['errors']:4d} "
+            f"| {'✓' if step['sustained'] else '✗ décroche'}")
+
+
+def serve_variant(variant: str, cpus: Optional[List[int]], ready, overrides: Optional[Dict],
+                  infer_delay_ms: float):
+    """
+    Processus serveur : variante + modèle de substitution sur un port libre
+
+    Les cœurs sont fixés avant le chargement de torch pour que le serveur
+    (inférence comprise) ne tourne que sur `cpus`.
+    """
+    if cpus:
+        os.sched_setaffinity(0, cpus)
+    import torch
+    torch.cuda.is_available = lambda: False
+    if cpus:
+        torch.set_num_threads(len(cpus))
+
+    from werkzeug.serving import make_server
+    from benchmarks.latency_benchmark import load_variant, start_server
+    from debug_tools.livelink_receiver import LiveLinkReceiver
+
+    receiver = LiveLinkReceiver("127.0.0.1", 0).start()  # Puits des paquets LiveLink
+    module = load_variant(variant, receiver.address, overrides, infer_delay_ms)
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)  # Pas de ligne de log par requête
+    start_server(module, VARIANTS[variant]["mode"])
+    server = make_server("127.0.0.1", 0, module.app, threaded=True)
+    ready.put(server.server_port)
+    server.serve_forever()
+
+
+def start_variant_process(variant: str, cpus: Optional[List[int]] = None, overrides: Optional[Dict] = None,
+                          infer_delay_ms: float = 0.0, timeout: float = 60.0):
+    """
+    Démarre une variante dans un processus dédié
+
+    Returns:
+        (processus, url)
+    """
+    context = multiprocessing.get_context("spawn")
+    ready = context.Queue()
+    process = context.Process(target=serve_variant, args=(variant, cpus, ready, overrides, infer_delay_ms),
+                              daemon=True)
+    process.start()
+    port = ready.get(timeout=timeout)
+    return process, f"http://127.0.0.1:{port}"
+
+
+def sustained_level(steps: List[Dict]) -> Optional[float]:
+    """Plus haut niveau tenu avant le premier décrochage"""
+    best = None
+    for step in steps:
+        if not step["sustained"]:
+            break
+        best = step["level"]
+    return best
+
+
+def plot_curve(result: Dict, path):
+    """Courbe débit / latence (matplotlib importé seulement ici)"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    steps = result["steps"]
+    throughput = [step["throughput"]["audio_seconds_per_second"] for step in steps]
+    figure, axis = plt.subplots(figsize=(8, 5))
+    for percentile in ("p50", "p95", "p99"):
+        axis.plot(throughput, [(step["lag_ms"] or {}).get(percentile) for step in steps], marker="o",
+                  label=f"retard {percentile}")
+    for step, x in zip(steps, throughput):
+        axis.annotate(f"{step['level']:g}", (x, (step["lag_ms"] or {}).get("p95") or 0), fontsize=8)
+    axis.axhline(result["settings"]["max_lag_ms"], color="red", linestyle="--", linewidth=0.8)
+    axis.set_xlabel("Audio servi (s par s = locuteurs temps réel)")
+    axis.set_ylabel("Retard sur le temps réel (ms)")
+    axis.set_yscale("log")
+    axis.set_title(f"{result['target']} ({result['settings']['arrival']})")
+    axis.legend()
+    figure.tight_layout()
+    figure.savefig(path, dpi=100)
+    plt.close(figure)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Générateur de charge par rejeu du corpus audio")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", help="API déjà lancée (ex: http://127.0.0.1:6969)")
+    target.add_argument("--variant", choices=sorted(VARIANTS),
+                        help="Lance la variante avec le modèle de substitution dans un processus dédié")
+    parser.add_argument("--corpus", action="append", help="Dossier de captures / WAV (répétable, défaut debug_logs)")
+    parser.add_argument("--sink-name", default=DEBUG_SINK_NAME,
+                        help="Préfixe des journaux DebugSink du corpus (<nom>.jsonl / .bin)")
+    parser.add_argument("--group-gap", type=float, default=1.0, help="Écart max entre captures d'un énoncé (s)")
+    parser.add_argument("--index", help="Écrit l'index JSON du corpus puis quitte")
+    parser.add_argument("--arrival", choices=("closed", "open"), default="closed")
+    parser.add_argument("--levels", default="1,2,4,8", help="Sessions (closed) ou énoncés/s (open)")
+    parser.add_argument("--ramp-up", type=float, default=2.0, help="Montée en charge par niveau (s, non mesurée)")
+    parser.add_argument("--step-seconds", type=float, default=10.0, help="Durée mesurée par niveau (s)")
+    parser.add_argument("--chunk-ms", type=float, default=CHUNK_MS)
+    parser.add_argument("--think", type=float, default=0.5, help="Pause moyenne entre énoncés (closed, s)")
+    parser.add_argument("--flush", action="store_true", help="/flush_buffer en fin d'énoncé")
+    parser.add_argument("--max-lag-ms", type=float, default=100.0, help="Retard p95 toléré")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--keep-going", action="store_true", help="Continue après le premier décrochage")
+    parser.add_argument("--cpus", help="Cœurs du processus serveur (--variant), ex: 0 ou 0,1")
+    parser.add_argument("--set", action="append", default=[], metavar="NOM=VALEUR",
+                        help="Remplace une constante du serveur (--variant)")
+    parser.add_argument("--infer-delay-ms", type=float, default=0.0,
+                        help="Attente par fenêtre du modèle de substitution (--variant)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output-dir", default=str(RESULTS_DIR))
+    parser.add_argument("--plot", action="store_true", help="Sauve aussi la courbe en PNG")
+    args = parser.parse_args(argv)
+
+    corpus = build_corpus(args.corpus or [DEFAULT_CORPUS], args.group_gap, sink_name=args.sink_name)
+    summary = corpus.summary()
+    print(f"Corpus: {summary['clips']} énoncés, {summary['total_seconds']:.1f} s "
+          f"({summary['mean_seconds']:.2f} s en moyenne) {summary['sources']}")
+    if args.index:
+        corpus.write_index(args.index)
+        print(f"→ {args.index}")
+        return
+    if not args.url and not args.variant:
+        parser.error("--url ou --variant requis")
+
+    cpus = [int(cpu) for cpu in args.cpus.split(",")] if args.cpus else None
+    levels = [float(level) for level in args.levels.split(",")]
+    process = None
+    url = args.url
+    if args.variant:
+        process, url = start_variant_process(args.variant, cpus, dict(parse_override(item) for item in args.set),
+                                             args.infer_delay_ms)
+    try:
+        steps = asyncio.run(run_levels(url, corpus, levels, args.arrival, args.ramp_up, args.step_seconds,
+                                       args.chunk_ms, args.think, args.flush, args.max_lag_ms,
+                                       args.max_error_rate, args.keep_going, args.seed))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.join(timeout=5)
+
+    sustained = sustained_level(steps)
+    cores = len(cpus) if cpus else os.cpu_count()
+    result = {
+        "benchmark": "load",
+        "target": args.variant or url,
+        **git_revision(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "settings": {
+            "arrival": args.arrival, "levels": levels, "ramp_up": args.ramp_up,
+            "step_seconds": args.step_seconds, "chunk_ms": args.chunk_ms, "think": args.think,
+            "flush": args.flush, "max_lag_ms": args.max_lag_ms, "max_error_rate": args.max_error_rate,
+            "cpus": cpus, "infer_delay_ms": args.infer_delay_ms, "seed": args.seed
+        },
+        "corpus": summary,
+        "steps": steps,
+        "max_sustained_level": sustained,
+        "sustained_per_core": sustained / cores if sustained is not None and args.variant else None
+    }
+
+    print(f"\nNiveau max tenu: {sustained if sustained is not None else 'aucun'}"
+          + (f" sur {cores} cœur(s)" if args.variant else ""))
+    directory = Path(args.output_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    name = f"load_{(args.variant or 'url')}_{result['commit']}_{result['timestamp'].replace(':', '').replace('-', '')}"
+    path = directory / f"{name}.json"
+    path.write_text(json.dumps(result, indent=2))
+    print(f"→ {path}")
+    if args.plot:
+        try:
+            plot_curve(result, directory / f"{name}.png")
+            print(f"→ {directory / f'{name}.png'}")
+        except ImportError:
+            print("matplotlib non installé : courbe non tracée")
+
+
+if __name__ == "__main__":
+    main()
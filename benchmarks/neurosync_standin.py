@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Modèle NeuroSync de substitution (CPU, déterministe) pour Gala v1
+Reproduit l'interface des modules models.neurosync.* importés par les
+serveurs (config, load_model, extraction des features, inférence par
+fenêtres encoder/decoder, generate_facial_data_from_bytes) avec un petit
+réseau aux poids fixés par une graine. Sert aux bancs de mesure : les
+serveurs tournent dans le processus sans checkpoint ni GPU, avec les
+mêmes formes de tenseurs et les mêmes appels au modèle
+"""
+
+import io
+import sys
+import threading
+import time
+import types
+import wave
+from collections import deque
+from typing import Dict, List
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from modules.resampler_bank import resampler_bank
+
+
+SAMPLE_RATE = 88200
+FEATURE_DIM = 256  # 128 bandes log-énergie + leurs deltas
+OUTPUT_DIM = 68  # 61 blendshapes + 7 émotions, comme NeuroSync
+
+config = {
+    "input_dim": FEATURE_DIM,
+    "output_dim": OUTPUT_DIM,
+    "hidden_dim": 512,
+    "frame_size": 128,  # Features par fenêtre du modèle
+    "use_half_precision": False,
+    "seed": 0,
+    "infer_delay_ms": 0.0  # Attente ajoutée à chaque fenêtre (simule un modèle plus lent)
+}
+
+# Durées mesurées (s) des dernières extractions et inférences
+_timings_lock = threading.Lock()
+_timings = {"features": deque(maxlen=100000), "inference": deque(maxlen=100000)}
+
+
+def _record(kind: str, seconds: float):
+    with _timings_lock:
+        _timings[kind].append(seconds)
+
+
+def timings() -> Dict[str, List[float]]:
+    """Durées (s) enregistrées depuis le dernier reset_timings()"""
+    with _timings_lock:
+        return {kind: list(values) for kind, values in _timings.items()}
+
+
+def reset_timings():
+    with _timings_lock:
+        for values in _timings.values():
+            values.clear()
+
+
+class StandInSeq2Seq(nn.Module):
+    """Encoder/decoder [B, T, 256] -> [B, T, 68] aux poids déterministes"""
+
+    def __init__(self, input_dim: int = FEATURE_DIM, hidden_dim: int = 512,
+                 output_dim: int = OUTPUT_DIM, seed: int = 0):
+        super().__init__()
+        generator = torch.Generator().manual_seed(seed)
+        self.encoder = nn.Sequential(
+            nn.Linear(input_dim, hidden_dim), nn.ReLU(),
+            nn.Linear(hidden_dim, hidden_dim), nn.ReLU()
+        )
+        self.decoder = nn.Sequential(nn.Linear(hidden_dim, output_dim), nn.Sigmoid())
+        with torch.no_grad():
+            for parameter in self.parameters():
+                parameter.copy_(torch.randn(parameter.shape, generator=generator) * 0.05)
+
+    def forward(self, x):
+        return self.decoder(self.encoder(x))
+
+
+def load_model(model_path: str, model_config: Dict, device: str) -> nn.Module:
+    """Même signature que NeuroSync ; model_path est ignoré"""
+    model = StandInSeq2Seq(model_config.get("input_dim", FEATURE_DIM), model_config.get("hidden_dim", 512),
+                           model_config.get("output_dim", OUTPUT_DIM), model_config.get("seed", 0))
+    return model.to(device).eval()
+
+
+def load_pcm_audio_from_bytes(pcm_bytes: bytes, sr: int = 16000, channels: int = 1,
+                              sample_width: int = 2) -> np.ndarray:
+    """PCM int16 -> audio float32 mono à 88.2 kHz"""
+    audio = np.frombuffer(pcm_bytes, dtype=np.int16).astype(np.float32) / 32768.0
+    if channels > 1:
+        audio = audio[:len(audio) // channels * channels].reshape(-1, channels).mean(axis=1)
+    if sr != SAMPLE_RATE:
+        audio = resampler_bank.resample(torch.from_numpy(audio), sr, SAMPLE_RATE).numpy()
+    return audio
+
+
+def extract_and_combine_features(audio: np.ndarray, sr: int, frame_length: int,
+                                 hop_length: int) -> np.ndarray:
+    """
+    Features [len(audio) // hop_length, 256] : log-énergie de 128 bandes FFT et deltas
+
+    Toutes les trames sont calculées d'un bloc (fenêtres glissantes vues
+    sans copie), la fin est complétée par des zéros comme NeuroSync.
+    """
+    start = time.perf_counter()
+    audio = np.asarray(audio, dtype=np.float32)
+    count = len(audio) // hop_length
+    if count == 0:
+        _record("features", time.perf_counter() - start)
+        return np.zeros((0, FEATURE_DIM), dtype=np.float32)
+
+    padded = np.concatenate([audio, np.zeros(frame_length, dtype=np.float32)])
+    frames = np.lib.stride_tricks.sliding_window_view(padded, frame_length)[::hop_length][:count]
+    spectrum = np.abs(np.fft.rfft(frames * np.hanning(frame_length).astype(np.float32), axis=1))
+    bands = np.array_split(spectrum, FEATURE_DIM // 2, axis=1)
+    energy = np.log1p(np.stack([band.mean(axis=1) for band in bands], axis=1))
+    delta = np.diff(energy, axis=0, prepend=energy[:1])
+    features = np.concatenate([energy, delta], axis=1).astype(np.float32)
+
+    _record("features", time.perf_counter() - start)
+    return features
+
+
+def process_audio_features(features: np.ndarray, model, device: str, model_config: Dict) -> np.ndarray:
+    """
+    Inférence par fenêtres de frame_size features (encoder puis decoder)
+
+    Returns:
+        Blendshapes [ceil(T / 2), 68] : une frame pour deux features (60 fps)
+    """
+    start = time.perf_counter()
+    features = np.asarray(features, dtype=np.float32)
+    frame_size = model_config.get("frame_size", 128)
+    delay = model_config.get("infer_delay_ms", 0.0) / 1000
+
+    outputs = []
+    for offset in range(0, len(features), frame_size):
+        window = features[offset:offset + frame_size]
+        src = torch.zeros(1, frame_size, features.shape[1])
+        src[0, :len(window)] = torch.from_numpy(window)
+        with torch.inference_mode():
+            decoded = model.decoder(model.encoder(src.to(device)))
+        outputs.append(decoded[0, :len(window)].float().cpu().numpy())
+        if delay > 0:
+            time.sleep(delay)
+
+    result = np.concatenate(outputs, axis=0)[::2] if outputs else np.zeros((0, OUTPUT_DIM), dtype=np.float32)
+    _record("inference", time.perf_counter() - start)
+    return result
+
+
+def generate_facial_data_from_bytes(audio_bytes: bytes, model, device: str, model_config: Dict) -> np.ndarray:
+    """WAV (RIFF) ou PCM int16 16 kHz -> blendshapes [frames, 68]"""
+    if audio_bytes[:4] == b"RIFF":
+        with wave.open(io.BytesIO(audio_bytes), "rb") as wav_file:
+            audio = load_pcm_audio_from_bytes(wav_file.readframes(wav_file.getnframes()),
+                                              sr=wav_file.getframerate(), channels=wav_file.getnchannels())
+    else:
+        audio = load_pcm_audio_from_bytes(audio_bytes)
+
+    frame_length = int(0.01667 * SAMPLE_RATE)
+    features = extract_and_combine_features(audio, SAMPLE_RATE, frame_length, frame_length // 2)
+    return process_audio_features(features, model, device, model_config)
+
+
+def install():
+    """
+    Enregistre ce module sous les noms models.neurosync.* importés par les serveurs
+
+    À appeler avant d'importer un api_*.py ; n'a d'effet que dans le processus courant.
+    """
+    names = {
+        "models": {},
+        "models.neurosync": {},
+        "models.neurosync.config": {"config": config},
+        "models.neurosync.generate_face_shapes": {
+            "generate_facial_data_from_bytes": generate_facial_data_from_bytes},
+        "models.neurosync.model": {},
+        "models.neurosync.model.model": {"load_model": load_model},
+        "models.neurosync.audio": {},
+        "models.neurosync.audio.extraction": {},
+        "models.neurosync.audio.extraction.extract_features": {
+            "extract_and_combine_features": extract_and_combine_features,
+            "load_pcm_audio_from_bytes": load_pcm_audio_from_bytes},
+        "models.neurosync.audio.processing": {},
+        "models.neurosync.audio.processing.audio_processing": {
+            "process_audio_features": process_audio_features},
+    }
+    for name, attributes in names.items():
+        module = types.ModuleType(name)
+        module.__path__ = []  # Paquet : les sous-modules restent importables
+        module.__dict__.update(attributes)
+        sys.modules[name] = module
+    for name in names:
+        parent, _, child = name.rpartition(".")
+        if parent:
+            setattr(sys.modules[parent], child, sys.modules[name])
@@ -3,8 +3,8 @@ Configuration centrale pour Gala v1
 """
 
 import os
-from dataclasses import dataclass
-from typing import List, Optional
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
 
 @dataclass
 class AudioConfig:
@@ -24,8 +24,27 @@ class ModelConfig:
     sequence_length: int = 1024
     use_cuda: bool = True
     use_fp16: bool = True
+    precision: str = "auto"  # auto, fp32, fp16 (GPU), bf16 / int8 (CPU) - voir modules/precision.py
     batch_size: int = 1
+    # Démarrage (voir modules/startup.py) : poids mappés, préchauffage (durée ms, fréquence Hz)
+    mmap_weights: bool = True
+    warmup_chunks: List[Tuple[int, int]] = field(default_factory=lambda: [(192, 16000), (200, 48000)])
+    warmup_iterations: int = 3
     
+@dataclass
+class LiveLinkDestination:
+    """Nœud de rendu Unreal recevant les paquets LiveLink"""
+    host: str = "127.0.0.1"
+    port: int = 11111
+    sndbuf: int = 0  # SO_SNDBUF en octets (0 = défaut système)
+    tos: int = 0  # Octet IP_TOS (DSCP << 2), ex: 0xB8 = EF
+
+@dataclass
+class LiveLinkSubject:
+    """Sujet LiveLink (un avatar)"""
+    name: str = "GalaFace"
+    uuid: Optional[str] = None  # Généré au démarrage si None
+
 @dataclass
 class LiveLinkConfig:
     """Configuration LiveLink"""
@@ -34,7 +53,17 @@ class LiveLinkConfig:
     subject_name: str = "GalaFace"
     fps: int = 60
     use_compression: bool = True
+    # Fan-out multi-sujets / multi-destinations (voir modules/livelink_transport.py)
+    # Vides : un seul sujet subject_name vers host:port
+    destinations: List[LiveLinkDestination] = field(default_factory=list)
+    subjects: List[LiveLinkSubject] = field(default_factory=list)
+    # Émission delta / keyframe (voir modules/send_policy.py)
+    delta_send: bool = False
+    delta_epsilon: float = 1e-3  # Variation minimale d'un canal pour renvoyer la frame
+    keyframe_interval: float = 0.5  # Intervalle maximal entre deux paquets (s)
+    idle_fps: float = 10.0  # Cadence maximale hors parole
     
+
 @dataclass
 class APIConfig:
     """Configuration de l'API"""
@@ -50,10 +79,10 @@ class APIConfig:
 @dataclass
 class GalaConfig:
     """Configuration complète de Gala v1"""
-    audio: AudioConfig = AudioConfig()
-    model: ModelConfig = ModelConfig()
-    livelink: LiveLinkConfig = LiveLinkConfig()
-    api: APIConfig = APIConfig()
+    audio: AudioConfig = field(default_factory=AudioConfig)
+    model: ModelConfig = field(default_factory=ModelConfig)
+    livelink: LiveLinkConfig = field(default_factory=LiveLinkConfig)
+    api: APIConfig = field(default_factory=APIConfig)
     
     # Paths
     base_dir: str = os.path.dirname(os.path.abspath(__file__))
@@ -70,6 +99,17 @@ class GalaConfig:
     pin_memory: bool = True
     prefetch_factor: int = 2
     
+    # Cache des blendshapes (voir modules/facial_cache.py)
+    facial_cache_memory_mb: int = 64
+    facial_cache_on_disk: bool = False  # Phrases en direct presque toutes uniques : utile pour un TTS rejoué
+    facial_cache_disk_mb: int = 512
+    
+    # Instrumentation par étape exposée sur /metrics (voir modules/metrics.py)
+    metrics_enabled: bool = True
+    
+    # Profileur échantillonné /debug/profile (voir modules/profiler.py)
+    profiling_enabled: bool = True
+    
     def __post_init__(self):
         # Créer les dossiers nécessaires
         os.makedirs(self.models_dir, exist_ok=True)
@@ -87,8 +127,47 @@ class GalaConfig:
             config.api.port = int(os.getenv("GALA_API_PORT"))
         if os.getenv("GALA_LIVELINK_PORT"):
             config.livelink.port = int(os.getenv("GALA_LIVELINK_PORT"))
+        if os.getenv("GALA_LIVELINK_DESTINATIONS"):
+            # "ip:port,ip:port" ; options communes GALA_LIVELINK_SNDBUF / GALA_LIVELINK_TOS
+            sndbuf = int(os.getenv("GALA_LIVELINK_SNDBUF", "0"))
+            tos = int(os.getenv("GALA_LIVELINK_TOS", "0"), 0)
+            config.livelink.destinations = [
+                LiveLinkDestination(host, int(port), sndbuf, tos)
+                for host, port in (item.strip().rsplit(":", 1)
+                                   for item in os.getenv("GALA_LIVELINK_DESTINATIONS").split(","))
+            ]
+        if os.getenv("GALA_LIVELINK_SUBJECTS"):
+            config.livelink.subjects = [
+                LiveLinkSubject(name.strip()) for name in os.getenv("GALA_LIVELINK_SUBJECTS").split(",")
+            ]
+        if os.getenv("GALA_LIVELINK_DELTA"):
+            config.livelink.delta_send = os.getenv("GALA_LIVELINK_DELTA").lower() == "true"
+        if os.getenv("GALA_LIVELINK_IDLE_FPS"):
+            config.livelink.idle_fps = float(os.getenv("GALA_LIVELINK_IDLE_FPS"))
         if os.getenv("GALA_DEBUG"):
             config.api.debug = os.getenv("GALA_DEBUG").lower() == "true"
+        if os.getenv("GALA_PRECISION"):
+            config.model.precision = os.getenv("GALA_PRECISION").lower()
+        if os.getenv("GALA_MMAP_WEIGHTS"):
+            config.model.mmap_weights = os.getenv("GALA_MMAP_WEIGHTS").lower() == "true"
+        if os.getenv("GALA_WARMUP") is not None:
+            # "192@16000,200@48000" ; "off" ou vide pour ne pas préchauffer
+            warmup = os.getenv("GALA_WARMUP").strip().lower()
+            config.model.warmup_chunks = [] if warmup in ("", "off") else [
+                (int(ms), int(rate)) for ms, rate in (item.strip().split("@") for item in warmup.split(","))
+            ]
+        if os.getenv("GALA_WARMUP_ITERATIONS"):
+            config.model.warmup_iterations = int(os.getenv("GALA_WARMUP_ITERATIONS"))
+        if os.getenv("GALA_FACIAL_CACHE_MB"):
+            config.facial_cache_memory_mb = int(os.getenv("GALA_FACIAL_CACHE_MB"))
+        if os.getenv("GALA_FACIAL_CACHE_DISK"):
+            config.facial_cache_on_disk = os.getenv("GALA_FACIAL_CACHE_DISK").lower() == "true"
+        if os.getenv("GALA_FACIAL_CACHE_DISK_MB"):
+            config.facial_cache_disk_mb = int(os.getenv("GALA_FACIAL_CACHE_DISK_MB"))
+        if os.getenv("GALA_METRICS"):
+            config.metrics_enabled = os.getenv("GALA_METRICS").lower() == "true"
+        if os.getenv("GALA_PROFILING"):
+            config.profiling_enabled = os.getenv("GALA_PROFILING").lower() == "true"
             
         return config
 
@@ -2,12 +2,27 @@
 """
 Outil pour analyser les captures de paquets LiveLink
 Permet de comparer avec le format NeuroSync_Player qui fonctionne
+Paquets isolés (.bin) : analyse octet par octet ; captures .llcap : stats
+vectorisées par canal et comparaison de deux captures
 """
 
 import sys
 import struct
 import binascii
 from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from debug_tools.capture_format import Capture, load_capture
+from modules.pylivelinkface import FaceBlendShape
+
+# Noms des 61 canaux (52-60 : rotations tête / yeux, hors FaceBlendShape)
+CHANNEL_NAMES = [shape.name for shape in sorted(FaceBlendShape)] + [
+    "HeadYaw", "HeadPitch", "HeadRoll", "LeftEyeYaw", "LeftEyePitch", "LeftEyeRoll",
+    "RightEyeYaw", "RightEyePitch", "RightEyeRoll"]
 
 def analyze_packet(data):
     """Analyse un paquet LiveLink"""
@@ -125,13 +140,143 @@ def extract_blendshapes(data):
         print(f"Erreur extraction blendshapes: {e}")
         return []
 
+def channel_stats(values: np.ndarray, active_threshold: float = 0.01) -> Dict[str, np.ndarray]:
+    """
+    Statistiques par canal d'un bloc de valeurs [N, 61]
+
+    Returns:
+        {mean, std, min, max, p95, active} : tableaux [61] (active = part des
+        frames au-dessus du seuil)
+    """
+    values = np.asarray(values, dtype=np.float32)
+    if len(values) == 0:
+        zeros = np.zeros(values.shape[1] if values.ndim == 2 else 61, dtype=np.float32)
+        return {key: zeros for key in ("mean", "std", "min", "max", "p95", "active")}
+    return {
+        "mean": values.mean(axis=0),
+        "std": values.std(axis=0),
+        "min": values.min(axis=0),
+        "max": values.max(axis=0),
+        "p95": np.percentile(values, 95, axis=0),
+        "active": (values > active_threshold).mean(axis=0)
+    }
+
+
+def timing_stats(records: np.ndarray) -> Dict[str, float]:
+    """Cadence, jitter d'arrivée et frames manquantes d'un sujet"""
+    if len(records) < 2:
+        return {"packets": len(records)}
+    intervals = np.diff(records["arrival"]) * 1000
+    steps = np.diff(records["frames"].astype(np.int64))
+    duration = records["arrival"][-1] - records["arrival"][0]
+    return {
+        "packets": len(records),
+        "duration_s": float(duration),
+        "fps": (len(records) - 1) / duration if duration > 0 else 0.0,
+        "interval_p50_ms": float(np.percentile(intervals, 50)),
+        "interval_p99_ms": float(np.percentile(intervals, 99)),
+        "interval_std_ms": float(intervals.std()),
+        "missing_frames": int(np.sum(steps[steps > 1] - 1)),
+        "reordered": int(np.sum(steps < 0))
+    }
+
+
+def _subject_records(capture: Capture, subject: Optional[str]) -> np.ndarray:
+    """Enregistrements valides d'un sujet (le premier si None)"""
+    if subject is None:
+        subject = capture.subjects[0]["name"] if capture.subjects else None
+    if subject is None:
+        return capture.records[:0]
+    return capture.subject(subject)
+
+
+def analyze_capture(capture: Capture, top: int = 15):
+    """Affiche cadence et statistiques par canal de chaque sujet"""
+    print(f"\n=== Capture: {len(capture.records)} enregistrements, "
+          f"{len(capture.subjects)} sujet(s) ===")
+    for subject in capture.subjects:
+        records = capture.subject(subject["name"])
+        timing = timing_stats(records)
+        print(f"\n📊 {subject['name']} ({subject['uuid']}): {timing['packets']} paquets")
+        if timing["packets"] < 2:
+            continue
+        print(f"   {timing['fps']:.1f} fps sur {timing['duration_s']:.1f} s, inter-arrivée "
+              f"p50 {timing['interval_p50_ms']:.2f} ms / p99 {timing['interval_p99_ms']:.2f} ms, "
+              f"manquantes {timing['missing_frames']}, réordonnées {timing['reordered']}")
+
+        stats = channel_stats(records["values"])
+        print(f"   {'Canal':<22} {'moy':>7} {'écart':>7} {'max':>7} {'actif':>7}")
+        for channel in np.argsort(stats["mean"])[::-1][:top]:
+            print(f"   {CHANNEL_NAMES[channel]:<22} {stats['mean'][channel]:7.4f} "
+                  f"{stats['std'][channel]:7.4f} {stats['max'][channel]:7.4f} "
+                  f"{stats['active'][channel] * 100:6.1f}%")
+
+
+def diff_captures(first: Capture, second: Capture, subject: Optional[str] = None) -> Dict[str, np.ndarray]:
+    """
+    Compare deux captures canal par canal
+
+    Les distributions (moyenne, max, activité) sont comparées sur toute la
+    durée ; les écarts frame à frame sont mesurés après alignement sur la
+    première frame de chaque capture, sur la longueur commune.
+
+    Returns:
+        {mean_delta, max_delta, active_delta, mae, max_abs, correlation} : [61]
+    """
+    a = _subject_records(first, subject)["values"]
+    b = _subject_records(second, subject)["values"]
+    stats_a, stats_b = channel_stats(a), channel_stats(b)
+
+    length = min(len(a), len(b))
+    aligned_a = np.asarray(a[:length], dtype=np.float64)
+    aligned_b = np.asarray(b[:length], dtype=np.float64)
+    delta = aligned_b - aligned_a
+
+    centered_a = aligned_a - aligned_a.mean(axis=0) if length else aligned_a
+    centered_b = aligned_b - aligned_b.mean(axis=0) if length else aligned_b
+    norm = np.sqrt((centered_a ** 2).sum(axis=0) * (centered_b ** 2).sum(axis=0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        correlation = np.where(norm > 0, (centered_a * centered_b).sum(axis=0) / norm, np.nan)
+
+    return {
+        "frames": length,
+        "mean_delta": stats_b["mean"] - stats_a["mean"],
+        "max_delta": stats_b["max"] - stats_a["max"],
+        "active_delta": stats_b["active"] - stats_a["active"],
+        "mae": np.abs(delta).mean(axis=0) if length else np.zeros(61),
+        "max_abs": np.abs(delta).max(axis=0) if length else np.zeros(61),
+        "correlation": correlation
+    }
+
+
+def print_diff(diff: Dict[str, np.ndarray], top: int = 15):
+    """Affiche les canaux les plus différents"""
+    print(f"\n=== Comparaison ({diff['frames']} frames alignées) ===")
+    print(f"   {'Canal':<22} {'Δmoy':>8} {'Δmax':>8} {'MAE':>8} {'corr':>6}")
+    for channel in np.argsort(np.abs(diff["mean_delta"]) + diff["mae"])[::-1][:top]:
+        print(f"   {CHANNEL_NAMES[channel]:<22} {diff['mean_delta'][channel]:+8.4f} "
+              f"{diff['max_delta'][channel]:+8.4f} {diff['mae'][channel]:8.4f} "
+              f"{diff['correlation'][channel]:6.2f}")
+
+
 def main():
     if len(sys.argv) < 2:
         print("Usage: python analyze_livelink_capture.py <packet_file> [packet_file2]")
         print("  Pour analyser un paquet: python analyze_livelink_capture.py packet.bin")
         print("  Pour comparer deux paquets: python analyze_livelink_capture.py packet1.bin packet2.bin")
+        print("  Pour analyser une capture: python analyze_livelink_capture.py capture.llcap")
+        print("  Pour comparer deux captures: python analyze_livelink_capture.py a.llcap b.llcap")
         sys.exit(1)
-    
+
+    if Path(sys.argv[1]).suffix == ".llcap":
+        captures = [load_capture(path) for path in sys.argv[1:3]]
+        for path, capture in zip(sys.argv[1:3], captures):
+            print(f"Analyse de: {path}")
+            analyze_capture(capture)
+        if len(captures) == 2:
+            print_diff(diff_captures(*captures))
+        return
+
     # Charger le premier paquet
     packet_file1 = Path(sys.argv[1])
     if not packet_file1.exists():
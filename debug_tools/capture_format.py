@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Format de capture LiveLink (.llcap) pour Gala v1
+Un seul fichier : en-tête fixe, enregistrements de taille fixe (arrivée,
+champs d'en-tête LiveLink, 61 floats contigus) puis un index JSON en fin
+de fichier. Les enregistrements se relisent d'un bloc avec np.memmap en
+tableau structuré : chaque champ est une colonne, values est [N, 61]
+"""
+
+import json
+import struct
+import sys
+from pathlib import Path
+from typing import Dict, List, NamedTuple
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modules.livelink_encoder import LiveLinkDecoder, BLENDSHAPE_COUNT
+
+
+CAPTURE_MAGIC = b"GLLCAP01"
+CAPTURE_VERSION = 1
+
+# magic, version, taille d'enregistrement, nombre de valeurs, nombre d'enregistrements, offset de l'index
+_HEADER_STRUCT = struct.Struct('<8sIIIQQ')
+HEADER_SIZE = 64  # En-tête complété à 64 octets (enregistrements alignés)
+
+RECORD_DTYPE = np.dtype([
+    ("arrival", "<f8"),  # Secondes depuis minuit à la réception
+    ("frames", "<u4"),  # Timecode LiveLink
+    ("sub_frame", "<u4"),
+    ("fps", "<u2"),
+    ("denominator", "<u2"),
+    ("subject", "<u2"),  # Index dans la table des sujets de l'index
+    ("valid", "u1"),  # 0 : paquet non décodable (valeurs à zéro)
+    ("version", "u1"),
+    ("values", "<f4", (BLENDSHAPE_COUNT,)),
+    ("reserved", "<u4"),  # Complète à 272 octets (arrivée alignée sur 8)
+])
+
+
+class Capture(NamedTuple):
+    """Capture chargée : enregistrements (memmap) et index"""
+    records: np.ndarray
+    subjects: List[Dict[str, str]]
+    index: Dict
+
+    @property
+    def seconds(self) -> np.ndarray:
+        """Timecode de chaque enregistrement en secondes depuis minuit"""
+        fps = np.maximum(self.records["fps"], 1).astype(np.float64)
+        return (self.records["frames"] + self.records["sub_frame"] / 4294967296.0) / fps
+
+    def subject(self, name: str) -> np.ndarray:
+        """Enregistrements valides d'un sujet"""
+        index = next(i for i, subject in enumerate(self.subjects) if subject["name"] == name)
+        records = self.records
+        return records[(records["subject"] == index) & (records["valid"] == 1)]
+
+
+class CaptureWriter:
+    """
+    Écriture d'une capture .llcap
+
+    Les paquets sont décodés à la volée dans un tampon d'enregistrements
+    écrit par blocs ; close() ajoute l'index et complète l'en-tête. Une
+    capture interrompue reste lisible (le nombre d'enregistrements est
+    alors déduit de la taille du fichier).
+    """
+
+    def __init__(self, path, flush_records: int = 1024):
+        """
+        Args:
+            path: Fichier de capture (écrasé)
+            flush_records: Enregistrements tamponnés avant écriture
+        """
+        self.path = Path(path)
+        self._file = open(self.path, "wb")
+        self._file.write(self._header(0, 0))
+        self._buffer = np.zeros(flush_records, dtype=RECORD_DTYPE)
+        self._pending = 0
+        self._decoder = LiveLinkDecoder()
+        self._subjects: Dict[tuple, int] = {}
+        self.records = 0
+        self.invalid = 0
+
+    @staticmethod
+    def _header(record_count: int, index_offset: int) -> bytes:
+        header = _HEADER_STRUCT.pack(CAPTURE_MAGIC, CAPTURE_VERSION, RECORD_DTYPE.itemsize,
+                                     BLENDSHAPE_COUNT, record_count, index_offset)
+        return header.ljust(HEADER_SIZE, b"\0")
+
+    def write(self, arrival: float, packet) -> bool:
+        """
+        Ajoute un paquet
+
+        Args:
+            arrival: Arrivée en secondes depuis minuit
+            packet: Paquet LiveLink brut
+
+        Returns:
+            False si le paquet n'a pas pu être décodé (enregistré comme invalide)
+        """
+        record = self._buffer[self._pending]
+        record["arrival"] = arrival
+        try:
+            decoded = self._decoder.decode(packet)
+        except ValueError:
+            self.invalid += 1
+            record["valid"] = 0
+            record["values"] = 0.0
+            valid = False
+        else:
+            key = (decoded.uuid, decoded.name)
+            subject = self._subjects.get(key)
+            if subject is None:
+                subject = self._subjects[key] = len(self._subjects)
+            record["frames"] = decoded.frames
+            record["sub_frame"] = decoded.sub_frame
+            record["fps"] = decoded.fps
+            record["denominator"] = decoded.denominator
+            record["subject"] = subject
+            record["valid"] = 1
+            record["version"] = decoded.version
+            record["values"] = decoded.values
+            valid = True
+
+        self._pending += 1
+        self.records += 1
+        if self._pending == len(self._buffer):
+            self.flush()
+        return valid
+
+    def flush(self):
+        if self._pending:
+            self._file.write(self._buffer[:self._pending].tobytes())
+            self._buffer[:self._pending] = 0
+            self._pending = 0
+        self._file.flush()
+
+    def close(self):
+        """Écrit l'index et finalise l'en-tête"""
+        if self._file.closed:
+            return
+        self.flush()
+        index_offset = self._file.tell()
+        index = {
+            "subjects": [{"uuid": uuid, "name": name}
+                         for (uuid, name), _ in sorted(self._subjects.items(), key=lambda item: item[1])],
+            "records": self.records,
+            "invalid": self.invalid
+        }
+        self._file.write(json.dumps(index).encode("utf-8"))
+        self._file.seek(0)
+        self._file.write(self._header(self.records, index_offset))
+        self._file.close()
+
+    def __enter__(self) -> "CaptureWriter":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_capture(path) -> Capture:
+    """
+    Charge une capture .llcap sans copie (np.memmap)
+
+    Args:
+        path: Fichier de capture
+
+    Returns:
+        Capture (records est un tableau structuré RECORD_DTYPE)
+    """
+    path = Path(path)
+    with open(path, "rb") as f:
+        header = f.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE:
+            raise ValueError(f"Capture invalide: {path}")
+        magic, version, record_size, value_count, record_count, index_offset = \
+            _HEADER_STRUCT.unpack_from(header)
+        if magic != CAPTURE_MAGIC or record_size != RECORD_DTYPE.itemsize or value_count != BLENDSHAPE_COUNT:
+            raise ValueError(f"Capture invalide ou version incompatible: {path}")
+
+        index: Dict = {"subjects": []}
+        if index_offset:
+            f.seek(index_offset)
+            index = json.loads(f.read().decode("utf-8"))
+        else:
+            # Capture non finalisée : enregistrements complets seulement
+            record_count = (path.stat().st_size - HEADER_SIZE) // record_size
+
+    if record_count == 0:
+        records = np.zeros(0, dtype=RECORD_DTYPE)
+    else:
+        records = np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=HEADER_SIZE, shape=(record_count,))
+    if not index["subjects"] and record_count:
+        count = int(records["subject"].max()) + 1
+        index["subjects"] = [{"uuid": "", "name": f"subject_{i}"} for i in range(count)]
+    return Capture(records, index["subjects"], index)
+
+
+def convert_receiver_log(log_path, capture_path) -> int:
+    """
+    Convertit un journal de livelink_receiver.py en capture .llcap
+
+    Returns:
+        Nombre d'enregistrements écrits
+    """
+    from debug_tools.livelink_receiver import read_log
+
+    with CaptureWriter(capture_path) as writer:
+        for arrival, packet in read_log(log_path):
+            writer.write(arrival, packet)
+        return writer.records
@@ -2,6 +2,7 @@
 """
 Capture les paquets LiveLink pour analyse
 Peut capturer depuis NeuroSync_Player ou notre API
+Tous les paquets vont dans un seul fichier .llcap (voir capture_format.py)
 """
 
 import socket
@@ -10,12 +11,20 @@ import sys
 from datetime import datetime
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from debug_tools.capture_format import CaptureWriter
+from modules.livelink_encoder import current_seconds_of_day
+
 def capture_packets(ip="0.0.0.0", port=11111, duration=10, output_dir="captures"):
     """
-    Capture les paquets UDP LiveLink
+    Capture les paquets UDP LiveLink dans output_dir/capture_<horodatage>.llcap
     """
     output_path = Path(output_dir)
-    output_path.mkdir(exist_ok=True)
+    output_path.mkdir(parents=True, exist_ok=True)
+    filename = output_path / f"capture_{datetime.now().strftime('%Y%m%d_%H%M%S')}.llcap"
+    writer = CaptureWriter(filename)
+    buffer = bytearray(65535)  # Buffer max UDP, réutilisé
     
     # Créer un socket UDP pour écouter
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -30,27 +39,24 @@ def capture_packets(ip="0.0.0.0", port=11111, duration=10, output_dir="captures"
     
     start_time = time.time()
     packet_count = 0
+    last_report = start_time
     
     try:
         while time.time() - start_time < duration:
             try:
-                data, addr = sock.recvfrom(65535)  # Buffer max UDP
+                size, addr = sock.recvfrom_into(buffer)
                 packet_count += 1
                 
-                # Sauvegarder le paquet
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-                filename = output_path / f"packet_{packet_count:04d}_{timestamp}.bin"
-                
-                with open(filename, 'wb') as f:
-                    f.write(data)
-                
-                print(f"✅ Paquet {packet_count} capturé: {len(data)} octets de {addr}")
-                print(f"   Sauvé dans: {filename}")
+                # Ajouter le paquet à la capture
+                if not writer.write(current_seconds_of_day(), memoryview(buffer)[:size]):
+                    print(f"⚠️ Paquet {packet_count} non décodable: {size} octets de {addr}")
                 
-                # Aperçu rapide
-                if len(data) >= 64:
-                    print(f"   Début: {data[:32].hex()}")
-                    print()
+                if packet_count == 1:
+                    print(f"✅ Premier paquet: {size} octets de {addr}")
+                    print(f"   Début: {bytes(buffer[:32]).hex()}")
+                if time.time() - last_report >= 1.0:
+                    last_report = time.time()
+                    print(f"   {packet_count} paquets capturés")
                 
             except socket.timeout:
                 continue
@@ -61,9 +67,11 @@ def capture_packets(ip="0.0.0.0", port=11111, duration=10, output_dir="captures"
         print(f"Erreur: {e}")
     finally:
         sock.close()
+        writer.close()
     
     print(f"\n📊 Capture terminée: {packet_count} paquets capturés")
-    print(f"📁 Fichiers sauvés dans: {output_path}")
+    print(f"📁 Capture sauvée dans: {filename}")
+    return filename
 
 def compare_sources():
     """
@@ -78,22 +86,23 @@ def compare_sources():
     input()
     
     print("Capture des paquets NeuroSync_Player...")
-    capture_packets(duration=5, output_dir="captures/neurosync_player")
+    neurosync_capture = capture_packets(duration=5, output_dir="captures/neurosync_player")
     
     print("\n2. Arrêtez NeuroSync_Player et lancez notre API")
     print("   Appuyez sur Entrée quand prêt...")
     input()
     
     print("Capture des paquets de notre API...")
-    capture_packets(duration=5, output_dir="captures/our_api")
+    api_capture = capture_packets(duration=5, output_dir="captures/our_api")
     
     print("\n✅ Captures terminées!")
-    print("Utilisez analyze_livelink_capture.py pour comparer les paquets")
+    print("Comparaison des captures:")
+    print(f"   python debug_tools/analyze_livelink_capture.py {neurosync_capture} {api_capture}")
 
 if __name__ == "__main__":
     if len(sys.argv) > 1 and sys.argv[1] == "compare":
         compare_sources()
     else:
         # Capture simple
-        duration = int(sys.argv[1]) if len(sys.argv> 1 else 10
+        duration = int(sys.argv[1]) if len(sys.argv) > 1 else 10
         capture_packets(duration=duration)
\ No newline at end of file
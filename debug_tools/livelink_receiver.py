@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Récepteur LiveLink de substitution (sans Unreal)
+Décode les paquets PyLiveLinkFace au fil de l'eau et mesure par sujet :
+fps, jitter d'inter-arrivée, frames manquantes, réordonnancement et latence
+timecode -> arrivée, avec histogrammes. Peut enregistrer le flux dans un
+journal binaire unique en ajout seul
+"""
+
+import argparse
+import bisect
+import socket
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modules.av_sync import PresentationClock, SECONDS_PER_DAY
+from modules.livelink_encoder import LiveLinkDecoder, LiveLinkPacket
+
+
+# Bornes des histogrammes (ms) ; la dernière case reçoit tout le reste
+INTERVAL_EDGES_MS = (0, 2, 5, 10, 14, 15, 16, 17, 18, 20, 25, 34, 50, 100, 250)
+LATENCY_EDGES_MS = (-10, -1, 0, 1, 2, 5, 10, 20, 50, 100, 250, 1000)
+
+# Enregistrement du journal : arrivée (s depuis minuit), taille, paquet
+_RECORD_STRUCT = struct.Struct('<dI')
+LOG_MAGIC = b"GLLLOG01"
+
+
+class Histogram:
+    """Histogramme à bornes fixes, mise à jour O(log n) par échantillon"""
+
+    def __init__(self, edges: Tuple[float, ...]):
+        self.edges = list(edges)
+        self.counts = [0] * (len(edges) + 1)
+
+    def add(self, value: float):
+        self.counts[bisect.bisect_right(self.edges, value)] += 1
+
+    def to_dict(self) -> Dict[str, int]:
+        labels = [f"<{self.edges[0]}"]
+        labels += [f"{low}-{high}" for low, high in zip(self.edges, self.edges[1:])]
+        labels.append(f">={self.edges[-1]}")
+        return {label: count for label, count in zip(labels, self.counts) if count}
+
+
+class SubjectStats:
+    """Mesures d'un sujet LiveLink"""
+
+    def __init__(self, name: str, uuid: str, window: int = 10000):
+        self.name = name
+        self.uuid = uuid
+        self.packets = 0
+        self.missing_frames = 0
+        self.reordered = 0
+        self.duplicates = 0
+        self.first_arrival: Optional[float] = None
+        self.last_arrival: Optional[float] = None
+        self.last_frame: Optional[int] = None
+        self.fps = 0
+
+        self._intervals = np.zeros(window, dtype=np.float64)
+        self._latencies = np.zeros(window, dtype=np.float64)
+        self._samples = 0
+        self.interval_histogram = Histogram(INTERVAL_EDGES_MS)
+        self.latency_histogram = Histogram(LATENCY_EDGES_MS)
+
+    def record(self, arrival: float, frame: int, fps: int, latency: float):
+        """
+        Args:
+            arrival: Instant d'arrivée (time.monotonic)
+            frame: Numéro de frame du timecode
+            fps: Frame rate annoncé
+            latency: Arrivée - timecode (s)
+        """
+        self.packets += 1
+        self.fps = fps
+        if self.last_arrival is not None:
+            interval_ms = (arrival - self.last_arrival) * 1000
+            self._intervals[(self.packets - 2) % len(self._intervals)] = interval_ms
+            self.interval_histogram.add(interval_ms)
+        else:
+            self.first_arrival = arrival
+        self.last_arrival = arrival
+
+        latency_ms = latency * 1000
+        self._latencies[self._samples % len(self._latencies)] = latency_ms
+        self._samples += 1
+        self.latency_histogram.add(latency_ms)
+
+        if self.last_frame is not None:
+            step = frame - self.last_frame
+            if step > 1:
+                self.missing_frames += step - 1
+            elif step == 0:
+                self.duplicates += 1
+            elif step < 0:
+                self.reordered += 1
+                return  # La référence reste la frame la plus récente
+        self.last_frame = frame
+
+    def stats(self) -> Dict:
+        """Résumé (ms)"""
+        duration = (self.last_arrival - self.first_arrival) if self.packets > 1 else 0.0
+        intervals = self._intervals[:min(self.packets - 1, len(self._intervals))] if self.packets > 1 else None
+        latencies = self._latencies[:min(self._samples, len(self._latencies))]
+        stats = {
+            "uuid": self.uuid,
+            "packets": self.packets,
+            "announced_fps": self.fps,
+            "measured_fps": (self.packets - 1) / duration if duration > 0 else 0.0,
+            "missing_frames": self.missing_frames,
+            "reordered": self.reordered,
+            "duplicates": self.duplicates,
+            "interval_histogram_ms": self.interval_histogram.to_dict(),
+            "latency_histogram_ms": self.latency_histogram.to_dict()
+        }
+        if intervals is not None and len(intervals):
+            stats["jitter_ms"] = {
+                "std": float(intervals.std()),
+                "p50": float(np.percentile(intervals, 50)),
+                "p99": float(np.percentile(intervals, 99)),
+                "max": float(intervals.max())
+            }
+        if len(latencies):
+            stats["latency_ms"] = {
+                "mean": float(latencies.mean()),
+                "p50": float(np.percentile(latencies, 50)),
+                "p99": float(np.percentile(latencies, 99)),
+                "max": float(latencies.max())
+            }
+        return stats
+
+
+class LiveLinkReceiver:
+    """
+    Émulateur de récepteur LiveLink Face
+
+    Un thread lit le socket avec recvfrom_into dans un buffer unique,
+    décode l'en-tête une fois par sujet (LiveLinkDecoder) et met à jour
+    les mesures du sujet. La latence suppose que l'émetteur tourne sur la
+    même machine (ou une horloge synchronisée) : timecode et arrivée sont
+    tous deux en secondes depuis minuit, heure locale.
+    """
+
+    def __init__(self, ip: str = "0.0.0.0", port: int = 11111,
+                 record_path: Optional[str] = None, rcvbuf: int = 4 * 1024 * 1024,
+                 on_packet: Optional[Callable[[float, LiveLinkPacket], None]] = None):
+        """
+        Args:
+            ip: Adresse d'écoute
+            port: Port d'écoute (0 = port libre, voir self.address)
+            record_path: Journal binaire (ajout) ; aucun enregistrement si None
+            rcvbuf: SO_RCVBUF demandé pour absorber les rafales
+            on_packet: Appelé dans le thread de réception avec (arrivée monotonic, paquet décodé)
+        """
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+        self.sock.bind((ip, port))
+        self.sock.settimeout(0.2)
+        self.address = self.sock.getsockname()
+
+        self.clock = PresentationClock()
+        self.decoder = LiveLinkDecoder()
+        self.subjects: Dict[str, SubjectStats] = {}
+        self.invalid_packets = 0
+        self.last_values: Dict[str, np.ndarray] = {}
+        self.on_packet = on_packet
+
+        self._buffer = bytearray(65535)
+        self._view = memoryview(self._buffer)
+        self._log = open(record_path, "ab") if record_path else None
+        if self._log is not None and self._log.tell() == 0:
+            self._log.write(LOG_MAGIC)
+
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    def _handle(self, size: int, arrival: float):
+        """Décode et mesure un paquet reçu"""
+        packet = self._view[:size]
+        arrival_seconds = self.clock.livelink_seconds(arrival)
+        if self._log is not None:
+            self._log.write(_RECORD_STRUCT.pack(arrival_seconds, size))
+            self._log.write(packet)
+
+        try:
+            decoded = self.decoder.decode(packet)
+        except ValueError:
+            self.invalid_packets += 1
+            return
+
+        # Latence ramenée dans [-12 h, 12 h) (passage de minuit)
+        latency = (arrival_seconds - decoded.seconds + SECONDS_PER_DAY / 2) % SECONDS_PER_DAY - SECONDS_PER_DAY / 2
+        with self._lock:
+            subject = self.subjects.get(decoded.name)
+            if subject is None:
+                subject = self.subjects[decoded.name] = SubjectStats(decoded.name, decoded.uuid)
+            subject.record(arrival, decoded.frames, decoded.fps, latency)
+            self.last_values[decoded.name] = decoded.values
+        if self.on_packet is not None:
+            self.on_packet(arrival, decoded)
+
+    def poll(self) -> bool:
+        """Reçoit et traite un paquet (False si timeout)"""
+        try:
+            size = self.sock.recv_into(self._buffer)
+        except socket.timeout:
+            return False
+        self._handle(size, time.monotonic())
+        return True
+
+    def _run(self):
+        while self._running:
+            try:
+                self.poll()
+            except OSError:
+                break
+
+    def start(self) -> "LiveLinkReceiver":
+        """Démarre la réception dans un thread"""
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="LiveLinkReceiver", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Arrête la réception et ferme le journal"""
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1.0)
+        self.sock.close()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def stats(self) -> Dict:
+        """Mesures de tous les sujets"""
+        with self._lock:
+            return {
+                "subjects": {name: subject.stats() for name, subject in self.subjects.items()},
+                "invalid_packets": self.invalid_packets
+            }
+
+
+def read_log(path: str) -> Iterator[Tuple[float, bytes]]:
+    """
+    Relit un journal enregistré par LiveLinkReceiver
+
+    Yields:
+        (arrivée en secondes depuis minuit, paquet)
+    """
+    with open(path, "rb") as f:
+        if f.read(len(LOG_MAGIC)) != LOG_MAGIC:
+            raise ValueError(f"Journal LiveLink invalide: {path}")
+        while True:
+            header = f.read(_RECORD_STRUCT.size)
+            if len(header) < _RECORD_STRUCT.size:
+                return
+            arrival, size = _RECORD_STRUCT.unpack(header)
+            packet = f.read(size)
+            if len(packet) < size:
+                return  # Enregistrement tronqué (arrêt brutal)
+            yield arrival, packet
+
+
+def print_report(stats: Dict):
+    """Affiche un résumé lisible"""
+    for name, subject in stats["subjects"].items():
+        jitter = subject.get("jitter_ms", {})
+        latency = subject.get("latency_ms", {})
+        print(f"📊 {name}: {subject['packets']} paquets, {subject['measured_fps']:.1f}/"
+              f"{subject['announced_fps']} fps, manquantes {subject['missing_frames']}, "
+              f"réordonnées {subject['reordered']}")
+        if jitter:
+            print(f"   Inter-arrivée p50 {jitter['p50']:.2f} ms, p99 {jitter['p99']:.2f} ms, "
+                  f"écart-type {jitter['std']:.2f} ms")
+        if latency:
+            print(f"   Latence p50 {latency['p50']:.2f} ms, p99 {latency['p99']:.2f} ms")
+    if stats["invalid_packets"]:
+        print(f"⚠️ {stats['invalid_packets']} paquets invalides")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Récepteur LiveLink de substitution")
+    parser.add_argument("--ip", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=11111)
+    parser.add_argument("--duration", type=float, default=10.0, help="Durée d'écoute (s), 0 = infini")
+    parser.add_argument("--record", help="Journal binaire où ajouter les paquets reçus")
+    parser.add_argument("--interval", type=float, default=2.0, help="Période des rapports (s)")
+    args = parser.parse_args(argv)
+
+    receiver = LiveLinkReceiver(args.ip, args.port, record_path=args.record)
+    print(f"📡 Écoute LiveLink sur {args.ip}:{receiver.address[1]}")
+    receiver.start()
+
+    start = time.monotonic()
+    try:
+        while not args.duration or time.monotonic() - start < args.duration:
+            time.sleep(args.interval)
+            print_report(receiver.stats())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        receiver.stop()
+    print("\n=== Rapport final ===")
+    print_report(receiver.stats())
+
+
+if __name__ == "__main__":
+    main()
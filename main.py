@@ -9,7 +9,6 @@ import logging
 import os
 import sys
 import time
-import requests
 import numpy as np
 import io
 from typing import Optional, Dict, Any
@@ -24,6 +23,7 @@ from elevenlabs import generate, Voice, VoiceSettings
 
 # Import de la configuration
 from config import config
+from modules.animation_client import AnimationClient
 
 # Configuration du logging
 logging.basicConfig(
@@ -56,10 +56,13 @@ class GalaAgent:
 class GalaConversation:
     """Gère la conversation complète avec Gala"""
     
-    def __init__(self):
+    def __init__(self, http: Optional[AnimationClient] = None):
         self.agent = GalaAgent()
         self.api_base_url = f"http://localhost:{config.api.port}"
         
+        # Client HTTP persistant partagé (pool keep-alive, reprise avec backoff)
+        self.http = http or AnimationClient(self.api_base_url)
+        
         # Initialiser les clients
         self.init_clients()
         
@@ -175,22 +178,11 @@ class GalaConversation:
         
     async def send_to_blendshapes(self, audio_data: bytes) -> Dict[str, Any]:
         """Envoie l'audio à l'API unifiée pour conversion en blendshapes"""
-        try:
-            response = requests.post(
-                f"{self.api_base_url}/audio_to_blendshapes",
-                data=audio_data,
-                headers={'Content-Type': 'audio/wav'}
-            )
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.error(f"Erreur API blendshapes: {response.status_code}")
-                return None
-                
-        except Exception as e:
-            logger.error(f"Erreur envoi blendshapes: {e}")
-            return None
+        # Non bloquant : la boucle asyncio continue pendant l'inférence
+        result = await self.http.post("/audio_to_blendshapes", audio_data, content_type="audio/wav")
+        if result is None:
+            logger.error("Erreur envoi blendshapes")
+        return result
             
     async def process_conversation(self, user_audio: bytes):
         """Traite un cycle complet de conversation"""
@@ -230,19 +222,15 @@ async def main():
     logger.info("=== Démarrage de Gala v1 ===")
     
     # Vérifier que l'API unifiée est en cours d'exécution
-    try:
-        response = requests.get(f"http://localhost:{config.api.port}/health")
-        if response.status_code != 200:
-            logger.error("L'API unifiée n'est pas accessible")
-            logger.info("Lancez d'abord: python api_client.py")
-            return
-    except:
+    http = AnimationClient(f"http://localhost:{config.api.port}")
+    if await http.get("/health") is None:
         logger.error("Impossible de se connecter à l'API unifiée")
         logger.info("Lancez d'abord: python api_client.py")
+        await http.close()
         return
         
-    # Créer l'instance de conversation
-    conversation = GalaConversation()
+    # Créer l'instance de conversation (réutilise la connexion ouverte)
+    conversation = GalaConversation(http)
     
     # Message de bienvenue
     welcome_text = "Ohé moussaillon! C'est moi, Gala le pirate digital! Prêt pour l'aventure?"
@@ -275,6 +263,7 @@ async def main():
             logger.error(f"Erreur dans la boucle principale: {e}")
             await asyncio.sleep(1)
             
+    await conversation.http.close()
     logger.info("=== Arrêt de Gala v1 ===")
 
 if __name__ == "__main__":
@@ -10,18 +10,18 @@ import json
 import logging
 import os
 import re
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
-import aiohttp
 import google.generativeai as genai
-import requests
 import wave
 from dotenv import load_dotenv
 from loguru import logger
 from pipecat.frames.frames import (
     BlendshapeFrame,
+    StartInterruptionFrame,
     TTSAudioRawFrame,
     TTSSpeakFrame,
     TTSStartedFrame,
@@ -49,6 +49,10 @@ from pipecat.transports.services.daily import (
 import socket
 import numpy as np
 from modules.pylivelinkface import PyLiveLinkFace, FaceBlendShape
+from modules.blendshape_remap import create_direct_remapper
+from modules.animation_client import AnimationClient
+from modules.animation_queue import AnimationQueue
+from modules.av_sync import AudioTimeline, SkewMonitor, presentation_clock
 
 # ---------------------------------------------------------------------------
 # Configuration du logging
@@ -68,71 +72,76 @@ class NeuroSyncApiClient:
         self.api_url = f"http://{host}:{port}"
         self.logger = logging.getLogger(__name__)
         
+        # Client HTTP persistant (pool keep-alive, requêtes en vol bornées, reprise)
+        self.http = AnimationClient(self.api_url)
+        
         # LiveLink setup
         self.livelink_ip = livelink_ip
         self.livelink_port = livelink_port
         self.py_face = PyLiveLinkFace(name="GalaFace", fps=60)
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.socket.connect((self.livelink_ip, self.livelink_port))
+        self.remapper = create_direct_remapper(threshold=0.0)
         self.logger.info(f"LiveLink connecté à {self.livelink_ip}:{self.livelink_port}")
     
+    async def fetch_blendshapes(self, audio_data: bytes) -> List[float]:
+        """
+        Envoie l'audio à l'API et retourne les blendshapes (sans animer)
+        """
+        # Debug log
+        self.logger.info(f"⚡ Envoi audio: {len(audio_data)} octets")
+        
+        result = await self.http.post("/audio_to_blendshapes", audio_data, content_type="audio/pcm")
+        if result is None:
+            return []
+        
+        blendshapes = result.get('blendshapes', [])
+        if blendshapes:
+            self.logger.info(f"✅ Reçu {len(blendshapes)} blendshapes")
+        else:
+            self.logger.error("Pas de blendshapes dans la réponse")
+        return blendshapes
+    
     async def send_audio_and_animate(self, audio_data: bytes, sample_rate: int = 16000) -> List[float]:
         """
         Envoie l'audio à l'API et anime directement le personnage
         """
-        try:
-            # Debug log
-            self.logger.info(f"⚡ Envoi audio: {len(audio_data)} octets")
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.api_url}/audio_to_blendshapes",
-                    data=audio_data,
-                    headers={"Content-Type": "audio/pcm"},
-                    timeout=aiohttp.ClientTimeout(total=5)
-                ) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        blendshapes = result.get('blendshapes', [])
-                        
-                        if blendshapes:
-                            self.logger.info(f"✅ Reçu {len(blendshapes)} blendshapes")
-                            
-                            # Envoyer directement à LiveLink
-                            self.send_to_livelink(blendshapes)
-                            return blendshapes
-                        else:
-                            self.logger.error("Pas de blendshapes dans la réponse")
-                            return []
-                    else:
-                        self.logger.error(f"❌ Erreur API: {response.status}")
-                        return []
-                        
-        except Exception as e:
-            self.logger.error(f"❌ Erreur: {e}")
-            return []
+        blendshapes = await self.fetch_blendshapes(audio_data)
+        if blendshapes:
+            # Envoyer directement à LiveLink
+            self.send_to_livelink(blendshapes)
+        return blendshapes
+    
+    def send_to_livelink(self, blendshapes: List[float], pts: Optional[float] = None):
+        """
+        Envoie directement les blendshapes à Unreal via LiveLink
+        
+        Args:
+            blendshapes: Valeurs ARKit
+            pts: Instant de présentation (time.monotonic) dont le paquet porte le timecode
+        """
+        # Remapping vectorisé (reset + clamp) de la première frame
+        self.send_frame(self.remapper.remap_frame(blendshapes), pts)
     
-    def send_to_livelink(self, blendshapes: List[float]):
-        """Envoie directement les blendshapes à Unreal via LiveLink"""
+    def send_frame(self, frame: np.ndarray, pts: Optional[float] = None):
+        """
+        Encode et envoie une frame déjà remappée (ligne de remapper.remap)
+        
+        Args:
+            frame: Vecteur de 61 valeurs LiveLink
+            pts: Instant de présentation (time.monotonic) dont le paquet porte le timecode
+        """
         try:
-            # Reset tous les blendshapes
-            for i in range(52):  # 0-51 valides
-                self.py_face.set_blendshape(FaceBlendShape(i), 0.0)
-            
-            # Appliquer les nouvelles valeurs
-            for i in range(min(52, len(blendshapes))):
-                value = float(blendshapes[i])
-                # Limiter entre 0 et 1
-                value = max(0.0, min(1.0, value))
-                self.py_face.set_blendshape(FaceBlendShape(i), value)
-            
-            # Encoder et envoyer
-            data = self.py_face.encode()
-            self.socket.sendall(data)
+            seconds = presentation_clock.livelink_seconds(pts) if pts is not None else None
+            self.socket.sendall(self.py_face.encode_values_view(frame, seconds))
             
         except Exception as e:
             self.logger.error(f"Erreur LiveLink: {e}")
     
+    async def aclose(self):
+        """Ferme le pool HTTP (dans la boucle asyncio)"""
+        await self.http.close()
+    
     def close(self):
         """Ferme les connexions"""
         if self.socket:
@@ -142,7 +151,15 @@ class NeuroSyncApiClient:
 # Processor NeuroSync avec buffer et animation directe
 # ---------------------------------------------------------------------------
 class NeuroSyncBufferProcessor(FrameProcessor):
-    """Processeur qui bufferise l'audio et anime le personnage"""
+    """
+    Processeur qui bufferise l'audio et anime le personnage
+    
+    Les frames sont propagés immédiatement : les buffers de 192 ms partent
+    dans une file de fond bornée (AnimationQueue) et chaque résultat est
+    envoyé à LiveLink frame par frame : la frame i d'un buffer part à
+    pts + offset + i / fps. Une interruption annule tout le travail en
+    attente et toutes les frames planifiées.
+    """
     
     def __init__(self, api_client: NeuroSyncApiClient, config=None):
         super().__init__(name="neurosync_buffer")
@@ -152,39 +169,125 @@ class NeuroSyncBufferProcessor(FrameProcessor):
         
         # Buffer pour accumulation
         self._buffer = bytearray()
-        # Accumule environ 192 ms d'audio (16 kHz mono, 16‑bit)
-        self._min_buffer_size = int(16000 * 0.192 * 2)  # 6144 octets
+        self._buffer_pts = 0.0
+        # Accumule environ 192 ms d'audio (16 kHz mono, 16‑bit)
+        self._min_buffer_size = int(16000 * 0.192 * 2)  # 6144 octets
+        
+        # Instant de lecture de l'audio propagé (time.monotonic), indexé en octets
+        self._sample_rate = self.config.get("sample_rate", 16000)
+        self._timeline = AudioTimeline(self._sample_rate)
+        self._audio_position = 0
+        # Décalage de l'animation par rapport à la lecture audio (s)
+        self._av_offset = self.config.get("av_offset", 0.0)
+        self.skew = SkewMonitor()
+        # Cadence des frames renvoyées par l'API
+        self._frame_rate = self.config.get("frame_rate", 60)
+        
+        # Au-delà de ce retard, un résultat n'est plus envoyé (s)
+        self._stale_after = self.config.get("stale_after", 0.2)
+        
+        # Travail d'animation en arrière-plan
+        self._queue = AnimationQueue(self._animate, max_depth=self.config.get("max_queue_depth", 4))
+        self._scheduled = set()
+        self.stale_frames = 0
+    
+    def _presentation_time(self, audio_bytes: int) -> float:
+        """Instant de lecture du frame audio courant (réancré si la sortie était à vide)"""
+        pts = self._timeline.stamp(self._audio_position, audio_bytes)
+        self._audio_position += audio_bytes
+        return pts
+    
+    def _reset_clock(self):
+        self._timeline.reset()
+        self._audio_position = 0
+    
+    async def _animate(self, audio: bytes, pts: float):
+        """Récupère les blendshapes d'un buffer et planifie chaque frame à son pts"""
+        blendshapes = await self.api_client.fetch_blendshapes(audio)
+        if not blendshapes:
+            return
+        
+        # Bloc [N, 61] : une frame par 1/fps d'audio à partir du pts du buffer
+        frames = self.api_client.remapper.remap(blendshapes)
+        pts += self._av_offset
+        loop = asyncio.get_running_loop()
+        now = time.monotonic()
+        for index, frame in enumerate(frames):
+            frame_pts = pts + index / self._frame_rate
+            delay = frame_pts - now
+            if delay < -self._stale_after:
+                # La voix est déjà passée : envoyer maintenant décalerait les lèvres
+                self.stale_frames += 1
+                continue
+            self._schedule(loop, max(0.0, delay), frame, frame_pts)
+    
+    def _schedule(self, loop, delay: float, frame: np.ndarray, pts: float):
+        """Planifie l'envoi d'une frame (annulable par _interrupt)"""
+        def send():
+            self._scheduled.discard(handle)
+            self.skew.record(pts)
+            self.api_client.send_frame(frame, pts)
+        
+        handle = loop.call_later(delay, send)
+        self._scheduled.add(handle)
+    
+    def _submit_buffer(self):
+        if self._buffer:
+            self._logger.info(f"⚡ Buffer: {len(self._buffer)} octets")
+            self._queue.submit(bytes(self._buffer), self._buffer_pts)
+            self._buffer.clear()
+    
+    def _interrupt(self):
+        """Abandonne l'audio en attente et les envois planifiés"""
+        self._buffer.clear()
+        cancelled = self._queue.cancel()
+        for handle in self._scheduled:
+            handle.cancel()
+        cancelled += len(self._scheduled)
+        self._scheduled.clear()
+        self._reset_clock()
+        if cancelled:
+            self._logger.info(f"⏹️ Interruption: {cancelled} animations annulées")
         
     async def process_frame(self, frame, direction=FrameDirection.DOWNSTREAM):
         # Toujours appeler super()
         await super().process_frame(frame, direction)
         
-        # Traiter l'audio en aval
-        if (
+        if isinstance(frame, StartInterruptionFrame):
+            self._interrupt()
+        elif isinstance(frame, TTSStartedFrame):
+            self._reset_clock()
+        elif isinstance(frame, TTSStoppedFrame):
+            # Fin d'énoncé : animer le reste du buffer
+            self._submit_buffer()
+        elif (
             direction == FrameDirection.DOWNSTREAM 
             and hasattr(frame, "audio") 
             and frame.audio
         ):
             audio_data = frame.audio
             if isinstance(audio_data, bytes) and len(audio_data) > 0:
+                pts = self._presentation_time(len(audio_data))
+                if not self._buffer:
+                    self._buffer_pts = pts
+                
                 # Ajouter au buffer
                 self._buffer.extend(audio_data)
                 
-                # Si buffer suffisant, envoyer
+                # Si buffer suffisant, le confier à la file (sans attendre l'API)
                 if len(self._buffer) >= self._min_buffer_size:
-                    self._logger.info(f"⚡ Buffer: {len(self._buffer)} octets")
-                    
-                    # Envoyer à l'API et animer
-                    await self.api_client.send_audio_and_animate(
-                        bytes(self._buffer), 
-                        sample_rate=16000
-                    )
-                    
-                    # Vider le buffer
-                    self._buffer.clear()
+                    self._submit_buffer()
         
-        # Propager le frame
+        # Propager le frame immédiatement
         await self.push_frame(frame, direction)
+    
+    async def close(self):
+        """Arrête la file d'animation (fin du pipeline)"""
+        self._interrupt()
+        await self._queue.close()
+        skew = self.skew.stats()
+        if skew:
+            self._logger.info(f"Skew A/V: p50 {skew['p50']:.1f} ms, p95 {skew['p95']:.1f} ms")
 
 # ---------------------------------------------------------------------------
 # Pipeline principale
@@ -307,18 +410,18 @@ async def on_client_disconnected(transport, client):
 async def main():
     logger.info("Gala • Démarrage du pipeline – salle %s", DAILY_ROOM_URL)
     
-    # Vérifier l'API
-    try:
-        response = requests.get("http://127.0.0.1:6969/health")
-        if response.status_code == 200:
-            logger.info("✅ API NeuroSync accessible")
-        else:
-            logger.warning("⚠️ API non accessible")
-    except:
-        logger.warning("⚠️ Impossible de vérifier l'API")
+    # Vérifier l'API (ouvre aussi la connexion persistante)
+    if await api_client.http.get("/health"):
+        logger.info("✅ API NeuroSync accessible")
+    else:
+        logger.warning("⚠️ API non accessible")
     
     runner = PipelineRunner()
-    await runner.run(task)
+    try:
+        await runner.run(task)
+    finally:
+        await neurosync_processor.close()
+        await api_client.aclose()
 
 if __name__ == "__main__":
     try:
@@ -13,6 +13,15 @@ import wave
 import time
 from typing import Optional
 
+import websockets
+
+from modules.audio_stream import (
+    pack_audio_frame,
+    unpack_blendshape_frame,
+    FLAG_FLUSH,
+    FLAG_SUBSCRIBE,
+)
+
 # Configuration du logging
 logging.basicConfig(
     level=logging.INFO,
@@ -25,6 +34,7 @@ class GalaAudioSender:
     
     def __init__(self):
         self.api_url = "http://localhost:6969"
+        self.ws_url = "ws://localhost:6970"
         self.sample_rate = 16000
         self.chunk_duration_ms = 32  # Envoyer par chunks de 32ms
         self.chunk_size = int(self.sample_rate * self.chunk_duration_ms / 1000 * 2)  # *2 pour 16-bit
@@ -109,6 +119,53 @@ class GalaAudioSender:
             logger.info("Buffer flush demandé")
         except:
             pass
+    
+    async def stream_audio_ws(self, audio_data: bytes, receive_blendshapes: bool = False) -> int:
+        """
+        Stream l'audio sur une connexion WebSocket persistante
+        
+        Un message binaire (en-tête + PCM) par chunk au lieu d'un POST HTTP.
+        
+        Args:
+            audio_data: PCM int16 16kHz
+            receive_blendshapes: Recevoir les blendshapes générés (float16)
+            
+        Returns:
+            Nombre de frames de blendshapes reçues
+        """
+        received_frames = 0
+        
+        async with websockets.connect(self.ws_url, max_size=2 ** 20) as websocket:
+            
+            async def receive():
+                nonlocal received_frames
+                async for message in websocket:
+                    if isinstance(message, bytes):
+                        _, _, frames = unpack_blendshape_frame(message)
+                        received_frames += len(frames)
+            
+            receiver = asyncio.create_task(receive()) if receive_blendshapes else None
+            flags = FLAG_SUBSCRIBE if receive_blendshapes else 0
+            
+            logger.info(f"Streaming WebSocket de {len(audio_data)} bytes")
+            for sequence, i in enumerate(range(0, len(audio_data), self.chunk_size)):
+                chunk = audio_data[i:i + self.chunk_size]
+                last = i + self.chunk_size >= len(audio_data)
+                
+                await websocket.send(pack_audio_frame(
+                    sequence, chunk, self.sample_rate,
+                    flags | (FLAG_FLUSH if last else 0)
+                ))
+                
+                # Timing pour simuler le temps réel (32ms entre chunks)
+                await asyncio.sleep(self.chunk_duration_ms / 1000)
+            
+            if receiver:
+                # Laisser arriver les derniers blocs
+                await asyncio.sleep(0.5)
+                receiver.cancel()
+        
+        return received_frames
 
 async def main():
     """Point d'entrée principal"""
@@ -125,8 +182,13 @@ async def main():
     logger.info("Génération audio de test (5 secondes)")
     test_audio = sender.generate_test_audio(duration=5.0)
     
-    # Streamer l'audio
-    await sender.stream_audio(test_audio)
+    # Streamer l'audio (WebSocket, sinon POST HTTP par chunk)
+    try:
+        frames = await sender.stream_audio_ws(test_audio, receive_blendshapes=True)
+        logger.info(f"{frames} frames de blendshapes reçues")
+    except (OSError, websockets.WebSocketException) as e:
+        logger.warning(f"WebSocket indisponible ({e}), repli sur HTTP")
+        await sender.stream_audio(test_audio)
     
     # Attendre un peu pour voir les résultats
     await asyncio.sleep(2)
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Client HTTP asynchrone persistant vers l'API d'animation Gala
+Une seule ClientSession aiohttp (pool keep-alive) pour tout le processus au
+lieu d'une session par buffer de 192 ms, nombre de requêtes en vol borné et
+reprise avec backoff exponentiel à jitter
+"""
+
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+
+logger = logging.getLogger(__name__)
+
+# Statuts temporaires qui justifient une nouvelle tentative
+# (503 : buffer PCM plein côté serveur, politique 'block')
+RETRY_STATUSES = (502, 503, 504)
+
+# Méthodes sans effet de bord, retentées après toute erreur réseau. Un POST
+# audio n'est renvoyé que si la connexion n'a pas pu s'établir : après un
+# timeout ou une déconnexion, le serveur a pu déjà écrire le chunk dans son
+# buffer et le renvoyer dupliquerait l'audio
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class AnimationClient:
+    """
+    Client partagé par les processeurs audio (pipecat) et la conversation
+
+    La session et son connecteur sont créés à la première requête dans la
+    boucle asyncio courante puis réutilisés : les connexions TCP restent
+    ouvertes entre les buffers. Un sémaphore borne les requêtes en vol pour
+    qu'un serveur lent ne fasse pas grossir la file indéfiniment.
+    """
+
+    def __init__(self, base_url: str, max_in_flight: int = 4, timeout: float = 5.0,
+                 retries: int = 2, backoff_base: float = 0.05, backoff_max: float = 1.0,
+                 keepalive_timeout: float = 30.0):
+        """
+        Args:
+            base_url: URL de l'API (ex: http://127.0.0.1:6969)
+            max_in_flight: Requêtes simultanées max (= taille du pool)
+            timeout: Timeout total d'une tentative en secondes
+            retries: Nombre de nouvelles tentatives après un échec temporaire
+            backoff_base: Délai de base du backoff exponentiel (s)
+            backoff_max: Délai maximal entre deux tentatives (s)
+            keepalive_timeout: Durée de vie d'une connexion inactive dans le pool
+        """
+        self.base_url = base_url.rstrip("/")
+        self.max_in_flight = max_in_flight
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.keepalive_timeout = keepalive_timeout
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        # Statistiques
+        self.requests = 0
+        self.failures = 0
+        self.retried = 0
+        self.in_flight = 0
+        self.total_latency = 0.0
+
+    def _ensure_session(self) -> aiohttp.ClientSession:
+        """Crée la session (et le pool) dans la boucle courante si besoin"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_in_flight,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self._session
+
+    def _backoff(self, attempt: int) -> float:
+        """Délai avant la tentative suivante (full jitter)"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def request(self, method: str, path: str, data=None,
+                      headers: Optional[Dict[str, str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Envoie une requête et décode la réponse JSON
+
+        Les statuts 502/503/504 et les échecs de connexion sont retentés ;
+        les timeouts et déconnexions ne le sont que pour les méthodes
+        idempotentes (GET). Les autres erreurs sont abandonnées immédiatement.
+
+        Returns:
+            Réponse JSON, ou None en cas d'échec
+        """
+        session = self._ensure_session()
+        url = f"{self.base_url}{path}"
+
+        async with self._semaphore:
+            self.in_flight += 1
+            start = time.perf_counter()
+            try:
+                for attempt in range(self.retries + 1):
+                    if attempt:
+                        self.retried += 1
+                        await asyncio.sleep(self._backoff(attempt))
+                    try:
+                        async with session.request(method, url, data=data, headers=headers) as response:
+                            if response.status == 200:
+                                self.requests += 1
+                                return await response.json(content_type=None)
+                            if response.status not in RETRY_STATUSES:
+                                logger.error(f"❌ Erreur API {path}: {response.status}")
+                                break
+                            logger.debug(f"API {path}: {response.status}, nouvelle tentative")
+                    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                        if method not in IDEMPOTENT_METHODS and not isinstance(e, aiohttp.ClientConnectorError):
+                            # Requête peut-être reçue : pas de renvoi
+                            logger.error(f"❌ API {path}: {e!r}, sans nouvelle tentative")
+                            break
+                        logger.debug(f"API {path}: {e!r}, nouvelle tentative")
+                        if attempt == self.retries:
+                            logger.error(f"❌ API {path} injoignable: {e!r}")
+
+                self.failures += 1
+                return None
+            finally:
+                self.in_flight -= 1
+                self.total_latency += time.perf_counter() - start
+
+    async def post(self, path: str, data, content_type: str = "application/octet-stream"):
+        """POST binaire (audio) vers l'API"""
+        return await self.request("POST", path, data=data, headers={"Content-Type": content_type})
+
+    async def get(self, path: str):
+        """GET JSON vers l'API"""
+        return await self.request("GET", path)
+
+    async def close(self):
+        """Ferme la session et les connexions du pool"""
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def stats(self) -> Dict:
+        """Statistiques du client"""
+        completed = self.requests + self.failures
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "retried": self.retried,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "avg_latency_ms": self.total_latency / completed * 1000 if completed else 0.0
+        }
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+File de travail d'animation en arrière-plan pour Gala v1
+Le processeur pipecat dépose les buffers audio et retourne immédiatement ;
+une tâche asyncio les envoie à l'API d'animation. La file est bornée
+(les plus anciens buffers sont abandonnés) et annulable en bloc lors d'une
+interruption
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class AnimationQueue:
+    """
+    File asyncio bornée traitée par une tâche de fond
+
+    Chaque élément porte l'audio et son instant de présentation (pts,
+    horloge time.monotonic) ; le handler reçoit les deux. cancel() abandonne
+    les éléments en attente et annule le traitement en cours : rien de ce
+    qui précède l'interruption n'atteint LiveLink.
+    """
+
+    def __init__(self, handler: Callable[[bytes, float], Awaitable], max_depth: int = 4):
+        """
+        Args:
+            handler: Coroutine handler(audio, pts) qui traite un buffer
+            max_depth: Nombre max de buffers en attente (au-delà : abandon du plus ancien)
+        """
+        self.handler = handler
+        self.max_depth = max_depth
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._current: Optional[asyncio.Task] = None
+
+        # Statistiques
+        self.submitted = 0
+        self.processed = 0
+        self.dropped = 0
+        self.cancelled = 0
+        self.errors = 0
+        self.dequeued = 0
+        self.total_wait = 0.0
+
+    def _ensure_worker(self):
+        """Démarre la tâche de fond dans la boucle courante"""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue(maxsize=self.max_depth)
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    def submit(self, audio: bytes, pts: float) -> bool:
+        """
+        Dépose un buffer sans attendre (à appeler depuis la boucle asyncio)
+
+        Returns:
+            False si un buffer plus ancien a dû être abandonné
+        """
+        self._ensure_worker()
+        self.submitted += 1
+        accepted = True
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+            accepted = False
+        self._queue.put_nowait((audio, pts, time.monotonic()))
+        return accepted
+
+    async def _run(self):
+        """Traite les buffers dans l'ordre"""
+        while True:
+            audio, pts, submitted = await self._queue.get()
+            self.dequeued += 1
+            self.total_wait += time.monotonic() - submitted
+
+            self._current = asyncio.ensure_future(self.handler(audio, pts))
+            # wait() ne propage pas l'annulation de la tâche interne
+            await asyncio.wait({self._current})
+            task, self._current = self._current, None
+
+            if task.cancelled():
+                continue
+            if task.exception() is not None:
+                self.errors += 1
+                logger.error(f"Erreur animation: {task.exception()!r}")
+                continue
+            self.processed += 1
+
+    def cancel(self) -> int:
+        """
+        Abandonne le travail en attente et en cours (interruption)
+
+        Returns:
+            Nombre de buffers abandonnés
+        """
+        cancelled = 0
+        if self._queue is not None:
+            while not self._queue.empty():
+                self._queue.get_nowait()
+                cancelled += 1
+        if self._current is not None and not self._current.done():
+            self._current.cancel()
+            cancelled += 1
+        self.cancelled += cancelled
+        return cancelled
+
+    @property
+    def depth(self) -> int:
+        """Nombre de buffers en attente"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def close(self):
+        """Annule le travail restant et arrête la tâche de fond"""
+        self.cancel()
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+
+    def stats(self) -> Dict:
+        """Statistiques de la file"""
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "submitted": self.submitted,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "cancelled": self.cancelled,
+            "errors": self.errors,
+            "avg_queue_ms": self.total_wait / self.dequeued * 1000 if self.dequeued else 0.0
+        }
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Ingestion audio en streaming par WebSocket pour Gala v1
+Une connexion persistante remplace un POST HTTP par chunk de 32 ms :
+chaque chunk PCM est un message binaire préfixé d'un petit en-tête, et le
+serveur peut renvoyer les blendshapes générés en float16
+"""
+
+import asyncio
+import logging
+import struct
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+import websockets
+
+
+logger = logging.getLogger(__name__)
+
+PROTOCOL_VERSION = 1
+
+# Types de message
+MSG_AUDIO = 1
+MSG_BLENDSHAPES = 2
+
+# Flags des messages audio
+FLAG_FLUSH = 0x01  # Fin d'énoncé : vider le buffer
+FLAG_SUBSCRIBE = 0x02  # Le client veut recevoir les blendshapes
+
+# En-têtes little-endian
+# audio : version, type, flags, séquence, sample rate, puis PCM int16
+AUDIO_HEADER = struct.Struct('<BBHII')
+# blendshapes : version, type, flags, séquence, frames, canaux, puis float16
+BLENDSHAPE_HEADER = struct.Struct('<BBHIHH')
+
+
+def pack_audio_frame(sequence: int, pcm: bytes, sample_rate: int = 16000, flags: int = 0) -> bytes:
+    """
+    Construit un message audio
+
+    Args:
+        sequence: Numéro de séquence du chunk
+        pcm: Données PCM int16 mono
+        sample_rate: Fréquence d'échantillonnage
+        flags: Combinaison de FLAG_*
+    """
+    header = AUDIO_HEADER.pack(PROTOCOL_VERSION, MSG_AUDIO, flags, sequence & 0xFFFFFFFF, sample_rate)
+    return header + bytes(pcm)
+
+
+def unpack_audio_frame(message) -> Tuple[int, int, int, memoryview]:
+    """
+    Décode un message audio
+
+    Returns:
+        Tuple (séquence, sample_rate, flags, vue sur le PCM)
+    """
+    view = memoryview(message)
+    if len(view) < AUDIO_HEADER.size:
+        raise ValueError(f"Message audio trop court: {len(view)} octets")
+
+    version, msg_type, flags, sequence, sample_rate = AUDIO_HEADER.unpack_from(view)
+    if version != PROTOCOL_VERSION or msg_type != MSG_AUDIO:
+        raise ValueError(f"Message inattendu (version {version}, type {msg_type})")
+    return sequence, sample_rate, flags, view[AUDIO_HEADER.size:]
+
+
+def pack_blendshape_frame(sequence: int, frames: np.ndarray, flags: int = 0) -> bytes:
+    """
+    Construit un message de blendshapes float16
+
+    Args:
+        sequence: Numéro de séquence du bloc
+        frames: Tableau [N, C] de valeurs
+    """
+    frames = np.asarray(frames)
+    if frames.ndim == 1:
+        frames = frames[np.newaxis, :]
+    header = BLENDSHAPE_HEADER.pack(PROTOCOL_VERSION, MSG_BLENDSHAPES, flags,
+                                    sequence & 0xFFFFFFFF, frames.shape[0], frames.shape[1])
+    return header + frames.astype('<f2').tobytes()
+
+
+def unpack_blendshape_frame(message) -> Tuple[int, int, np.ndarray]:
+    """
+    Décode un message de blendshapes
+
+    Returns:
+        Tuple (séquence, flags, tableau float16 [N, C])
+    """
+    version, msg_type, flags, sequence, count, channels = BLENDSHAPE_HEADER.unpack_from(message)
+    if version != PROTOCOL_VERSION or msg_type != MSG_BLENDSHAPES:
+        raise ValueError(f"Message inattendu (version {version}, type {msg_type})")
+    frames = np.frombuffer(message, dtype='<f2', count=count * channels,
+                           offset=BLENDSHAPE_HEADER.size)
+    return sequence, flags, frames.reshape(count, channels)
+
+
+class AudioStreamServer:
+    """
+    Serveur WebSocket asyncio tournant dans son propre thread
+
+    Les chunks audio sont transmis à `on_audio` (ex: écriture dans le ring
+    buffer PCM) ; publish() diffuse les blendshapes aux clients abonnés
+    depuis n'importe quel thread.
+    """
+
+    def __init__(self, on_audio: Callable[[memoryview, int], None],
+                 on_flush: Optional[Callable[[], None]] = None,
+                 host: str = "0.0.0.0", port: int = 6970):
+        """
+        Args:
+            on_audio: Appelé avec (pcm, sample_rate) pour chaque chunk
+            on_flush: Appelé quand un chunk porte FLAG_FLUSH
+            host: Adresse d'écoute
+            port: Port WebSocket
+        """
+        self.on_audio = on_audio
+        self.on_flush = on_flush
+        self.host = host
+        self.port = port
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop: Optional[asyncio.Future] = None
+        self._subscribers = set()
+        self._sequence = 0
+
+        # Statistiques
+        self.connections = 0
+        self.messages = 0
+        self.bytes_received = 0
+        self.sequence_gaps = 0
+        self.errors = 0
+        self.blocks_published = 0
+
+    async def _handle(self, websocket, *args):
+        """Boucle de réception d'une connexion"""
+        self.connections += 1
+        expected = None
+        try:
+            async for message in websocket:
+                if isinstance(message, str):
+                    continue
+
+                try:
+                    sequence, sample_rate, flags, pcm = unpack_audio_frame(message)
+                except ValueError as e:
+                    self.errors += 1
+                    logger.warning(f"Message WebSocket ignoré: {e}")
+                    continue
+
+                if expected is not None and sequence != expected:
+                    self.sequence_gaps += 1
+                expected = (sequence + 1) & 0xFFFFFFFF
+
+                if flags & FLAG_SUBSCRIBE:
+                    self._subscribers.add(websocket)
+
+                self.messages += 1
+                self.bytes_received += len(pcm)
+                if len(pcm):
+                    await self._deliver(pcm, sample_rate)
+
+                if flags & FLAG_FLUSH and self.on_flush:
+                    self.on_flush()
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self._subscribers.discard(websocket)
+            self.connections -= 1
+
+    async def _deliver(self, pcm: memoryview, sample_rate: int):
+        """Transmet un chunk au consommateur (hors boucle s'il peut bloquer)"""
+        try:
+            result = self.on_audio(pcm, sample_rate)
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Erreur ingestion audio WebSocket: {e}")
+
+    async def _serve(self, ready: threading.Event):
+        self._stop = self._loop.create_future()
+        async with websockets.serve(self._handle, self.host, self.port, max_size=2 ** 20):
+            logger.info(f"✅ WebSocket audio en écoute sur ws://{self.host}:{self.port}")
+            ready.set()
+            await self._stop
+
+    def start(self):
+        """Démarre le serveur dans un thread dédié"""
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            try:
+                self._loop.run_until_complete(self._serve(ready))
+            except Exception as e:
+                logger.error(f"Erreur serveur WebSocket: {e}")
+                ready.set()
+            finally:
+                self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="AudioStreamServer", daemon=True)
+        self._thread.start()
+        ready.wait(timeout=5.0)
+
+    def stop(self):
+        """Arrête le serveur"""
+        if self._loop and self._stop and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._stop.set_result, None)
+        if self._thread:
+            self._thread.join(timeout=2)
+
+    def publish(self, frames: np.ndarray):
+        """Envoie un bloc de blendshapes (float16) à tous les clients abonnés"""
+        if not self._subscribers or not self._loop:
+            return
+
+        message = pack_blendshape_frame(self._sequence, frames)
+        self._sequence += 1
+        self.blocks_published += 1
+        for websocket in list(self._subscribers):
+            asyncio.run_coroutine_threadsafe(self._send(websocket, message), self._loop)
+
+    async def _send(self, websocket, message: bytes):
+        try:
+            await websocket.send(message)
+        except websockets.ConnectionClosed:
+            self._subscribers.discard(websocket)
+
+    def stats(self) -> Dict:
+        """Statistiques du serveur"""
+        return {
+            "port": self.port,
+            "connections": self.connections,
+            "subscribers": len(self._subscribers),
+            "messages": self.messages,
+            "bytes_received": self.bytes_received,
+            "sequence_gaps": self.sequence_gaps,
+            "errors": self.errors,
+            "blocks_published": self.blocks_published
+        }
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Synchronisation audio / animation par timestamps de présentation pour Gala v1
+Chaque chunk PCM ingéré reçoit un instant de lecture (pts, horloge
+time.monotonic) qui suit l'audio jusqu'à l'inférence ; les frames LiveLink
+sont planifiées à pts + offset avec le timecode LiveLink correspondant, et
+l'écart réel d'émission (skew A/V) est mesuré en continu
+"""
+
+import bisect
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+import numpy as np
+
+from modules.livelink_encoder import current_seconds_of_day
+
+
+SECONDS_PER_DAY = 86400
+
+
+class PresentationClock:
+    """
+    Horloge commune monotone -> timecode LiveLink
+
+    L'heure murale n'est lue qu'une fois : le timecode d'un paquet dérive
+    de son pts monotone et non de datetime.now() au moment de l'envoi.
+    """
+
+    def __init__(self):
+        self._monotonic_origin = time.monotonic()
+        self._day_origin = current_seconds_of_day()
+
+    @staticmethod
+    def now() -> float:
+        return time.monotonic()
+
+    def livelink_seconds(self, pts: float) -> float:
+        """Secondes depuis minuit (timecode LiveLink) correspondant à un pts"""
+        return (self._day_origin + pts - self._monotonic_origin) % SECONDS_PER_DAY
+
+
+# Horloge partagée par les serveurs et les clients d'un même processus
+presentation_clock = PresentationClock()
+
+
+class AudioTimeline:
+    """
+    Instants de lecture d'un flux PCM indexé par position absolue en octets
+
+    stamp() enregistre un chunk : il est joué à la suite du précédent s'il
+    arrive avant la fin de celui-ci, sinon dès maintenant (sortie audio à
+    vide). Une position déjà vue (buffer vidé puis réécrit) remplace les
+    chunks qu'elle recouvre. pts_at() retrouve l'instant de lecture de n'importe quel octet
+    déjà enregistré, par exemple le début d'une fenêtre d'inférence.
+    """
+
+    def __init__(self, sample_rate: int, sample_width: int = 2, max_anchors: int = 1024):
+        """
+        Args:
+            sample_rate: Fréquence d'échantillonnage du flux
+            sample_width: Octets par échantillon (mono)
+            max_anchors: Nombre de chunks mémorisés
+        """
+        self.bytes_per_second = sample_rate * sample_width
+        self.max_anchors = max_anchors
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Oublie tous les chunks (nouvelle phrase)"""
+        with self._lock:
+            self._offsets = []
+            self._pts = []
+            self._end_offset: Optional[int] = None
+            self._end_pts = 0.0
+            self.underruns = 0
+
+    def stamp(self, offset: int, length: int, now: Optional[float] = None) -> float:
+        """
+        Enregistre un chunk ingéré
+
+        Args:
+            offset: Position absolue du premier octet du chunk
+            length: Taille du chunk en octets
+            now: Instant d'ingestion (time.monotonic() si None)
+
+        Returns:
+            pts du premier échantillon du chunk
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._end_offset is not None and offset < self._end_offset:
+                # Buffer vidé (flush) : les positions suivantes sont réécrites
+                self._truncate(offset)
+            contiguous = offset == self._end_offset and self._end_pts > now
+            if not contiguous and self._end_offset is not None:
+                self.underruns += 1
+            pts = self._end_pts if contiguous else now
+
+            self._offsets.append(offset)
+            self._pts.append(pts)
+            if len(self._offsets) > self.max_anchors:
+                del self._offsets[0], self._pts[0]
+
+            self._end_offset = offset + length
+            self._end_pts = pts + length / self.bytes_per_second
+            return pts
+
+    def pts_at(self, offset: int) -> Optional[float]:
+        """pts de l'octet à une position absolue (None s'il est inconnu)"""
+        with self._lock:
+            index = bisect.bisect_right(self._offsets, offset) - 1
+            if index < 0:
+                return None
+            return self._pts[index] + (offset - self._offsets[index]) / self.bytes_per_second
+
+    def truncate(self, offset: int):
+        """Oublie les chunks à partir d'une position (données vidées par un flush)"""
+        with self._lock:
+            self._truncate(offset)
+
+    def _truncate(self, offset: int):
+        index = bisect.bisect_left(self._offsets, offset)
+        del self._offsets[index:], self._pts[index:]
+        if self._end_offset is not None and self._end_offset > offset:
+            self._end_offset = offset
+            self._end_pts = 0.0
+
+
+class SkewMonitor:
+    """Écart entre l'émission réelle des frames et leur instant prévu"""
+
+    def __init__(self, window: int = 1000):
+        self._skew = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, target: float, actual: Optional[float] = None):
+        """Enregistre une frame émise (instants time.monotonic)"""
+        actual = time.monotonic() if actual is None else actual
+        with self._lock:
+            self._skew.append(actual - target)
+
+    def stats(self) -> Optional[Dict]:
+        """Skew A/V en ms (positif : animation en retard sur l'audio)"""
+        with self._lock:
+            skew = np.array(self._skew, dtype=np.float64) * 1000
+        if not len(skew):
+            return None
+        return {
+            "mean": float(skew.mean()),
+            "p50": float(np.percentile(skew, 50)),
+            "p95": float(np.percentile(np.abs(skew), 95)),
+            "max_abs": float(np.abs(skew).max()),
+            "samples": len(skew)
+        }
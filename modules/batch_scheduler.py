@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Micro-batching de l'inférence pour Gala v1
+Regroupe les fenêtres de features de plusieurs sessions arrivées dans un
+court budget de temps (ex: 5 ms) en un seul forward pass, puis redistribue
+les résultats aux appelants via des futures
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+import torch
+
+from modules.metrics import metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    File d'attente d'inférence à regroupement temporel
+
+    Le premier élément arrivé ouvre une fenêtre de `max_wait_ms` ; tout ce qui
+    arrive avant l'échéance (jusqu'à `max_batch_size`) part dans le même lot.
+    On n'attend que si d'autres producteurs sont actifs (threads vivants ayant
+    soumis dans la dernière `active_window_ms`) sans avoir encore d'élément en
+    file : un producteur seul (thread AudioBuffer) part sans délai, et ce qui
+    s'accumule pendant un forward part dans le lot suivant.
+    Les éléments sont groupés par clé (forme, dtype...) : seuls des éléments
+    compatibles sont concaténés.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]],
+                 key_fn: Optional[Callable[[Any], Hashable]] = None,
+                 max_batch_size: int = 8, max_wait_ms: float = 5.0,
+                 active_window_ms: float = 1000.0):
+        """
+        Args:
+            batch_fn: Traite une liste d'éléments compatibles, retourne la liste des résultats
+            key_fn: Clé de compatibilité d'un élément (un seul groupe si None)
+            max_batch_size: Taille maximale d'un lot
+            max_wait_ms: Attente maximale du premier élément avant exécution
+            active_window_ms: Un producteur sans soumission depuis ce délai
+                              n'est plus attendu
+        """
+        self.batch_fn = batch_fn
+        self.key_fn = key_fn or (lambda item: None)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.active_window = active_window_ms / 1000.0
+
+        self._pending = []
+        self._submitters: Dict[threading.Thread, float] = {}  # Producteur -> dernière soumission
+        self._cond = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="MicroBatcher", daemon=True)
+        self._thread.start()
+
+        # Statistiques
+        self.batches = 0
+        self.items = 0
+        self.max_seen_batch = 0
+        self.total_wait = 0.0
+        self.batch_sizes = defaultdict(int)
+        self.immediate_batches = 0
+
+    def submit(self, item) -> Future:
+        """Dépose un élément et retourne le future de son résultat"""
+        future = Future()
+        with self._cond:
+            if not self._running:
+                raise RuntimeError("MicroBatcher arrêté")
+            now = time.monotonic()
+            submitter = threading.current_thread()
+            self._pending.append((item, future, now, submitter))
+            self._submitters[submitter] = now
+            metrics.sample("batch_queue_depth", len(self._pending))
+            self._cond.notify()
+        return future
+
+    def __call__(self, item):
+        """Appel bloquant : soumet l'élément et attend son résultat"""
+        return self.submit(item).result()
+
+    def _others_active(self, now: float) -> bool:
+        """Un producteur actif n'a pas encore d'élément en file (appelé sous le verrou)"""
+        for thread, last in list(self._submitters.items()):
+            if now - last > self.active_window or not thread.is_alive():
+                del self._submitters[thread]
+        queued = {entry[3] for entry in self._pending}
+        return any(thread not in queued for thread in self._submitters)
+
+    def _collect(self) -> List:
+        """Attend le premier élément puis remplit le lot jusqu'à l'échéance"""
+        with self._cond:
+            while self._running and not self._pending:
+                self._cond.wait()
+            if not self._pending:
+                return []
+
+            deadline = self._pending[0][2] + self.max_wait
+            waited = False
+            while self._running and len(self._pending) < self.max_batch_size:
+                now = time.monotonic()
+                remaining = deadline - now
+                if remaining <= 0 or not self._others_active(now):
+                    break
+                waited = True
+                self._cond.wait(remaining)
+            if not waited:
+                self.immediate_batches += 1
+
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:self.max_batch_size]
+            return batch
+
+    def _run(self):
+        while self._running or self._pending:
+            batch = self._collect()
+            if not batch:
+                continue
+
+            now = time.monotonic()
+            groups = defaultdict(list)
+            for entry in batch:
+                try:
+                    groups[self.key_fn(entry[0])].append(entry)
+                except Exception as e:
+                    entry[1].set_exception(e)
+
+            for entries in groups.values():
+                self._execute(entries, now)
+
+    def _execute(self, entries: List, now: float):
+        """Exécute un groupe compatible et distribue les résultats"""
+        try:
+            results = list(self.batch_fn([entry[0] for entry in entries]))
+        except Exception as e:
+            for entry in entries:
+                entry[1].set_exception(e)
+            return
+
+        for (_, future, submitted, _), result in zip(entries, results):
+            self.total_wait += now - submitted
+            future.set_result(result)
+        if len(results) < len(entries):
+            # Sans résultat, l'appelant attendrait indéfiniment
+            error = RuntimeError(f"batch_fn a retourné {len(results)} résultat(s) pour {len(entries)} élément(s)")
+            for entry in entries[len(results):]:
+                entry[1].set_exception(error)
+
+        size = len(entries)
+        metrics.sample("batch_size", size)
+        self.batches += 1
+        self.items += size
+        self.max_seen_batch = max(self.max_seen_batch, size)
+        self.batch_sizes[size] += 1
+
+    def stop(self):
+        """Arrête le thread après avoir traité les éléments en attente"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join(timeout=2)
+
+    def stats(self) -> Dict:
+        """Statistiques de regroupement"""
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_seen_batch,
+            "avg_wait_ms": self.total_wait / self.items * 1000 if self.items else 0.0,
+            "batch_size_histogram": dict(self.batch_sizes),
+            "immediate_batches": self.immediate_batches,
+            "max_wait_ms": self.max_wait * 1000,
+            "batch_limit": self.max_batch_size
+        }
+
+
+def _tensor_key(item):
+    """Clé de compatibilité d'un couple (tenseur, autocast) : formes hors batch, dtype, device"""
+    tensor, autocast = item
+    return (tuple(tensor.shape[1:]), tensor.dtype, str(tensor.device), autocast)
+
+
+class BatchedModel:
+    """
+    Proxy de modèle NeuroSync partagé entre sessions
+
+    S'utilise à la place de `blendshape_model` dans les fonctions NeuroSync
+    (generate_facial_data_from_bytes, process_audio_features). Les appels
+    model(x), model.encoder(x) et model.decoder(x) sont regroupés chacun
+    dans leur propre file et retournent exactement la sortie du sous-module
+    d'origine. Les autres attributs sont délégués au modèle d'origine.
+    """
+
+    def __init__(self, model, max_batch_size: int = 8, max_wait_ms: float = 5.0):
+        """
+        Args:
+            model: Modèle NeuroSync chargé (load_model)
+            max_batch_size: Nombre maximal de fenêtres par forward pass
+            max_wait_ms: Budget d'attente pour compléter un lot
+        """
+        self.model = model
+        self._batchers = {
+            name: MicroBatcher(
+                lambda items, fn=fn: self._run_batch(fn, items),
+                key_fn=_tensor_key, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms
+            )
+            for name, fn in (("forward", model), ("encoder", model.encoder), ("decoder", model.decoder))
+        }
+
+    @staticmethod
+    def _run_batch(fn, items: List) -> List[torch.Tensor]:
+        """Concatène sur la dimension batch, une passe, puis redécoupe"""
+        tensors = [tensor for tensor, _ in items]
+        sizes = [tensor.shape[0] for tensor in tensors]
+        batch = torch.cat(tensors, dim=0) if len(tensors) > 1 else tensors[0]
+
+        with torch.no_grad():
+            # Le thread de batch reprend l'état autocast des appelants (clé du groupe)
+            if items[0][1]:
+                with torch.autocast(device_type=batch.device.type):
+                    output = fn(batch)
+            else:
+                output = fn(batch)
+
+        return list(torch.split(output, sizes, dim=0)) if len(items) > 1 else [output]
+
+    def _submit(self, stage: str, src: torch.Tensor) -> torch.Tensor:
+        return self._batchers[stage]((src, torch.is_autocast_enabled()))
+
+    def __call__(self, src: torch.Tensor) -> torch.Tensor:
+        return self._submit("forward", src)
+
+    def forward(self, src: torch.Tensor) -> torch.Tensor:
+        return self(src)
+
+    def encoder(self, src: torch.Tensor) -> torch.Tensor:
+        return self._submit("encoder", src)
+
+    def decoder(self, encoded: torch.Tensor) -> torch.Tensor:
+        return self._submit("decoder", encoded)
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def stop(self):
+        for batcher in self._batchers.values():
+            batcher.stop()
+
+    def stats(self) -> Dict:
+        """Statistiques par file (forward, encoder, decoder)"""
+        return {name: batcher.stats() for name, batcher in self._batchers.items()}
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Remapping vectorisé ARKit (68) -> LiveLink (61) pour Gala v1
+Remplace les boucles Python par élément (reset/seuil/clamp) par des
+tables d'indices numpy appliquées sur un bloc [frames, 68] complet
+"""
+
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+from modules.metrics import metrics, STAGE_REMAP
+
+
+LIVELINK_COUNT = 61
+
+# Plages d'indices LiveLink pour les facteurs d'échelle (cf. PyLiveLinkFace._apply_scaling)
+EYES_RANGE = range(0, 14)
+MOUTH_RANGE = range(18, 41)
+BROWS_RANGE = range(41, 46)
+
+# Les 52 premiers ARKit correspondent directement aux 52 premiers LiveLink
+ARKIT_DIRECT_MAPPING: Dict[int, Optional[int]] = {i: i for i in range(52)}
+
+# EyeOpenLeft/Right (56-57) : inverses de EyeBlinkLeft/Right
+NEUROSYNC_INVERTED_SOURCES = (56, 57)
+
+
+def neurosync_mapping() -> Dict[int, Optional[int]]:
+    """
+    Crée un mapping entre les 68 blendshapes ARKit et les 61 LiveLink
+    Certains blendshapes ARKit sont dupliqués ou n'existent pas dans LiveLink
+    """
+    mapping = dict(ARKIT_DIRECT_MAPPING)
+
+    # Les suivants (52-67) sont soit dupliqués soit mappés différemment
+    # HeadYaw, HeadPitch, HeadRoll (52-54) - pas dans LiveLink standard
+    # EyeBlinkLeft/Right dupliqués (54-55) -> map vers 0,7
+    mapping[54] = 0  # EyeBlinkLeft duplicate
+    mapping[55] = 7  # EyeBlinkRight duplicate
+
+    # EyeOpenLeft/Right (56-57) - inverses de EyeBlink
+    mapping[56] = 0  # EyeOpenLeft -> inverse de EyeBlinkLeft
+    mapping[57] = 7  # EyeOpenRight -> inverse de EyeBlinkRight
+
+    # Brow duplicates (58-61)
+    mapping[58] = 41  # BrowLeftDown
+    mapping[59] = 44  # BrowLeftUp -> BrowOuterUpLeft
+    mapping[60] = 42  # BrowRightDown
+    mapping[61] = 45  # BrowRightUp -> BrowOuterUpRight
+
+    # Emotions (62-67) - pas dans LiveLink standard
+    for i in range(62, 68):
+        mapping[i] = None
+
+    return mapping
+
+
+class BlendshapeRemapper:
+    """
+    Étape unique de remapping ARKit -> LiveLink
+
+    Applique en quelques opérations numpy sur tout le bloc :
+    gather par table d'indices, inversion EyeOpen = 1 - EyeBlink,
+    seuil, clamp [0, 1] et facteurs d'échelle bouche/yeux/sourcils.
+    """
+
+    def __init__(self, mapping: Optional[Dict[int, Optional[int]]] = None,
+                 inverted_sources: Iterable[int] = (),
+                 threshold: float = 0.001, clamp: bool = True,
+                 scaling_mouth: float = 1.0, scaling_eyes: float = 1.0,
+                 scaling_eyebrows: float = 1.0):
+        """
+        Initialise les tables d'indices
+
+        Args:
+            mapping: {index ARKit: index LiveLink ou None}. En cas de doublon,
+                     la source d'indice le plus élevé l'emporte (comme la
+                     boucle d'origine).
+            inverted_sources: Indices ARKit à inverser (1 - valeur)
+            threshold: Les valeurs <= seuil sont mises à 0
+            clamp: Limiter les valeurs entre 0 et 1
+            scaling_mouth: Facteur d'échelle bouche (indices 18-40)
+            scaling_eyes: Facteur d'échelle yeux (indices 0-13)
+            scaling_eyebrows: Facteur d'échelle sourcils (indices 41-45)
+        """
+        self.mapping = dict(mapping if mapping is not None else ARKIT_DIRECT_MAPPING)
+        self.inverted_sources = frozenset(inverted_sources)
+        self.threshold = threshold
+        self.clamp = clamp
+
+        # Table cible -> source (la dernière source écrite l'emporte)
+        source_for_target = {}
+        for source in sorted(self.mapping):
+            target = self.mapping[source]
+            if target is not None and 0 <= target < LIVELINK_COUNT:
+                source_for_target[target] = source
+
+        targets = sorted(source_for_target)
+        self._targets = np.array(targets, dtype=np.intp)
+        self._sources = np.array([source_for_target[t] for t in targets], dtype=np.intp)
+        self._inverted = np.array([source_for_target[t] in self.inverted_sources for t in targets],
+                                  dtype=bool)
+
+        # Vecteur d'échelle par canal LiveLink
+        self._scale = np.ones(LIVELINK_COUNT, dtype=np.float32)
+        self._scale[list(EYES_RANGE)] = scaling_eyes
+        self._scale[list(MOUTH_RANGE)] = scaling_mouth
+        self._scale[list(BROWS_RANGE)] = scaling_eyebrows
+        self._needs_scaling = not np.all(self._scale == 1.0)
+
+        # Tables restreintes par largeur d'entrée (52, 61, 68...)
+        self._tables = {}
+
+    def _tables_for_width(self, width: int):
+        """Retourne (sources, cibles, inversion) valides pour une largeur d'entrée"""
+        tables = self._tables.get(width)
+        if tables is None:
+            valid = self._sources < width
+            tables = (self._sources[valid], self._targets[valid], self._inverted[valid],
+                      bool(np.any(self._inverted[valid])))
+            self._tables[width] = tables
+        return tables
+
+    def remap(self, blendshapes, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Remappe un bloc de frames ARKit vers LiveLink
+
+        Args:
+            blendshapes: [frames, N] ou [N] valeurs ARKit (liste ou np.ndarray)
+            out: Tableau [frames, 61] float32 optionnel à réutiliser
+
+        Returns:
+            Tableau float32 [frames, 61] prêt pour l'encodeur LiveLink
+        """
+        start = metrics.start()
+        block = np.asarray(blendshapes, dtype=np.float32)
+        if block.ndim == 1:
+            block = block[np.newaxis, :]
+        if block.size == 0:
+            return np.zeros((0, LIVELINK_COUNT), dtype=np.float32)
+
+        frames = block.shape[0]
+        if out is None or out.shape != (frames, LIVELINK_COUNT):
+            out = np.zeros((frames, LIVELINK_COUNT), dtype=np.float32)
+        else:
+            out.fill(0.0)
+
+        sources, targets, inverted, has_inverted = self._tables_for_width(block.shape[1])
+
+        # Gather (copie) des sources mappées
+        values = block[:, sources]
+        if has_inverted:
+            values[:, inverted] = 1.0 - values[:, inverted]
+
+        # Seuil puis clamp
+        values[values <= self.threshold] = 0.0
+        if self.clamp:
+            np.clip(values, 0.0, 1.0, out=values)
+
+        # Scatter vers les indices LiveLink
+        out[:, targets] = values
+
+        if self._needs_scaling:
+            out *= self._scale
+
+        metrics.stop(STAGE_REMAP, start)
+        return out
+
+    def remap_frame(self, blendshapes) -> np.ndarray:
+        """Remappe une seule frame et retourne un vecteur [61]"""
+        return self.remap(blendshapes)[0]
+
+
+def create_direct_remapper(threshold: float = 0.001, **kwargs) -> BlendshapeRemapper:
+    """
+    Remapper des serveurs api_* : 52 ARKit -> 52 LiveLink, seuil et clamp
+
+    Args:
+        threshold: Seuil en dessous duquel les valeurs sont ignorées
+    """
+    return BlendshapeRemapper(ARKIT_DIRECT_MAPPING, threshold=threshold, **kwargs)
+
+
+def create_neurosync_remapper(threshold: float = 0.0, **kwargs) -> BlendshapeRemapper:
+    """Remapper 68 -> 61 avec doublons et inversion EyeOpen (LiveLinkNeuroSync)"""
+    return BlendshapeRemapper(neurosync_mapping(), inverted_sources=NEUROSYNC_INVERTED_SOURCES,
+                              threshold=threshold, **kwargs)
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Puits de debug asynchrone pour Gala v1
+Les handlers déposent des enregistrements dans une file bornée sans jamais
+attendre ; un thread les écrit dans un journal JSONL tournant (les blobs
+binaires comme l'audio brut vont dans un journal binaire tournant à part).
+Sous pression, les enregistrements sont abandonnés et comptés. Les
+graphiques ne sont rendus qu'à la demande, depuis les dernières frames
+gardées en mémoire (matplotlib / plotly importés à ce moment-là)
+"""
+
+import json
+import logging
+import queue
+import struct
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+# En-tête d'un blob : horodatage, taille
+_BLOB_STRUCT = struct.Struct('<dI')
+
+# Préfixe des journaux de api_debug_advanced.py (relus par benchmarks/audio_corpus.py)
+DEBUG_SINK_NAME = "api_debug"
+
+# Type des enregistrements de record_frames() (clé de sample_rates)
+KIND_FRAMES = "frames"
+
+_STOP = object()
+
+
+class RotatingFile:
+    """Fichier en ajout qui tourne à max_bytes (nom, nom.1, ... nom.backups)"""
+
+    def __init__(self, path: Path, max_bytes: int, backups: int, mode: str = "ab"):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.mode = mode
+        self.rotations = 0
+        self._file = open(self.path, self.mode)
+
+    def write(self, data: bytes) -> int:
+        """Écrit data et retourne sa position dans le fichier courant"""
+        if self._file.tell() + len(data) > self.max_bytes and self._file.tell() > 0:
+            self._rotate()
+        offset = self._file.tell()
+        self._file.write(data)
+        return offset
+
+    def _rotate(self):
+        self._file.close()
+        for index in range(self.backups, 0, -1):
+            source = self.path if index == 1 else self.path.with_name(f"{self.path.name}.{index - 1}")
+            if source.exists():
+                source.replace(self.path.with_name(f"{self.path.name}.{index}"))
+        self._file = open(self.path, self.mode)
+        self.rotations += 1
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def _to_json(value):
+    """Sérialisation des types numpy (dans le thread d'écriture)"""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).hex()
+    return str(value)
+
+
+class DebugSink:
+    """
+    Journal de debug hors du chemin des requêtes
+
+    record() coûte un test d'échantillonnage et un put_nowait : aucune
+    sérialisation ni écriture disque dans le thread appelant. Les tableaux
+    passés ne doivent plus être modifiés par l'appelant.
+    """
+
+    def __init__(self, directory, name: str = "debug", max_queue: int = 1024,
+                 sample_rates: Optional[Dict[str, float]] = None,
+                 max_bytes: int = 32 * 1024 * 1024, backups: int = 4,
+                 recent_frames: int = 600, flush_interval: float = 1.0):
+        """
+        Args:
+            directory: Dossier des journaux
+            name: Préfixe des fichiers (<name>.jsonl, <name>.bin)
+            max_queue: Enregistrements en attente au-delà desquels on abandonne
+            sample_rates: Taux d'échantillonnage par type (1.0 par défaut)
+            max_bytes: Taille d'un fichier avant rotation
+            backups: Nombre de fichiers tournés conservés
+            recent_frames: Frames gardées en mémoire pour les graphiques
+            flush_interval: Intervalle max entre deux flush disque (s)
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.sample_rates = dict(sample_rates or {})
+        self.flush_interval = flush_interval
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._sample_credit: Dict[str, float] = {}
+        self._recent = deque(maxlen=recent_frames)
+        self._lock = threading.Lock()
+
+        self._log = RotatingFile(self.directory / f"{name}.jsonl", max_bytes, backups)
+        self._blobs = RotatingFile(self.directory / f"{name}.bin", max_bytes, backups)
+
+        # Statistiques
+        self.accepted = 0
+        self.written = 0
+        self.dropped = 0
+        self.sampled_out = 0
+        self.bytes_written = 0
+        self.write_errors = 0
+
+        self._thread = threading.Thread(target=self._run, name="DebugSink", daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------------------------------
+    # Chemin des requêtes
+    # ------------------------------------------------------------------
+
+    def _sampled(self, kind: str) -> bool:
+        """Échantillonnage déterministe : un enregistrement sur 1/taux"""
+        rate = self.sample_rates.get(kind, 1.0)
+        if rate >= 1.0:
+            return True
+        with self._lock:
+            credit = self._sample_credit.get(kind, 1.0 - rate) + rate
+            if credit >= 1.0:
+                self._sample_credit[kind] = credit - 1.0
+                return True
+            self._sample_credit[kind] = credit
+            return False
+
+    def record(self, kind: str, payload: Dict, blob: Optional[bytes] = None, force: bool = False) -> bool:
+        """
+        Dépose un enregistrement (ne bloque jamais)
+
+        Args:
+            kind: Type d'enregistrement ('frame', 'audio', 'error', ...)
+            payload: Données JSON-sérialisables (numpy accepté)
+            blob: Données binaires écrites dans le journal .bin
+            force: Ignore l'échantillonnage (erreurs)
+
+        Returns:
+            False si l'enregistrement a été échantillonné ou abandonné
+        """
+        if not force and not self._sampled(kind):
+            self.sampled_out += 1
+            return False
+        try:
+            self._queue.put_nowait((kind, time.time(), payload, blob))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.accepted += 1
+        return True
+
+    def record_frames(self, frames, label: str = "") -> bool:
+        """Garde des frames [N, 61] pour les graphiques et les journalise (type KIND_FRAMES, échantillonné)"""
+        frames = np.asarray(frames, dtype=np.float32)
+        if frames.ndim == 1:
+            frames = frames[np.newaxis, :]
+        with self._lock:
+            self._recent.extend(frames)
+        return self.record(KIND_FRAMES, {"label": label, "count": len(frames), "frames": frames})
+
+    # ------------------------------------------------------------------
+    # Thread d'écriture
+    # ------------------------------------------------------------------
+
+    def _write(self, kind: str, timestamp: float, payload: Dict, blob: Optional[bytes]):
+        entry = {"kind": kind, "time": datetime.fromtimestamp(timestamp).isoformat()}
+        if blob is not None:
+            blob = bytes(blob)
+            offset = self._blobs.write(_BLOB_STRUCT.pack(timestamp, len(blob)) + blob)
+            entry["blob"] = {"file": self._blobs.path.name, "rotation": self._blobs.rotations,
+                             "offset": offset + _BLOB_STRUCT.size, "length": len(blob)}
+            self.bytes_written += len(blob)
+        entry.update(payload)
+        line = (json.dumps(entry, default=_to_json) + "\n").encode("utf-8")
+        self._log.write(line)
+        self.bytes_written += len(line)
+        self.written += 1
+
+    def _run(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                break
+            if item is not None:
+                try:
+                    self._write(*item)
+                except Exception as e:
+                    self.write_errors += 1
+                    logger.error(f"Erreur d'écriture debug: {e}")
+            if item is None or time.monotonic() - last_flush >= self.flush_interval:
+                self._log.flush()
+                self._blobs.flush()
+                last_flush = time.monotonic()
+
+        self._log.close()
+        self._blobs.close()
+
+    def close(self, timeout: float = 5.0):
+        """Écrit ce qui reste en file puis ferme les journaux"""
+        if not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout=timeout)
+
+    # ------------------------------------------------------------------
+    # Rapports (à la demande)
+    # ------------------------------------------------------------------
+
+    def recent_frames(self) -> np.ndarray:
+        """Dernières frames enregistrées [N, 61]"""
+        with self._lock:
+            return np.array(self._recent, dtype=np.float32).reshape(-1, 61)
+
+    def render_report(self, names: List[str], prefix: str = "report", html: bool = True) -> Dict[str, str]:
+        """
+        Rend les graphiques des dernières frames (appelé depuis /debug/report)
+
+        Args:
+            names: Noms des canaux (étiquettes)
+            prefix: Préfixe des fichiers produits
+            html: Produit aussi une page plotly interactive
+
+        Returns:
+            {'png': chemin, 'html': chemin} des fichiers produits
+        """
+        frames = self.recent_frames()
+        if len(frames) == 0:
+            return {}
+
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+
+        count = min(len(names), frames.shape[1])
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        outputs = {}
+
+        figure, (heatmap, bars) = plt.subplots(2, 1, figsize=(15, 10))
+        heatmap.imshow(frames[:, :count].T, aspect="auto", interpolation="nearest", vmin=0, vmax=1)
+        heatmap.set_yticks(range(count))
+        heatmap.set_yticklabels(names[:count], fontsize=5)
+        heatmap.set_xlabel("Frame")
+        heatmap.set_title(f"{len(frames)} dernières frames")
+        bars.bar(range(count), frames[:, :count].max(axis=0))
+        bars.set_xticks(range(count))
+        bars.set_xticklabels(names[:count], rotation=90, fontsize=6)
+        bars.set_ylabel("Max")
+        figure.tight_layout()
+        png_path = self.directory / f"{prefix}_{stamp}.png"
+        figure.savefig(png_path, dpi=100)
+        plt.close(figure)
+        outputs["png"] = str(png_path)
+
+        if html:
+            try:
+                import plotly.graph_objects as go
+                import plotly.io as pio
+            except ImportError:
+                logger.warning("plotly non installé : rapport HTML ignoré")
+            else:
+                figure = go.Figure(data=[go.Heatmap(z=frames[:, :count].T, y=names[:count], zmin=0, zmax=1)])
+                figure.update_layout(title=f"{len(frames)} dernières frames", height=900)
+                html_path = self.directory / f"{prefix}_{stamp}.html"
+                pio.write_html(figure, html_path)
+                outputs["html"] = str(html_path)
+        return outputs
+
+    def stats(self) -> Dict:
+        """Compteurs du puits"""
+        return {
+            "queued": self._queue.qsize(),
+            "accepted": self.accepted,
+            "written": self.written,
+            "dropped": self.dropped,
+            "sampled_out": self.sampled_out,
+            "bytes_written": self.bytes_written,
+            "rotations": self._log.rotations + self._blobs.rotations,
+            "write_errors": self.write_errors,
+            "sample_rates": self.sample_rates
+        }
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Cache des blendshapes indexé par le contenu audio pour Gala v1
+Les phrases répétées du TTS (salutations, messages d'accueil) sont servies
+sans extraction de features ni inférence : clé = hash du PCM + version du
+modèle, valeur = tableau [frames, 68] stocké en float16. Le niveau disque
+(optionnel) est écrit par un thread de fond et borné en octets
+"""
+
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+def model_version(model_path: str, model_config: Optional[Dict] = None, precision: str = "") -> str:
+    """
+    Identifiant de version du modèle pour invalider le cache
+
+    Combine taille et date de modification des poids avec la configuration
+    NeuroSync : un nouveau checkpoint ou un changement de config change la clé.
+
+    Args:
+        model_path: Chemin du fichier de poids
+        model_config: Configuration passée à l'inférence (dict)
+        precision: Précision d'exécution (voir modules/precision.py)
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    try:
+        stat = os.stat(model_path)
+        digest.update(f"{os.path.basename(model_path)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    except OSError:
+        digest.update(model_path.encode())
+    if model_config:
+        digest.update(json.dumps(model_config, sort_keys=True, default=str).encode())
+    digest.update(precision.encode())
+    return digest.hexdigest()
+
+
+class FacialCache:
+    """
+    Cache LRU borné en mémoire avec niveau disque optionnel
+
+    Le niveau mémoire garde des tableaux float16 jusqu'à `max_memory_bytes`.
+    Le niveau disque écrit un .npy par entrée dans `cache_dir`, relu en
+    memory-map (np.load mmap_mode='r') puis promu en mémoire. Les écritures
+    passent par une file bornée vidée par un thread de fond (abandonnées si
+    elle est pleine) et le dossier est borné à `max_disk_bytes` : les entrées
+    les moins récemment utilisées (date d'écriture au redémarrage) sont
+    supprimées.
+    """
+
+    def __init__(self, version: str = "", max_memory_bytes: int = 64 * 1024 * 1024,
+                 cache_dir: Optional[str] = None, max_disk_bytes: int = 512 * 1024 * 1024,
+                 max_pending_writes: int = 64):
+        """
+        Args:
+            version: Version du modèle/config (voir model_version)
+            max_memory_bytes: Budget mémoire du niveau LRU
+            cache_dir: Dossier du niveau disque (désactivé si None)
+            max_disk_bytes: Budget disque du niveau disque
+            max_pending_writes: Écritures en attente au-delà desquelles on abandonne
+        """
+        self.version = version.encode()
+        self.max_memory_bytes = max_memory_bytes
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+
+        self._entries = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+        # Index du niveau disque : clé -> taille, du moins au plus récemment utilisé
+        self._disk_entries = OrderedDict()
+        self._disk_bytes = 0
+        self._writes: "queue.Queue" = queue.Queue(maxsize=max_pending_writes)
+        self._writer: Optional[threading.Thread] = None
+
+        # Statistiques
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        self.disk_errors = 0
+        self.disk_writes_dropped = 0
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._load_disk_index()
+            self._evict_disk()
+            self._writer = threading.Thread(target=self._write_loop, name="FacialCacheWriter", daemon=True)
+            self._writer.start()
+
+    def key(self, audio_bytes) -> str:
+        """Clé de contenu : blake2b(version + PCM)"""
+        digest = hashlib.blake2b(self.version, digest_size=16)
+        digest.update(memoryview(audio_bytes))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.npy")
+
+    def _load_disk_index(self):
+        """Entrées déjà sur disque, les plus anciennes d'abord"""
+        files = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".npy"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+        for _, key, size in sorted(files):
+            self._disk_entries[key] = size
+            self._disk_bytes += size
+
+    def _evict_disk(self):
+        """Supprime les entrées les moins récemment utilisées au-delà du budget"""
+        while True:
+            with self._lock:
+                if self._disk_bytes <= self.max_disk_bytes or not self._disk_entries:
+                    return
+                key, size = self._disk_entries.popitem(last=False)
+                self._disk_bytes -= size
+                self.disk_evictions += 1
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                self.disk_errors += 1
+                logger.warning(f"Suppression du cache impossible {key}: {e}")
+
+    def _write(self, key: str, stored: np.ndarray):
+        """Écrit une entrée (thread de fond) puis applique le budget disque"""
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                np.save(f, stored)
+            os.replace(temp_path, path)
+        except OSError as e:
+            self.disk_errors += 1
+            logger.warning(f"Écriture du cache impossible {key}: {e}")
+            return
+        size = os.path.getsize(path)
+        with self._lock:
+            self._disk_bytes += size - self._disk_entries.pop(key, 0)
+            self._disk_entries[key] = size
+        self._evict_disk()
+
+    def _write_loop(self):
+        while True:
+            key, stored = self._writes.get()
+            try:
+                self._write(key, stored)
+            finally:
+                self._writes.task_done()
+
+    def flush(self):
+        """Attend la fin des écritures disque en attente"""
+        if self._writer is not None:
+            self._writes.join()
+
+    def _remember(self, key: str, frames: np.ndarray):
+        """Ajoute au niveau mémoire en évinçant les plus anciennes entrées"""
+        if frames.nbytes > self.max_memory_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._memory_bytes -= previous.nbytes
+            self._entries[key] = frames
+            self._memory_bytes += frames.nbytes
+            while self._memory_bytes > self.max_memory_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._memory_bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """
+        Cherche une entrée (mémoire puis disque)
+
+        Returns:
+            Tableau float32 [frames, 68] ou None
+        """
+        with self._lock:
+            frames = self._entries.get(key)
+            if frames is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return frames.astype(np.float32)
+
+        if self.cache_dir:
+            try:
+                frames = np.load(self._path(key), mmap_mode='r')
+                stored = np.array(frames, dtype=np.float16)
+                self._remember(key, stored)
+                with self._lock:
+                    self.disk_hits += 1
+                    if key in self._disk_entries:
+                        self._disk_entries.move_to_end(key)
+                return stored.astype(np.float32)
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                self.disk_errors += 1
+                logger.warning(f"Entrée de cache illisible {key}: {e}")
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, frames) -> None:
+        """Stocke un résultat [frames, 68] (converti en float16)"""
+        stored = np.ascontiguousarray(frames, dtype=np.float16)
+        stored.setflags(write=False)
+        self._remember(key, stored)
+
+        if self.cache_dir:
+            # Écriture hors du chemin de la requête
+            try:
+                self._writes.put_nowait((key, stored))
+            except queue.Full:
+                self.disk_writes_dropped += 1
+
+    def get_or_compute(self, audio_bytes, compute: Callable[[], np.ndarray]) -> np.ndarray:
+        """
+        Retourne les blendshapes en cache, ou les calcule puis les stocke
+
+        Args:
+            audio_bytes: Audio d'entrée (clé de contenu)
+            compute: Calcule les blendshapes en cas d'absence
+
+        Returns:
+            Tableau [frames, 68]
+        """
+        key = self.key(audio_bytes)
+        frames = self.get(key)
+        if frames is not None:
+            return frames
+
+        frames = np.asarray(compute())
+        if frames.ndim == 2 and len(frames):
+            self.put(key, frames)
+        return frames
+
+    def clear(self):
+        """Vide le niveau mémoire"""
+        with self._lock:
+            self._entries.clear()
+            self._memory_bytes = 0
+
+    def stats(self) -> Dict:
+        """Statistiques de cache"""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "memory_bytes": self._memory_bytes,
+                "max_memory_bytes": self.max_memory_bytes,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "disk_errors": self.disk_errors,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "disk_tier": self.cache_dir is not None,
+                "disk_entries": len(self._disk_entries),
+                "disk_bytes": self._disk_bytes,
+                "max_disk_bytes": self.max_disk_bytes,
+                "disk_evictions": self.disk_evictions,
+                "disk_writes_dropped": self.disk_writes_dropped
+            }
+
+
+def create_facial_cache(model_path: str, model_config: Optional[Dict], gala_config,
+                        precision: str = "") -> FacialCache:
+    """
+    Crée le cache d'un serveur à partir de GalaConfig
+
+    Args:
+        model_path: Chemin des poids NeuroSync chargés
+        model_config: Configuration NeuroSync utilisée à l'inférence
+        gala_config: Instance GalaConfig (cache_dir, budgets mémoire et disque, niveau disque)
+        precision: Précision d'exécution du modèle (fait partie de la version)
+    """
+    cache_dir = None
+    if gala_config.facial_cache_on_disk:
+        cache_dir = os.path.join(gala_config.cache_dir, "facial")
+    return FacialCache(
+        version=model_version(model_path, model_config, precision),
+        max_memory_bytes=gala_config.facial_cache_memory_mb * 1024 * 1024,
+        cache_dir=cache_dir,
+        max_disk_bytes=gala_config.facial_cache_disk_mb * 1024 * 1024
+    )
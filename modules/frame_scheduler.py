@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Cadenceur de frames LiveLink temps réel pour Gala v1
+Un thread dédié possède le socket et émet exactement un paquet par tick
+de 1/fps sur une horloge monotone, à la place des boucles
+send_to_livelink(frame); time.sleep(0.016) dans les handlers HTTP.
+Avec une PresentationClock, chaque paquet porte le timecode LiveLink de
+l'instant prévu de sa frame et le skew A/V est mesuré. Avec un
+LayerCompositor, le thread émet en continu : idle, parole et émotion sont
+mélangés à chaque tick. Avec une SendPolicy, les frames inchangées ne
+partent pas et la cadence baisse hors parole
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from modules.livelink_encoder import LiveLinkEncoder, BLENDSHAPE_COUNT
+from modules.av_sync import PresentationClock, SkewMonitor, presentation_clock
+from modules.layer_compositor import LayerCompositor
+from modules.send_policy import SendPolicy
+from modules.metrics import metrics, STAGE_ENCODE, STAGE_UDP_SEND
+
+
+logger = logging.getLogger(__name__)
+
+LATE_DROP = "drop"
+LATE_STRETCH = "stretch"
+
+# Marge pour les comparaisons de temps (évite les erreurs d'arrondi flottant)
+_EPSILON = 1e-6
+
+
+class FrameBlock:
+    """Bloc de frames horodaté en attente d'émission"""
+
+    __slots__ = ("frames", "start_time", "play_start", "scale", "next_index")
+
+    def __init__(self, frames: np.ndarray, start_time: float):
+        self.frames = frames
+        self.start_time = start_time
+        self.play_start: Optional[float] = None
+        self.scale = 1.0
+        self.next_index = 0
+
+
+class FrameScheduler:
+    """
+    Thread d'émission LiveLink à cadence fixe
+
+    Les producteurs déposent des blocs [N, 61] horodatés (horloge
+    time.monotonic) avec submit() et retournent immédiatement. Les échéances
+    sont calculées depuis une ancre absolue (ancre + k/fps) : aucune dérive
+    ne s'accumule. Un bloc arrivé en retard est soit tronqué (drop : on
+    saute les frames déjà dépassées), soit compressé dans le temps restant
+    (stretch).
+    """
+
+    def __init__(self, sock, encoder: LiveLinkEncoder, fps: int = 60,
+                 late_policy: str = LATE_DROP, spin_seconds: float = 0.0005,
+                 jitter_window: int = 1000, clock: Optional[PresentationClock] = None,
+                 compositor: Optional[LayerCompositor] = None,
+                 send_policy: Optional[SendPolicy] = None):
+        """
+        Args:
+            sock: Socket UDP connecté vers Unreal (possédé par le scheduler)
+            encoder: Encodeur LiveLink dédié à ce thread
+            fps: Cadence d'émission
+            late_policy: 'drop' ou 'stretch' pour les blocs en retard
+            spin_seconds: Attente active avant l'échéance (précision du tick)
+            jitter_window: Nombre d'échéances gardées pour les stats de jitter
+            clock: Horloge de présentation ; si fournie, le timecode LiveLink
+                   d'un paquet est celui de l'instant prévu de sa frame
+            compositor: Compositeur de couches ; si fourni, une frame est émise
+                        à chaque tick et les blocs alimentent la couche parole
+            send_policy: Politique delta / keyframe ; si fournie, les ticks
+                         sans changement ne sont pas émis
+        """
+        if late_policy not in (LATE_DROP, LATE_STRETCH):
+            raise ValueError(f"Politique de retard inconnue: {late_policy}")
+
+        self.sock = sock
+        self.encoder = encoder
+        self.fps = fps
+        self.period = 1.0 / fps
+        self.late_policy = late_policy
+        self.spin_seconds = spin_seconds
+        self.clock = clock
+        self.compositor = compositor
+        self.send_policy = send_policy
+
+        self._blocks = deque()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._queue_end = 0.0
+
+        # Ancre de la grille de ticks
+        self._anchor: Optional[float] = None
+        self._tick = 0
+
+        # Statistiques
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.late_blocks = 0
+        self.stretched_blocks = 0
+        self.overruns = 0
+        self.send_errors = 0
+        self.frames_suppressed = 0
+        self._jitter = deque(maxlen=jitter_window)
+        self.skew = SkewMonitor(jitter_window)
+
+    # ------------------------------------------------------------------
+    # API producteurs
+    # ------------------------------------------------------------------
+
+    def submit(self, frames, start_time: Optional[float] = None) -> float:
+        """
+        Dépose un bloc de frames à émettre
+
+        Args:
+            frames: [N, 61] (ou [61]) valeurs LiveLink déjà remappées
+            start_time: Instant time.monotonic() de la première frame. Si None,
+                        le bloc est enchaîné après les blocs déjà en file
+                        (ou démarre au prochain tick si la file est vide).
+
+        Returns:
+            Instant de départ retenu pour le bloc
+        """
+        frames = np.asarray(frames, dtype=np.float32)
+        if frames.ndim == 1:
+            frames = frames[np.newaxis, :]
+        if frames.shape[1] != BLENDSHAPE_COUNT:
+            raise ValueError(f"Expected frames of shape [N, {BLENDSHAPE_COUNT}], got {frames.shape}")
+        if len(frames) == 0:
+            return start_time if start_time is not None else time.monotonic()
+
+        with self._cond:
+            if start_time is None:
+                start_time = max(time.monotonic(), self._queue_end)
+            self._blocks.append(FrameBlock(frames, start_time))
+            self._queue_end = max(self._queue_end, start_time + len(frames) * self.period)
+            metrics.sample("scheduler_queue_frames", (self._queue_end - time.monotonic()) * self.fps)
+            self._cond.notify()
+            return start_time
+
+    def clear(self) -> int:
+        """
+        Abandonne tous les blocs en attente (interruption)
+
+        Returns:
+            Nombre de frames abandonnées
+        """
+        with self._cond:
+            dropped = sum(len(block.frames) - block.next_index for block in self._blocks)
+            self._blocks.clear()
+            self._queue_end = 0.0
+            self.frames_dropped += dropped
+            return dropped
+
+    def pending_frames(self) -> int:
+        """Nombre de frames restant à émettre"""
+        with self._cond:
+            return sum(len(block.frames) - block.next_index for block in self._blocks)
+
+    # ------------------------------------------------------------------
+    # Thread d'émission
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Démarre le thread d'émission"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="FrameScheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        """Arrête le thread d'émission"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+
+    def _wait_until(self, deadline: float):
+        """Dort jusqu'à l'échéance puis termine en attente active"""
+        remaining = deadline - time.monotonic() - self.spin_seconds
+        if remaining > 0:
+            time.sleep(remaining)
+        while time.monotonic() < deadline:
+            pass
+
+    def _frame_index(self, block: FrameBlock, deadline: float) -> Optional[int]:
+        """
+        Index de la frame du bloc à émettre à cette échéance
+
+        Returns:
+            None si le bloc n'a pas commencé, un index >= len(frames) s'il est fini
+        """
+        if block.play_start is None:
+            late_frames = math.floor((deadline - block.start_time) * self.fps + _EPSILON)
+            if late_frames < 0:
+                return None
+
+            block.play_start = block.start_time
+            if late_frames > 0:
+                self.late_blocks += 1
+                remaining = len(block.frames) - late_frames
+                if self.late_policy == LATE_STRETCH and remaining > 0:
+                    # Compresser tout le bloc dans le temps restant
+                    self.stretched_blocks += 1
+                    block.play_start = deadline
+                    block.scale = len(block.frames) / remaining
+
+        position = (deadline - block.play_start) * self.fps + _EPSILON
+        return int(position * block.scale)
+
+    def _next_frame(self, deadline: float) -> Optional[Tuple[np.ndarray, float]]:
+        """Sélectionne la frame à émettre pour cette échéance et son instant prévu"""
+        with self._cond:
+            while self._blocks:
+                block = self._blocks[0]
+                index = self._frame_index(block, deadline)
+                if index is None:
+                    return None
+                if index >= len(block.frames):
+                    self.frames_dropped += max(0, len(block.frames) - block.next_index)
+                    self._blocks.popleft()
+                    continue
+
+                self.frames_dropped += max(0, index - block.next_index)
+                block.next_index = index + 1
+                return block.frames[index], block.start_time + index * self.period
+            return None
+
+    def _send(self, values: np.ndarray, seconds: Optional[float] = None):
+        """Encode et envoie une frame (surchargeable)"""
+        if getattr(self.sock, "multi_subject", False):
+            # Transport multi-sujets : un paquet par sujet (UUID / nom de chacun)
+            self.sock.send_frame(values, seconds)
+            return
+        with metrics.span(STAGE_ENCODE):
+            self.encoder.encode_into(values, seconds)
+        with metrics.span(STAGE_UDP_SEND):
+            # Buffer écrivable d'adresse stable : envoyé sans copie par le transport
+            self.sock.sendall(self.encoder.packet_buffer)
+
+    def _send_packet(self, packet: memoryview, seconds: Optional[float] = None):
+        """Envoie un paquet déjà encodé (surchargeable)"""
+        if getattr(self.sock, "multi_subject", False):
+            values = np.frombuffer(packet, dtype='>f4', count=BLENDSHAPE_COUNT, offset=self.encoder.values_offset)
+            self.sock.send_frame(values, seconds)
+            return
+        with metrics.span(STAGE_UDP_SEND):
+            self.sock.sendall(packet)
+
+    def _run(self):
+        """Boucle d'émission à cadence fixe"""
+        while self._running:
+            with self._cond:
+                while self._running and not self._blocks and self.compositor is None:
+                    # File vide : la grille repartira au prochain bloc
+                    self._anchor = None
+                    self._cond.wait()
+                if not self._running:
+                    break
+                first_start = self._blocks[0].start_time if self._blocks else None
+
+            now = time.monotonic()
+            if self._anchor is None:
+                self._anchor = max(now, first_start or now)
+                self._tick = 0
+
+            deadline = self._anchor + self._tick * self.period
+            if deadline < now - self.period:
+                # Retard de plus d'un tick (GC, CPU) : on saute les ticks perdus
+                skipped = int((now - deadline) * self.fps)
+                self.overruns += skipped
+                self._tick += skipped
+                deadline = self._anchor + self._tick * self.period
+
+            if self.compositor is None and deadline < first_start - self.period:
+                # Prochain bloc dans le futur : réancrer sur son départ
+                self._anchor = first_start
+                self._tick = 0
+                deadline = first_start
+
+            self._wait_until(deadline)
+            self._tick += 1
+
+            selected = self._next_frame(deadline)
+            if selected is None and self.compositor is None:
+                continue
+            frame, target = selected if selected is not None else (None, deadline)
+
+            now = time.monotonic()
+            self._jitter.append(now - deadline)
+            if selected is not None:
+                self.skew.record(target, now)
+            seconds = self.clock.livelink_seconds(target) if self.clock else None
+            try:
+                values, packet = frame, None
+                if self.compositor is not None:
+                    # Mélange des couches ; la frame de parole alimente sa couche
+                    values, packet = self.compositor.compose(deadline, frame, seconds)
+
+                if self.send_policy is not None:
+                    current = values if packet is None else np.frombuffer(
+                        packet, dtype='>f4', count=BLENDSHAPE_COUNT, offset=self.encoder.values_offset)
+                    if not self.send_policy.should_send(current, deadline, active=selected is not None):
+                        self.frames_suppressed += 1
+                        continue
+
+                if packet is not None:
+                    self._send_packet(packet, seconds)
+                else:
+                    self._send(values, seconds)
+                self.frames_sent += 1
+            except Exception as e:
+                self.send_errors += 1
+                metrics.count("livelink_send_errors")
+                logger.error(f"Erreur LiveLink: {e}")
+
+    def stats(self) -> Dict:
+        """Statistiques de cadence et de jitter (ms)"""
+        with self._cond:
+            jitter = np.array(self._jitter, dtype=np.float64) * 1000
+            pending = sum(len(block.frames) - block.next_index for block in self._blocks)
+
+        stats = {
+            "fps": self.fps,
+            "late_policy": self.late_policy,
+            "frames_sent": self.frames_sent,
+            "frames_dropped": self.frames_dropped,
+            "frames_pending": pending,
+            "late_blocks": self.late_blocks,
+            "stretched_blocks": self.stretched_blocks,
+            "overruns": self.overruns,
+            "send_errors": self.send_errors
+        }
+        if self.send_policy is not None:
+            stats["frames_suppressed"] = self.frames_suppressed
+            stats["send_policy"] = self.send_policy.stats()
+        if len(jitter):
+            stats["jitter_ms"] = {
+                "mean": float(jitter.mean()),
+                "p50": float(np.percentile(jitter, 50)),
+                "p99": float(np.percentile(jitter, 99)),
+                "max": float(jitter.max())
+            }
+        skew = self.skew.stats()
+        if skew:
+            stats["av_skew_ms"] = skew
+        if self.compositor is not None:
+            stats["compositor"] = self.compositor.stats()
+        return stats
+
+
+def create_frame_scheduler(sock, py_face, **kwargs) -> FrameScheduler:
+    """
+    Crée et démarre un scheduler pour un socket et un PyLiveLinkFace existants
+
+    Le scheduler utilise son propre encodeur (même UUID et nom de sujet) pour
+    ne pas partager le buffer de paquet de py_face entre threads. Les
+    timecodes suivent l'horloge de présentation partagée du processus.
+    """
+    kwargs.setdefault("clock", presentation_clock)
+    encoder = LiveLinkEncoder(py_face.uuid, py_face.name, fps=py_face.fps)
+    scheduler = FrameScheduler(sock, encoder, fps=py_face.fps, **kwargs)
+    scheduler.start()
+    return scheduler
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Bibliothèque de clips d'animation idle précalculés pour Gala v1
+Les pistes idle (respiration, clignements stochastiques, saccades,
+micro-expressions) sont générées une fois en tableaux float32
+contigus [N, 61] puis pré-encodées en paquets LiveLink : à l'exécution,
+une frame idle se réduit à un index, un timecode et un send
+"""
+
+import logging
+from typing import List, Optional
+
+import numpy as np
+
+from modules.livelink_encoder import LiveLinkEncoder, BLENDSHAPE_COUNT
+from modules.pylivelinkface import FaceBlendShape
+
+
+logger = logging.getLogger(__name__)
+
+BLINK_CHANNELS = [FaceBlendShape.EyeBlinkLeft, FaceBlendShape.EyeBlinkRight]
+GAZE_CHANNELS = [
+    FaceBlendShape.EyeLookDownLeft, FaceBlendShape.EyeLookInLeft,
+    FaceBlendShape.EyeLookOutLeft, FaceBlendShape.EyeLookUpLeft,
+    FaceBlendShape.EyeLookDownRight, FaceBlendShape.EyeLookInRight,
+    FaceBlendShape.EyeLookOutRight, FaceBlendShape.EyeLookUpRight,
+]
+# Canaux discrets (événements) : jamais moyennés lors d'un mélange
+EVENT_CHANNELS = BLINK_CHANNELS + GAZE_CHANNELS
+
+# Micro-expressions : canaux et amplitude maximale
+MICRO_EXPRESSIONS = [
+    ([FaceBlendShape.MouthSmileLeft, FaceBlendShape.MouthSmileRight], 0.08),
+    ([FaceBlendShape.BrowInnerUp], 0.04),
+    ([FaceBlendShape.EyeSquintLeft, FaceBlendShape.EyeSquintRight], 0.03),
+    ([FaceBlendShape.BrowOuterUpLeft, FaceBlendShape.BrowOuterUpRight], 0.03),
+]
+
+# Marge neutre en début et fin de clip (s) : les clips s'enchaînent sans raccord
+EDGE_SECONDS = 0.5
+
+
+class IdleClipGenerator:
+    """
+    Génère des clips idle [N, 61] float32 (indices LiveLink)
+
+    Chaque clip commence et finit sur une pose neutre (respiration en phase
+    nulle, regard centré, aucun clignement ni expression en cours) : les
+    clips peuvent être enchaînés dans n'importe quel ordre. Les valeurs sont
+    bornées à [0, 1] comme dans PyLiveLinkFace.set_blendshapes.
+    """
+
+    def __init__(self, fps: int = 60, seed: Optional[int] = None):
+        """
+        Args:
+            fps: Cadence des clips
+            seed: Graine du générateur aléatoire (clips reproductibles)
+        """
+        self.fps = fps
+        self.rng = np.random.default_rng(seed)
+
+    def generate(self, seconds: float = 20.0) -> np.ndarray:
+        """Génère un clip complet de `seconds` secondes"""
+        count = int(seconds * self.fps)
+        clip = np.zeros((count, BLENDSHAPE_COUNT), dtype=np.float32)
+        self._add_breathing(clip)
+        self._add_blinks(clip)
+        self._add_saccades(clip)
+        self._add_micro_expressions(clip)
+        np.clip(clip, 0.0, 1.0, out=clip)
+        return clip
+
+    def _edge_envelope(self, count: int) -> np.ndarray:
+        """Enveloppe 0 -> 1 -> 0 sur les marges du clip"""
+        edge = min(int(EDGE_SECONDS * self.fps), count // 2)
+        envelope = np.ones(count, dtype=np.float32)
+        ramp = 0.5 - 0.5 * np.cos(np.linspace(0, np.pi, edge, dtype=np.float32))
+        envelope[:edge] = ramp
+        envelope[count - edge:] = ramp[::-1]
+        return envelope
+
+    def _event_times(self, count: int, mean_interval: float, jitter: float) -> np.ndarray:
+        """Instants (en frames) d'événements espacés aléatoirement hors des marges"""
+        edge = int(EDGE_SECONDS * self.fps)
+        times = []
+        position = edge + self.rng.uniform(0, mean_interval) * self.fps
+        while position < count - 2 * edge:
+            times.append(int(position))
+            position += self.rng.lognormal(np.log(mean_interval), jitter) * self.fps
+        return np.array(times, dtype=np.int64)
+
+    def _add_breathing(self, clip: np.ndarray):
+        """Respiration : nombre entier de cycles de 3.5-5 s, légèrement irrégulière"""
+        count = len(clip)
+        cycles = max(1, round(count / self.fps / self.rng.uniform(3.5, 5.0)))
+        phase = np.linspace(0, 2 * np.pi * cycles, count, endpoint=False)
+        # Modulation lente de la vitesse sans changer le nombre de cycles
+        phase += 0.3 * np.sin(np.linspace(0, 2 * np.pi, count, endpoint=False))
+        breath = 0.5 - 0.5 * np.cos(phase)
+
+        clip[:, FaceBlendShape.JawOpen] += 0.02 * breath
+        clip[:, FaceBlendShape.NoseSneerLeft] += 0.01 * breath
+        clip[:, FaceBlendShape.NoseSneerRight] += 0.01 * breath
+
+    def _add_blinks(self, clip: np.ndarray):
+        """Clignements tous les ~4 s (intervalle log-normal), parfois doubles"""
+        count = len(clip)
+        for start in self._event_times(count, mean_interval=4.0, jitter=0.35):
+            starts = [start]
+            if self.rng.random() < 0.15:
+                starts.append(start + int(self.rng.uniform(0.25, 0.4) * self.fps))
+            for blink_start in starts:
+                curve = self._blink_curve(int(self.rng.uniform(0.1, 0.15) * self.fps))
+                end = min(count, blink_start + len(curve))
+                for channel in BLINK_CHANNELS:
+                    np.maximum(clip[blink_start:end, channel], curve[:end - blink_start],
+                               out=clip[blink_start:end, channel])
+
+    @staticmethod
+    def _blink_curve(length: int) -> np.ndarray:
+        """Fermeture rapide (30 %), réouverture plus lente"""
+        progress = np.linspace(0, 1, max(length, 3), dtype=np.float32)
+        return np.where(progress < 0.3, progress / 0.3, 1.0 - (progress - 0.3) / 0.7)
+
+    def _add_saccades(self, clip: np.ndarray):
+        """Fixations de 0.4-2.5 s reliées par des saccades de 3 frames"""
+        count = len(clip)
+        edge = int(EDGE_SECONDS * self.fps)
+        horizontal = np.zeros(count, dtype=np.float32)
+        vertical = np.zeros(count, dtype=np.float32)
+
+        position = edge
+        while position < count - 2 * edge:
+            duration = int(self.rng.uniform(0.4, 2.5) * self.fps)
+            end = min(position + duration, count - edge)
+            horizontal[position:end] = self.rng.normal(0, 0.04)
+            vertical[position:end] = self.rng.normal(0, 0.025)
+            position = end
+
+        # Saccade : transition lissée sur 3 frames
+        kernel = np.ones(3, dtype=np.float32) / 3
+        horizontal = np.convolve(horizontal, kernel, mode="same")
+        vertical = np.convolve(vertical, kernel, mode="same")
+
+        right, left = np.maximum(horizontal, 0), np.maximum(-horizontal, 0)
+        up, down = np.maximum(vertical, 0), np.maximum(-vertical, 0)
+        clip[:, FaceBlendShape.EyeLookOutLeft] += right
+        clip[:, FaceBlendShape.EyeLookInRight] += right
+        clip[:, FaceBlendShape.EyeLookInLeft] += left
+        clip[:, FaceBlendShape.EyeLookOutRight] += left
+        clip[:, FaceBlendShape.EyeLookUpLeft] += up
+        clip[:, FaceBlendShape.EyeLookUpRight] += up
+        clip[:, FaceBlendShape.EyeLookDownLeft] += down
+        clip[:, FaceBlendShape.EyeLookDownRight] += down
+
+    def _add_micro_expressions(self, clip: np.ndarray):
+        """Micro-expressions éparses (~1 toutes les 6 s) à enveloppe de Hann"""
+        count = len(clip)
+        for start in self._event_times(count, mean_interval=6.0, jitter=0.5):
+            channels, amplitude = MICRO_EXPRESSIONS[self.rng.integers(len(MICRO_EXPRESSIONS))]
+            length = int(self.rng.uniform(0.5, 1.5) * self.fps)
+            envelope = amplitude * self.rng.uniform(0.5, 1.0) * np.hanning(length).astype(np.float32)
+            end = min(count, start + length)
+            for channel in channels:
+                clip[start:end, channel] += envelope[:end - start]
+
+    def mix(self, first: np.ndarray, second: np.ndarray, weight: float = 0.5,
+            noise: float = 0.005) -> np.ndarray:
+        """
+        Variation : mélange deux clips et ajoute un bruit lissé
+
+        Les canaux continus (respiration, expressions) sont moyennés ;
+        clignements et regard viennent du premier clip pour ne pas dédoubler
+        les événements. Le bruit est nul aux marges (enchaînement neutre).
+
+        Args:
+            first: Clip de référence [N, 61]
+            second: Clip mélangé [M, 61]
+            weight: Poids du second clip sur les canaux continus
+            noise: Amplitude du bruit ajouté
+        """
+        count = min(len(first), len(second))
+        clip = first[:count].copy()
+        continuous = np.setdiff1d(np.arange(BLENDSHAPE_COUNT), np.array(EVENT_CHANNELS, dtype=np.int64))
+        clip[:, continuous] = (1 - weight) * first[:count, continuous] + weight * second[:count, continuous]
+
+        # Bruit basse fréquence (moyenne glissante de 0.5 s) sur les canaux animés
+        active = continuous[np.any(clip[:, continuous] > 0, axis=0)]
+        window = max(1, self.fps // 2)
+        kernel = np.ones(window, dtype=np.float32) / window
+        raw = self.rng.normal(0, noise * np.sqrt(window), size=(count, len(active))).astype(np.float32)
+        smooth = np.apply_along_axis(np.convolve, 0, raw, kernel, mode="same")
+        clip[:, active] += smooth * self._edge_envelope(count)[:, None]
+        np.clip(clip, 0.0, 1.0, out=clip)
+        return clip
+
+
+class IdleClipLibrary:
+    """
+    Clips idle concaténés et pré-encodés en paquets LiveLink
+
+    frames [total, 61] et packets [total, packet_size] sont contigus ; un
+    clip est une plage de lignes. Les paquets sont encodés une fois avec
+    encode_batch, seul leur timecode est réécrit à l'envoi.
+    """
+
+    def __init__(self, clips: List[np.ndarray], encoder: LiveLinkEncoder):
+        """
+        Args:
+            clips: Clips [N, 61] float32
+            encoder: Encodeur du sujet LiveLink (UUID, nom, fps)
+        """
+        if not clips:
+            raise ValueError("La bibliothèque idle doit contenir au moins un clip")
+
+        self.encoder = encoder
+        self.frames = np.ascontiguousarray(np.concatenate(clips), dtype=np.float32)
+        self.packets = encoder.encode_batch(self.frames, start_seconds=0.0)
+
+        lengths = np.array([len(clip) for clip in clips], dtype=np.int64)
+        self.starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        self.lengths = lengths
+
+    @property
+    def clip_count(self) -> int:
+        return len(self.lengths)
+
+    @property
+    def nbytes(self) -> int:
+        """Mémoire occupée par les frames et les paquets"""
+        return self.frames.nbytes + self.packets.nbytes
+
+
+class IdlePlayer:
+    """
+    Lecture d'une bibliothèque idle, frame par frame
+
+    À la fin d'un clip, le suivant est tiré au hasard (jamais le même deux
+    fois de suite) : la séquence ne boucle pas visiblement. Un lecteur
+    appartient à un seul thread d'émission.
+    """
+
+    def __init__(self, library: IdleClipLibrary, seed: Optional[int] = None):
+        self.library = library
+        self.rng = np.random.default_rng(seed)
+        self.clip = 0
+        self.position = 0
+        self.frames_played = 0
+        self.clips_played = 1
+
+    @property
+    def row(self) -> int:
+        """Ligne de la frame courante dans la bibliothèque"""
+        return int(self.library.starts[self.clip]) + self.position
+
+    def current_values(self) -> np.ndarray:
+        """61 valeurs de la frame courante (vue, sans copie)"""
+        return self.library.frames[self.row]
+
+    def advance(self):
+        """Passe à la frame suivante (et au clip suivant en fin de clip)"""
+        self.position += 1
+        self.frames_played += 1
+        if self.position >= self.library.lengths[self.clip]:
+            self.position = 0
+            self.clips_played += 1
+            if self.library.clip_count > 1:
+                offset = self.rng.integers(1, self.library.clip_count)
+                self.clip = int((self.clip + offset) % self.library.clip_count)
+
+    def next_values(self) -> np.ndarray:
+        """Retourne la frame courante puis avance"""
+        values = self.current_values()
+        self.advance()
+        return values
+
+    def next_packet(self, seconds: Optional[float] = None) -> memoryview:
+        """
+        Paquet pré-encodé de la frame courante (timecode réécrit) puis avance
+
+        Args:
+            seconds: Timecode LiveLink (secondes depuis minuit, maintenant si None)
+
+        Returns:
+            memoryview sur la ligne du paquet (à envoyer directement)
+        """
+        packet = self.library.packets[self.row]
+        self.library.encoder.patch_frame_time(packet, seconds)
+        self.advance()
+        return memoryview(packet)
+
+    def restart(self):
+        """Reprend au début du clip courant (pose neutre)"""
+        self.position = 0
+
+
+def create_idle_library(encoder: LiveLinkEncoder, clip_count: int = 4, clip_seconds: float = 20.0,
+                        variations: int = 4, seed: Optional[int] = None) -> IdleClipLibrary:
+    """
+    Génère les clips de base et leurs variations puis les pré-encode
+
+    Args:
+        encoder: Encodeur du sujet LiveLink
+        clip_count: Nombre de clips générés indépendamment
+        clip_seconds: Durée de chaque clip
+        variations: Nombre de variations (mélange de deux clips + bruit)
+        seed: Graine (bibliothèque reproductible)
+    """
+    generator = IdleClipGenerator(fps=encoder.fps, seed=seed)
+    clips = [generator.generate(clip_seconds) for _ in range(clip_count)]
+    for _ in range(variations if clip_count > 1 else 0):
+        first, second = generator.rng.choice(clip_count, size=2, replace=False)
+        clips.append(generator.mix(clips[first], clips[second], weight=generator.rng.uniform(0.3, 0.7)))
+
+    library = IdleClipLibrary(clips, encoder)
+    logger.info(f"Bibliothèque idle: {library.clip_count} clips, "
+                f"{len(library.frames) / encoder.fps:.0f} s, {library.nbytes / 1e6:.1f} Mo")
+    return library
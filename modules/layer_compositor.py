@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Compositeur de couches d'animation pour Gala v1
+Idle, parole et émotion sont des couches pondérées dont les poids suivent
+des courbes d'easing ; le FrameScheduler les mélange à chaque tick en un
+seul produit coefficients @ valeurs sur les 61 canaux. Les transitions ne
+bloquent plus les threads appelants (plus de time.sleep par frame)
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from modules.livelink_encoder import BLENDSHAPE_COUNT
+from modules.idle_clips import IdlePlayer, create_idle_library
+
+
+MODE_OVER = "over"  # Recouvre les couches précédentes à hauteur de son poids
+MODE_ADD = "add"  # S'ajoute au résultat (émotion, correctifs)
+
+IDLE_LAYER = "idle"
+SPEECH_LAYER = "speech"
+
+
+def _linear(t: float) -> float:
+    return t
+
+
+def _smoothstep(t: float) -> float:
+    return t * t * (3 - 2 * t)
+
+
+def _ease_in_out(t: float) -> float:
+    return 0.5 - 0.5 * np.cos(np.pi * t)
+
+
+EASINGS = {
+    "linear": _linear,
+    "smoothstep": _smoothstep,
+    "ease_in_out": _ease_in_out,
+}
+
+
+class Layer:
+    """Couche d'animation : valeurs [61] et poids animé"""
+
+    __slots__ = ("name", "mode", "values", "source", "packet_source",
+                 "weight", "start_weight", "target_weight", "fade_start", "fade_duration", "easing")
+
+    def __init__(self, name: str, mode: str = MODE_OVER, weight: float = 0.0,
+                 source: Optional[Callable[[], np.ndarray]] = None,
+                 packet_source: Optional[Callable[[Optional[float]], memoryview]] = None):
+        self.name = name
+        self.mode = mode
+        self.values = np.zeros(BLENDSHAPE_COUNT, dtype=np.float32)
+        self.source = source
+        self.packet_source = packet_source
+
+        self.weight = weight
+        self.start_weight = weight
+        self.target_weight = weight
+        self.fade_start = 0.0
+        self.fade_duration = 0.0
+        self.easing = _smoothstep
+
+    def weight_at(self, now: float) -> float:
+        """Poids de la couche à l'instant donné (met à jour l'état du fondu)"""
+        if self.weight != self.target_weight:
+            if self.fade_duration <= 0:
+                self.weight = self.target_weight
+            else:
+                progress = min(1.0, (now - self.fade_start) / self.fade_duration)
+                eased = self.easing(max(0.0, progress))
+                self.weight = self.start_weight + (self.target_weight - self.start_weight) * eased
+                if progress >= 1.0:
+                    self.weight = self.target_weight
+        return self.weight
+
+
+class LayerCompositor:
+    """
+    Mélange de couches à chaque tick du FrameScheduler
+
+    Les couches MODE_OVER sont empilées dans l'ordre d'ajout : une couche
+    de poids w garde (1 - w) de ce qui est en dessous. Les couches MODE_ADD
+    s'ajoutent ensuite. La couche 'speech' est alimentée par les frames du
+    scheduler et fond automatiquement quand la parole commence ou s'arrête.
+
+    Les fondus peuvent être demandés depuis n'importe quel thread ; compose()
+    n'est appelé que par le thread d'émission.
+    """
+
+    def __init__(self, speech_fade_in: float = 0.1, speech_fade_out: float = 0.3,
+                 speech_hold: float = 0.1, easing: str = "smoothstep"):
+        """
+        Args:
+            speech_fade_in: Durée du fondu d'entrée de la parole (s)
+            speech_fade_out: Durée du fondu de sortie de la parole (s)
+            speech_hold: Absence de frames de parole tolérée avant le fondu de sortie (s)
+            easing: Courbe par défaut des fondus
+        """
+        self.speech_fade_in = speech_fade_in
+        self.speech_fade_out = speech_fade_out
+        self.speech_hold = speech_hold
+        self.easing = easing
+
+        self._layers: Dict[str, Layer] = {}
+        self._order = []
+        self._lock = threading.Lock()
+        self._matrix = np.zeros((0, BLENDSHAPE_COUNT), dtype=np.float32)
+        self._coefficients = np.zeros(0, dtype=np.float32)
+        self._output = np.zeros(BLENDSHAPE_COUNT, dtype=np.float32)
+
+        self._speech_active = False
+        self._last_speech = 0.0
+
+        # Statistiques
+        self.ticks = 0
+        self.solo_ticks = 0
+        self.speech_fades = 0
+
+        self.add_layer(SPEECH_LAYER, MODE_OVER)
+
+    def add_layer(self, name: str, mode: str = MODE_OVER, weight: float = 0.0,
+                  source: Optional[Callable[[], np.ndarray]] = None,
+                  packet_source: Optional[Callable[[Optional[float]], memoryview]] = None,
+                  below: Optional[str] = None) -> Layer:
+        """
+        Ajoute une couche
+
+        Args:
+            name: Nom unique de la couche
+            mode: MODE_OVER ou MODE_ADD
+            weight: Poids initial
+            source: Appelé à chaque tick pour obtenir les valeurs [61] (sinon valeurs fixes)
+            packet_source: Paquet pré-encodé équivalent (utilisé quand la couche est seule)
+            below: Insère la couche sous une couche existante
+        """
+        if mode not in (MODE_OVER, MODE_ADD):
+            raise ValueError(f"Mode de couche inconnu: {mode}")
+
+        with self._lock:
+            if name in self._layers:
+                raise ValueError(f"Couche déjà présente: {name}")
+            layer = Layer(name, mode, weight, source, packet_source)
+            layer.easing = EASINGS[self.easing]
+            self._layers[name] = layer
+            index = self._order.index(below) if below in self._order else len(self._order)
+            self._order.insert(index, name)
+            self._matrix = np.zeros((len(self._order), BLENDSHAPE_COUNT), dtype=np.float32)
+            self._coefficients = np.zeros(len(self._order), dtype=np.float32)
+            self._over = np.array([self._layers[n].mode == MODE_OVER for n in self._order])
+            return layer
+
+    def add_idle(self, player, weight: float = 1.0) -> Layer:
+        """Ajoute un IdlePlayer comme couche de fond (sous la parole)"""
+        return self.add_layer(IDLE_LAYER, MODE_OVER, weight, source=player.next_values,
+                              packet_source=player.next_packet, below=SPEECH_LAYER)
+
+    def layer(self, name: str) -> Layer:
+        return self._layers[name]
+
+    def fade(self, name: str, target: float, duration: float,
+             easing: Optional[str] = None, now: Optional[float] = None):
+        """
+        Démarre un fondu du poids d'une couche (non bloquant)
+
+        Args:
+            name: Couche
+            target: Poids final
+            duration: Durée du fondu en secondes (0 = immédiat)
+            easing: 'linear', 'smoothstep' ou 'ease_in_out'
+            now: Instant de départ (time.monotonic() si None)
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            layer = self._layers[name]
+            layer.start_weight = layer.weight_at(now)
+            layer.target_weight = float(target)
+            layer.fade_start = now
+            layer.fade_duration = duration
+            layer.easing = EASINGS[easing or self.easing]
+
+    def set_values(self, name: str, values):
+        """Fixe les valeurs [61] d'une couche sans source (émotion, pose)"""
+        with self._lock:
+            self._layers[name].values[:] = values
+
+    def _update_speech(self, now: float, speech_frame: Optional[np.ndarray]):
+        """Fondu automatique de la couche parole"""
+        speech = self._layers[SPEECH_LAYER]
+        if speech_frame is not None:
+            speech.values[:] = speech_frame
+            self._last_speech = now
+            if not self._speech_active:
+                self._speech_active = True
+                self.speech_fades += 1
+                self._start_fade(speech, now, 1.0, self.speech_fade_in)
+        elif self._speech_active and now - self._last_speech > self.speech_hold:
+            # Fin de parole : la dernière frame est tenue pendant le fondu
+            self._speech_active = False
+            self._start_fade(speech, now, 0.0, self.speech_fade_out)
+
+    def _start_fade(self, layer: Layer, now: float, target: float, duration: float):
+        layer.start_weight = layer.weight_at(now)
+        layer.target_weight = target
+        layer.fade_start = now
+        layer.fade_duration = duration
+
+    def _update_coefficients(self, now: float):
+        """Coefficient effectif de chaque couche dans le mélange"""
+        coefficients = self._coefficients
+        coefficients[:] = 0.0
+        for index, name in enumerate(self._order):
+            layer = self._layers[name]
+            weight = layer.weight_at(now)
+            if layer.mode == MODE_OVER:
+                # Seules les couches 'over' inférieures sont recouvertes
+                below = coefficients[:index]
+                below[self._over[:index]] *= 1.0 - weight
+            coefficients[index] = weight
+
+    def compose(self, now: float, speech_frame: Optional[np.ndarray] = None,
+                seconds: Optional[float] = None) -> Tuple[Optional[np.ndarray], Optional[memoryview]]:
+        """
+        Mélange les couches pour un tick
+
+        Args:
+            now: Échéance du tick (time.monotonic)
+            speech_frame: Frame de parole à ce tick (None s'il n'y en a pas)
+            seconds: Timecode LiveLink du tick (pour un paquet pré-encodé)
+
+        Returns:
+            (valeurs [61], None), ou (None, paquet) quand une seule couche
+            pré-encodée est visible
+        """
+        with self._lock:
+            self.ticks += 1
+            self._update_speech(now, speech_frame)
+            self._update_coefficients(now)
+
+            visible = np.flatnonzero(self._coefficients)
+            if len(visible) == 1 and self._coefficients[visible[0]] == 1.0:
+                solo = self._layers[self._order[visible[0]]]
+                if solo.packet_source is not None:
+                    # Seule la couche pré-encodée est visible : paquet direct
+                    self.solo_ticks += 1
+                    for name in self._order:
+                        layer = self._layers[name]
+                        if layer is not solo and layer.source is not None:
+                            layer.source()  # Les couches cachées continuent d'avancer
+                    return None, solo.packet_source(seconds)
+
+            for index, name in enumerate(self._order):
+                layer = self._layers[name]
+                self._matrix[index] = layer.source() if layer.source is not None else layer.values
+
+            np.matmul(self._coefficients, self._matrix, out=self._output)
+            np.clip(self._output, 0.0, 1.0, out=self._output)
+            return self._output, None
+
+    @property
+    def speech_active(self) -> bool:
+        return self._speech_active
+
+    def stats(self) -> Dict:
+        """Poids courants et statistiques"""
+        with self._lock:
+            return {
+                "layers": {name: round(self._layers[name].weight, 3) for name in self._order},
+                "speech_active": self._speech_active,
+                "speech_fades": self.speech_fades,
+                "ticks": self.ticks,
+                "solo_ticks": self.solo_ticks
+            }
+
+
+def create_idle_compositor(encoder, seed: Optional[int] = None, **kwargs) -> LayerCompositor:
+    """
+    Crée un compositeur avec une couche idle précalculée sous la parole
+
+    Args:
+        encoder: Encodeur du sujet LiveLink (les paquets idle sont pré-encodés avec)
+        seed: Graine de la bibliothèque idle
+        **kwargs: Paramètres de LayerCompositor (fondus de la parole)
+    """
+    compositor = LayerCompositor(**kwargs)
+    compositor.add_idle(IdlePlayer(create_idle_library(encoder, seed=seed), seed=seed))
+    return compositor
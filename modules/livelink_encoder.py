@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Encodeur LiveLink précompilé pour Gala v1
+Construit l'en-tête constant une seule fois et ne patche que le timecode
+et le bloc de floats à chaque paquet
+"""
+
+import datetime
+import struct
+from typing import NamedTuple, Optional, Tuple
+
+import numpy as np
+
+
+LIVELINK_VERSION = 6
+BLENDSHAPE_COUNT = 61
+
+# Formats pré-compilés (évite de re-parser la chaîne de format à chaque frame)
+_VERSION_STRUCT = struct.Struct('<I')
+_NAME_LENGTH_STRUCT = struct.Struct('!i')
+_FRAME_TIME_STRUCT = struct.Struct('!II')
+_FRAME_RATE_STRUCT = struct.Struct('!II')
+_COUNT_STRUCT = struct.Struct('!B')
+
+# Valeurs big-endian float32 comme attendu par Unreal
+_WIRE_DTYPE = np.dtype('>f4')
+_SUB_FRAME_SCALE = 4294967296
+
+
+def frame_time_from_seconds(seconds: float, fps: int) -> Tuple[int, int]:
+    """
+    Convertit un nombre de secondes depuis minuit en (frames, sub_frame)
+
+    Args:
+        seconds: Secondes écoulées depuis minuit
+        fps: Frame rate LiveLink
+
+    Returns:
+        Tuple (frames, sub_frame) tel qu'encodé dans le paquet
+    """
+    position = seconds * fps
+    frames = int(position)
+    sub_frame = int((position - frames) * _SUB_FRAME_SCALE)
+    return frames & 0xFFFFFFFF, min(sub_frame, 0xFFFFFFFF)
+
+
+def current_seconds_of_day(now: Optional[datetime.datetime] = None) -> float:
+    """Retourne le nombre de secondes écoulées depuis minuit (heure locale)"""
+    now = now or datetime.datetime.now()
+    return (now.hour * 3600 + now.minute * 60 +
+            now.second + now.microsecond / 1000000.0)
+
+
+class LiveLinkEncoder:
+    """
+    Encodeur de paquets LiveLink à en-tête pré-calculé
+
+    Le paquet complet est alloué une fois dans un bytearray. Chaque appel à
+    encode() ne réécrit que le timecode (8 octets) et les 61 floats
+    (244 octets) via une vue numpy big-endian sur le même buffer.
+    """
+
+    def __init__(self, uuid: str, name: str, fps: int = 60, denominator: int = 1,
+                 version: int = LIVELINK_VERSION):
+        """
+        Initialise l'encodeur
+
+        Args:
+            uuid: UUID du sujet (avec le préfixe $ style NeuroSync_Player)
+            name: Nom du sujet LiveLink
+            fps: Frame rate annoncé
+            denominator: Dénominateur du frame rate
+            version: Version du protocole LiveLink
+        """
+        self.uuid = uuid
+        self.name = name
+        self.fps = fps
+        self.denominator = denominator
+        self.version = version
+
+        name_bytes = name.encode('utf-8')
+        header = (_VERSION_STRUCT.pack(version) +
+                  uuid.encode('utf-8') +
+                  _NAME_LENGTH_STRUCT.pack(len(name_bytes)) +
+                  name_bytes)
+
+        # Offsets des zones variables
+        self.frame_time_offset = len(header)
+        frame_rate_offset = self.frame_time_offset + _FRAME_TIME_STRUCT.size
+        count_offset = frame_rate_offset + _FRAME_RATE_STRUCT.size
+        self.values_offset = count_offset + _COUNT_STRUCT.size
+        self.packet_size = self.values_offset + BLENDSHAPE_COUNT * _WIRE_DTYPE.itemsize
+
+        # Paquet pré-alloué avec les parties constantes déjà écrites
+        self._packet = bytearray(self.packet_size)
+        self._packet[:len(header)] = header
+        _FRAME_RATE_STRUCT.pack_into(self._packet, frame_rate_offset, fps, denominator)
+        _COUNT_STRUCT.pack_into(self._packet, count_offset, BLENDSHAPE_COUNT)
+
+        self._view = memoryview(self._packet)
+        # Vue big-endian écrivable directement sur le bloc de floats
+        self._values = np.frombuffer(self._packet, dtype=_WIRE_DTYPE,
+                                     count=BLENDSHAPE_COUNT, offset=self.values_offset)
+
+        # Gabarit d'une ligne de paquet pour l'encodage par lot
+        self._template = np.frombuffer(bytes(self._packet), dtype=np.uint8)
+
+    @property
+    def packet_buffer(self) -> bytearray:
+        """Buffer du paquet (adresse stable, réécrit par chaque encode_into)"""
+        return self._packet
+
+    def frame_time(self, seconds: Optional[float] = None) -> Tuple[int, int]:
+        """
+        Calcule le timecode LiveLink
+
+        Args:
+            seconds: Secondes depuis minuit (maintenant si None)
+        """
+        if seconds is None:
+            seconds = current_seconds_of_day()
+        return frame_time_from_seconds(seconds, self.fps)
+
+    def encode_into(self, values, seconds: Optional[float] = None) -> memoryview:
+        """
+        Encode une frame dans le buffer interne, sans allocation
+
+        Args:
+            values: 61 valeurs float (liste ou np.ndarray)
+            seconds: Secondes depuis minuit pour le timecode (maintenant si None)
+
+        Returns:
+            memoryview sur le paquet interne, valide jusqu'au prochain encodage
+        """
+        frames, sub_frame = self.frame_time(seconds)
+        _FRAME_TIME_STRUCT.pack_into(self._packet, self.frame_time_offset, frames, sub_frame)
+        self._values[:] = values
+        return self._view
+
+    def encode(self, values, seconds: Optional[float] = None) -> bytes:
+        """Encode une frame et retourne une copie indépendante du paquet"""
+        return bytes(self.encode_into(values, seconds))
+
+    def encode_batch(self, frames: np.ndarray, start_seconds: Optional[float] = None) -> np.ndarray:
+        """
+        Encode N frames en une seule conversion vectorisée
+
+        Args:
+            frames: Tableau [N, 61] de valeurs float
+            start_seconds: Secondes depuis minuit de la première frame
+                           (maintenant si None). Les frames suivantes sont
+                           espacées de 1/fps.
+
+        Returns:
+            Tableau uint8 [N, packet_size] : une ligne contiguë par paquet,
+            directement utilisable avec socket.sendall(packets[i])
+        """
+        frames = np.asarray(frames)
+        if frames.ndim != 2 or frames.shape[1] != BLENDSHAPE_COUNT:
+            raise ValueError(f"Expected frames of shape [N, {BLENDSHAPE_COUNT}], got {frames.shape}")
+
+        count = frames.shape[0]
+        packets = np.empty((count, self.packet_size), dtype=np.uint8)
+        packets[:] = self._template
+
+        # Timecodes de toutes les frames
+        if start_seconds is None:
+            start_seconds = current_seconds_of_day()
+        position = start_seconds * self.fps + np.arange(count, dtype=np.float64)
+        frame_numbers = np.floor(position)
+        times = np.empty((count, 2), dtype='>u4')
+        times[:, 0] = frame_numbers.astype(np.uint64) & 0xFFFFFFFF
+        times[:, 1] = np.minimum((position - frame_numbers) * _SUB_FRAME_SCALE, 0xFFFFFFFF)
+        packets[:, self.frame_time_offset:self.frame_time_offset + 8] = times.view(np.uint8).reshape(count, 8)
+
+        # Conversion big-endian float32 de tout le bloc en une passe
+        wire_values = frames.astype(_WIRE_DTYPE)
+        packets[:, self.values_offset:] = wire_values.view(np.uint8).reshape(count, -1)
+
+        return packets
+
+    def patch_frame_time(self, packet, seconds: Optional[float] = None) -> None:
+        """
+        Réécrit le timecode d'un paquet déjà encodé (ex: paquet pré-encodé)
+
+        Args:
+            packet: Buffer écrivable (bytearray, ligne de encode_batch, ...)
+            seconds: Secondes depuis minuit (maintenant si None)
+        """
+        frames, sub_frame = self.frame_time(seconds)
+        _FRAME_TIME_STRUCT.pack_into(packet, self.frame_time_offset, frames, sub_frame)
+
+
+class LiveLinkPacket(NamedTuple):
+    """Paquet LiveLink décodé"""
+    version: int
+    uuid: str
+    name: str
+    frames: int
+    sub_frame: int
+    fps: int
+    denominator: int
+    values: np.ndarray
+
+    @property
+    def seconds(self) -> float:
+        """Timecode en secondes depuis minuit"""
+        return (self.frames + self.sub_frame / _SUB_FRAME_SCALE) / self.fps if self.fps else 0.0
+
+
+class LiveLinkDecoder:
+    """
+    Décodeur de paquets LiveLink pour les outils de réception
+
+    Tout ce qui précède le timecode est constant pour un sujet : l'en-tête
+    est analysé une fois puis mis en cache, un paquet ne coûte ensuite
+    qu'une recherche de dictionnaire et deux unpack.
+    """
+
+    def __init__(self):
+        self._headers = {}
+
+    def _parse_header(self, header: bytes) -> Tuple[int, str, str]:
+        """Version, UUID et nom d'un en-tête (UUID de longueur libre)"""
+        if len(header) < 8:
+            raise ValueError("En-tête LiveLink trop court")
+        version = _VERSION_STRUCT.unpack_from(header, 0)[0]
+        # L'UUID n'a pas de longueur : on cherche la longueur de nom cohérente
+        for name_offset in range(4, len(header) - 3):
+            name_length = _NAME_LENGTH_STRUCT.unpack_from(header, name_offset)[0]
+            if name_offset + 4 + name_length == len(header):
+                uuid = header[4:name_offset].decode('utf-8', errors='replace')
+                name = header[name_offset + 4:].decode('utf-8', errors='replace')
+                return version, uuid, name
+        raise ValueError("Longueur de nom LiveLink introuvable")
+
+    def decode(self, data, count: int = BLENDSHAPE_COUNT) -> LiveLinkPacket:
+        """
+        Décode un paquet (bytes, bytearray ou memoryview)
+
+        Args:
+            data: Paquet complet
+            count: Nombre de valeurs attendu (vérifié dans le paquet)
+
+        Returns:
+            LiveLinkPacket (values est une copie float32 native)
+        """
+        values_offset = len(data) - count * _WIRE_DTYPE.itemsize
+        frame_time_offset = values_offset - _COUNT_STRUCT.size - _FRAME_RATE_STRUCT.size - _FRAME_TIME_STRUCT.size
+        if frame_time_offset < 8 or data[values_offset - 1] != count:
+            raise ValueError(f"Paquet LiveLink invalide ({len(data)} octets)")
+
+        header = bytes(data[:frame_time_offset])
+        parsed = self._headers.get(header)
+        if parsed is None:
+            parsed = self._headers[header] = self._parse_header(header)
+
+        frames, sub_frame = _FRAME_TIME_STRUCT.unpack_from(data, frame_time_offset)
+        fps, denominator = _FRAME_RATE_STRUCT.unpack_from(data, frame_time_offset + _FRAME_TIME_STRUCT.size)
+        values = np.frombuffer(data, dtype=_WIRE_DTYPE, count=count, offset=values_offset).astype(np.float32)
+        return LiveLinkPacket(parsed[0], parsed[1], parsed[2], frames, sub_frame, fps, denominator, values)
+
+
+def decode_packet(data) -> LiveLinkPacket:
+    """Décode un paquet LiveLink isolé (voir LiveLinkDecoder pour un flux)"""
+    return LiveLinkDecoder().decode(data)
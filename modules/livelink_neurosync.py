@@ -8,6 +8,11 @@ import socket
 import time
 from typing import List, Optional
 from modules.pylivelinkface import PyLiveLinkFace, FaceBlendShape
+from modules.blendshape_remap import (
+    BlendshapeRemapper,
+    NEUROSYNC_INVERTED_SOURCES,
+    neurosync_mapping,
+)
 
 
 class LiveLinkNeuroSync:
@@ -35,6 +40,9 @@ class LiveLinkNeuroSync:
         
         # Mapping des indices ARKit standard (68) vers les indices LiveLink (61)
         self.arkit_to_livelink_mapping = self._create_mapping()
+        self.remapper = BlendshapeRemapper(self.arkit_to_livelink_mapping,
+                                           inverted_sources=NEUROSYNC_INVERTED_SOURCES,
+                                           threshold=0.0)
     
     def _create_socket(self):
         """Crée et connecte le socket UDP"""
@@ -46,33 +54,7 @@ class LiveLinkNeuroSync:
         Crée un mapping entre les 68 blendshapes ARKit et les 61 LiveLink
         Certains blendshapes ARKit sont dupliqués ou n'existent pas dans LiveLink
         """
-        mapping = {}
-        
-        # Les 52 premiers sont directs
-        for i in range(52):
-            mapping[i] = i
-        
-        # Les suivants (52-67) sont soit dupliqués soit mappés différemment
-        # HeadYaw, HeadPitch, HeadRoll (52-54) - pas dans LiveLink standard
-        # EyeBlinkLeft/Right dupliqués (54-55) -> map vers 0,7
-        mapping[54] = 0  # EyeBlinkLeft duplicate
-        mapping[55] = 7  # EyeBlinkRight duplicate
-        
-        # EyeOpenLeft/Right (56-57) - inverses de EyeBlink
-        mapping[56] = 0  # EyeOpenLeft -> inverse de EyeBlinkLeft
-        mapping[57] = 7  # EyeOpenRight -> inverse de EyeBlinkRight
-        
-        # Brow duplicates (58-61)
-        mapping[58] = 41  # BrowLeftDown
-        mapping[59] = 44  # BrowLeftUp -> BrowOuterUpLeft
-        mapping[60] = 42  # BrowRightDown
-        mapping[61] = 45  # BrowRightUp -> BrowOuterUpRight
-        
-        # Emotions (62-67) - pas dans LiveLink standard
-        for i in range(62, 68):
-            mapping[i] = None
-        
-        return mapping
+        return neurosync_mapping()
     
     def send_blendshapes(self, blendshapes: List[float]):
         """
@@ -84,21 +66,29 @@ class LiveLinkNeuroSync:
         if len(blendshapes) != 68:
             raise ValueError(f"Expected 68 blendshapes, got {len(blendshapes)}")
         
-        # Convertir de ARKit (68) vers LiveLink (61)
-        livelink_values = [0.0] * 61
-        
-        for arkit_idx, value in enumerate(blendshapes):
-            if arkit_idx in self.arkit_to_livelink_mapping:
-                livelink_idx = self.arkit_to_livelink_mapping[arkit_idx]
-                if livelink_idx is not None:
-                    livelink_values[livelink_idx] = value
+        # Convertir de ARKit (68) vers LiveLink (61) en une passe vectorisée
+        livelink_values = self.remapper.remap_frame(blendshapes)
         
         # Définir les valeurs dans PyLiveLinkFace
         self.py_face.set_blendshapes(livelink_values)
         
-        # Encoder et envoyer
-        data = self.py_face.encode()
-        self.socket.sendall(data)
+        # Encoder (sans allocation) et envoyer
+        self.socket.sendall(self.py_face.encode_view())
+    
+    def send_block(self, blendshapes_block) -> int:
+        """
+        Remappe un bloc [frames, 68] en une fois et envoie chaque frame
+        
+        Args:
+            blendshapes_block: Tableau [frames, 68] (sortie de generate_facial_data_from_bytes)
+        
+        Returns:
+            Nombre de frames envoyées
+        """
+        frames = self.remapper.remap(blendshapes_block)
+        for frame in frames:
+            self.socket.sendall(self.py_face.encode_values_view(frame))
+        return len(frames)
     
     def send_blendshapes_direct(self, livelink_values: List[float]):
         """
@@ -111,8 +101,7 @@ class LiveLinkNeuroSync:
             raise ValueError(f"Expected 61 LiveLink values, got {len(livelink_values)}")
         
         self.py_face.set_blendshapes(livelink_values)
-        data = self.py_face.encode()
-        self.socket.sendall(data)
+        self.socket.sendall(self.py_face.encode_view())
     
     def set_blendshape(self, index: FaceBlendShape, value: float):
         """
@@ -130,8 +119,7 @@ class LiveLinkNeuroSync:
     
     def send_current(self):
         """Envoie les valeurs actuelles"""
-        data = self.py_face.encode()
-        self.socket.sendall(data)
+        self.socket.sendall(self.py_face.encode_view())
     
     def reset(self):
         """Réinitialise tous les blendshapes à 0"""
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Transport LiveLink multi-sujets / multi-destinations pour Gala v1
+Chaque frame est encodée une fois par sujet puis envoyée à tous les nœuds
+de rendu en un seul appel sendmmsg (Linux, via ctypes) ; boucle sendto en
+repli. Options de socket (SO_SNDBUF, IP_TOS) par destination et UUID / nom
+par sujet issus de config.LiveLinkConfig
+"""
+
+import ctypes
+import logging
+import socket
+import threading
+import uuid
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from modules.livelink_encoder import LiveLinkEncoder
+from modules.metrics import metrics, STAGE_ENCODE, STAGE_UDP_SEND
+from config import LiveLinkDestination, LiveLinkSubject
+
+
+logger = logging.getLogger(__name__)
+
+
+class _IOVec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [
+        ("msg_name", ctypes.c_void_p),
+        ("msg_namelen", ctypes.c_uint32),
+        ("msg_iov", ctypes.POINTER(_IOVec)),
+        ("msg_iovlen", ctypes.c_size_t),
+        ("msg_control", ctypes.c_void_p),
+        ("msg_controllen", ctypes.c_size_t),
+        ("msg_flags", ctypes.c_int),
+    ]
+
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", _MsgHdr), ("msg_len", ctypes.c_uint)]
+
+
+class _SockAddrIn(ctypes.Structure):
+    _fields_ = [
+        ("sin_family", ctypes.c_ushort),
+        ("sin_port", ctypes.c_uint16),
+        ("sin_addr", ctypes.c_uint8 * 4),
+        ("sin_zero", ctypes.c_uint8 * 8),
+    ]
+
+
+def _load_sendmmsg():
+    """sendmmsg de la libc, ou None (plateforme non Linux)"""
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        sendmmsg = libc.sendmmsg
+    except (OSError, AttributeError):
+        return None
+    sendmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(_MMsgHdr), ctypes.c_uint, ctypes.c_int]
+    sendmmsg.restype = ctypes.c_int
+    return sendmmsg
+
+
+_sendmmsg = _load_sendmmsg()
+
+
+def _buffer_address(data) -> Tuple[int, int, object]:
+    """Adresse et taille d'un buffer (+ objet à garder vivant pendant l'envoi)"""
+    view = memoryview(data).cast("B")
+    if view.readonly:
+        holder = (ctypes.c_char * len(view)).from_buffer_copy(view)
+    else:
+        holder = (ctypes.c_char * len(view)).from_buffer(view)
+    return ctypes.addressof(holder), len(view), holder
+
+
+class _DestinationGroup:
+    """Destinations partageant les mêmes options de socket (un socket, un sendmmsg)"""
+
+    def __init__(self, destinations: list, sndbuf: int, tos: int):
+        self.destinations = destinations
+        self.addresses = [(socket.gethostbyname(d.host), d.port) for d in destinations]
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if sndbuf:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, sndbuf)
+        if tos:
+            self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_TOS, tos)
+
+        # sockaddr_in pré-construites pour sendmmsg
+        self.sockaddrs = (_SockAddrIn * len(self.addresses))()
+        for sockaddr, (host, port) in zip(self.sockaddrs, self.addresses):
+            sockaddr.sin_family = socket.AF_INET
+            sockaddr.sin_port = socket.htons(port)
+            sockaddr.sin_addr[:] = socket.inet_aton(host)
+
+    def prepare(self, buffers: Sequence[Tuple[int, int]]) -> Tuple[ctypes.Array, ctypes.Array]:
+        """Tableau mmsghdr : chaque buffer vers chaque destination"""
+        count = len(buffers) * len(self.addresses)
+        iovecs = (_IOVec * count)()
+        messages = (_MMsgHdr * count)()
+        index = 0
+        for address, length in buffers:
+            for destination in range(len(self.addresses)):
+                iovecs[index].iov_base = address
+                iovecs[index].iov_len = length
+                header = messages[index].msg_hdr
+                header.msg_name = ctypes.addressof(self.sockaddrs[destination])
+                header.msg_namelen = ctypes.sizeof(_SockAddrIn)
+                header.msg_iov = ctypes.pointer(iovecs[index])
+                header.msg_iovlen = 1
+                index += 1
+        return messages, iovecs
+
+
+class LiveLinkTransport:
+    """
+    Fan-out LiveLink : N sujets x M destinations
+
+    Les destinations sont regroupées par options de socket ; chaque groupe
+    a un socket non connecté et ses sockaddr pré-construites. send_frames()
+    encode une frame par sujet dans le buffer de son encodeur puis émet les
+    N x M paquets avec un sendmmsg par groupe (tableau de messages construit
+    une fois, les buffers des encodeurs ne bougent pas).
+    """
+
+    def __init__(self, destinations: List[LiveLinkDestination], subjects: List[LiveLinkSubject],
+                 fps: int = 60, use_sendmmsg: bool = True):
+        """
+        Args:
+            destinations: LiveLinkDestination (host, port, sndbuf, tos)
+            subjects: LiveLinkSubject (name, uuid)
+            fps: Frame rate annoncé dans les paquets
+            use_sendmmsg: False pour forcer la boucle sendto
+        """
+        if not destinations or not subjects:
+            raise ValueError("Au moins une destination et un sujet sont nécessaires")
+
+        self.fps = fps
+        self.use_sendmmsg = use_sendmmsg and _sendmmsg is not None
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self.encoders: Dict[str, LiveLinkEncoder] = {}
+        for subject in subjects:
+            subject_uuid = subject.uuid or str(uuid.uuid1())
+            subject_uuid = subject_uuid if subject_uuid.startswith("$") else f"${subject_uuid}"
+            self.encoders[subject.name] = LiveLinkEncoder(subject_uuid, subject.name, fps=fps)
+
+        grouped: Dict[Tuple[int, int], list] = {}
+        for destination in destinations:
+            grouped.setdefault((destination.sndbuf, destination.tos), []).append(destination)
+        self.groups = [_DestinationGroup(dests, sndbuf, tos) for (sndbuf, tos), dests in grouped.items()]
+
+        # Messages sendmmsg pré-construits sur les buffers des encodeurs
+        self._frame_buffers = [_buffer_address(encoder.packet_buffer) for encoder in self.encoders.values()]
+        self._frame_messages = [
+            group.prepare([(address, length) for address, length, _ in self._frame_buffers])
+            for group in self.groups
+        ]
+        # Un message par destination, buffer renseigné quand send_packet() change de paquet
+        self._packet_messages = [group.prepare([(0, 0)]) for group in self.groups]
+        self._packet_source = None
+        self._packet_address: Tuple[int, int, object] = (0, 0, None)
+
+        # Statistiques
+        self.packets_sent = 0
+        self.syscalls = 0
+        self.send_errors = 0
+
+    @property
+    def subjects(self) -> List[str]:
+        return list(self.encoders)
+
+    @property
+    def multi_subject(self) -> bool:
+        return len(self.encoders) > 1
+
+    @property
+    def destination_count(self) -> int:
+        return sum(len(group.addresses) for group in self.groups)
+
+    def _send_group(self, group: _DestinationGroup, messages: Optional[ctypes.Array],
+                    buffers: Sequence[Tuple[int, int]]):
+        """Envoie chaque buffer à chaque destination du groupe"""
+        if self.use_sendmmsg:
+            # Un appel système pour tout le tableau (reprise après un échec partiel)
+            fd = group.sock.fileno()
+            count = len(messages)
+            sent = 0
+            while sent < count:
+                pointer = ctypes.cast(ctypes.byref(messages, sent * ctypes.sizeof(_MMsgHdr)),
+                                      ctypes.POINTER(_MMsgHdr))
+                result = _sendmmsg(fd, pointer, count - sent, 0)
+                self.syscalls += 1
+                if result < 0:
+                    # Le premier message restant a échoué : on le saute
+                    self.send_errors += 1
+                    logger.debug(f"sendmmsg: errno {ctypes.get_errno()}")
+                    sent += 1
+                    continue
+                self.packets_sent += result
+                sent += result
+            return
+
+        for address, length in buffers:
+            packet = ctypes.string_at(address, length)
+            for destination in group.addresses:
+                self.syscalls += 1
+                try:
+                    group.sock.sendto(packet, destination)
+                    self.packets_sent += 1
+                except OSError as e:
+                    self.send_errors += 1
+                    logger.debug(f"sendto: {e}")
+
+    def send_frames(self, frames: Union[Dict[str, Sequence[float]], Sequence[Sequence[float]]],
+                    seconds: Optional[float] = None) -> int:
+        """
+        Encode une frame par sujet et l'envoie à toutes les destinations
+
+        Args:
+            frames: {sujet: 61 valeurs} ou liste alignée sur self.subjects
+            seconds: Timecode LiveLink commun (maintenant si None)
+
+        Returns:
+            Nombre de paquets émis
+        """
+        if not isinstance(frames, dict):
+            frames = dict(zip(self.encoders, frames))
+        if set(frames) != set(self.encoders):
+            raise ValueError(f"Une frame par sujet attendue: {self.subjects}")
+
+        with self._lock:
+            if self._closed:
+                return 0
+            before = self.packets_sent
+            with metrics.span(STAGE_ENCODE):
+                for name, encoder in self.encoders.items():
+                    encoder.encode_into(frames[name], seconds)
+            buffers = [(address, length) for address, length, _ in self._frame_buffers]
+            with metrics.span(STAGE_UDP_SEND):
+                for group, (messages, _) in zip(self.groups, self._frame_messages):
+                    self._send_group(group, messages, buffers)
+            return self.packets_sent - before
+
+    def send_frame(self, values: Sequence[float], seconds: Optional[float] = None) -> int:
+        """Même frame pour tous les sujets (un paquet encodé par sujet)"""
+        return self.send_frames({name: values for name in self.encoders}, seconds)
+
+    def send_packet(self, packet) -> int:
+        """
+        Envoie un paquet déjà encodé (un sujet) à toutes les destinations
+
+        Un buffer écrivable d'adresse stable (packet_buffer d'un encodeur) est
+        envoyé sans copie et les messages ne sont réécrits que lorsque le
+        paquet change ; un `bytes` est copié une fois par objet.
+
+        Returns:
+            Nombre de paquets émis
+        """
+        with self._lock:
+            if self._closed:
+                return 0
+            before = self.packets_sent
+            if packet is not self._packet_source:
+                self._packet_address = _buffer_address(packet)
+                self._packet_source = packet
+                address, length, _ = self._packet_address
+                for _, iovecs in self._packet_messages:
+                    for iovec in iovecs:
+                        iovec.iov_base = address
+                        iovec.iov_len = length
+            address, length, _ = self._packet_address
+            for group, (messages, _) in zip(self.groups, self._packet_messages):
+                self._send_group(group, messages, [(address, length)])
+            return self.packets_sent - before
+
+    def fanout(self) -> "FanoutSocket":
+        """Objet socket (sendall/close) pour FrameScheduler et les serveurs"""
+        return FanoutSocket(self)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            for group in self.groups:
+                group.sock.close()
+
+    def stats(self) -> Dict:
+        """Statistiques du transport"""
+        return {
+            "subjects": self.subjects,
+            "destinations": [f"{host}:{port}" for group in self.groups for host, port in group.addresses],
+            "sendmmsg": self.use_sendmmsg,
+            "packets_sent": self.packets_sent,
+            "syscalls": self.syscalls,
+            "send_errors": self.send_errors
+        }
+
+
+class FanoutSocket:
+    """Adaptateur sendall() vers toutes les destinations d'un transport"""
+
+    def __init__(self, transport: LiveLinkTransport):
+        self.transport = transport
+
+    @property
+    def multi_subject(self) -> bool:
+        return self.transport.multi_subject
+
+    def sendall(self, data):
+        self.transport.send_packet(data)
+
+    def send_frame(self, values, seconds: Optional[float] = None):
+        """Encode la frame pour chaque sujet configuré et l'envoie"""
+        self.transport.send_frame(values, seconds)
+
+    def close(self):
+        self.transport.close()
+
+
+def create_livelink_transport(livelink_config, default_host: Optional[str] = None,
+                              default_port: Optional[int] = None, **kwargs) -> LiveLinkTransport:
+    """
+    Crée le transport depuis config.LiveLinkConfig
+
+    Sans destinations configurées, une seule destination default_host:default_port
+    (constantes du serveur) ou host:port de la config ; sans sujets, subject_name.
+    """
+    destinations = livelink_config.destinations or [LiveLinkDestination(
+        default_host or livelink_config.host,
+        default_port or livelink_config.port
+    )]
+    subjects = livelink_config.subjects or [LiveLinkSubject(livelink_config.subject_name)]
+    transport = LiveLinkTransport(destinations, subjects, fps=livelink_config.fps, **kwargs)
+    logger.info(f"Transport LiveLink: {len(subjects)} sujet(s) x {transport.destination_count} "
+                f"destination(s), sendmmsg={'oui' if transport.use_sendmmsg else 'non'}")
+    return transport
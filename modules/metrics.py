@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Instrumentation des étapes du pipeline Gala v1
+Chronomètres monotones (perf_counter_ns) autour de chaque étape (lecture
+du corps, décodage PCM/WAV, resampling, features, forward du modèle, remap,
+encodage, envoi UDP) et échantillons de niveaux (remplissage des buffers,
+profondeur des files), agrégés dans des histogrammes de type HDR et exposés
+au format texte Prometheus par la route /metrics des serveurs.
+Désactivé, un span coûte un appel de méthode et un test (< 1 µs)
+"""
+
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, Optional
+
+
+# Étapes chronométrées (noms partagés par les modules et les serveurs)
+STAGE_BODY_READ = "body_read"
+STAGE_DECODE = "decode"
+STAGE_RESAMPLE = "resample"
+STAGE_FEATURES = "feature_extraction"
+STAGE_MODEL_FORWARD = "model_forward"
+STAGE_INFERENCE = "inference"
+STAGE_REMAP = "remap"
+STAGE_ENCODE = "encode"
+STAGE_UDP_SEND = "udp_send"
+STAGE_REQUEST = "request"
+
+# Quantiles publiés
+QUANTILES = (0.5, 0.9, 0.95, 0.99, 0.999)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class HdrHistogram:
+    """
+    Histogramme à précision relative constante (façon HdrHistogram)
+
+    Les valeurs entières sont rangées dans des groupes de 2^sub_bits
+    sous-buckets par puissance de deux : l'erreur relative de chaque valeur
+    est inférieure à 2^-sub_bits, quelle que soit sa magnitude (de la
+    nanoseconde à l'heure), pour une mémoire fixe.
+    """
+
+    def __init__(self, sub_bits: int = 7, max_value: int = 1 << 42):
+        """
+        Args:
+            sub_bits: Bits de précision (7 -> erreur relative < 0.8 %)
+            max_value: Plus grande valeur distinguée (les suivantes y sont ramenées)
+        """
+        self.sub_bits = sub_bits
+        self.sub_count = 1 << sub_bits
+        self.max_value = max_value
+        self.counts = [0] * (self._index(max_value) + 1)
+
+        self.total = 0
+        self.sum = 0
+        self.min = None
+        self.max = 0
+        self._lock = threading.Lock()
+
+    def _index(self, value: int) -> int:
+        shift = max(0, value.bit_length() - self.sub_bits - 1)
+        return shift * self.sub_count + (value >> shift)
+
+    def _highest_equivalent(self, index: int) -> int:
+        """Plus grande valeur rangée dans le bucket `index`"""
+        if index < 2 * self.sub_count:
+            return index
+        shift = index // self.sub_count - 1
+        return ((index - shift * self.sub_count + 1) << shift) - 1
+
+    def record(self, value: int, count: int = 1):
+        """Enregistre une valeur entière positive"""
+        value = min(max(int(value), 0), self.max_value)
+        index = self._index(value)
+        with self._lock:
+            self.counts[index] += count
+            self.total += count
+            self.sum += value * count
+            if self.min is None or value < self.min:
+                self.min = value
+            if value > self.max:
+                self.max = value
+
+    def percentile(self, q: float) -> int:
+        """Valeur sous laquelle se trouve la fraction q des enregistrements"""
+        with self._lock:
+            if self.total == 0:
+                return 0
+            target = max(1, int(q * self.total + 0.5))
+            seen = 0
+            for index, count in enumerate(self.counts):
+                seen += count
+                if seen >= target:
+                    return min(self._highest_equivalent(index), self.max)
+            return self.max
+
+    def percentiles(self, quantiles: Iterable[float]) -> Dict[float, int]:
+        return {q: self.percentile(q) for q in quantiles}
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.total if self.total else 0.0
+
+    def reset(self):
+        with self._lock:
+            self.counts = [0] * len(self.counts)
+            self.total = 0
+            self.sum = 0
+            self.min = None
+            self.max = 0
+
+
+class _Span:
+    """Chronomètre d'une étape (context manager)"""
+
+    __slots__ = ("_metrics", "_stage", "_start")
+
+    def __init__(self, metrics: 'Metrics', stage: str):
+        self._metrics = metrics
+        self._stage = stage
+
+    def __enter__(self):
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self._metrics.record(self._stage, time.perf_counter_ns() - self._start)
+        return False
+
+
+class _NullSpan:
+    """Span partagé quand l'instrumentation est désactivée"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Metrics:
+    """
+    Registre des durées d'étapes, niveaux et compteurs du processus
+
+    Usage :
+        with metrics.span(STAGE_RESAMPLE):
+            audio = resampler(audio)
+        metrics.sample("pcm_buffer_bytes", buffer.available)
+        metrics.count("livelink_send_errors")
+
+    Les histogrammes sont cumulatifs depuis le démarrage (ou le dernier
+    reset()), comme les summaries Prometheus d'un processus.
+    """
+
+    def __init__(self, enabled: bool = True, sub_bits: int = 7):
+        self.enabled = enabled
+        self.sub_bits = sub_bits
+        self._stages: Dict[str, HdrHistogram] = {}
+        self._levels: Dict[str, HdrHistogram] = {}
+        self._last: Dict[str, float] = {}
+        self._counters: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def _histogram(self, table: Dict[str, HdrHistogram], name: str) -> HdrHistogram:
+        histogram = table.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = table.setdefault(name, HdrHistogram(self.sub_bits))
+        return histogram
+
+    # ------------------------------------------------------------------
+    # Enregistrement
+    # ------------------------------------------------------------------
+
+    def span(self, stage: str):
+        """Context manager chronométrant une étape"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, stage)
+
+    def start(self) -> int:
+        """Début d'une mesure manuelle (0 si désactivé), à passer à stop()"""
+        return time.perf_counter_ns() if self.enabled else 0
+
+    def stop(self, stage: str, start: int):
+        """Termine une mesure ouverte par start()"""
+        if start:
+            self.record(stage, time.perf_counter_ns() - start)
+
+    def record(self, stage: str, nanoseconds: int):
+        """Enregistre une durée en nanosecondes"""
+        if self.enabled:
+            self._histogram(self._stages, stage).record(nanoseconds)
+
+    def observe(self, stage: str, seconds: float):
+        """Enregistre une durée mesurée ailleurs, en secondes"""
+        if self.enabled:
+            self._histogram(self._stages, stage).record(int(seconds * 1e9))
+
+    def sample(self, name: str, value: float):
+        """Échantillon d'un niveau (octets en buffer, frames en file...)"""
+        if self.enabled:
+            self._histogram(self._levels, name).record(int(value))
+            self._last[name] = value
+
+    def count(self, name: str, n: int = 1):
+        """Incrémente un compteur d'événements"""
+        if self.enabled:
+            with self._lock:
+                self._counters[name] += n
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._levels.clear()
+            self._last.clear()
+            self._counters.clear()
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    def stats(self) -> Dict:
+        """Résumé JSON : durées en ms, niveaux en unités brutes"""
+        with self._lock:
+            stages, levels = dict(self._stages), dict(self._levels)
+            counters, last = dict(self._counters), dict(self._last)
+
+        def summarize(histogram: HdrHistogram, scale: float) -> Dict:
+            summary = {"count": histogram.total, "mean": histogram.mean * scale,
+                       "max": histogram.max * scale}
+            summary.update({f"p{q * 100:g}": value * scale
+                            for q, value in histogram.percentiles(QUANTILES).items()})
+            return summary
+
+        return {
+            "enabled": self.enabled,
+            "stages_ms": {name: summarize(histogram, 1e-6) for name, histogram in sorted(stages.items())},
+            "levels": {name: dict(summarize(histogram, 1.0), last=last.get(name))
+                       for name, histogram in sorted(levels.items())},
+            "counters": dict(sorted(counters.items()))
+        }
+
+    def render(self, prefix: str = "gala") -> str:
+        """Exposition au format texte Prometheus (version 0.0.4)"""
+        with self._lock:
+            stages, levels = dict(self._stages), dict(self._levels)
+            counters, last = dict(self._counters), dict(self._last)
+
+        lines = []
+        name = f"{prefix}_stage_duration_seconds"
+        lines += [f"# HELP {name} Durée des étapes du pipeline (cumulée depuis le démarrage)",
+                  f"# TYPE {name} summary"]
+        for stage, histogram in sorted(stages.items()):
+            for q, value in histogram.percentiles(QUANTILES).items():
+                lines.append(f'{name}{{stage="{stage}",quantile="{q:g}"}} {value / 1e9:.9f}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.sum / 1e9:.9f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {histogram.total}')
+        lines += [f"# HELP {name}_max Durée maximale observée par étape",
+                  f"# TYPE {name}_max gauge"]
+        for stage, histogram in sorted(stages.items()):
+            lines.append(f'{name}_max{{stage="{stage}"}} {histogram.max / 1e9:.9f}')
+
+        name = f"{prefix}_level"
+        lines += [f"# HELP {name} Niveaux échantillonnés (buffers, files d'attente)",
+                  f"# TYPE {name} summary"]
+        for level, histogram in sorted(levels.items()):
+            for q, value in histogram.percentiles(QUANTILES).items():
+                lines.append(f'{name}{{name="{level}",quantile="{q:g}"}} {value}')
+            lines.append(f'{name}_sum{{name="{level}"}} {histogram.sum}')
+            lines.append(f'{name}_count{{name="{level}"}} {histogram.total}')
+        lines += [f"# HELP {name}_last Dernière valeur échantillonnée",
+                  f"# TYPE {name}_last gauge"]
+        for level in sorted(levels):
+            lines.append(f'{name}_last{{name="{level}"}} {last.get(level, 0)}')
+
+        name = f"{prefix}_events_total"
+        lines += [f"# HELP {name} Compteurs d'événements", f"# TYPE {name} counter"]
+        for counter, value in sorted(counters.items()):
+            lines.append(f'{name}{{name="{counter}"}} {value}')
+
+        return "\n".join(lines) + "\n"
+
+
+# Registre partagé par le processus
+metrics = Metrics()
@@ -4,15 +4,20 @@ Module simplifié pour l'intégration NeuroSync
 import torch
 import torch.nn as nn
 import numpy as np
-import torchaudio
 from typing import Dict, Optional
 
+from modules.resampler_bank import resampler_bank
+from modules.precision import PrecisionPolicy
+from modules.startup import DEFAULT_WARMUP_CHUNKS, run_warmup
+
+
 class NeuroSyncSimple:
     """
     Wrapper simplifié pour le modèle NeuroSync
     """
     
-    def __init__(self, model_path: str = "models/neurosync/model/model.pth", device: str = None):
+    def __init__(self, model_path: str = "models/neurosync/model/model.pth", device: str = None,
+                 precision: str = "auto"):
         self.device = torch.device(device or ("cuda" if torch.cuda.is_available() else "cpu"))
         self.model_path = model_path
         self.sample_rate = 88200
@@ -21,14 +26,26 @@ class NeuroSyncSimple:
         # Charger le modèle
         self._load_model()
         
-        print(f"Modèle NeuroSync chargé sur {self.device}")
+        # Précision d'inférence (fp32 / fp16 / bf16 / int8) vérifiée contre fp32
+        self.precision_policy = PrecisionPolicy(precision, str(self.device))
+        parity_input = torch.randn(1, self.sample_rate // 2, generator=torch.Generator().manual_seed(0))
+        self.runner = self.precision_policy.apply(
+            self.model,
+            run=lambda model: model(parity_input.to(self.device)).cpu().numpy()
+        )
+        
+        print(f"Modèle NeuroSync chargé sur {self.device} ({self.precision_policy.precision})")
         
     def _load_model(self):
         """Charge ou crée un modèle"""
         try:
             if self.model_path and torch.cuda.is_available():
                 # Essayer de charger le modèle existant
-                checkpoint = torch.load(self.model_path, map_location=self.device)
+                # Poids mappés (lus à la demande) ; format historique en lecture classique
+                try:
+                    checkpoint = torch.load(self.model_path, map_location=self.device, mmap=True)
+                except RuntimeError:
+                    checkpoint = torch.load(self.model_path, map_location=self.device)
                 
                 # Pour le moment, utiliser un modèle simple
                 self.model = self._create_simple_model()
@@ -89,20 +106,19 @@ class NeuroSyncSimple:
         Returns:
             blendshapes: Tensor [B, 68] entre 0 et 1
         """
-        with torch.no_grad():
-            audio_tensor = audio_tensor.to(self.device)
-            blendshapes = self.model(audio_tensor)
-            
-            # S'assurer qu'on a 68 blendshapes
-            if blendshapes.shape[1] != self.blendshapes_count:
-                # Ajuster si nécessaire
-                if blendshapes.shape[1] > self.blendshapes_count:
-                    blendshapes = blendshapes[:, :self.blendshapes_count]
-                else:
-                    pad_size = self.blendshapes_count - blendshapes.shape[1]
-                    blendshapes = torch.nn.functional.pad(blendshapes, (0, pad_size))
-                    
-            return blendshapes
+        # Le runner exécute sous inference_mode dans la précision configurée
+        blendshapes = self.runner(audio_tensor.to(self.device))
+        
+        # S'assurer qu'on a 68 blendshapes
+        if blendshapes.shape[1] != self.blendshapes_count:
+            # Ajuster si nécessaire
+            if blendshapes.shape[1] > self.blendshapes_count:
+                blendshapes = blendshapes[:, :self.blendshapes_count]
+            else:
+                pad_size = self.blendshapes_count - blendshapes.shape[1]
+                blendshapes = torch.nn.functional.pad(blendshapes, (0, pad_size))
+                
+        return blendshapes
             
     def process_audio_bytes(self, audio_bytes: bytes, sample_rate: int = 48000) -> np.ndarray:
         """
@@ -115,11 +131,7 @@ class NeuroSyncSimple:
         # Rééchantillonner si nécessaire
         if sample_rate != self.sample_rate:
             audio_tensor = torch.FloatTensor(audio_float).unsqueeze(0)
-            resampler = torchaudio.transforms.Resample(
-                orig_freq=sample_rate,
-                new_freq=self.sample_rate
-            )
-            audio_resampled = resampler(audio_tensor)
+            audio_resampled = resampler_bank.resample(audio_tensor, sample_rate, self.sample_rate)
         else:
             audio_resampled = torch.FloatTensor(audio_float).unsqueeze(0)
             
@@ -129,8 +141,17 @@ class NeuroSyncSimple:
         # Retourner comme numpy
         return blendshapes_tensor.cpu().numpy()[0]
         
-    def warmup(self):
-        """Préchauffe le modèle"""
-        dummy_input = torch.randn(1, self.sample_rate * 2, device=self.device)
-        _ = self.process_audio(dummy_input)
-        print("Modèle préchauffé")
\ No newline at end of file
+    def warmup(self, chunks=DEFAULT_WARMUP_CHUNKS, iterations: int = 2):
+        """
+        Préchauffe le modèle sur les tailles de chunk courantes
+
+        Args:
+            chunks: Tailles (durée ms, fréquence Hz) à traiter à blanc
+            iterations: Passes par taille
+
+        Returns:
+            Durées (ms) de la première et de la dernière passe par taille
+        """
+        results = run_warmup(self.process_audio_bytes, chunks, iterations, target_rate=self.sample_rate)
+        print("Modèle préchauffé")
+        return results
\ No newline at end of file
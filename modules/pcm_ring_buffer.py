@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Ring buffer PCM pré-alloué pour Gala v1
+Remplace le bytearray global (extend + slice-and-shift) des serveurs PCM :
+lecture par fenêtres sans copie, réveil du consommateur par condition
+et politique de débordement configurable
+"""
+
+import threading
+from collections import deque
+from typing import Callable, Dict, Optional
+
+from modules.metrics import metrics
+
+
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_BLOCK = "block"
+
+
+class BufferOverflowError(Exception):
+    """Levée quand le buffer reste plein au-delà du timeout (politique 'block')"""
+
+
+class PCMRingBuffer:
+    """
+    Buffer circulaire d'octets PCM à capacité fixe
+
+    Les positions de lecture/écriture sont des compteurs absolus : consommer
+    ne déplace aucune donnée. Les `window` premiers octets du stockage sont
+    recopiés après la fin (miroir), ce qui permet à peek() de retourner une
+    memoryview contiguë même quand la fenêtre chevauche la fin du buffer.
+
+    Une fenêtre obtenue par peek() est réservée jusqu'à consume() : le
+    producteur ne l'écrase jamais.
+
+    mark_end() pose une fin d'énoncé à la position d'écriture : le
+    consommateur est réveillé pour traiter le reste (< une fenêtre) au lieu
+    de l'abandonner.
+    """
+
+    def __init__(self, capacity: int, window: Optional[int] = None,
+                 overflow: str = OVERFLOW_DROP_OLDEST, sample_width: int = 2):
+        """
+        Args:
+            capacity: Capacité en octets (arrondie à un multiple de sample_width)
+            window: Taille maximale d'une fenêtre peek() en octets (capacity si None)
+            overflow: 'drop_oldest' (écrase les plus anciennes données) ou
+                      'block' (le producteur attend, BufferOverflowError au timeout)
+            sample_width: Taille d'un échantillon en octets (2 pour int16)
+        """
+        if overflow not in (OVERFLOW_DROP_OLDEST, OVERFLOW_BLOCK):
+            raise ValueError(f"Politique de débordement inconnue: {overflow}")
+
+        self.sample_width = sample_width
+        self.capacity = capacity - capacity % sample_width
+        self.window = min(window or self.capacity, self.capacity)
+        self.overflow = overflow
+
+        self._storage = bytearray(self.capacity + self.window)
+        self._view = memoryview(self._storage)
+
+        self._read = 0
+        self._write = 0
+        self._leased = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._marks = deque()  # Fins d'énoncé (positions absolues d'écriture)
+
+        # Appelé sous le verrou à chaque écriture : on_write(position, longueur)
+        # (horodatage des chunks, cf. modules.av_sync.AudioTimeline)
+        self.on_write: Optional[Callable[[int, int], None]] = None
+
+        # Statistiques
+        self.bytes_written = 0
+        self.bytes_dropped = 0
+        self.overflows = 0
+
+    @property
+    def available(self) -> int:
+        """Nombre d'octets non consommés"""
+        return self._write - self._read
+
+    @property
+    def position(self) -> int:
+        """Position absolue de lecture (premier octet non consommé)"""
+        return self._read
+
+    def _copy_in(self, data: memoryview):
+        """Copie les données à la position d'écriture (avec mise à jour du miroir)"""
+        length = len(data)
+        position = self._write % self.capacity
+        first = min(length, self.capacity - position)
+
+        self._storage[position:position + first] = data[:first]
+        if position < self.window:
+            mirrored = min(first, self.window - position)
+            start = self.capacity + position
+            self._storage[start:start + mirrored] = data[:mirrored]
+
+        rest = length - first
+        if rest:
+            self._storage[:rest] = data[first:]
+            mirrored = min(rest, self.window)
+            self._storage[self.capacity:self.capacity + mirrored] = data[first:first + mirrored]
+
+        self._write += length
+
+    def _drop_for(self, length: int) -> int:
+        """
+        Libère la place pour `length` octets en abandonnant les plus anciennes
+        données non réservées. Retourne le nombre d'octets entrants à ignorer
+        si la fenêtre réservée empêche de libérer assez de place.
+        """
+        missing = length - (self.capacity - self.available)
+        if missing <= 0:
+            return 0
+
+        self.overflows += 1
+        if not self._leased:
+            # Arrondi à l'échantillon pour garder l'alignement int16
+            missing += -missing % self.sample_width
+            dropped = min(missing, self.available)
+            self._read += dropped
+            self.bytes_dropped += dropped
+            return 0
+
+        # La fenêtre en cours de traitement ne peut pas être écrasée
+        skip = missing + (-missing % self.sample_width)
+        self.bytes_dropped += skip
+        return skip
+
+    def write(self, data, timeout: Optional[float] = None) -> int:
+        """
+        Ajoute des octets PCM au buffer et réveille le consommateur
+
+        Args:
+            data: bytes, bytearray ou memoryview
+            timeout: Attente maximale en secondes (politique 'block')
+
+        Returns:
+            Nombre d'octets effectivement ajoutés
+
+        Raises:
+            BufferOverflowError: Pas de place avant le timeout (politique 'block')
+        """
+        data = memoryview(data).cast('B')
+
+        with self._cond:
+            if self._closed:
+                return 0
+
+            if self.overflow == OVERFLOW_BLOCK:
+                if len(data) > self.capacity:
+                    raise BufferOverflowError(
+                        f"Chunk de {len(data)} octets supérieur à la capacité ({self.capacity})")
+                has_room = self._cond.wait_for(
+                    lambda: self._closed or self.capacity - self.available >= len(data),
+                    timeout
+                )
+                if not has_room:
+                    self.overflows += 1
+                    raise BufferOverflowError(
+                        f"Buffer plein ({self.available}/{self.capacity} octets)")
+                if self._closed:
+                    return 0
+            else:
+                # Un chunk plus grand que le buffer : seule la fin est gardée
+                if len(data) > self.capacity:
+                    excess = len(data) - self.capacity
+                    self.bytes_dropped += excess
+                    data = data[excess:]
+                skip = self._drop_for(len(data))
+                data = data[skip:]
+
+            if self.on_write is not None and len(data):
+                self.on_write(self._write, len(data))
+            self._copy_in(data)
+            self.bytes_written += len(data)
+            metrics.sample("pcm_buffer_bytes", self.available)
+            self._cond.notify_all()
+            return len(data)
+
+    def wait_for(self, length: int, timeout: Optional[float] = None) -> bool:
+        """
+        Attend que `length` octets soient disponibles (sans polling)
+
+        Returns:
+            True si les données sont disponibles ou une fin d'énoncé en attente,
+            False au timeout ou à la fermeture
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._closed or self.available >= length or self._marks, timeout)
+            return self.available >= length or bool(self._marks)
+
+    def peek(self, length: int) -> Optional[memoryview]:
+        """
+        Retourne une vue sans copie sur les `length` prochains octets
+
+        La vue reste valide jusqu'au prochain consume() ou clear().
+
+        Returns:
+            memoryview contiguë, ou None si pas assez de données
+        """
+        if length > self.window:
+            raise ValueError(f"Fenêtre de {length} octets > window ({self.window})")
+
+        with self._cond:
+            if self.available < length:
+                return None
+            self._leased = max(self._leased, length)
+            position = self._read % self.capacity
+            return self._view[position:position + length]
+
+    def consume(self, length: int) -> int:
+        """
+        Avance la position de lecture (hop) et libère la fenêtre réservée
+
+        Returns:
+            Nombre d'octets consommés
+        """
+        with self._cond:
+            consumed = min(length, self.available)
+            self._read += consumed
+            self._leased = 0
+            self._cond.notify_all()
+            return consumed
+
+    def read(self, length: int) -> Optional[bytes]:
+        """Copie puis consomme `length` octets (None si pas assez de données)"""
+        window = self.peek(length)
+        if window is None:
+            return None
+        data = bytes(window)
+        self.consume(length)
+        return data
+
+    def mark_end(self) -> int:
+        """
+        Marque la fin d'un énoncé après les données déjà écrites
+
+        Returns:
+            Nombre d'octets restant à traiter avant la marque
+        """
+        with self._cond:
+            self._marks.append(self._write)
+            self._cond.notify_all()
+            return self.available
+
+    def pending_end(self) -> Optional[int]:
+        """Octets à lire avant la prochaine fin d'énoncé (None sans marque)"""
+        with self._cond:
+            return max(0, self._marks[0] - self._read) if self._marks else None
+
+    def pop_end(self):
+        """Retire la fin d'énoncé traitée"""
+        with self._cond:
+            if self._marks:
+                self._marks.popleft()
+
+    def clear(self) -> int:
+        """
+        Vide les données non réservées (et les fins d'énoncé en attente)
+
+        Returns:
+            Nombre d'octets abandonnés
+        """
+        with self._cond:
+            cleared = self.available - self._leased
+            self._write = self._read + self._leased
+            self._marks.clear()
+            self.bytes_dropped += cleared
+            self._cond.notify_all()
+            return cleared
+
+    def close(self):
+        """Réveille tous les threads en attente (arrêt du serveur)"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def reopen(self):
+        """Accepte à nouveau les écritures après close() (redémarrage dans le processus)"""
+        with self._cond:
+            self._closed = False
+
+    def stats(self) -> Dict:
+        """Statistiques du buffer"""
+        with self._cond:
+            return {
+                "level": self.available,
+                "capacity": self.capacity,
+                "window": self.window,
+                "overflow_policy": self.overflow,
+                "bytes_written": self.bytes_written,
+                "bytes_dropped": self.bytes_dropped,
+                "overflows": self.overflows
+            }
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Politique de précision de l'inférence pour Gala v1
+Applique au chargement du modèle la précision demandée par ModelConfig :
+fp32, fp16 (GPU), autocast bf16 (CPU) ou quantification dynamique int8 des
+couches Linear (CPU), le tout sous torch.inference_mode(), avec un contrôle
+de parité contre la sortie fp32 au démarrage
+"""
+
+import copy
+import io
+import logging
+import wave
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from modules.metrics import metrics, STAGE_MODEL_FORWARD
+
+
+logger = logging.getLogger(__name__)
+
+PRECISION_AUTO = "auto"
+PRECISION_FP32 = "fp32"
+PRECISION_FP16 = "fp16"
+PRECISION_BF16 = "bf16"
+PRECISION_INT8 = "int8"
+
+PRECISIONS = (PRECISION_FP32, PRECISION_FP16, PRECISION_BF16, PRECISION_INT8)
+
+# Écart absolu maximal toléré sur les blendshapes (valeurs dans [0, 1])
+DEFAULT_PARITY_TOLERANCE = 0.05
+
+
+def resolve_precision(precision: str = PRECISION_AUTO, device: str = "cpu",
+                      use_fp16: bool = True) -> str:
+    """
+    Choisit la précision effective pour un device
+
+    'auto' donne fp16 sur GPU (si use_fp16) et fp32 sur CPU. Les modes
+    réservés à un type de device retombent en fp32 ailleurs.
+    """
+    is_cuda = str(device).startswith("cuda")
+    if precision == PRECISION_AUTO:
+        return PRECISION_FP16 if is_cuda and use_fp16 else PRECISION_FP32
+    if precision not in PRECISIONS:
+        raise ValueError(f"Précision inconnue: {precision}")
+    if precision == PRECISION_FP16 and not is_cuda:
+        logger.warning("fp16 indisponible sur CPU, utilisation de fp32")
+        return PRECISION_FP32
+    if precision in (PRECISION_BF16, PRECISION_INT8) and is_cuda:
+        logger.warning(f"{precision} réservé au CPU, utilisation de fp16")
+        return PRECISION_FP16
+    return precision
+
+
+@contextmanager
+def mha_fastpath(enabled: bool):
+    """
+    Active ou coupe le fast path MHA le temps du bloc, puis restaure l'état
+
+    Le fast path des TransformerEncoderLayer lit linear.weight comme un
+    tenseur, ce qui échoue sur les Linear quantifiés : seul le modèle int8
+    s'exécute sans, les autres modèles du processus le gardent.
+    """
+    previous = torch.backends.mha.get_fastpath_enabled()
+    torch.backends.mha.set_fastpath_enabled(enabled)
+    try:
+        yield
+    finally:
+        torch.backends.mha.set_fastpath_enabled(previous)
+
+
+class PrecisionModel:
+    """
+    Proxy exécutant le modèle dans sa politique de précision
+
+    Chaque appel (model(x), encoder, decoder) passe sous inference_mode et,
+    en bf16, sous autocast CPU ; en int8, le fast path MHA est coupé le
+    temps de l'appel seulement. Les entrées sont converties au dtype des
+    poids et les sorties rendues en float32 (compatibles .numpy()).
+    Les autres attributs sont délégués au modèle.
+    """
+
+    def __init__(self, model: nn.Module, precision: str):
+        self.model = model
+        self.precision = precision
+        self.input_dtype = torch.float16 if precision == PRECISION_FP16 else torch.float32
+
+    @contextmanager
+    def context(self):
+        """Contexte d'inférence de la politique"""
+        with torch.inference_mode():
+            if self.precision == PRECISION_BF16:
+                with torch.autocast(device_type="cpu", dtype=torch.bfloat16):
+                    yield
+            elif self.precision == PRECISION_INT8:
+                with mha_fastpath(False):
+                    yield
+            else:
+                yield
+
+    def _run(self, fn, x):
+        if torch.is_tensor(x) and x.is_floating_point():
+            x = x.to(self.input_dtype)
+        with metrics.span(STAGE_MODEL_FORWARD), self.context():
+            output = fn(x)
+            if metrics.enabled and torch.is_tensor(output) and output.is_cuda:
+                # Noyaux lancés en asynchrone : on attend leur fin pour que le span
+                # mesure le forward et non son lancement (la sortie est relue juste après)
+                torch.cuda.synchronize(output.device)
+        return output.float() if torch.is_tensor(output) else output
+
+    def __call__(self, x):
+        return self._run(self.model, x)
+
+    def forward(self, x):
+        return self(x)
+
+    def encoder(self, x):
+        return self._run(self.model.encoder, x)
+
+    def decoder(self, x):
+        return self._run(self.model.decoder, x)
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+
+class PrecisionPolicy:
+    """
+    Conversion du modèle selon la précision choisie, avec repli fp32
+
+    Usage au chargement :
+        policy = PrecisionPolicy.from_config(gala_config.model, device)
+        model = policy.apply(load_model(...), run=lambda m: ...)
+    """
+
+    def __init__(self, precision: str = PRECISION_AUTO, device: str = "cpu",
+                 use_fp16: bool = True, parity_tolerance: float = DEFAULT_PARITY_TOLERANCE):
+        """
+        Args:
+            precision: 'auto', 'fp32', 'fp16', 'bf16' ou 'int8'
+            device: Device du modèle
+            use_fp16: Autorise fp16 en mode 'auto' (ModelConfig.use_fp16)
+            parity_tolerance: Écart max toléré contre fp32 avant repli
+        """
+        self.requested = precision
+        self.device = str(device)
+        self.precision = resolve_precision(precision, device, use_fp16)
+        self.parity_tolerance = parity_tolerance
+
+        self.parity_error: Optional[float] = None
+        self.fallback = False
+
+    @classmethod
+    def from_config(cls, model_config, device: str) -> 'PrecisionPolicy':
+        """Crée la politique depuis ModelConfig (precision, use_fp16)"""
+        return cls(model_config.precision, device, use_fp16=model_config.use_fp16)
+
+    def convert(self, model: nn.Module, precision: Optional[str] = None):
+        """
+        Convertit une copie du modèle et retourne le proxy d'exécution
+
+        Le modèle d'origine n'est pas modifié (il sert de référence fp32).
+        """
+        precision = precision or self.precision
+        if precision == PRECISION_FP16:
+            converted = copy.deepcopy(model).half()
+        elif precision == PRECISION_INT8:
+            converted = torch.ao.quantization.quantize_dynamic(
+                copy.deepcopy(model).cpu(), {nn.Linear}, dtype=torch.qint8
+            )
+        else:
+            # fp32 et bf16 (autocast) gardent les poids fp32
+            converted = model
+        converted.eval()
+        return PrecisionModel(converted, precision)
+
+    def parity_check(self, reference: nn.Module, candidate: PrecisionModel,
+                     run: Callable[[object], np.ndarray]) -> float:
+        """
+        Compare la sortie du modèle converti à la référence fp32
+
+        Args:
+            reference: Modèle fp32
+            candidate: Proxy converti
+            run: Exécute une inférence complète avec le modèle donné
+
+        Returns:
+            Écart absolu maximal
+        """
+        expected = np.asarray(run(PrecisionModel(reference, PRECISION_FP32)), dtype=np.float32)
+        actual = np.asarray(run(candidate), dtype=np.float32)
+        if expected.shape != actual.shape:
+            return float("inf")
+        return float(np.max(np.abs(expected - actual))) if expected.size else 0.0
+
+    def apply(self, model: nn.Module, run: Optional[Callable[[object], np.ndarray]] = None,
+              neurosync_config: Optional[Dict] = None) -> PrecisionModel:
+        """
+        Applique la politique, vérifie la parité et retombe en fp32 si besoin
+
+        Args:
+            model: Modèle fp32 chargé
+            run: Inférence de référence pour le contrôle de parité (ignoré si None)
+            neurosync_config: Config NeuroSync ; use_half_precision y est aligné
+                              sur la politique (le proxy gère dtype et autocast)
+
+        Returns:
+            Proxy à passer à la place du modèle
+        """
+        # Référence fp32 (load_model peut rendre des poids déjà convertis)
+        model = model.float().eval()
+        if neurosync_config is not None:
+            neurosync_config["use_half_precision"] = False
+
+        prepared = self.convert(model)
+        if run is not None and self.precision != PRECISION_FP32:
+            self.parity_error = self.parity_check(model, prepared, run)
+            if self.parity_error > self.parity_tolerance:
+                logger.warning(f"Parité {self.precision} insuffisante "
+                               f"(écart {self.parity_error:.4f} > {self.parity_tolerance}), repli fp32")
+                self.fallback = True
+                self.precision = PRECISION_FP32
+                prepared = self.convert(model)
+
+        logger.info(f"✅ Précision d'inférence: {self.precision}"
+                    + (f" (écart fp32 {self.parity_error:.4f})" if self.parity_error is not None else ""))
+        return prepared
+
+    def stats(self) -> Dict:
+        """État de la politique"""
+        return {
+            "requested": self.requested,
+            "precision": self.precision,
+            "device": self.device,
+            "parity_error": self.parity_error,
+            "parity_tolerance": self.parity_tolerance,
+            "fallback": self.fallback
+        }
+
+
+def synthetic_pcm(seconds: float = 1.0, sample_rate: int = 16000) -> bytes:
+    """
+    Audio synthétique (voyelles harmoniques modulées + bruit) pour la parité au démarrage
+
+    Returns:
+        PCM int16 mono
+    """
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    rng = np.random.default_rng(0)
+    signal = sum(np.sin(2 * np.pi * f * t) / (i + 1) for i, f in enumerate((180, 360, 720, 1440)))
+    signal = signal * (0.5 + 0.5 * np.sin(2 * np.pi * 3 * t)) + 0.05 * rng.standard_normal(len(t))
+    return (np.clip(signal / np.max(np.abs(signal)), -1, 1) * 0.6 * 32767).astype(np.int16).tobytes()
+
+
+def synthetic_wav(seconds: float = 1.0, sample_rate: int = 16000) -> bytes:
+    """Même audio que synthetic_pcm(), en fichier WAV mono 16 bits"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(synthetic_pcm(seconds, sample_rate))
+    return buffer.getvalue()
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Profileur échantillonné à la demande pour Gala v1
+Un thread relève périodiquement la pile de tous les threads du processus
+(workers Flask, thread de traitement du buffer, cadenceur LiveLink) via
+sys._current_frames(), sans instrumenter le code profilé. En mode "wall"
+chaque pile pèse le temps écoulé, en mode "cpu" le temps CPU consommé par
+son thread depuis le relevé précédent (les threads en attente disparaissent).
+Le résultat est rendu en piles repliées (flamegraph.pl, inferno) ou au
+format speedscope, avec un bilan des pauses GC et des allocations sur la
+même fenêtre
+"""
+
+import gc
+import sys
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Dict, List, Mapping, Optional, Tuple
+
+
+MODE_WALL = "wall"
+MODE_CPU = "cpu"
+MODES = (MODE_WALL, MODE_CPU)
+
+FORMAT_COLLAPSED = "collapsed"
+FORMAT_SPEEDSCOPE = "speedscope"
+FORMATS = (FORMAT_COLLAPSED, FORMAT_SPEEDSCOPE)
+
+MAX_SECONDS = 60.0
+DEFAULT_RATE_HZ = 100
+MAX_DEPTH = 128  # Piles plus profondes tronquées côté racine
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+
+class ProfilerBusyError(Exception):
+    """Levée quand un profil est déjà en cours"""
+
+
+def _thread_cpu_clock(ident: int) -> Optional[int]:
+    """Horloge CPU POSIX d'un thread (None si indisponible ou thread terminé)"""
+    try:
+        return time.pthread_getcpuclockid(ident)
+    except (AttributeError, OSError):
+        return None
+
+
+class _GCMonitor:
+    """Pauses du ramasse-miettes via gc.callbacks pendant la fenêtre"""
+
+    def __init__(self):
+        self.pauses: List[Tuple[int, float, int]] = []  # (génération, durée s, objets collectés)
+        self._start = None
+
+    def __call__(self, phase: str, info: Dict):
+        if phase == "start":
+            self._start = time.perf_counter()
+        elif self._start is not None:
+            self.pauses.append((info.get("generation", -1), time.perf_counter() - self._start,
+                                info.get("collected", 0)))
+            self._start = None
+
+    def summary(self) -> Dict:
+        durations = sorted(pause[1] * 1000 for pause in self.pauses)
+        generations = defaultdict(int)
+        for generation, _, _ in self.pauses:
+            generations[generation] += 1
+        return {
+            "collections": len(self.pauses),
+            "by_generation": {str(generation): count for generation, count in sorted(generations.items())},
+            "collected": sum(pause[2] for pause in self.pauses),
+            "total_pause_ms": sum(durations),
+            "max_pause_ms": durations[-1] if durations else 0.0,
+            "p99_pause_ms": durations[min(len(durations) - 1, int(0.99 * len(durations)))] if durations else 0.0
+        }
+
+
+class SamplingProfiler:
+    """
+    Profileur par échantillonnage de tous les threads Python du processus
+
+    Usage :
+        result = profiler.profile(seconds=5, mode="cpu", output="speedscope")
+
+    Un seul profil à la fois ; le thread appelant (qui attend la fin de la
+    fenêtre) et le thread d'échantillonnage sont exclus des piles.
+    """
+
+    def __init__(self, rate_hz: float = DEFAULT_RATE_HZ, max_seconds: float = MAX_SECONDS):
+        self.rate_hz = rate_hz
+        self.max_seconds = max_seconds
+        self._lock = threading.Lock()
+        self._frame_names: Dict[Tuple, str] = {}
+
+    def _frame_name(self, frame) -> str:
+        code = frame.f_code
+        key = (code, frame.f_lineno)
+        name = self._frame_names.get(key)
+        if name is None:
+            filename = code.co_filename.rsplit("/", 1)[-1]
+            name = f"{getattr(code, 'co_qualname', code.co_name)} ({filename}:{frame.f_lineno})"
+            self._frame_names[key] = name
+        return name
+
+    def _stack(self, frame) -> Tuple[str, ...]:
+        """Pile racine -> feuille"""
+        names = []
+        while frame is not None and len(names) < MAX_DEPTH:
+            names.append(self._frame_name(frame))
+            frame = frame.f_back
+        names.reverse()
+        return tuple(names)
+
+    def _sample(self, seconds: float, interval: float, mode: str, exclude: set) -> Tuple[Dict, int]:
+        """Boucle d'échantillonnage ; retourne {(thread, pile): poids en s} et le nombre de relevés"""
+        weights: Dict[Tuple[str, Tuple[str, ...]], float] = defaultdict(float)
+        clocks: Dict[int, Optional[int]] = {}
+        last_cpu: Dict[int, float] = {}
+        names: Dict[int, str] = {}
+
+        ticks = 0
+        start = last = time.perf_counter()
+        deadline = start + seconds
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            elapsed, last = now - last, now
+            ticks += 1
+
+            frames = sys._current_frames()
+            if not names.keys() >= frames.keys():
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in frames.items():
+                if ident in exclude:
+                    continue
+                if mode == MODE_CPU:
+                    if ident not in clocks:
+                        clocks[ident] = _thread_cpu_clock(ident)
+                    clock = clocks[ident]
+                    if clock is None:
+                        continue
+                    try:
+                        cpu = time.clock_gettime(clock)
+                    except OSError:
+                        continue  # Thread terminé entre-temps
+                    weight = cpu - last_cpu.get(ident, cpu)
+                    last_cpu[ident] = cpu
+                else:
+                    weight = elapsed if ticks > 1 else interval
+                if weight > 0:
+                    weights[(names.get(ident, f"thread-{ident}"), self._stack(frame))] += weight
+            del frames
+
+            time.sleep(max(0.0, min(interval - (time.perf_counter() - now), deadline - time.perf_counter())))
+        return weights, ticks
+
+    def profile(self, seconds: float = 5.0, mode: str = MODE_WALL, output: str = FORMAT_COLLAPSED,
+                rate_hz: Optional[float] = None, trace_allocations: bool = False) -> Dict:
+        """
+        Profile le processus pendant `seconds` (bloquant)
+
+        Args:
+            seconds: Durée de la fenêtre (au plus max_seconds)
+            mode: "wall" (temps écoulé) ou "cpu" (temps CPU par thread)
+            output: "collapsed" (texte replié) ou "speedscope" (JSON)
+            rate_hz: Fréquence d'échantillonnage (défaut : self.rate_hz)
+            trace_allocations: Active tracemalloc sur la fenêtre (coûteux) pour
+                               lister les lignes qui allouent le plus
+
+        Returns:
+            Dict avec le profil, le bilan GC et allocations et les threads vus
+
+        Raises:
+            ValueError: Paramètre invalide
+            ProfilerBusyError: Un profil est déjà en cours
+        """
+        if mode not in MODES:
+            raise ValueError(f"Mode inconnu: {mode} (attendu: {', '.join(MODES)})")
+        if output not in FORMATS:
+            raise ValueError(f"Format inconnu: {output} (attendu: {', '.join(FORMATS)})")
+        if not 0 < seconds <= self.max_seconds:
+            raise ValueError(f"seconds doit être dans ]0, {self.max_seconds:g}]")
+        rate_hz = rate_hz or self.rate_hz
+        if not 0 < rate_hz <= 1000:
+            raise ValueError("rate doit être dans ]0, 1000]")
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusyError("Un profil est déjà en cours")
+
+        try:
+            return self._profile(seconds, mode, output, 1.0 / rate_hz, trace_allocations)
+        finally:
+            self._lock.release()
+
+    def _profile(self, seconds: float, mode: str, output: str, interval: float,
+                 trace_allocations: bool) -> Dict:
+        monitor = _GCMonitor()
+        gc_before = gc.get_stats()
+        blocks_before = sys.getallocatedblocks()
+        tracing = trace_allocations and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+
+        result: Dict = {}
+        caller = threading.get_ident()
+
+        def run():
+            result["weights"], result["ticks"] = self._sample(
+                seconds, interval, mode, {caller, threading.get_ident()})
+
+        gc.callbacks.append(monitor)
+        try:
+            sampler = threading.Thread(target=run, name="SamplingProfiler", daemon=True)
+            started = time.perf_counter()
+            sampler.start()
+            sampler.join()
+            duration = time.perf_counter() - started
+        finally:
+            gc.callbacks.remove(monitor)
+
+        allocations = {
+            "allocated_blocks_delta": sys.getallocatedblocks() - blocks_before,
+            "gc_collections_delta": [after["collections"] - before["collections"]
+                                     for before, after in zip(gc_before, gc.get_stats())],
+            "gc_tracked_counts": list(gc.get_count())
+        }
+        if trace_allocations and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            if tracing:
+                tracemalloc.stop()
+            allocations["top_lines"] = [
+                {"line": str(stat.traceback[0]), "kib": stat.size / 1024, "blocks": stat.count}
+                for stat in snapshot.statistics("lineno")[:15]
+            ]
+
+        weights = result.get("weights", {})
+        threads = defaultdict(float)
+        for (thread, _), weight in weights.items():
+            threads[thread] += weight
+
+        report = {
+            "mode": mode,
+            "format": output,
+            "seconds": duration,
+            "interval_ms": interval * 1000,
+            "samples": result.get("ticks", 0),
+            "threads": {thread: {"seconds": weight} for thread, weight in sorted(threads.items())},
+            "top_self": self.top_self(weights),
+            "gc": monitor.summary(),
+            "allocations": allocations
+        }
+        if output == FORMAT_SPEEDSCOPE:
+            report["profile"] = self.to_speedscope(weights, mode, duration)
+        else:
+            report["profile"] = self.to_collapsed(weights)
+        return report
+
+    # ------------------------------------------------------------------
+    # Rendus
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def top_self(weights: Dict, limit: int = 15) -> List[Dict]:
+        """Frames feuilles les plus lourdes (temps propre), tous threads confondus"""
+        leaves = defaultdict(float)
+        for (_, stack), weight in weights.items():
+            if stack:
+                leaves[stack[-1]] += weight
+        total = sum(leaves.values()) or 1.0
+        ranked = sorted(leaves.items(), key=lambda item: -item[1])[:limit]
+        return [{"frame": frame, "seconds": weight, "share": weight / total} for frame, weight in ranked]
+
+    @staticmethod
+    def to_collapsed(weights: Dict) -> str:
+        """Piles repliées 'thread;racine;...;feuille poids_µs', une par ligne"""
+        lines = []
+        for (thread, stack), weight in sorted(weights.items(), key=lambda item: -item[1]):
+            micros = int(round(weight * 1e6))
+            if micros > 0:
+                lines.append(f"{';'.join((thread,) + stack)} {micros}")
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    @staticmethod
+    def to_speedscope(weights: Dict, mode: str, duration: float) -> Dict:
+        """Fichier speedscope : un profil 'sampled' par thread, poids en µs"""
+        frame_index: Dict[str, int] = {}
+        frames: List[Dict] = []
+        per_thread: Dict[str, Tuple[List, List]] = defaultdict(lambda: ([], []))
+
+        for (thread, stack), weight in weights.items():
+            indices = []
+            for name in stack:
+                if name not in frame_index:
+                    frame_index[name] = len(frames)
+                    function, _, location = name.rpartition(" (")
+                    filename, _, line = location.rstrip(")").rpartition(":")
+                    frames.append({"name": function, "file": filename, "line": int(line)})
+                indices.append(frame_index[name])
+            samples, sample_weights = per_thread[thread]
+            samples.append(indices)
+            sample_weights.append(weight * 1e6)
+
+        profiles = []
+        for thread, (samples, sample_weights) in sorted(per_thread.items()):
+            profiles.append({
+                "type": "sampled",
+                "name": f"{thread} ({mode})",
+                "unit": "microseconds",
+                "startValue": 0,
+                "endValue": sum(sample_weights),
+                "samples": samples,
+                "weights": sample_weights
+            })
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": f"Gala {mode} {duration:.1f}s",
+            "exporter": "gala-sampling-profiler",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": profiles
+        }
+
+    def profile_from_query(self, args: Mapping) -> Dict:
+        """
+        Profil décrit par les paramètres d'URL de /debug/profile
+
+        ?seconds=N&mode=wall|cpu&format=collapsed|speedscope&rate=Hz&alloc=1
+        """
+        try:
+            seconds = float(args.get("seconds", 5))
+            rate_hz = float(args["rate"]) if args.get("rate") else None
+        except ValueError:
+            raise ValueError("seconds et rate doivent être numériques")
+        return self.profile(seconds=seconds,
+                            mode=args.get("mode", MODE_WALL).lower(),
+                            output=args.get("format", FORMAT_COLLAPSED).lower(),
+                            rate_hz=rate_hz,
+                            trace_allocations=str(args.get("alloc", "0")).lower() in ("1", "true"))
+
+
+# Profileur partagé par le processus
+profiler = SamplingProfiler()
@@ -5,12 +5,18 @@ Basé sur l'implémentation de NeuroSync_Player
 """
 
 from __future__ import annotations
-import datetime
-import struct
 import uuid
 from enum import IntEnum
 from typing import Optional
 
+import numpy as np
+
+from modules.livelink_encoder import (
+    LiveLinkEncoder,
+    current_seconds_of_day,
+    frame_time_from_seconds,
+)
+
 
 class FaceBlendShape(IntEnum):
     """ARKit FaceBlendShape indices (0-60)"""
@@ -106,17 +112,19 @@ class PyLiveLinkFace:
         self._scaling_factor_eyes = 1.0
         self._scaling_factor_eyebrows = 1.0
         
+        # En-tête constant (version, UUID, nom) pré-calculé une seule fois
+        self._encoder = LiveLinkEncoder(self.uuid, self.name, fps=self.fps,
+                                        denominator=self._denominator,
+                                        version=self._version)
+        
         # Initialiser le timestamp
         self._update_timestamp()
     
-    def _update_timestamp(self):
+    def _update_timestamp(self) -> float:
         """Met à jour le timestamp et les infos de frame"""
-        now = datetime.datetime.now()
-        total_seconds = (now.hour * 3600 + now.minute * 60 + 
-                        now.second + now.microsecond / 1000000.0)
-        self._frames = int(total_seconds * self.fps)
-        self._sub_frame = int((total_seconds * self.fps - self._frames) * 4294967296)
-        self._denominator = 1
+        total_seconds = current_seconds_of_day()
+        self._frames, self._sub_frame = frame_time_from_seconds(total_seconds, self.fps)
+        return total_seconds
     
     def encode(self) -> bytes:
         """
@@ -132,34 +140,34 @@ class PyLiveLinkFace:
         - Blend shape count (1 byte, UInt8)
         - Blend shape values (61 * 4 bytes, float32 big-endian)
         """
-        # Version
-        version_packed = struct.pack('<I', self._version)
-        
-        # UUID
-        uuid_packed = self.uuid.encode('utf-8')
-        
-        # Subject name
-        name_bytes = self.name.encode('utf-8')
-        name_length_packed = struct.pack('!i', len(name_bytes))
-        
-        # Update timestamp
-        self._update_timestamp()
-        
-        # Frame time
-        frames_packed = struct.pack("!II", self._frames, self._sub_frame)
-        
-        # Frame rate
-        frame_rate_packed = struct.pack("!II", self.fps, self._denominator)
+        return bytes(self.encode_view())
+    
+    def encode_view(self) -> memoryview:
+        """
+        Encode sans allocation dans le buffer pré-calculé de l'encodeur
         
-        # Blend shapes
-        blend_shape_count = 61
-        scaled_shapes = self._apply_scaling()
-        data_packed = struct.pack('!B', blend_shape_count)
-        data_packed += struct.pack('!61f', *scaled_shapes)
+        Returns:
+            memoryview valide jusqu'au prochain encodage (à envoyer directement)
+        """
+        seconds = self._update_timestamp()
+        return self._encoder.encode_into(self._blend_shapes, seconds)
+    
+    def encode_values_view(self, values, seconds: Optional[float] = None) -> memoryview:
+        """
+        Encode directement 61 valeurs déjà remappées/clampées (sans copie d'état)
         
-        # Combine all parts
-        return (version_packed + uuid_packed + name_length_packed + 
-                name_bytes + frames_packed + frame_rate_packed + data_packed)
+        Args:
+            values: Vecteur de 61 valeurs (ex: ligne de BlendshapeRemapper.remap)
+            seconds: Timecode LiveLink (secondes depuis minuit) ; maintenant si None
+        """
+        if seconds is None:
+            seconds = self._update_timestamp()
+        return self._encoder.encode_into(values, seconds)
+    
+    @property
+    def encoder(self) -> LiveLinkEncoder:
+        """Encodeur à en-tête pré-calculé de ce sujet"""
+        return self._encoder
     
     def _apply_scaling(self) -> list:
         """Applique les facteurs d'échelle aux blendshapes"""
@@ -199,8 +207,9 @@ class PyLiveLinkFace:
             values: Liste de 61 valeurs float
         """
         if len(values) >= 61:
-            for i in range(61):
-                self.set_blendshape(i, values[i])
+            # Clamp vectorisé au lieu de 61 appels à set_blendshape
+            clamped = np.clip(np.asarray(values[:61], dtype=np.float64), 0.0, 1.0)
+            self._blend_shapes = clamped.tolist()
     
     def get_blendshape(self, index: int) -> float:
         """Récupère la valeur d'un blendshape"""
@@ -215,28 +224,3 @@ class PyLiveLinkFace:
     def reset(self):
         """Réinitialise tous les blendshapes à 0"""
         self._blend_shapes = [0.0] * 61
-    
-    def encode(self) -> bytes:
-        """
-        Encode les données pour l'envoi LiveLink
-        Compatible avec le protocole Unreal Engine LiveLink
-        """
-        version_packed = struct.pack('<I', self._version)
-        uuid_packed = self.uuid.encode('utf-8')
-        name_packed = self.name.encode('utf-8')
-        name_length_packed = struct.pack('!i', len(self.name))
-        
-        now = datetime.datetime.now()
-        # Calcul simple du timecode
-        self._frames = int(now.hour * 3600 * self.fps + 
-                           now.minute * 60 * self.fps + 
-                           now.second * self.fps + 
-                           (now.microsecond / 1000000.0) * self.fps)
-        
-        frames_packed = struct.pack("!II", self._frames, self._sub_frame)
-        frame_rate_packed = struct.pack("!II", self.fps, self._denominator)
-        
-        # Empaqueter les 61 blendshapes
-        data_packed = struct.pack('!B61f', 61, *self._blend_shapes)
-        
-        return version_packed + uuid_packed + name_length_packed + name_packed + frames_packed + frame_rate_packed + data_packed
\ No newline at end of file
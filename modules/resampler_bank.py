@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Banque de resamplers réutilisables pour Gala v1
+Évite de recalculer le noyau sinc à chaque requête et fournit un mode
+streaming qui conserve l'historique du filtre entre chunks consécutifs
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import torch
+import torch.nn.functional as F
+from modules.metrics import metrics, STAGE_RESAMPLE
+from modules.startup import lazy_import
+
+# Chargé à la construction du premier noyau (préchauffage), pas à l'import
+torchaudio = lazy_import("torchaudio")
+
+
+class StreamingResampler:
+    """
+    Resampler polyphase à état pour flux audio découpé en chunks
+
+    Utilise le même noyau que torchaudio.transforms.Resample, mais garde
+    en mémoire la fin du chunk précédent : la concaténation des sorties
+    de process() puis flush() est identique au resampling du signal complet,
+    sans artefacts aux frontières des chunks de 192 ms.
+    """
+
+    def __init__(self, resampler: "torchaudio.transforms.Resample"):
+        """
+        Args:
+            resampler: Resample issu de la banque (noyau déjà calculé)
+        """
+        self.kernel = resampler.kernel
+        self.width = resampler.width
+        self.orig = int(resampler.orig_freq) // resampler.gcd
+        self.new = int(resampler.new_freq) // resampler.gcd
+        self._window = self.orig + 2 * self.width
+        self.reset()
+
+    def reset(self):
+        """Réinitialise l'historique (début d'un nouveau flux)"""
+        self._history: Optional[torch.Tensor] = None
+        self._total_in = 0
+        self._total_out = 0
+
+    def _prepare(self, chunk: torch.Tensor) -> torch.Tensor:
+        """Ajoute le chunk à l'historique (coordonnées avec padding gauche)"""
+        chunk = chunk.to(device=self.kernel.device, dtype=self.kernel.dtype)
+        frames = chunk.reshape(-1, chunk.shape[-1])
+        if self._history is None:
+            # Padding gauche identique au resampling hors-ligne
+            self._history = frames.new_zeros((frames.shape[0], self.width))
+        return torch.cat([self._history, frames], dim=-1)
+
+    def _run_blocks(self, padded: torch.Tensor) -> torch.Tensor:
+        """Calcule tous les blocs complets disponibles et garde le reste"""
+        length = padded.shape[-1]
+        if length < self._window:
+            self._history = padded
+            return padded.new_zeros((padded.shape[0], 0))
+
+        blocks = (length - self._window) // self.orig + 1
+        used = (blocks - 1) * self.orig + self._window
+        output = F.conv1d(padded[:, None, :used], self.kernel, stride=self.orig)
+        output = output.transpose(1, 2).reshape(padded.shape[0], -1)
+
+        # L'historique démarre à la fenêtre du prochain bloc
+        self._history = padded[:, blocks * self.orig:]
+        return output
+
+    def process(self, chunk: torch.Tensor) -> torch.Tensor:
+        """
+        Resample un chunk en tenant compte des chunks précédents
+
+        Args:
+            chunk: Tensor [T] ou [C, T] à la fréquence d'origine
+
+        Returns:
+            Échantillons disponibles à la nouvelle fréquence (même rang que
+            l'entrée). Le retard est d'au plus un bloc polyphase + width.
+        """
+        shape = chunk.shape
+        self._total_in += shape[-1]
+        with metrics.span(STAGE_RESAMPLE):
+            output = self._run_blocks(self._prepare(chunk))
+        self._total_out += output.shape[-1]
+        return output.reshape(*shape[:-1], output.shape[-1])
+
+    def flush(self) -> torch.Tensor:
+        """Vide l'historique en fin de flux et réinitialise l'état"""
+        if self._history is None:
+            return self.kernel.new_zeros((0,))
+
+        channels = self._history.shape[0]
+        padded = F.pad(self._history, (0, self.width + self.orig))
+        output = self._run_blocks(padded)
+
+        target = math.ceil(self.new * self._total_in / self.orig)
+        output = output[:, :max(0, target - self._total_out)]
+        self.reset()
+        return output[0] if channels == 1 else output
+
+
+class ResamplerBank:
+    """
+    Registre LRU de resamplers indexé par (orig_rate, target_rate, dtype, device)
+
+    Les noyaux sinc sont construits une seule fois puis réutilisés par
+    toutes les requêtes ; les compteurs hits/builds sont exposés via stats().
+    """
+
+    def __init__(self, max_entries: int = 8):
+        """
+        Args:
+            max_entries: Nombre maximum de noyaux gardés en mémoire
+        """
+        self.max_entries = max_entries
+        self._resamplers: "OrderedDict[Tuple, torchaudio.transforms.Resample]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.builds = 0
+        self.evictions = 0
+
+    def get(self, orig_freq: int, new_freq: int, dtype: torch.dtype = torch.float32,
+            device="cpu") -> "torchaudio.transforms.Resample":
+        """
+        Retourne le resampler pour ces paramètres (construit au premier appel)
+
+        Args:
+            orig_freq: Fréquence d'origine
+            new_freq: Fréquence cible
+            dtype: Type du noyau
+            device: Device du noyau
+        """
+        device = torch.device(device)
+        key = (int(orig_freq), int(new_freq), dtype, str(device))
+
+        with self._lock:
+            resampler = self._resamplers.get(key)
+            if resampler is not None:
+                self._resamplers.move_to_end(key)
+                self.hits += 1
+                return resampler
+
+        # Construction hors verrou (calcul du noyau sinc)
+        resampler = torchaudio.transforms.Resample(
+            orig_freq=int(orig_freq),
+            new_freq=int(new_freq),
+            dtype=dtype
+        ).to(device)
+
+        with self._lock:
+            existing = self._resamplers.get(key)
+            if existing is not None:
+                # Un autre thread l'a construit entre-temps
+                self._resamplers.move_to_end(key)
+                self.hits += 1
+                return existing
+
+            self._resamplers[key] = resampler
+            self.builds += 1
+            while len(self._resamplers) > self.max_entries:
+                self._resamplers.popitem(last=False)
+                self.evictions += 1
+            return resampler
+
+    def resample(self, waveform: torch.Tensor, orig_freq: int, new_freq: int) -> torch.Tensor:
+        """Resample un signal complet avec le noyau mis en cache"""
+        if orig_freq == new_freq:
+            return waveform
+        resampler = self.get(orig_freq, new_freq, waveform.dtype, waveform.device)
+        with metrics.span(STAGE_RESAMPLE):
+            return resampler(waveform)
+
+    def stream(self, orig_freq: int, new_freq: int, dtype: torch.dtype = torch.float32,
+               device="cpu") -> StreamingResampler:
+        """Crée un resampler streaming (à état) partageant le noyau en cache"""
+        return StreamingResampler(self.get(orig_freq, new_freq, dtype, device))
+
+    def stats(self) -> Dict:
+        """Statistiques d'utilisation des noyaux"""
+        with self._lock:
+            total = self.hits + self.builds
+            return {
+                "entries": len(self._resamplers),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "builds": self.builds,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0
+            }
+
+
+class StreamSession:
+    """État streaming d'un client : resampler à état et audio en attente"""
+
+    def __init__(self, resampler: Optional[StreamingResampler]):
+        self.resampler = resampler
+        self.pending: List[bytes] = []
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+
+    @property
+    def has_tail(self) -> bool:
+        """Des échantillons reçus restent dans l'historique du filtre"""
+        return self.resampler is not None and self.resampler._history is not None
+
+    def resample(self, audio: torch.Tensor, final: bool = False) -> torch.Tensor:
+        """
+        Resample un chunk [1, T] ; en fin d'énoncé, ajoute la queue du filtre
+
+        Args:
+            audio: Chunk à la fréquence d'origine
+            final: Dernier chunk de l'énoncé (flush puis reset du resampler)
+        """
+        if self.resampler is None:
+            return audio
+        output = self.resampler.process(audio)
+        if final:
+            tail = self.resampler.flush().reshape(*output.shape[:-1], -1)
+            output = torch.cat([output, tail], dim=-1)
+        return output
+
+
+class StreamSessions:
+    """
+    Sessions streaming indépendantes (une par client ou par énoncé)
+
+    Chaque session garde son propre historique de filtre et son propre
+    verrou : des clients concurrents ne mélangent pas leurs échantillons.
+    Une session est retirée en fin d'énoncé (end) ou après idle_seconds
+    sans requête.
+    """
+
+    def __init__(self, bank: "ResamplerBank", orig_freq: int, new_freq: int,
+                 idle_seconds: float = 30.0):
+        """
+        Args:
+            bank: Banque fournissant le noyau partagé
+            orig_freq: Fréquence du flux reçu
+            new_freq: Fréquence attendue par le modèle
+            idle_seconds: Inactivité au-delà de laquelle une session expire
+        """
+        self.bank = bank
+        self.orig_freq = orig_freq
+        self.new_freq = new_freq
+        self.idle_seconds = idle_seconds
+        self._sessions: Dict[str, StreamSession] = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.expired = 0
+
+    def _expire(self, now: float):
+        for key, session in list(self._sessions.items()):
+            if now - session.last_used > self.idle_seconds and not session.lock.locked():
+                del self._sessions[key]
+                self.expired += 1
+
+    @contextmanager
+    def acquire(self, key: str) -> Iterator[StreamSession]:
+        """Session de ce client, verrouillée pendant le bloc (créée au besoin)"""
+        with self._lock:
+            self._expire(time.monotonic())
+            session = self._sessions.get(key)
+            if session is None:
+                resampler = (self.bank.stream(self.orig_freq, self.new_freq)
+                             if self.orig_freq != self.new_freq else None)
+                session = self._sessions[key] = StreamSession(resampler)
+                self.created += 1
+        with session.lock:
+            session.last_used = time.monotonic()
+            yield session
+
+    def end(self, key: str):
+        """Fin d'énoncé : le prochain chunk de ce client repart d'un état vierge"""
+        with self._lock:
+            self._sessions.pop(key, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"active": len(self._sessions), "created": self.created, "expired": self.expired}
+
+
+# Banque partagée par le processus
+resampler_bank = ResamplerBank()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Politique d'émission LiveLink (delta / keyframe) pour Gala v1
+Le FrameScheduler consulte la politique à chaque tick : une frame dont
+aucun canal n'a bougé de plus d'epsilon depuis le dernier envoi n'est pas
+émise, une keyframe part au moins toutes les keyframe_interval secondes,
+et sans parole la cadence descend à idle_fps. Le récepteur LiveLink Face
+d'Unreal garde la dernière frame reçue : les paquets restent des frames
+complètes, seules les frames redondantes sont supprimées
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+
+from modules.livelink_encoder import BLENDSHAPE_COUNT
+
+
+class SendPolicy:
+    """
+    Décide si la frame d'un tick doit partir sur le réseau
+
+    Les écarts sont mesurés par rapport à la dernière frame envoyée (et non
+    la précédente) : une dérive lente finit toujours par être transmise.
+    """
+
+    def __init__(self, epsilon: float = 1e-3, keyframe_interval: float = 0.5,
+                 idle_fps: float = 10.0, idle_after: float = 0.5):
+        """
+        Args:
+            epsilon: Variation minimale d'un canal pour justifier un envoi
+            keyframe_interval: Intervalle maximal entre deux envois (s)
+            idle_fps: Cadence maximale sans parole (0 = pas de limite)
+            idle_after: Délai sans parole avant de passer à idle_fps (s)
+        """
+        self.epsilon = epsilon
+        self.keyframe_interval = keyframe_interval
+        self.idle_period = 1.0 / idle_fps if idle_fps > 0 else 0.0
+        self.idle_after = idle_after
+
+        self._last_values = np.zeros(BLENDSHAPE_COUNT, dtype=np.float32)
+        self._delta = np.zeros(BLENDSHAPE_COUNT, dtype=np.float32)
+        self._last_sent: Optional[float] = None
+        self._last_active = float("-inf")
+
+        # Statistiques
+        self.sent = 0
+        self.keyframes = 0
+        self.suppressed_unchanged = 0
+        self.suppressed_rate = 0
+
+    def should_send(self, values, now: float, active: bool = False) -> bool:
+        """
+        Args:
+            values: Valeurs [61] de la frame (ou vue sur les valeurs d'un paquet)
+            now: Échéance du tick (time.monotonic)
+            active: True si une frame de parole est émise à ce tick
+
+        Returns:
+            True si la frame doit être envoyée (elle devient la référence)
+        """
+        if active:
+            self._last_active = now
+
+        if self._last_sent is None or now - self._last_sent >= self.keyframe_interval:
+            if self._last_sent is not None:
+                self.keyframes += 1
+            return self._accept(values, now)
+
+        np.subtract(values, self._last_values, out=self._delta)
+        np.abs(self._delta, out=self._delta)
+        if self._delta.max() <= self.epsilon:
+            self.suppressed_unchanged += 1
+            return False
+
+        idle = now - self._last_active > self.idle_after
+        if idle and now - self._last_sent < self.idle_period - 1e-6:
+            self.suppressed_rate += 1
+            return False
+        return self._accept(values, now)
+
+    def _accept(self, values, now: float) -> bool:
+        self._last_values[:] = values
+        self._last_sent = now
+        self.sent += 1
+        return True
+
+    def reset(self):
+        """Force une keyframe au prochain tick (reconnexion, changement de sujet)"""
+        self._last_sent = None
+
+    def stats(self) -> Dict:
+        """Répartition des ticks envoyés / supprimés"""
+        ticks = self.sent + self.suppressed_unchanged + self.suppressed_rate
+        return {
+            "sent": self.sent,
+            "keyframes": self.keyframes,
+            "suppressed_unchanged": self.suppressed_unchanged,
+            "suppressed_rate": self.suppressed_rate,
+            "send_ratio": self.sent / ticks if ticks else 1.0
+        }
+
+
+def create_send_policy(livelink_config) -> Optional[SendPolicy]:
+    """SendPolicy depuis config.LiveLinkConfig (None si delta_send est désactivé)"""
+    if not livelink_config.delta_send:
+        return None
+    return SendPolicy(epsilon=livelink_config.delta_epsilon,
+                      keyframe_interval=livelink_config.keyframe_interval,
+                      idle_fps=livelink_config.idle_fps)
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Démarrage à froid des serveurs Gala v1
+Le chargement du modèle et son préchauffage tournent dans un thread de fond
+pendant que le serveur HTTP écoute déjà : /livez répond dès le lancement,
+/readyz (et le traitement audio) seulement une fois le modèle préchauffé
+sur les tailles de chunk courantes (allocateur, noyaux de resampling,
+autotune cuDNN payés avant le premier énoncé). Les poids sont lus par
+memory-mapping et les imports lourds peuvent être différés
+"""
+
+import importlib.util
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+PHASE_STARTING = "starting"
+PHASE_LOADING = "loading"
+PHASE_WARMUP = "warmup"
+PHASE_READY = "ready"
+PHASE_FAILED = "failed"
+
+# Tailles de chunk (ms, Hz) envoyées par Gala et le Player
+DEFAULT_WARMUP_CHUNKS = ((192, 16000), (200, 48000))
+MODEL_SAMPLE_RATE = 88200
+
+
+def lazy_import(name: str):
+    """
+    Module importé au premier accès à l'un de ses attributs
+
+    Usage (en tête de module, à la place de `import torchaudio`) :
+        torchaudio = lazy_import("torchaudio")
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"Module introuvable: {name}")
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def _process_age() -> Optional[float]:
+    """Secondes écoulées depuis le lancement du processus (Linux, None ailleurs)"""
+    try:
+        with open("/proc/self/stat") as stat_file:
+            start_ticks = int(stat_file.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as uptime_file:
+            uptime = float(uptime_file.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+@contextmanager
+def mmap_weights(enabled: bool = True):
+    """
+    Lecture des checkpoints par memory-mapping pendant le bloc
+
+    Le chargeur de NeuroSync appelle torch.load sans option : les fichiers
+    au format zip sont alors mappés (pages lues à la demande, partagées
+    entre processus) au lieu d'être copiés en mémoire. Les checkpoints au
+    format historique retombent sur la lecture classique.
+    """
+    import torch
+
+    if not enabled:
+        yield
+        return
+
+    original = torch.load
+
+    def load(f, *args, **kwargs):
+        if isinstance(f, (str, os.PathLike)) and "mmap" not in kwargs:
+            try:
+                return original(f, *args, mmap=True, **kwargs)
+            except RuntimeError as e:
+                logger.debug(f"mmap impossible pour {f}: {e}")
+        return original(f, *args, **kwargs)
+
+    torch.load = load
+    try:
+        yield
+    finally:
+        torch.load = original
+
+
+def run_warmup(run: Callable[[bytes, int], object],
+               chunks: Iterable[Tuple[int, int]] = DEFAULT_WARMUP_CHUNKS,
+               iterations: int = 3, sample_rates: Optional[Iterable[int]] = None,
+               target_rate: Optional[int] = MODEL_SAMPLE_RATE, wav: bool = False) -> List[Dict]:
+    """
+    Inférences à blanc sur les tailles de chunk courantes
+
+    Args:
+        run: Traite un chunk audio (PCM int16 mono, ou WAV si wav=True) à la
+             fréquence donnée, comme une requête (sans émission LiveLink ni cache)
+        chunks: Tailles (durée ms, fréquence Hz)
+        iterations: Passes par taille (la première paie l'autotune)
+        sample_rates: Fréquences acceptées par le serveur (toutes si None)
+        target_rate: Fréquence du modèle ; les noyaux de resampling vers elle
+                     sont construits d'avance (None pour ne pas le faire)
+        wav: Passer des fichiers WAV plutôt que du PCM brut
+
+    Returns:
+        Durées (ms) de la première et de la dernière passe par taille
+    """
+    import torch
+    from modules.precision import synthetic_pcm, synthetic_wav
+    from modules.resampler_bank import resampler_bank
+
+    accepted = set(sample_rates) if sample_rates is not None else None
+    results = []
+    for chunk_ms, sample_rate in chunks:
+        if accepted is not None and sample_rate not in accepted:
+            continue
+        if target_rate and sample_rate != target_rate:
+            resampler_bank.get(sample_rate, target_rate)
+        audio = (synthetic_wav if wav else synthetic_pcm)(chunk_ms / 1000, sample_rate)
+        durations = []
+        for _ in range(max(1, iterations)):
+            start = time.perf_counter()
+            run(audio, sample_rate)
+            if torch.cuda.is_available():
+                torch.cuda.synchronize()
+            durations.append((time.perf_counter() - start) * 1000)
+        results.append({"chunk_ms": chunk_ms, "sample_rate": sample_rate,
+                        "first_ms": durations[0], "last_ms": durations[-1]})
+    return results
+
+
+class StartupState:
+    """
+    État de démarrage du processus (vivant, prêt, en échec)
+
+    Usage dans un serveur :
+        startup.start(load_neurosync_model, warmup_model)   # thread de fond
+        app.run(...)                                         # /livez répond déjà
+
+    Les routes de traitement renvoient 503 tant que `ready` est faux.
+    """
+
+    def __init__(self):
+        self.created = time.monotonic()
+        self.imports_s = _process_age()  # Interpréteur + imports avant ce module
+        self.reset()
+
+    def reset(self):
+        self.phase = PHASE_STARTING
+        self.error: Optional[str] = None
+        self.durations: Dict[str, float] = {}
+        self.warmup: List[Dict] = []
+        self.ready_after_s: Optional[float] = None
+        self._ready = threading.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+    @contextmanager
+    def _phase(self, name: str):
+        self.phase = name
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] = time.perf_counter() - start
+
+    def run(self, load: Callable[[], object], warmup: Optional[Callable[[], object]] = None) -> bool:
+        """
+        Charge puis préchauffe (bloquant)
+
+        Args:
+            load: Chargement du modèle (ex: load_neurosync_model)
+            warmup: Préchauffage ; s'il retourne une liste (run_warmup), elle
+                    est exposée dans stats()
+
+        Returns:
+            True si le serveur est prêt, False en cas d'échec (voir `error`)
+        """
+        self.reset()
+        try:
+            with self._phase(PHASE_LOADING):
+                load()
+            if warmup is not None:
+                with self._phase(PHASE_WARMUP):
+                    result = warmup()
+                if isinstance(result, list):
+                    self.warmup = result
+        except Exception as e:
+            self.phase = PHASE_FAILED
+            self.error = str(e)
+            logger.exception("Échec du démarrage")
+            return False
+
+        self.phase = PHASE_READY
+        age = _process_age()
+        self.ready_after_s = age if age is not None else time.monotonic() - self.created
+        self._ready.set()
+        logger.info(f"Prêt en {self.ready_after_s:.1f}s (chargement {self.durations.get(PHASE_LOADING, 0):.1f}s, "
+                    f"préchauffage {self.durations.get(PHASE_WARMUP, 0):.1f}s)")
+        return True
+
+    def start(self, load: Callable[[], object], warmup: Optional[Callable[[], object]] = None) -> threading.Thread:
+        """Lance run() dans un thread de fond et rend la main"""
+        self.reset()
+        thread = threading.Thread(target=self.run, args=(load, warmup), name="Startup", daemon=True)
+        thread.start()
+        return thread
+
+    def not_ready(self) -> Dict:
+        """Corps des réponses 503 pendant le démarrage"""
+        if self.phase == PHASE_FAILED:
+            return {"status": "error", "message": f"Démarrage en échec: {self.error}"}
+        return {"status": "starting", "message": f"Modèle pas encore prêt ({self.phase})"}
+
+    def liveness(self) -> Dict:
+        return {"status": "alive", "phase": self.phase, "uptime_s": time.monotonic() - self.created}
+
+    def stats(self) -> Dict:
+        return {
+            "phase": self.phase,
+            "ready": self.ready,
+            "error": self.error,
+            "imports_s": self.imports_s,
+            "ready_after_s": self.ready_after_s,
+            "durations_s": dict(self.durations),
+            "warmup": list(self.warmup)
+        }
+
+
+# État partagé par le processus
+startup = StartupState()
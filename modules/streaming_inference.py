@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Inférence par fenêtre glissante pour Gala v1
+Remplace le découpage en blocs disjoints de 192 ms : chaque inférence voit
+un contexte passé (look-back), réutilise les features déjà calculées, n'émet
+que les nouvelles frames et fond la zone de recouvrement (crossfade)
+"""
+
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from modules.metrics import metrics, STAGE_FEATURES
+
+
+class SlidingWindowInference:
+    """
+    Pipeline streaming audio -> blendshapes à hop et look-back configurables
+
+    À chaque hop, seules les features du nouvel audio (plus un court contexte
+    d'analyse) sont extraites ; la fenêtre du modèle est la concaténation des
+    features en cache. Les `crossfade_frames` dernières frames de chaque
+    inférence sont retenues puis fondues avec leur nouvelle prédiction, qui
+    dispose de plus de contexte à droite.
+    """
+
+    def __init__(self, extract_features: Callable[[np.ndarray], np.ndarray],
+                 infer: Callable[[np.ndarray], np.ndarray],
+                 sample_rate: int, feature_rate: float,
+                 hop_ms: float = 64, lookback_ms: float = 320,
+                 context_ms: float = 20, output_fps: int = 60,
+                 crossfade_frames: int = 2):
+        """
+        Args:
+            extract_features: audio float32 [samples] -> features [T, D]
+            infer: features [T, D] -> blendshapes [frames, N] couvrant la fenêtre
+            sample_rate: Fréquence de l'audio passé à extract_features
+            feature_rate: Nombre de frames de features par seconde
+            hop_ms: Durée de nouvel audio par inférence
+            lookback_ms: Contexte passé conservé dans la fenêtre du modèle
+            context_ms: Audio précédent ré-analysé pour les features du hop
+            output_fps: Frame rate des blendshapes produits
+            crossfade_frames: Frames retenues et fondues entre deux inférences
+        """
+        self.extract_features = extract_features
+        self.infer = infer
+        self.sample_rate = sample_rate
+        self.feature_rate = feature_rate
+        self.output_fps = output_fps
+        self.crossfade_frames = crossfade_frames
+
+        self.hop_samples = int(round(sample_rate * hop_ms / 1000))
+        self.context_samples = int(round(sample_rate * context_ms / 1000))
+        self.lookback_features = int(round(feature_rate * lookback_ms / 1000))
+
+        self.inferences = 0
+        self.total_infer_time = 0.0
+        self.features_reused = 0
+        self.reset()
+
+    def reset(self):
+        """Réinitialise l'état (nouvelle phrase / interruption)"""
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._context = np.zeros(0, dtype=np.float32)
+        self._features = deque()
+        self._cached_features = 0
+        self._samples_seen = 0
+        self._features_seen = 0
+        self._frames_done = 0
+        self._tail: Optional[np.ndarray] = None
+
+    def _hop_features(self, hop: np.ndarray) -> np.ndarray:
+        """Extrait les features du hop (avec contexte) sans recalculer le passé"""
+        samples_per_feature = self.sample_rate / self.feature_rate
+        history_start = self._samples_seen - len(self._context)
+        self._samples_seen += len(hop)
+        expected = int(self._samples_seen / samples_per_feature)
+
+        # Début de l'analyse aligné sur la grille globale des features
+        first_index = int(np.ceil(max(0, history_start + len(self._context) - self.context_samples)
+                                  / samples_per_feature))
+        first_index = min(first_index, self._features_seen)
+        offset = max(0, int(round(first_index * samples_per_feature)) - history_start)
+
+        audio = np.concatenate([self._context, hop])
+        with metrics.span(STAGE_FEATURES):
+            features = np.asarray(self.extract_features(audio[offset:]))
+
+        keep = self.context_samples + int(np.ceil(samples_per_feature))
+        self._context = audio[-keep:]
+
+        start = self._features_seen - first_index
+        stop = max(start, min(expected - first_index, len(features)))
+        self._features_seen += stop - start
+        return features[start:stop]
+
+    def _window(self, new_features: np.ndarray):
+        """
+        Ajoute les nouvelles features au cache et retourne la fenêtre du modèle
+
+        Returns:
+            Tuple (features [T, D], index global de la première feature)
+        """
+        self.features_reused += self._cached_features
+        self._features.append(new_features)
+        self._cached_features += len(new_features)
+
+        # Garder look-back + hop courant
+        limit = self.lookback_features + len(new_features)
+        while len(self._features) > 1 and self._cached_features - len(self._features[0]) >= limit:
+            self._cached_features -= len(self._features.popleft())
+
+        # Début de fenêtre aligné sur la grille des frames de sortie
+        start_index = max(0, self._features_seen - limit)
+        step = max(1, int(round(self.feature_rate / self.output_fps)))
+        start_index += -start_index % step
+
+        window = np.concatenate(self._features, axis=0)
+        return window[len(window) - (self._features_seen - start_index):], start_index
+
+    def _emit(self, outputs: np.ndarray, start_index: int) -> np.ndarray:
+        """Sélectionne les nouvelles frames et applique le crossfade"""
+        outputs = np.asarray(outputs, dtype=np.float32)
+        frames_per_feature = self.output_fps / self.feature_rate
+
+        # Frames de sortie alignées sur le début de la fenêtre
+        offset = int(round(start_index * frames_per_feature))
+        target = min(int(self._features_seen * frames_per_feature), offset + len(outputs))
+        first = max(self._frames_done, offset)
+        new_frames = outputs[first - offset:max(first, target) - offset]
+        self._frames_done = max(self._frames_done, target)
+
+        parts = []
+
+        # Frames retenues à l'inférence précédente, recalculées avec plus de contexte
+        if self._tail is not None and len(self._tail):
+            overlap = min(len(self._tail), first - offset)
+            if overlap < len(self._tail):
+                parts.append(self._tail[:len(self._tail) - overlap])
+            if overlap:
+                held = self._tail[len(self._tail) - overlap:]
+                recomputed = outputs[first - offset - overlap:first - offset]
+                weights = (np.arange(1, overlap + 1, dtype=np.float32) / (overlap + 1))[:, None]
+                parts.append(held * (1.0 - weights) + recomputed * weights)
+
+        hold = min(self.crossfade_frames, len(new_frames))
+        parts.append(new_frames[:len(new_frames) - hold])
+        self._tail = new_frames[len(new_frames) - hold:].copy()
+
+        return np.concatenate(parts, axis=0)
+
+    def process_hop(self, hop: np.ndarray) -> np.ndarray:
+        """
+        Infère un hop d'audio
+
+        Args:
+            hop: Audio float32 [hop_samples] à sample_rate
+
+        Returns:
+            Nouvelles frames [n, N] prêtes à envoyer
+        """
+        new_features = self._hop_features(np.asarray(hop, dtype=np.float32))
+        window, start_index = self._window(new_features)
+
+        start = time.perf_counter()
+        outputs = self.infer(window)
+        self.total_infer_time += time.perf_counter() - start
+        self.inferences += 1
+
+        return self._emit(outputs, start_index)
+
+    def push(self, audio: np.ndarray) -> np.ndarray:
+        """
+        Ajoute de l'audio et traite tous les hops complets
+
+        Args:
+            audio: Audio float32 [samples] à sample_rate
+
+        Returns:
+            Frames produites [n, N] (éventuellement vide)
+        """
+        self._pending = np.concatenate([self._pending, np.asarray(audio, dtype=np.float32)])
+
+        outputs = []
+        while len(self._pending) >= self.hop_samples:
+            hop = self._pending[:self.hop_samples]
+            self._pending = self._pending[self.hop_samples:]
+            frames = self.process_hop(hop)
+            if len(frames):
+                outputs.append(frames)
+
+        if not outputs:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.concatenate(outputs, axis=0)
+
+    def flush(self) -> np.ndarray:
+        """Traite le hop partiel, émet les frames retenues et réinitialise l'état"""
+        parts = []
+        if len(self._pending):
+            # Dernier hop partiel
+            parts.append(self.process_hop(self._pending))
+            self._pending = self._pending[:0]
+        if self._tail is not None:
+            parts.append(self._tail)
+
+        parts = [part for part in parts if len(part)]
+        self.reset()
+        if not parts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.concatenate(parts, axis=0)
+
+    def stats(self) -> Dict:
+        """Statistiques d'inférence"""
+        return {
+            "inferences": self.inferences,
+            "avg_infer_ms": self.total_infer_time / self.inferences * 1000 if self.inferences else 0.0,
+            "features_reused": self.features_reused,
+            "hop_ms": self.hop_samples / self.sample_rate * 1000,
+            "lookback_features": self.lookback_features
+        }
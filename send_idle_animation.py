@@ -17,121 +17,119 @@ class IdleAnimationSender:
         self.client = livelink_client
         self.running = False
         self.frame_index = 0
-        self.total_frames = 120  # Cycle de 2 secondes à 60 FPS
+        self.total_frames = 120  # Cycle de respiration de 2 secondes à 60 FPS
+        self.cycle_frames = CONFIG["target_fps"] * 60  # Reset après 1 minute
         
-    def create_idle_animation(self) -> list:
+        # Toute la minute d'animation est précalculée une fois : [frames, 68]
+        self.animation_table = self._build_animation_table(np.arange(self.cycle_frames))
+        
+    def create_idle_animation(self) -> np.ndarray:
+        """Frame idle courante (lecture dans la table précalculée)"""
+        return self.animation_table[self.frame_index]
+    
+    def _build_animation_table(self, frame_indices: np.ndarray) -> np.ndarray:
         """
-        Crée une animation idle naturelle avec:
+        Calcule l'animation idle pour tous les index de frame en une passe:
         - Respiration subtile
         - Clignements périodiques
         - Micro-mouvements faciaux
         """
-        blendshapes = [0.0] * 68
+        table = np.zeros((len(frame_indices), 68), dtype=np.float32)
+        i = frame_indices.astype(np.float64)
         
         # Phase de respiration (cycle de 2 secondes)
-        breathing_phase = (self.frame_index / self.total_frames) * 2 * np.pi
+        breathing_phase = (i / self.total_frames) * 2 * np.pi
         
         # Respiration via JawOpen très subtile
-        jaw_breathing = 0.03 * np.sin(breathing_phase)
-        blendshapes[17] = max(0, jaw_breathing)  # JawOpen
+        table[:, 17] = np.maximum(0, 0.03 * np.sin(breathing_phase))  # JawOpen
         
         # Respiration via les narines
-        nose_breathing = 0.02 * np.sin(breathing_phase + np.pi/4)
-        blendshapes[49] = max(0, nose_breathing)  # NoseSneer_L
-        blendshapes[50] = max(0, nose_breathing)  # NoseSneer_R
+        nose_breathing = np.maximum(0, 0.02 * np.sin(breathing_phase + np.pi/4))
+        table[:, 49] = nose_breathing  # NoseSneer_L
+        table[:, 50] = nose_breathing  # NoseSneer_R
         
         # Respiration via la poitrine (CheekPuff peut simuler)
-        chest_breathing = 0.01 * np.sin(breathing_phase)
-        blendshapes[46] = max(0, chest_breathing)  # CheekPuff
+        table[:, 46] = np.maximum(0, 0.01 * np.sin(breathing_phase))  # CheekPuff
         
         # Clignements naturels
-        self._add_blinks(blendshapes)
+        self._add_blinks(table, frame_indices)
         
         # Micro-mouvements des yeux
-        self._add_eye_movements(blendshapes)
+        self._add_eye_movements(table, i)
         
         # Micro-expressions
-        self._add_micro_expressions(blendshapes)
+        self._add_micro_expressions(table, i)
         
         # Mouvements subtils de la tête
-        self._add_head_movements(blendshapes)
+        self._add_head_movements(table, i)
         
-        return blendshapes
+        return table
     
-    def _add_blinks(self, blendshapes: list):
+    def _add_blinks(self, table: np.ndarray, frame_indices: np.ndarray):
         """Ajoute des clignements naturels"""
         # Clignement principal toutes les 3-5 secondes
-        blink_intervals = [180, 240, 300, 360]  # Intervalles variés
-        current_interval = blink_intervals[self.frame_index // 1000 % len(blink_intervals)]
+        blink_intervals = np.array([180, 240, 300, 360])  # Intervalles variés
+        current_interval = blink_intervals[frame_indices // 1000 % len(blink_intervals)]
         
         blink_duration = 6  # ~100ms à 60 FPS
         
-        if (self.frame_index % current_interval) < blink_duration:
-            progress = (self.frame_index % current_interval) / blink_duration
-            # Courbe de clignement naturelle (rapide fermeture, ouverture plus lente)
-            if progress < 0.3:
-                blink_value = progress / 0.3
-            else:
-                blink_value = 1.0 - (progress - 0.3) / 0.7
-            
-            blendshapes[0] = blink_value  # EyeBlink_L
-            blendshapes[1] = blink_value  # EyeBlink_R
+        progress = (frame_indices % current_interval) / blink_duration
+        # Courbe de clignement naturelle (rapide fermeture, ouverture plus lente)
+        blink_value = np.where(progress < 0.3, progress / 0.3, 1.0 - (progress - 0.3) / 0.7)
+        blink_value = np.where(progress < 1.0, blink_value, 0.0)
+        
+        table[:, 0] = blink_value  # EyeBlink_L
+        table[:, 1] = blink_value  # EyeBlink_R
     
-    def _add_eye_movements(self, blendshapes: list):
+    def _add_eye_movements(self, table: np.ndarray, i: np.ndarray):
         """Ajoute des micro-mouvements oculaires"""
         # Saccades subtiles
-        saccade_phase = self.frame_index * 0.01
+        saccade_phase = i * 0.01
         
         # Mouvements horizontaux
         look_h = 0.05 * np.sin(saccade_phase)
-        if look_h > 0:
-            blendshapes[6] = look_h  # EyeLookOut_L
-            blendshapes[5] = look_h  # EyeLookIn_R
-        else:
-            blendshapes[5] = -look_h  # EyeLookIn_L
-            blendshapes[7] = -look_h  # EyeLookOut_R
+        table[:, 6] = np.where(look_h > 0, look_h, 0)  # EyeLookOut_L
+        table[:, 5] = np.abs(look_h)  # EyeLookIn_R / EyeLookIn_L
+        table[:, 7] = np.where(look_h > 0, 0, -look_h)  # EyeLookOut_R
         
         # Mouvements verticaux plus subtils
         look_v = 0.03 * np.sin(saccade_phase * 0.7 + np.pi/3)
-        if look_v > 0:
-            blendshapes[8] = look_v  # EyeLookUp_L
-            blendshapes[9] = look_v  # EyeLookUp_R
-        else:
-            blendshapes[2] = -look_v  # EyeLookDown_L
-            blendshapes[3] = -look_v  # EyeLookDown_R
+        table[:, 8] = np.where(look_v > 0, look_v, 0)  # EyeLookUp_L
+        table[:, 9] = np.where(look_v > 0, look_v, 0)  # EyeLookUp_R
+        table[:, 2] = np.where(look_v > 0, 0, -look_v)  # EyeLookDown_L
+        table[:, 3] = np.where(look_v > 0, 0, -look_v)  # EyeLookDown_R
     
-    def _add_micro_expressions(self, blendshapes: list):
+    def _add_micro_expressions(self, table: np.ndarray, i: np.ndarray):
         """Ajoute des micro-expressions faciales"""
         # Micro-sourire occasionnel
-        smile_phase = self.frame_index * 0.003
-        smile_value = max(0, 0.05 * np.sin(smile_phase) * (1 + 0.5 * np.sin(smile_phase * 0.3)))
+        smile_phase = i * 0.003
+        smile_value = np.maximum(0, 0.05 * np.sin(smile_phase) * (1 + 0.5 * np.sin(smile_phase * 0.3)))
         
-        blendshapes[23] = smile_value  # MouthSmile_L
-        blendshapes[24] = smile_value  # MouthSmile_R
+        table[:, 23] = smile_value  # MouthSmile_L
+        table[:, 24] = smile_value  # MouthSmile_R
         
         # Légère tension des sourcils (concentration)
-        brow_phase = self.frame_index * 0.002
-        brow_inner = 0.02 * np.sin(brow_phase)
-        blendshapes[44] = max(0, brow_inner)  # BrowInnerUp
+        brow_phase = i * 0.002
+        table[:, 44] = np.maximum(0, 0.02 * np.sin(brow_phase))  # BrowInnerUp
         
         # Léger plissement des yeux (squint)
-        squint_value = 0.01 * np.sin(brow_phase + np.pi/2)
-        blendshapes[10] = max(0, squint_value)  # EyeSquint_L
-        blendshapes[11] = max(0, squint_value)  # EyeSquint_R
+        squint_value = np.maximum(0, 0.01 * np.sin(brow_phase + np.pi/2))
+        table[:, 10] = squint_value  # EyeSquint_L
+        table[:, 11] = squint_value  # EyeSquint_R
     
-    def _add_head_movements(self, blendshapes: list):
+    def _add_head_movements(self, table: np.ndarray, i: np.ndarray):
         """Ajoute des mouvements subtils de la tête"""
         # Oscillation très légère
-        head_phase = self.frame_index * 0.001
+        head_phase = i * 0.001
         
         # Rotation horizontale (yaw)
-        blendshapes[52] = 0.02 * np.sin(head_phase)  # HeadYaw
+        table[:, 52] = 0.02 * np.sin(head_phase)  # HeadYaw
         
         # Inclinaison verticale (pitch)
-        blendshapes[53] = 0.015 * np.sin(head_phase * 0.8 + np.pi/4)  # HeadPitch
+        table[:, 53] = 0.015 * np.sin(head_phase * 0.8 + np.pi/4)  # HeadPitch
         
         # Roulis latéral (roll)
-        blendshapes[54] = 0.01 * np.sin(head_phase * 0.6 + np.pi/2)  # HeadRoll
+        table[:, 54] = 0.01 * np.sin(head_phase * 0.6 + np.pi/2)  # HeadRoll
     
     async def start(self):
         """Démarre l'envoi de l'animation idle"""
@@ -147,7 +145,7 @@ class IdleAnimationSender:
                 
                 # Créer et envoyer les blendshapes
                 blendshapes = self.create_idle_animation()
-                await self.client.send_blendshapes(blendshapes)
+                await self.client.send_blendshapes(blendshapes.tolist())
                 
                 # Debug toutes les secondes
                 if self.frame_index % CONFIG["target_fps"] == 0:
@@ -157,7 +155,7 @@ class IdleAnimationSender:
                     print(f"  Sourire (MouthSmile_L): {blendshapes[23]:.3f}")
                 
                 # Incrémenter l'index
-                self.frame_index = (self.frame_index + 1) % (CONFIG["target_fps"] * 60)  # Reset après 1 minute
+                self.frame_index = (self.frame_index + 1) % self.cycle_frames  # Reset après 1 minute
                 
                 # Maintenir le FPS
                 elapsed = time.time() - start_time
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test du client HTTP persistant vers l'API d'animation
+Vérifie la réutilisation des connexions, la reprise sur 503 (jamais après un
+POST peut-être reçu) et la borne en vol
+"""
+
+import asyncio
+
+from aiohttp import web
+
+from modules.animation_client import AnimationClient
+
+
+PORT = 16971
+
+
+async def start_server(handler):
+    app = web.Application()
+    app.router.add_route("*", "/{path:.*}", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", PORT).start()
+    return runner
+
+
+async def check_keepalive():
+    peers = set()
+
+    async def handler(request):
+        peers.add(request.transport.get_extra_info("peername"))
+        body = await request.read()
+        return web.json_response({"blendshapes": [0.0] * 68, "size": len(body)})
+
+    runner = await start_server(handler)
+    client = AnimationClient(f"http://127.0.0.1:{PORT}")
+    try:
+        for _ in range(10):
+            result = await client.post("/audio_to_blendshapes", b"\x00" * 6144, "audio/pcm")
+            assert result["size"] == 6144
+    finally:
+        await client.close()
+        await runner.cleanup()
+    return peers, client.stats()
+
+
+async def check_retry():
+    calls = {"flaky": 0, "bad": 0, "slow": 0}
+
+    async def handler(request):
+        name = request.match_info["path"]
+        calls[name] += 1
+        if name == "flaky" and calls[name] < 3:
+            return web.Response(status=503)
+        if name == "bad":
+            return web.Response(status=400)
+        if name == "slow" and calls[name] < 2:
+            await request.read()  # Chunk reçu, réponse trop tardive
+            await asyncio.sleep(0.5)
+        return web.json_response({"ok": True})
+
+    runner = await start_server(handler)
+    client = AnimationClient(f"http://127.0.0.1:{PORT}", retries=3, backoff_base=0.001, timeout=0.2)
+    try:
+        flaky = await client.post("/flaky", b"x")
+        bad = await client.post("/bad", b"x")
+        slow_post = await client.post("/slow", b"x")
+        slow_get = await client.get("/slow")
+    finally:
+        await client.close()
+        await runner.cleanup()
+    unreachable = AnimationClient("http://127.0.0.1:1", retries=2, backoff_base=0.001)
+    try:
+        refused = await unreachable.post("/audio_to_blendshapes", b"x")
+    finally:
+        await unreachable.close()
+    return flaky, bad, (slow_post, slow_get, refused), calls, client.stats(), unreachable.stats()
+
+
+async def check_in_flight():
+    active = {"now": 0, "max": 0}
+
+    async def handler(request):
+        active["now"] += 1
+        active["max"] = max(active["max"], active["now"])
+        await asyncio.sleep(0.05)
+        active["now"] -= 1
+        return web.json_response({"ok": True})
+
+    runner = await start_server(handler)
+    client = AnimationClient(f"http://127.0.0.1:{PORT}", max_in_flight=2)
+    try:
+        results = await asyncio.gather(*(client.post("/slow", b"x") for _ in range(8)))
+    finally:
+        await client.close()
+        await runner.cleanup()
+    return results, active["max"]
+
+
+def test_keepalive_reuses_connection():
+    """Dix buffers successifs passent par la même connexion TCP"""
+    print("=== Test keep-alive ===")
+    peers, stats = asyncio.run(check_keepalive())
+    assert len(peers) == 1
+    assert stats["requests"] == 10 and stats["failures"] == 0
+    print(f"✓ 10 requêtes sur {len(peers)} connexion, {stats['avg_latency_ms']:.2f} ms en moyenne")
+
+
+def test_retry_on_temporary_errors():
+    """503 et connexion refusée sont retentés ; 400 et timeout d'un POST ne le sont pas"""
+    print("\n=== Test reprise ===")
+    flaky, bad, (slow_post, slow_get, refused), calls, stats, unreachable = asyncio.run(check_retry())
+    assert flaky == {"ok": True} and calls["flaky"] == 3
+    assert bad is None and calls["bad"] == 1
+    # Timeout : le POST n'est pas renvoyé (chunk déjà reçu), le GET l'est
+    assert slow_post is None and slow_get == {"ok": True} and calls["slow"] == 2
+    assert stats["retried"] == 2 and stats["failures"] == 2
+    assert refused is None and unreachable["retried"] == 2
+    print("✓ 503 x2 puis succès, 400 et POST en timeout sans reprise, connexion refusée retentée")
+
+
+def test_in_flight_bound():
+    """Le nombre de requêtes simultanées reste borné"""
+    print("\n=== Test borne en vol ===")
+    results, peak = asyncio.run(check_in_flight())
+    assert all(result == {"ok": True} for result in results)
+    assert peak <= 2
+    print(f"✓ 8 requêtes, au plus {peak} en vol")
+
+
+def main():
+    test_keepalive_reuses_connection()
+    test_retry_on_temporary_errors()
+    test_in_flight_bound()
+    print("\n✅ Tous les tests passés")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test de la file d'animation en arrière-plan
+Vérifie que submit() ne bloque pas, la borne de la file et l'annulation
+"""
+
+import asyncio
+import time
+
+from modules.animation_queue import AnimationQueue
+
+
+async def check_non_blocking():
+    done = []
+
+    async def handler(audio, pts):
+        await asyncio.sleep(0.05)  # Aller-retour API simulé
+        done.append(pts)
+
+    queue = AnimationQueue(handler, max_depth=8)
+    start = time.perf_counter()
+    for i in range(4):
+        queue.submit(b"\x00" * 6144, float(i))
+    submit_time = time.perf_counter() - start
+
+    await asyncio.sleep(0.3)
+    await queue.close()
+    return submit_time, done, queue.stats()
+
+
+async def check_bounded_depth():
+    done = []
+    release = asyncio.Event()
+
+    async def handler(audio, pts):
+        await release.wait()
+        done.append(pts)
+
+    queue = AnimationQueue(handler, max_depth=2)
+    queue.submit(b"a", 0.0)
+    await asyncio.sleep(0)  # Le premier buffer est pris en charge
+    accepted = [queue.submit(b"x", float(i)) for i in range(1, 5)]
+    release.set()
+    await asyncio.sleep(0.05)
+    await queue.close()
+    return accepted, done, queue.stats()
+
+
+async def check_cancel():
+    done = []
+
+    async def handler(audio, pts):
+        await asyncio.sleep(0.1)
+        done.append(pts)
+
+    queue = AnimationQueue(handler, max_depth=8)
+    for i in range(3):
+        queue.submit(b"x", float(i))
+    await asyncio.sleep(0.02)
+    cancelled = queue.cancel()
+
+    # La file reste utilisable après l'interruption
+    queue.submit(b"x", 10.0)
+    await asyncio.sleep(0.2)
+    await queue.close()
+    return cancelled, done
+
+
+def test_submit_does_not_block():
+    """Déposer un buffer ne coûte rien, le traitement se fait en fond et dans l'ordre"""
+    print("=== Test non bloquant ===")
+    submit_time, done, stats = asyncio.run(check_non_blocking())
+    assert submit_time < 0.01
+    assert done == [0.0, 1.0, 2.0, 3.0]
+    assert stats["processed"] == 4
+    print(f"✓ 4 buffers déposés en {submit_time * 1000:.3f} ms, traités en fond")
+
+
+def test_bounded_depth_drops_oldest():
+    """File pleine : le plus ancien buffer en attente est abandonné"""
+    print("\n=== Test file bornée ===")
+    accepted, done, stats = asyncio.run(check_bounded_depth())
+    assert accepted == [True, True, False, False]
+    assert done == [0.0, 3.0, 4.0]
+    assert stats["dropped"] == 2
+    print(f"✓ {stats['dropped']} buffers anciens abandonnés, traités: {done}")
+
+
+def test_cancel_on_interruption():
+    """cancel() vide la file et annule le buffer en cours"""
+    print("\n=== Test interruption ===")
+    cancelled, done = asyncio.run(check_cancel())
+    assert cancelled == 3
+    assert done == [10.0]
+    print(f"✓ {cancelled} buffers annulés, seul le buffer post-interruption est traité")
+
+
+def main():
+    test_submit_does_not_block()
+    test_bounded_depth_drops_oldest()
+    test_cancel_on_interruption()
+    print("\n✅ Tous les tests passés")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test de l'ingestion audio WebSocket
+Vérifie le format binaire et un aller-retour complet en local
+"""
+
+import asyncio
+import time
+
+import numpy as np
+import websockets
+
+from modules.audio_stream import (
+    AudioStreamServer,
+    pack_audio_frame,
+    unpack_audio_frame,
+    pack_blendshape_frame,
+    unpack_blendshape_frame,
+    FLAG_FLUSH,
+    FLAG_SUBSCRIBE,
+)
+
+
+def test_frame_format():
+    """En-têtes audio et blendshapes compacts et réversibles"""
+    print("=== Test format binaire ===")
+    pcm = np.arange(512, dtype=np.int16).tobytes()
+    message = pack_audio_frame(7, pcm, 16000, FLAG_FLUSH)
+
+    sequence, sample_rate, flags, payload = unpack_audio_frame(message)
+    assert (sequence, sample_rate, flags) == (7, 16000, FLAG_FLUSH)
+    assert bytes(payload) == pcm
+    assert len(message) == len(pcm) + 12
+
+    frames = np.random.rand(12, 61).astype(np.float32)
+    sequence, _, decoded = unpack_blendshape_frame(pack_blendshape_frame(3, frames))
+    assert sequence == 3 and decoded.shape == (12, 61)
+    assert np.allclose(decoded, frames, atol=1e-3)
+    print(f"✓ En-tête audio 12 octets, 12 frames en {12 * 61 * 2} octets float16")
+
+
+def test_roundtrip():
+    """Chunks reçus dans l'ordre, flush transmis, blendshapes renvoyés"""
+    print("=== Test aller-retour WebSocket ===")
+    received = []
+    flushes = []
+    server = AudioStreamServer(lambda pcm, rate: received.append(bytes(pcm)),
+                               on_flush=lambda: flushes.append(True),
+                               host="127.0.0.1", port=16970)
+    server.start()
+
+    async def client():
+        async with websockets.connect("ws://127.0.0.1:16970") as websocket:
+            for sequence in range(5):
+                flags = FLAG_SUBSCRIBE | (FLAG_FLUSH if sequence == 4 else 0)
+                await websocket.send(pack_audio_frame(sequence, b"\x01\x00" * 512, 16000, flags))
+            await asyncio.sleep(0.1)
+            server.publish(np.full((4, 61), 0.5, dtype=np.float32))
+            message = await asyncio.wait_for(websocket.recv(), timeout=2.0)
+            return unpack_blendshape_frame(message)[2]
+
+    start = time.perf_counter()
+    frames = asyncio.run(client())
+    elapsed = time.perf_counter() - start
+    stats = server.stats()
+    server.stop()
+
+    assert len(received) == 5 and flushes == [True]
+    assert stats["sequence_gaps"] == 0
+    assert frames.shape == (4, 61) and np.all(frames == 0.5)
+    print(f"✓ 5 chunks + blendshapes en {elapsed * 1000:.1f} ms, stats: {stats}")
+
+
+def main():
+    test_frame_format()
+    test_roundtrip()
+    print("\n✅ Tous les tests passés")
+
+
+if __name__ == "__main__":
+    main()
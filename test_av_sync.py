@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test de la synchronisation audio / animation par timestamps de présentation
+Vérifie l'horodatage des chunks, le timecode LiveLink des paquets et le skew
+"""
+
+import socket
+import struct
+import time
+
+import numpy as np
+
+from modules.av_sync import AudioTimeline, PresentationClock
+from modules.frame_scheduler import FrameScheduler
+from modules.livelink_encoder import LiveLinkEncoder, BLENDSHAPE_COUNT
+from modules.pcm_ring_buffer import PCMRingBuffer
+
+
+SAMPLE_RATE = 16000
+CHUNK = 640  # 20 ms de PCM 16 bits
+
+
+def test_timeline_contiguous_and_underrun():
+    """Les chunks s'enchaînent tant que la lecture n'est pas à vide"""
+    print("=== Test timeline audio ===")
+    timeline = AudioTimeline(SAMPLE_RATE)
+    first = timeline.stamp(0, CHUNK, now=10.0)
+    second = timeline.stamp(CHUNK, CHUNK, now=10.005)  # Arrive pendant la lecture du premier
+    late = timeline.stamp(2 * CHUNK, CHUNK, now=11.0)  # Sortie audio à vide
+
+    assert first == 10.0
+    assert abs(second - 10.02) < 1e-9
+    assert late == 11.0 and timeline.underruns == 1
+    assert abs(timeline.pts_at(CHUNK + 320) - 10.03) < 1e-9
+    assert timeline.pts_at(-1) is None
+    print(f"✓ pts: {first:.3f}, {second:.3f}, réancré à {late:.3f} après un trou")
+
+
+def test_ring_buffer_stamps_writes():
+    """Le ring buffer horodate chaque écriture, retrouvée à la position de lecture"""
+    print("\n=== Test horodatage du ring buffer ===")
+    buffer = PCMRingBuffer(capacity=SAMPLE_RATE * 2, window=4 * CHUNK)
+    timeline = AudioTimeline(SAMPLE_RATE)
+    buffer.on_write = timeline.stamp
+
+    start = time.monotonic()
+    for _ in range(4):
+        buffer.write(b"\x00" * CHUNK)
+    buffer.consume(2 * CHUNK)
+    pts = timeline.pts_at(buffer.position)
+    assert abs(pts - start - 0.04) < 0.01
+
+    # Flush puis nouvelle phrase : les positions réécrites reprennent à maintenant
+    buffer.clear()
+    restart = time.monotonic()
+    buffer.write(b"\x00" * CHUNK)
+    assert timeline.pts_at(buffer.position) >= restart
+    print(f"✓ pts de la fenêtre: +{(pts - start) * 1000:.1f} ms, réancré après flush")
+
+
+def test_scheduler_timecode_and_skew():
+    """Chaque paquet porte le timecode LiveLink de l'instant prévu de sa frame"""
+    print("\n=== Test timecode et skew ===")
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    receiver.settimeout(1.0)
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sender.connect(receiver.getsockname())
+
+    clock = PresentationClock()
+    encoder = LiveLinkEncoder("uuid-test", "GalaFace", fps=60)
+    scheduler = FrameScheduler(sender, encoder, fps=60, clock=clock)
+    scheduler.start()
+
+    pts = time.monotonic() + 0.05
+    frames = np.zeros((6, BLENDSHAPE_COUNT), dtype=np.float32)
+    scheduler.submit(frames, start_time=pts)
+
+    packets = [receiver.recv(1024) for _ in range(6)]
+    scheduler.stop()
+    sender.close()
+    receiver.close()
+
+    offset = encoder.frame_time_offset
+    frame_numbers = [struct.unpack_from("!i", packet, offset)[0] for packet in packets]
+    expected = int(clock.livelink_seconds(pts) * 60)
+    assert abs(frame_numbers[0] - expected) <= 1
+    assert np.all(np.diff(frame_numbers) == 1)
+
+    skew = scheduler.stats()["av_skew_ms"]
+    assert skew["samples"] == 6 and skew["max_abs"] < 10
+    print(f"✓ Frames LiveLink {frame_numbers[0]}..{frame_numbers[-1]}, skew p95 {skew['p95']:.2f} ms")
+
+
+def main():
+    test_timeline_contiguous_and_underrun()
+    test_ring_buffer_stamps_writes()
+    test_scheduler_timecode_and_skew()
+    print("\n✅ Tous les tests passés")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Test du micro-batching de l'inférence
+Vérifie le regroupement des requêtes concurrentes et la redistribution des résultats
+"""
+
+import threading
+import time
+
+import torch
+
+from modules.batch_scheduler import BatchedModel, MicroBatcher
+
+
+class DummyModel(torch.nn.Module):
+    """Modèle encoder/decoder minimal qui compte ses forward passes"""
+
+    def __init__(self):
+        super().__init__()
+        self.encoder = torch.nn.Linear(16, 32)
+        self.decoder = torch.nn.Linear(32, 68)
+        self.calls = 0
+
+    def forward(self, x):
+        self.calls += 1
+        return self.decoder(self.encoder(x))
+
+
+def run_concurrently(fn, inputs):
+    """Appelle fn(x) depuis un thread par entrée, retourne les résultats dans l'ordre"""
+    results = [None] * len(inputs)
+    barrier = threading.Barrier(len(inputs))
+
+    def worker(index):
+        barrier.wait()
+        results[index] = fn(inputs[index])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(inputs))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_micro_batcher_groups_requests():
+    """Les requêtes simultanées partent dans un seul lot"""
+    print("=== Test regroupement ===")
+    batches = []
+
+    def batch_fn(items):
+        batches.append(len(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=8, max_wait_ms=50)
+    results = run_concurrently(batcher, list(range(6)))
+    batcher.stop()
+
+    assert results == [0, 2, 4, 6, 8, 10]
+    assert max(batches) > 1
+    print(f"✓ 6 requêtes en {len(batches)} lot(s) {batches}")
+
+
+def test_max_batch_size_and_errors():
+    """La taille de lot est bornée et les erreurs remontent à chaque appelant"""
+    print("\n=== Test taille max / erreurs ===")
+    batcher = MicroBatcher(lambda items: [item + 1 for item in items], max_batch_size=3, max_wait_ms=50)
+    results = run_concurrently(batcher, list(range(7)))
+    stats = batcher.stats()
+    batcher.stop()
+    assert results == list(range(1, 8))
+    assert stats["max_batch_size"] <= 3
+
+    def failing(items):
+        raise RuntimeError("boom")
+
+    for batch_fn in (failing, lambda items: items[:-1]):
+        batcher = MicroBatcher(batch_fn, max_wait_ms=1)
+        try:
+            batcher.submit(1).result(timeout=2)
+            raise AssertionError("exception attendue")
+        except RuntimeError:
+            pass
+        batcher.stop()
+    print(f"✓ Lots de {stats['max_batch_size']} max, exception propagée (y compris résultat manquant)")
+
+
+def test_single_producer_not_delayed():
+    """Un producteur seul n'attend pas la fenêtre de regroupement"""
+    print("\n=== Test producteur unique ===")
+    batcher = MicroBatcher(lambda items: items, max_wait_ms=200)
+    start = time.perf_counter()
+    results = [batcher(index) for index in range(10)]
+    elapsed = time.perf_counter() - start
+    stats = batcher.stats()
+    batcher.stop()
+    assert results == list(range(10))
+    assert elapsed < 0.2, elapsed  # 10 x 200 ms si chaque lot attendait l'échéance
+    assert stats["immediate_batches"] == 10
+    print(f"✓ 10 appels séquentiels en {elapsed * 1000:.1f} ms (fenêtre 200 ms)")
+
+
+def test_batched_model_matches_model():
+    """Le proxy donne les mêmes sorties que le modèle seul, en moins de passes"""
+    print("\n=== Test BatchedModel ===")
+    torch.manual_seed(0)
+    model = DummyModel().eval()
+    batched = BatchedModel(model, max_batch_size=8, max_wait_ms=50)
+
+    # Fenêtres de tailles différentes : seules les formes identiques sont regroupées
+    inputs = [torch.randn(1, 128, 16) for _ in range(5)] + [torch.randn(1, 40, 16)]
+
+    def encode_decode(x):
+        encoded = batched.encoder(x)
+        return encoded, batched.decoder(encoded)
+
+    outputs = run_concurrently(encode_decode, inputs)
+    forwards = run_concurrently(batched, inputs)
+
+    with torch.no_grad():
+        for x, (encoded, decoded), forward in zip(inputs, outputs, forwards):
+            # encoder() seul retourne bien la sortie de l'encoder
+            expected_encoded = model.encoder(x)
+            expected = model.decoder(expected_encoded)
+            assert encoded.shape == expected_encoded.shape
+            assert torch.allclose(encoded, expected_encoded, atol=1e-5)
+            assert decoded.shape == expected.shape
+            assert torch.allclose(decoded, expected, atol=1e-5)
+            assert torch.allclose(forward, expected, atol=1e-5)
+
+    stats = batched.stats()
+    batched.stop()
+    assert stats["encoder"]["items"] == stats["decoder"]["items"] == 6
+    assert stats["encoder"]["batches"] < 6 and stats["decoder"]["batches"] < 6
+    assert model.calls < 6
+    assert not batched.training
+    print(f"✓ 6 fenêtres en {stats['encoder']['batches']} passe(s) encoder, "
+          f"{stats['decoder']['batches']} decoder, {model.calls} forward")
+
+
+def main():
+    test_micro_batcher_groups_requests()
+    test_max_batch_size_and_errors()
+    test_single_producer_not_delayed()
+    test_batched_model_matches_model()
+    print("\n✅ Tous les tests passés")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Test du remapping vectorisé ARKit -> LiveLink
+Compare avec les boucles Python d'origine des serveurs api_*
+"""
+
+import time
+
+import numpy as np
+
+from modules.blendshape_remap import (
+    create_direct_remapper,
+    create_neurosync_remapper,
+    neurosync_mapping,
+)
+
+
+def loop_remap_direct(blendshapes):
+    """Boucle d'origine de send_to_livelink_fast (reset + seuil + clamp)"""
+    values = [0.0] * 61
+    for i in range(min(52, len(blendshapes))):
+        value = blendshapes[i]
+        if value > 0.001:
+            values[i] = max(0.0, min(1.0, value))
+    return values
+
+
+def test_direct_remap_matches_loop():
+    """Le remapping des serveurs doit être identique à la boucle"""
+    print("=== Test remapping direct (serveurs api_*) ===")
+    remapper = create_direct_remapper()
+    block = np.random.uniform(-0.2, 1.3, (120, 68)).astype(np.float32)
+
+    frames = remapper.remap(block)
+    assert frames.shape == (120, 61)
+
+    for i in range(len(block)):
+        assert np.allclose(frames[i], loop_remap_direct(block[i].tolist()))
+    print("✓ 120 frames identiques")
+
+
+def test_neurosync_remap_inverts_eye_open():
+    """EyeOpenLeft/Right (56-57) doivent être inversés vers EyeBlink (0, 7)"""
+    print("=== Test inversion EyeOpen ===")
+    remapper = create_neurosync_remapper()
+    frame = np.zeros(68, dtype=np.float32)
+    frame[56] = 0.8  # EyeOpenLeft
+    frame[57] = 1.0  # EyeOpenRight
+    frame[59] = 0.4  # BrowLeftUp -> BrowOuterUpLeft
+
+    values = remapper.remap_frame(frame)
+
+    assert abs(values[0] - 0.2) < 1e-6
+    assert values[7] == 0.0
+    assert abs(values[44] - 0.4) < 1e-6
+    assert neurosync_mapping()[56] == 0
+    print("✓ EyeBlink = 1 - EyeOpen")
+
+
+def test_scaling():
+    """Les facteurs d'échelle s'appliquent par zone"""
+    print("=== Test facteurs d'échelle ===")
+    remapper = create_direct_remapper(scaling_mouth=0.5, scaling_eyes=2.0)
+    frame = np.full(68, 0.4, dtype=np.float32)
+
+    values = remapper.remap_frame(frame)
+
+    assert abs(values[17] - 0.4) < 1e-6   # JawOpen : pas d'échelle
+    assert abs(values[23] - 0.2) < 1e-6   # MouthSmileLeft : bouche
+    assert abs(values[0] - 0.8) < 1e-6    # EyeBlinkLeft : yeux
+    print("✓ Échelles bouche/yeux appliquées")
+
+
+def test_remap_speed():
+    """Comparaison indicative boucle vs vectorisé"""
+    print("=== Test performance ===")
+    remapper = create_direct_remapper()
+    block = np.random.rand(600, 68).astype(np.float32)
+
+    start = time.perf_counter()
+    for frame in block.tolist():
+        loop_remap_direct(frame)
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    remapper.remap(block)
+    vector_time = time.perf_counter() - start
+
+    print(f"Boucle: {loop_time * 1000:.2f} ms, vectorisé: {vector_time * 1000:.2f} ms (600 frames)")
+
+
+def main():
+    test_direct_remap_matches_loop()
+    test_neurosync_remap_inverts_eye_open()
+    test_scaling()
+    test_remap_speed()
+    print("\n✅ Tous les tests passés")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test du puits de debug asynchrone
+Vérifie l'échantillonnage, l'abandon sous pression, la rotation et les blobs
+"""
+
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from modules.debug_sink import DebugSink, KIND_FRAMES
+
+
+def read_entries(directory, name="debug"):
+    entries = []
+    for path in sorted(Path(directory).glob(f"{name}.jsonl*")):
+        entries += [json.loads(line) for line in path.read_text().splitlines()]
+    return entries
+
+
+def test_sampling_and_blobs():
+    """Échantillonnage par type, numpy sérialisé et blobs relisibles"""
+    print("=== Test échantillonnage / blobs ===")
+    directory = tempfile.mkdtemp()
+    sink = DebugSink(directory, sample_rates={"frame": 0.25, KIND_FRAMES: 0.1})
+
+    accepted = sum(sink.record("frame", {"index": i, "values": np.arange(3, dtype=np.float32)})
+                   for i in range(100))
+    # record_frames suit le taux de son type ; les graphiques gardent toutes les frames
+    kept = sum(sink.record_frames(np.zeros((2, 61), dtype=np.float32)) for _ in range(20))
+    assert kept == 2 and len(sink.recent_frames()) == 40
+    sink.record("audio", {"request_id": "r1"}, blob=b"\x01\x02" * 500)
+    sink.record("error", {"error": "boom"}, force=True)
+    sink.close()
+
+    entries = read_entries(directory)
+    assert accepted == 25 and sink.sampled_out == 75 + 18
+    assert len(entries) == 29 and entries[0]["values"] == [0.0, 1.0, 2.0]
+
+    audio = next(entry for entry in entries if entry["kind"] == "audio")
+    with open(Path(directory) / audio["blob"]["file"], "rb") as f:
+        f.seek(audio["blob"]["offset"])
+        assert f.read(audio["blob"]["length"]) == b"\x01\x02" * 500
+    print(f"✓ {accepted}/100 frames gardées, blob audio de {audio['blob']['length']} octets relu")
+
+
+def test_never_blocks_under_pressure():
+    """Une rafale ne bloque pas l'appelant : le surplus est abandonné"""
+    print("\n=== Test pression ===")
+    sink = DebugSink(tempfile.mkdtemp(), max_queue=64)
+    payload = {"frames": np.random.rand(60, 61).astype(np.float32)}
+
+    worst = 0.0
+    for _ in range(5000):
+        start = time.perf_counter()
+        sink.record("frame", payload)
+        worst = max(worst, time.perf_counter() - start)
+    sink.close()
+
+    stats = sink.stats()
+    assert stats["dropped"] > 0 and stats["accepted"] + stats["dropped"] == 5000
+    assert stats["written"] == stats["accepted"]
+    assert worst < 0.05
+    print(f"✓ {stats['written']} écrits, {stats['dropped']} abandonnés, pire appel {worst * 1e6:.0f} µs")
+
+
+def test_rotation_and_lazy_plots():
+    """Les journaux tournent à max_bytes ; aucun import de tracé hors rapport"""
+    print("\n=== Test rotation / rapport ===")
+    directory = tempfile.mkdtemp()
+    sink = DebugSink(directory, max_bytes=20000, backups=2)
+    for index in range(50):
+        sink.record_frames(np.full((4, 61), index / 50, dtype=np.float32), f"req{index}")
+    sink.close()
+
+    files = sorted(path.name for path in Path(directory).glob("debug.jsonl*"))
+    assert files == ["debug.jsonl", "debug.jsonl.1", "debug.jsonl.2"]
+    assert sink.recent_frames().shape == (200, 61)
+    assert "matplotlib" not in sys.modules and "plotly" not in sys.modules
+
+    try:
+        import matplotlib  # noqa: F401
+    except ImportError:
+        print(f"✓ {sink.stats()['rotations']} rotations, 3 fichiers (matplotlib absent : rendu non testé)")
+        return
+    outputs = sink.render_report([f"ch{i}" for i in range(61)], html=False)
+    assert Path(outputs["png"]).exists()
+    print(f"✓ {sink.stats()['rotations']} rotations, rapport {outputs['png']}")
+
+
+def main():
+    test_sampling_and_blobs()
+    test_never_blocks_under_pressure()
+    test_rotation_and_lazy_plots()
+    print("\n✅ Tous les tests passés")
+
+
+if __name__ == "__main__":
+    main()
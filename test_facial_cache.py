@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test du cache de blendshapes par contenu audio
+Vérifie les hits mémoire/disque, l'éviction LRU et l'invalidation par version
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+from modules.facial_cache import FacialCache, model_version
+
+
+def fake_inference(audio_bytes):
+    """Inférence factice déterministe : [frames, 68] dépendant du contenu"""
+    rng = np.random.default_rng(len(audio_bytes))
+    return rng.random((len(audio_bytes) // 100, 68), dtype=np.float32)
+
+
+def test_memory_hits():
+    """Un audio répété est servi depuis la mémoire sans recalcul"""
+    print("=== Test hits mémoire ===")
+    cache = FacialCache(version="v1")
+    audio = b"\x01\x02" * 8000
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return fake_inference(audio)
+
+    first = cache.get_or_compute(audio, compute)
+    second = cache.get_or_compute(audio, compute)
+
+    assert len(calls) == 1
+    assert second.dtype == np.float32
+    assert np.allclose(first, second, atol=1e-3)  # stockage float16
+    stats = cache.stats()
+    assert stats["memory_hits"] == 1 and stats["misses"] == 1
+    print(f"✓ hit_rate {stats['hit_rate']:.2f}, {stats['memory_bytes']} octets")
+
+
+def test_lru_eviction():
+    """Le niveau mémoire respecte son budget"""
+    print("\n=== Test éviction LRU ===")
+    entry_bytes = 100 * 68 * 2
+    cache = FacialCache(max_memory_bytes=entry_bytes * 3)
+    for i in range(5):
+        cache.put(cache.key(bytes([i]) * 10), np.zeros((100, 68), dtype=np.float32))
+
+    stats = cache.stats()
+    assert stats["entries"] == 3
+    assert stats["evictions"] == 2
+    assert cache.get(cache.key(bytes([0]) * 10)) is None
+    assert cache.get(cache.key(bytes([4]) * 10)) is not None
+    print(f"✓ {stats['entries']} entrées gardées, {stats['evictions']} évincées")
+
+
+def test_disk_tier_and_version():
+    """Le niveau disque survit au redémarrage, reste sous son budget ; une nouvelle version invalide"""
+    print("\n=== Test niveau disque ===")
+    audio = b"\x00\x10" * 16000
+    expected = fake_inference(audio)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = FacialCache(version="v1", cache_dir=cache_dir)
+        cache.get_or_compute(audio, lambda: expected)
+        cache.flush()
+
+        # Nouveau processus : mémoire vide, le disque répond
+        restarted = FacialCache(version="v1", cache_dir=cache_dir)
+        frames = restarted.get(restarted.key(audio))
+        assert frames is not None
+        assert np.allclose(frames, expected, atol=1e-3)
+        assert restarted.stats()["disk_hits"] == 1
+
+        # Promu en mémoire au premier accès
+        restarted.get(restarted.key(audio))
+        assert restarted.stats()["memory_hits"] == 1
+
+        other = FacialCache(version="v2", cache_dir=cache_dir)
+        assert other.get(other.key(audio)) is None
+
+        # Budget disque de 3 entrées : les plus anciennes sont supprimées
+        entry_bytes = os.path.getsize(os.path.join(cache_dir, os.listdir(cache_dir)[0]))
+        bounded = FacialCache(version="v3", cache_dir=cache_dir, max_disk_bytes=entry_bytes * 3)
+        for index in range(5):
+            clip = bytes([index + 1]) * len(audio)
+            bounded.get_or_compute(clip, lambda: fake_inference(clip))
+        bounded.flush()
+        stats = bounded.stats()
+        assert stats["disk_bytes"] <= entry_bytes * 3 and len(os.listdir(cache_dir)) == stats["disk_entries"] == 3
+        assert bounded.stats()["disk_evictions"] == 3  # L'entrée v1 puis les deux premières v3
+
+    assert model_version("model.pth", {"a": 1}) != model_version("model.pth", {"a": 2})
+    print(f"✓ Relecture disque, promotion mémoire, invalidation par version, "
+          f"{stats['disk_evictions']} évictions disque")
+
+
+def main():
+    test_memory_hits()
+    test_lru_eviction()
+    test_disk_tier_and_version()
+    print("\n✅ Tous les tests passés")
+
+
+if __name__ == "__main__":
+    main()
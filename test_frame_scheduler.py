@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test du cadenceur de frames LiveLink
+Vérifie la cadence, l'enchaînement des blocs et la gestion des retards
+"""
+
+import time
+
+import numpy as np
+
+from modules.frame_scheduler import FrameScheduler
+from modules.livelink_encoder import LiveLinkEncoder
+
+
+class RecordingSocket:
+    """Socket factice qui horodate chaque paquet reçu"""
+
+    def __init__(self, encoder):
+        self.encoder = encoder
+        self.packets = []
+
+    def sendall(self, data):
+        values = np.frombuffer(bytes(data), dtype='>f4', offset=self.encoder.values_offset)
+        self.packets.append((time.monotonic(), float(values[0])))
+
+
+def make_scheduler(**kwargs):
+    encoder = LiveLinkEncoder("$test-uuid", "GalaFace", fps=60)
+    sock = RecordingSocket(encoder)
+    scheduler = FrameScheduler(sock, encoder, fps=60, **kwargs)
+    scheduler.start()
+    return scheduler, sock
+
+
+def numbered_frames(start, count):
+    """Frames dont la première valeur est le numéro de frame / 1000"""
+    frames = np.zeros((count, 61), dtype=np.float32)
+    frames[:, 0] = (np.arange(start, start + count) / 1000.0)
+    return frames
+
+
+def test_cadence_and_chaining():
+    """Deux blocs enchaînés sortent à 60 FPS, sans trou ni doublon"""
+    print("=== Test cadence 60 FPS ===")
+    scheduler, sock = make_scheduler()
+    scheduler.submit(numbered_frames(0, 30))
+    scheduler.submit(numbered_frames(30, 30))
+    time.sleep(1.2)
+    scheduler.stop()
+
+    values = [value for _, value in sock.packets]
+    assert np.allclose(values, np.arange(60) / 1000.0)
+
+    intervals = np.diff([t for t, _ in sock.packets]) * 1000
+    assert abs(np.mean(intervals) - 1000 / 60) < 0.5
+    print(f"✓ 60 frames, intervalle moyen {np.mean(intervals):.3f} ms, "
+          f"jitter p99 {scheduler.stats()['jitter_ms']['p99']:.3f} ms")
+
+
+def test_late_block_drop():
+    """Un bloc en retard saute les frames déjà dépassées"""
+    print("=== Test bloc en retard (drop) ===")
+    scheduler, sock = make_scheduler(late_policy="drop")
+    scheduler.submit(numbered_frames(0, 30), start_time=time.monotonic() - 0.25)
+    time.sleep(0.4)
+    scheduler.stop()
+
+    stats = scheduler.stats()
+    assert stats["late_blocks"] == 1
+    assert len(sock.packets) + stats["frames_dropped"] == 30
+    assert sock.packets[0][1] >= 0.014
+    print(f"✓ {stats['frames_dropped']} frames abandonnées, reprise à {sock.packets[0][1] * 1000:.0f}")
+
+
+def test_late_block_stretch():
+    """Un bloc en retard est compressé pour finir à l'heure"""
+    print("=== Test bloc en retard (stretch) ===")
+    scheduler, sock = make_scheduler(late_policy="stretch")
+    scheduler.submit(numbered_frames(0, 30), start_time=time.monotonic() - 0.25)
+    time.sleep(0.4)
+    scheduler.stop()
+
+    stats = scheduler.stats()
+    assert stats["stretched_blocks"] == 1
+    assert sock.packets[0][1] == 0.0
+    assert len(sock.packets) < 30
+    print(f"✓ Bloc de 30 frames joué en {len(sock.packets)} ticks")
+
+
+def main():
+    test_cadence_and_chaining()
+    test_late_block_drop()
+    test_late_block_stretch()
+    print("\n✅ Tous les tests passés")
+
+
+if __name__ == "__main__":
+    main()
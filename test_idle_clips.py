@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test de la bibliothèque de clips idle précalculés
+Vérifie les raccords neutres, le contenu des clips et les paquets pré-encodés
+"""
+
+import time
+
+import numpy as np
+
+from modules.idle_clips import IdleClipGenerator, IdlePlayer, create_idle_library, BLINK_CHANNELS
+from modules.livelink_encoder import LiveLinkEncoder
+from modules.pylivelinkface import FaceBlendShape
+
+
+def test_clip_content_and_neutral_edges():
+    """Un clip respire, cligne, bouge les yeux et commence/finit sur une pose neutre"""
+    print("=== Test contenu des clips ===")
+    generator = IdleClipGenerator(fps=60, seed=3)
+    clip = generator.generate(30.0)
+
+    assert clip.shape == (1800, 61) and clip.dtype == np.float32
+    assert clip.min() >= 0.0 and clip.max() <= 1.0
+    assert np.abs(clip[0]).max() < 1e-3 and np.abs(clip[-1]).max() < 1e-3
+
+    blink = clip[:, BLINK_CHANNELS[0]]
+    blinks = int(np.sum((blink[1:] > 0.5) & (blink[:-1] <= 0.5)))
+    assert 3 <= blinks <= 15
+    assert clip[:, FaceBlendShape.JawOpen].max() > 0.01
+    assert clip[:, FaceBlendShape.EyeLookUpLeft].max() + clip[:, FaceBlendShape.EyeLookDownLeft].max() > 0
+    print(f"✓ 30 s: {blinks} clignements, raccords neutres")
+
+
+def test_player_packets_match_encoder():
+    """Les paquets pré-encodés sont identiques à un encodage direct"""
+    print("\n=== Test paquets pré-encodés ===")
+    encoder = LiveLinkEncoder("$test-uuid", "GalaFace", fps=60)
+    library = create_idle_library(encoder, clip_count=3, clip_seconds=5.0, variations=2, seed=1)
+    player = IdlePlayer(library, seed=2)
+    reference = LiveLinkEncoder("$test-uuid", "GalaFace", fps=60)
+
+    clips = set()
+    for frame in range(len(library.frames) * 2):
+        values = player.current_values().copy()
+        clips.add(player.clip)
+        packet = bytes(player.next_packet(1000.0 + frame / 60))
+        assert packet == reference.encode(values, 1000.0 + frame / 60)
+
+    assert library.clip_count == 5 and len(clips) > 1
+    print(f"✓ {player.frames_played} paquets conformes sur {player.clips_played} clips enchaînés")
+
+
+def test_idle_frame_cost():
+    """Une frame idle ne coûte qu'un index et un timecode"""
+    print("\n=== Test coût par frame ===")
+    encoder = LiveLinkEncoder("$test-uuid", "GalaFace", fps=60)
+    player = IdlePlayer(create_idle_library(encoder, seed=4))
+
+    count = 6000
+    start = time.perf_counter()
+    for _ in range(count):
+        player.next_packet()
+    per_frame = (time.perf_counter() - start) / count * 1e6
+
+    assert per_frame < 100
+    print(f"✓ {per_frame:.1f} µs par frame ({per_frame * 60 / 1e4:.4f} % d'un cœur à 60 fps)")
+
+
+def main():
+    test_clip_content_and_neutral_edges()
+    test_player_packets_match_encoder()
+    test_idle_frame_cost()
+    print("\n✅ Tous les tests passés")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test du banc de latence et du modèle NeuroSync de substitution
+Vérifie les formes du modèle, la correspondance chunk -> paquet et une
+mesure complète d'une variante dans le processus
+"""
+
+import json
+import tempfile
+
+import numpy as np
+
+from benchmarks.latency_benchmark import measure_utterance, run_benchmark, save_result, speech_pcm
+from benchmarks import neurosync_standin
+
+
+def test_standin_model():
+    """Mêmes formes que NeuroSync, résultat déterministe, modules installés"""
+    print("=== Test modèle de substitution ===")
+    neurosync_standin.install()
+    from models.neurosync.generate_face_shapes import generate_facial_data_from_bytes
+    from models.neurosync.model.model import load_model
+    from models.neurosync.config import config
+
+    pcm = speech_pcm(1.0, seed=1)
+    first = generate_facial_data_from_bytes(pcm, load_model("", config, "cpu"), "cpu", config)
+    second = generate_facial_data_from_bytes(pcm, load_model("", config, "cpu"), "cpu", config)
+    assert first.shape == (60, 68) and np.array_equal(first, second)
+    assert 0.0 <= first.min() and first.max() <= 1.0
+    print(f"✓ 1 s de PCM -> {first.shape}, identique entre deux chargements")
+
+
+def test_chunk_to_packet_mapping():
+    """Le chunk k est associé au paquet de sa première frame"""
+    print("\n=== Test correspondance chunk -> paquet ===")
+    chunk_times = [0.02 * index for index in range(10)]  # 200 ms en chunks de 20 ms
+    arrivals = [0.25 + index / 60 for index in range(12)]
+    result = measure_utterance(arrivals, chunk_times, 0.02)
+
+    assert np.isclose(result["first_packet_ms"][0], 250.0)
+    # Chunk 3 : audio [60, 80[ ms -> frame 4 (66.7 ms), arrivée 250 + 66.7 ms
+    assert np.isclose(result["chunk_to_packet_ms"][3], 250 + 4000 / 60 - 60)
+    assert len(result["chunk_to_packet_ms"]) == 10
+    assert np.allclose(result["send_jitter_ms"], 0.0, atol=1e-6)
+    print(f"✓ {len(result['chunk_to_packet_ms'])} chunks associés, jitter nul sur une grille parfaite")
+
+
+def test_run_variant_in_process():
+    """Une variante tourne dans le processus et produit un rapport JSON"""
+    print("\n=== Test mesure api_optimized ===")
+    result = run_benchmark("api_optimized", utterances=1, seconds=1.0, pause=0.1, speed=2.0)
+    path = save_result(result, tempfile.mkdtemp())
+
+    report = json.loads(path.read_text())
+    metrics = report["metrics"]
+    assert report["variant"] == "api_optimized" and report["counts"]["errors"] == 0
+    assert report["counts"]["packets"] >= 55
+    for name in ("first_packet_ms", "chunk_to_packet_ms", "inference_ms", "send_jitter_ms"):
+        assert metrics[name] is not None and metrics[name]["p50"] <= metrics[name]["p99"]
+    print(f"✓ {report['counts']['packets']} paquets, premier paquet {metrics['first_packet_ms']['p50']:.1f} ms, "
+          f"inférence p99 {metrics['inference_ms']['p99']:.1f} ms")
+
+    # Streaming : la fin d'énoncé émet le hop partiel et les frames du fondu
+    counts = run_benchmark("api_pcm_buffer", utterances=1, seconds=1.0, pause=0.1)["counts"]
+    assert counts["packets"] >= counts["frames_expected"] - 1, counts
+    print(f"✓ api_pcm_buffer: {counts['packets']}/{counts['frames_expected']} frames émises")
+
+
+def main():
+    test_standin_model()
+    test_chunk_to_packet_mapping()
+    test_run_variant_in_process()
+    print("\n✅ Tous les tests passés")
+
+
+if __name__ == "__main__":
+    main()
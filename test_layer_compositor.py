@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test du compositeur de couches (idle / parole / émotion)
+Vérifie les fondus, le mélange et l'intégration au FrameScheduler
+"""
+
+import socket
+import time
+
+import numpy as np
+
+from modules.frame_scheduler import FrameScheduler
+from modules.idle_clips import IdlePlayer, create_idle_library
+from modules.layer_compositor import LayerCompositor, MODE_ADD, SPEECH_LAYER, IDLE_LAYER
+from modules.livelink_encoder import LiveLinkEncoder, BLENDSHAPE_COUNT
+
+
+def constant_source(value):
+    frame = np.full(BLENDSHAPE_COUNT, value, dtype=np.float32)
+    return lambda: frame
+
+
+def test_speech_fades_over_idle():
+    """La parole fond au-dessus de l'idle puis ressort quand elle s'arrête"""
+    print("=== Test fondus automatiques ===")
+    compositor = LayerCompositor(speech_fade_in=0.1, speech_fade_out=0.2, speech_hold=0.05,
+                                 easing="linear")
+    compositor.add_layer(IDLE_LAYER, weight=1.0, source=constant_source(0.2), below=SPEECH_LAYER)
+    speech = np.full(BLENDSHAPE_COUNT, 0.8, dtype=np.float32)
+
+    values, _ = compositor.compose(0.0)
+    assert np.allclose(values, 0.2)
+
+    compositor.compose(1.0, speech)
+    values, _ = compositor.compose(1.05, speech)  # Mi-fondu d'entrée
+    assert np.allclose(values, 0.5)
+    values, _ = compositor.compose(1.2, speech)
+    assert np.allclose(values, 0.8)
+
+    # Plus de frames : tenue puis fondu de sortie sur la dernière frame
+    values, _ = compositor.compose(1.22)
+    assert np.allclose(values, 0.8)
+    compositor.compose(1.3)
+    values, _ = compositor.compose(1.4)
+    assert np.allclose(values, 0.5)
+    values, _ = compositor.compose(1.6)
+    assert np.allclose(values, 0.2) and not compositor.speech_active
+    print("✓ idle 0.2 -> parole 0.8 -> idle, fondus linéaires")
+
+
+def test_additive_layer_and_manual_fade():
+    """Une couche additive s'ajoute sans être recouverte"""
+    print("\n=== Test couche additive ===")
+    compositor = LayerCompositor(easing="linear")
+    compositor.add_layer(IDLE_LAYER, weight=1.0, source=constant_source(0.1), below=SPEECH_LAYER)
+    compositor.add_layer("emotion", MODE_ADD)
+    emotion = np.zeros(BLENDSHAPE_COUNT, dtype=np.float32)
+    emotion[23] = 0.4  # MouthSmileLeft
+    compositor.set_values("emotion", emotion)
+    compositor.fade("emotion", 1.0, 1.0, now=0.0)
+
+    values, _ = compositor.compose(0.5, np.full(BLENDSHAPE_COUNT, 0.3, dtype=np.float32))
+    compositor.fade(SPEECH_LAYER, 1.0, 0.0, now=0.5)
+    values, _ = compositor.compose(1.0, np.full(BLENDSHAPE_COUNT, 0.3, dtype=np.float32))
+    assert np.isclose(values[23], 0.7) and np.isclose(values[0], 0.3)
+    print(f"✓ Sourire additif: {values[23]:.2f} au-dessus de la parole")
+
+
+def test_scheduler_sends_idle_and_speech():
+    """Le scheduler émet l'idle en continu et y mélange les blocs de parole"""
+    print("\n=== Test intégration scheduler ===")
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    receiver.settimeout(1.0)
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sender.connect(receiver.getsockname())
+
+    encoder = LiveLinkEncoder("$test-uuid", "GalaFace", fps=60)
+    compositor = LayerCompositor(speech_fade_in=0.05, speech_fade_out=0.05, speech_hold=0.02)
+    compositor.add_idle(IdlePlayer(create_idle_library(encoder, clip_count=2, clip_seconds=5.0, seed=1)))
+    scheduler = FrameScheduler(sender, LiveLinkEncoder("$test-uuid", "GalaFace", fps=60),
+                               compositor=compositor)
+    scheduler.start()
+
+    time.sleep(0.2)  # Idle seul
+    scheduler.submit(np.full((12, BLENDSHAPE_COUNT), 0.9, dtype=np.float32))
+    time.sleep(0.5)
+    scheduler.stop()
+
+    packets = []
+    try:
+        while True:
+            packets.append(receiver.recv(1024))
+    except socket.timeout:
+        pass
+    sender.close()
+    receiver.close()
+
+    jaw = np.array([np.frombuffer(p, dtype='>f4', offset=encoder.values_offset)[17] for p in packets])
+    stats = scheduler.stats()
+    assert len(packets) >= 35
+    assert jaw.max() > 0.85 and jaw[-1] < 0.1
+    assert stats["compositor"]["solo_ticks"] > 0
+    print(f"✓ {len(packets)} paquets, JawOpen max {jaw.max():.2f}, "
+          f"{stats['compositor']['solo_ticks']} ticks idle pré-encodés")
+
+
+def main():
+    test_speech_fades_over_idle()
+    test_additive_layer_and_manual_fade()
+    test_scheduler_sends_idle_and_speech()
+    print("\n✅ Tous les tests passés")
+
+
+if __name__ == "__main__":
+    main()
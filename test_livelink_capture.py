@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test du format de capture .llcap et de l'analyse vectorisée
+Vérifie l'aller-retour des paquets, les captures interrompues et la comparaison
+"""
+
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from debug_tools.analyze_livelink_capture import channel_stats, diff_captures, timing_stats
+from debug_tools.capture_format import CaptureWriter, load_capture
+from modules.livelink_encoder import LiveLinkEncoder, BLENDSHAPE_COUNT
+from modules.pylivelinkface import FaceBlendShape
+
+
+def write_capture(path, frames, jaw_gain=1.0, close=True):
+    """Capture synthétique à 60 fps : mâchoire sinusoïdale"""
+    encoder = LiveLinkEncoder("$test-uuid", "GalaFace", fps=60)
+    t = np.arange(frames) / 60
+    values = np.zeros((frames, BLENDSHAPE_COUNT), dtype=np.float32)
+    values[:, FaceBlendShape.JawOpen] = jaw_gain * 0.5 * (1 - np.cos(2 * np.pi * t))
+    values[:, FaceBlendShape.EyeBlinkLeft] = (t % 4 < 0.15)
+    packets = encoder.encode_batch(values, 3600.0)
+
+    writer = CaptureWriter(path)
+    for index, packet in enumerate(packets):
+        writer.write(3600.0 + index / 60 + 0.002, packet)
+    if close:
+        writer.close()
+    return values
+
+
+def test_roundtrip_and_index():
+    """Les enregistrements relus correspondent aux paquets écrits"""
+    print("=== Test aller-retour ===")
+    path = os.path.join(tempfile.mkdtemp(), "capture.llcap")
+    values = write_capture(path, 600)
+    capture = load_capture(path)
+
+    assert capture.subjects == [{"uuid": "$test-uuid", "name": "GalaFace"}]
+    assert len(capture.records) == 600 and capture.index["records"] == 600
+    assert np.array_equal(capture.records["values"], values)
+    assert np.allclose(capture.seconds[:3], 3600.0 + np.arange(3) / 60)
+
+    timing = timing_stats(capture.subject("GalaFace"))
+    assert timing["missing_frames"] == 0 and abs(timing["fps"] - 60) < 0.1
+    print(f"✓ 600 enregistrements de {capture.records.dtype.itemsize} octets, {timing['fps']:.1f} fps")
+
+
+def test_unfinished_capture():
+    """Une capture non finalisée reste lisible"""
+    print("\n=== Test capture interrompue ===")
+    path = os.path.join(tempfile.mkdtemp(), "capture.llcap")
+    write_capture(path, 2500, close=False)
+    capture = load_capture(path)
+    assert len(capture.records) == 2048  # Blocs déjà écrits
+    print(f"✓ {len(capture.records)} enregistrements relus sans index")
+
+
+def test_vectorized_diff():
+    """La comparaison isole le canal modifié, vite sur une longue capture"""
+    print("\n=== Test comparaison vectorisée ===")
+    directory = tempfile.mkdtemp()
+    first, second = os.path.join(directory, "player.llcap"), os.path.join(directory, "api.llcap")
+    write_capture(first, 36000)  # 10 minutes
+    write_capture(second, 36000, jaw_gain=0.6)
+
+    start = time.perf_counter()
+    a, b = load_capture(first), load_capture(second)
+    stats = channel_stats(a.records["values"])
+    diff = diff_captures(a, b)
+    elapsed = time.perf_counter() - start
+
+    jaw = FaceBlendShape.JawOpen
+    assert np.argmax(np.abs(diff["mean_delta"])) == jaw
+    assert np.isclose(diff["mean_delta"][jaw], -0.2, atol=1e-3)
+    assert np.isclose(diff["correlation"][jaw], 1.0)
+    assert np.isclose(stats["active"][FaceBlendShape.EyeBlinkLeft], 0.15 / 4, atol=0.01)
+    assert elapsed < 2.0
+    print(f"✓ 2 x 36000 frames analysées en {elapsed * 1000:.0f} ms, "
+          f"JawOpen Δmoy {diff['mean_delta'][jaw]:+.3f}")
+
+
+def main():
+    test_roundtrip_and_index()
+    test_unfinished_capture()
+    test_vectorized_diff()
+    print("\n✅ Tous les tests passés")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Test de l'encodeur LiveLink précompilé
+Vérifie la compatibilité binaire avec l'encodage struct d'origine
+"""
+
+import struct
+import time
+
+import numpy as np
+
+from modules.pylivelinkface import PyLiveLinkFace, FaceBlendShape
+from modules.livelink_encoder import LiveLinkEncoder
+
+
+def reference_encode(py_face, values, frames, sub_frame):
+    """Encodage d'origine (struct.pack champ par champ)"""
+    return (struct.pack('<I', 6) +
+            py_face.uuid.encode('utf-8') +
+            struct.pack('!i', len(py_face.name)) +
+            py_face.name.encode('utf-8') +
+            struct.pack("!II", frames, sub_frame) +
+            struct.pack("!II", py_face.fps, 1) +
+            struct.pack('!B61f', 61, *values))
+
+
+def test_encode_matches_reference():
+    """Le paquet doit être identique octet par octet à l'encodage struct"""
+    print("=== Test encodage compatible ===")
+    py_face = PyLiveLinkFace(name="GalaFace", fps=60)
+    py_face.set_blendshape(FaceBlendShape.JawOpen, 0.5)
+    py_face.set_blendshape(FaceBlendShape.EyeBlinkLeft, 0.25)
+
+    packet = py_face.encode()
+    expected = reference_encode(py_face, py_face.get_blendshapes(),
+                                py_face._frames, py_face._sub_frame)
+
+    assert packet == expected
+    print(f"✓ Paquet identique ({len(packet)} octets)")
+
+
+def test_encode_batch():
+    """Chaque ligne du lot doit correspondre à un encodage individuel"""
+    print("=== Test encodage par lot ===")
+    encoder = LiveLinkEncoder("$test-uuid", "GalaFace", fps=60)
+    frames = np.random.rand(32, 61).astype(np.float32)
+    start = 12 * 3600 + 0.5
+
+    packets = encoder.encode_batch(frames, start_seconds=start)
+    assert packets.shape == (32, encoder.packet_size)
+
+    for i in range(len(frames)):
+        assert bytes(packets[i]) == encoder.encode(frames[i], start + i / 60)
+    print(f"✓ {len(frames)} paquets identiques")
+
+
+def test_encode_speed():
+    """Mesure indicative du coût par frame"""
+    print("=== Test performance ===")
+    py_face = PyLiveLinkFace(name="GalaFace", fps=60)
+    iterations = 5000
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        py_face.encode_view()
+    elapsed = time.perf_counter() - start
+
+    print(f"Encodage: {elapsed / iterations * 1e6:.2f} µs/frame")
+
+
+def main():
+    test_encode_matches_reference()
+    test_encode_batch()
+    test_encode_speed()
+    print("\n✅ Tous les tests passés")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test du récepteur LiveLink de substitution
+Vérifie le décodage, les mesures de cadence / pertes / latence et le journal
+"""
+
+import os
+import socket
+import tempfile
+import time
+
+import numpy as np
+
+from debug_tools.livelink_receiver import LiveLinkReceiver, read_log
+from modules.av_sync import presentation_clock
+from modules.frame_scheduler import FrameScheduler
+from modules.livelink_encoder import LiveLinkEncoder, decode_packet, BLENDSHAPE_COUNT
+
+
+def test_decode_roundtrip():
+    """Le décodeur relit exactement ce que l'encodeur écrit"""
+    print("=== Test décodage ===")
+    encoder = LiveLinkEncoder("$0f8e5c2a-test", "GalaFace", fps=60)
+    values = np.linspace(0.0, 1.0, BLENDSHAPE_COUNT, dtype=np.float32)
+    packet = decode_packet(encoder.encode(values, 45296.25))
+
+    assert packet.uuid == "$0f8e5c2a-test" and packet.name == "GalaFace"
+    assert packet.fps == 60 and abs(packet.seconds - 45296.25) < 1e-6
+    assert np.array_equal(packet.values, values)
+    print(f"✓ {packet.name} @ {packet.seconds:.2f} s, 61 valeurs identiques")
+
+
+def test_gaps_and_reordering():
+    """Frames manquantes et paquets dans le désordre sont comptés"""
+    print("\n=== Test pertes / réordonnancement ===")
+    path = os.path.join(tempfile.mkdtemp(), "capture.gll")
+    receiver = LiveLinkReceiver("127.0.0.1", 0, record_path=path).start()
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    encoder = LiveLinkEncoder("$test-uuid", "GalaFace", fps=60)
+
+    frames = [0, 1, 2, 5, 4, 6, 7]  # 3 perdue, 4 en retard
+    for frame in frames:
+        sender.sendto(encoder.encode(np.zeros(BLENDSHAPE_COUNT), 1000.0 + frame / 60), receiver.address)
+    sender.sendto(b"not livelink", receiver.address)
+    time.sleep(0.3)
+    receiver.stop()
+    sender.close()
+
+    stats = receiver.stats()
+    subject = stats["subjects"]["GalaFace"]
+    assert subject["packets"] == 7 and subject["reordered"] == 1
+    assert subject["missing_frames"] == 2 and stats["invalid_packets"] == 1
+
+    records = list(read_log(path))
+    assert len(records) == 8 and decode_packet(records[3][1]).frames == 60000 + 5
+    print(f"✓ manquantes {subject['missing_frames']}, réordonnées {subject['reordered']}, "
+          f"{len(records)} paquets journalisés")
+
+
+def test_scheduler_rate_and_latency():
+    """Le flux du FrameScheduler arrive à 60 fps avec une latence faible"""
+    print("\n=== Test cadence / latence ===")
+    receiver = LiveLinkReceiver("127.0.0.1", 0).start()
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sender.connect(receiver.address)
+
+    scheduler = FrameScheduler(sender, LiveLinkEncoder("$test-uuid", "GalaFace", fps=60),
+                               clock=presentation_clock)
+    scheduler.start()
+    scheduler.submit(np.full((60, BLENDSHAPE_COUNT), 0.5, dtype=np.float32))
+    time.sleep(1.3)
+    scheduler.stop()
+    time.sleep(0.1)
+    receiver.stop()
+    sender.close()
+
+    subject = receiver.stats()["subjects"]["GalaFace"]
+    assert subject["packets"] == 60 and subject["missing_frames"] == 0
+    assert 55 <= subject["measured_fps"] <= 65
+    assert abs(subject["latency_ms"]["p50"]) < 20
+    print(f"✓ {subject['measured_fps']:.1f} fps, latence p50 {subject['latency_ms']['p50']:.2f} ms, "
+          f"jitter p99 {subject['jitter_ms']['p99']:.2f} ms")
+
+
+def main():
+    test_decode_roundtrip()
+    test_gaps_and_reordering()
+    test_scheduler_rate_and_latency()
+    print("\n✅ Tous les tests passés")
+
+
+if __name__ == "__main__":
+    main()
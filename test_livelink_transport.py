@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test du transport LiveLink multi-sujets / multi-destinations
+Vérifie le fan-out, le nombre d'appels système et l'intégration au FrameScheduler
+"""
+
+import socket
+import time
+
+import numpy as np
+
+from config import LiveLinkConfig, LiveLinkDestination, LiveLinkSubject
+from modules.frame_scheduler import FrameScheduler
+from modules.livelink_encoder import LiveLinkEncoder, BLENDSHAPE_COUNT
+from modules.livelink_transport import LiveLinkTransport, create_livelink_transport
+
+
+def open_receivers(count):
+    receivers = []
+    for _ in range(count):
+        receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        receiver.bind(("127.0.0.1", 0))
+        receiver.settimeout(0.5)
+        receivers.append(receiver)
+    return receivers
+
+
+def drain(receiver):
+    packets = []
+    try:
+        while True:
+            packets.append(receiver.recv(2048))
+    except socket.timeout:
+        pass
+    return packets
+
+
+def test_fanout_subjects_and_destinations():
+    """Chaque destination reçoit une frame par sujet"""
+    print("=== Test fan-out 2 sujets x 3 destinations ===")
+    receivers = open_receivers(3)
+    destinations = [LiveLinkDestination(*r.getsockname()) for r in receivers]
+    subjects = [LiveLinkSubject("GalaFace", "test-a"), LiveLinkSubject("GalaBody", "test-b")]
+    transport = LiveLinkTransport(destinations, subjects)
+
+    frame = np.linspace(0.0, 1.0, BLENDSHAPE_COUNT, dtype=np.float32)
+    sent = transport.send_frames({"GalaFace": frame, "GalaBody": frame[::-1]}, 1000.0)
+    assert sent == 6
+
+    reference = LiveLinkEncoder("$test-a", "GalaFace", fps=60)
+    for receiver in receivers:
+        packets = drain(receiver)
+        assert len(packets) == 2
+        assert reference.encode(frame, 1000.0) in packets
+        receiver.close()
+    transport.close()
+    print(f"✓ {sent} paquets conformes, {transport.syscalls} appel(s) système")
+
+
+def test_sendmmsg_syscalls():
+    """sendmmsg émet toutes les copies d'une frame en un appel par groupe d'options"""
+    print("\n=== Test appels système sendmmsg / sendto ===")
+    receivers = open_receivers(4)
+    destinations = [LiveLinkDestination(*r.getsockname()) for r in receivers]
+    destinations[3].tos = 0xB8  # Groupe d'options distinct
+    subjects = [LiveLinkSubject("GalaFace"), LiveLinkSubject("GalaBody")]
+    frames = [np.zeros(BLENDSHAPE_COUNT, dtype=np.float32)] * 2
+
+    batched = LiveLinkTransport(destinations, subjects)
+    fallback = LiveLinkTransport(destinations, subjects, use_sendmmsg=False)
+    for transport in (batched, fallback):
+        for _ in range(10):
+            transport.send_frames(frames)
+    for receiver in receivers:
+        assert len(drain(receiver)) == 40
+        receiver.close()
+
+    if batched.use_sendmmsg:
+        assert batched.syscalls == 20
+    assert fallback.syscalls == 80
+    assert batched.packets_sent == fallback.packets_sent == 80
+    batched.close()
+    fallback.close()
+    print(f"✓ 80 paquets: {batched.syscalls} appels (sendmmsg={batched.use_sendmmsg}) "
+          f"contre {fallback.syscalls} en sendto")
+
+
+def test_scheduler_through_fanout():
+    """Le FrameScheduler émet vers toutes les destinations, un paquet par sujet configuré"""
+    print("\n=== Test FrameScheduler -> FanoutSocket ===")
+    for subjects in ([], [LiveLinkSubject("GalaFace", "test-a"), LiveLinkSubject("GalaBody", "test-b")]):
+        receivers = open_receivers(2)
+        config = LiveLinkConfig(destinations=[LiveLinkDestination(*r.getsockname()) for r in receivers],
+                                subjects=subjects)
+        transport = create_livelink_transport(config)
+
+        scheduler = FrameScheduler(transport.fanout(), LiveLinkEncoder("$test-uuid", "GalaFace", fps=60))
+        scheduler.start()
+        scheduler.submit(np.full((12, BLENDSHAPE_COUNT), 0.5, dtype=np.float32))
+        time.sleep(0.4)
+        scheduler.stop()
+
+        received = [drain(receiver) for receiver in receivers]
+        for receiver in receivers:
+            receiver.close()
+        transport.close()
+        expected = 12 * max(1, len(subjects))
+        assert [len(packets) for packets in received] == [expected, expected]
+        for subject in subjects:
+            assert sum(subject.name.encode() in packet for packet in received[0]) == 12
+        print(f"✓ {expected} paquets ({len(subjects) or 1} sujet(s)) reçus par chaque destination: "
+              f"{transport.stats()['destinations']}")
+
+
+def main():
+    test_fanout_subjects_and_destinations()
+    test_sendmmsg_syscalls()
+    test_scheduler_through_fanout()
+    print("\n✅ Tous les tests passés")
+
+
+if __name__ == "__main__":
+    main()
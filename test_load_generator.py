@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test du corpus de rejeu et du générateur de charge
+Vérifie l'indexation des captures (raw et DebugSink), le critère de
+décrochage et une montée en charge contre une variante lancée à part
+"""
+
+import asyncio
+import io
+import tempfile
+import wave
+
+import numpy as np
+
+from benchmarks.audio_corpus import build_corpus
+from benchmarks.load_generator import (ChunkResult, run_levels, start_variant_process, summarize_step,
+                                       sustained_level)
+from modules.debug_sink import DebugSink, DEBUG_SINK_NAME
+
+
+def test_corpus_index():
+    """Captures raw regroupées en énoncés, blobs audio DebugSink (PCM et WAV) relus, paquets ignorés"""
+    print("=== Test corpus ===")
+    raw = build_corpus(["debug_logs"], group_gap=0)
+    grouped = build_corpus(["debug_logs"], group_gap=1.0)
+    assert len(grouped.clips) < len(raw.clips)
+    assert np.isclose(grouped.total_seconds, raw.total_seconds)
+
+    directory = tempfile.mkdtemp()
+    sink = DebugSink(directory, name=DEBUG_SINK_NAME, max_bytes=20000, backups=4)
+    for index in range(6):
+        sink.record("audio", {"index": index}, blob=np.full(4000, index, dtype=np.int16).tobytes())
+        sink.record("frame", {"index": index}, blob=np.full(120, 7, dtype=np.uint8).tobytes())
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav_file:
+        wav_file.setnchannels(2)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(48000)
+        wav_file.writeframes(np.zeros(2 * 4800, dtype=np.int16).tobytes())
+    sink.record("audio", {"index": 6}, blob=buffer.getvalue())
+    sink.close()
+
+    corpus = build_corpus([directory], group_gap=0)
+    first_samples = [np.frombuffer(clip.pcm[:2], dtype=np.int16)[0] for clip in corpus.clips[:6]]
+    assert len(corpus.clips) == 7  # Paquets LiveLink ('frame') écartés
+    assert first_samples == list(range(6))  # Ordre conservé à travers les rotations
+    assert np.isclose(corpus.clips[6].seconds, 0.1, atol=0.002)  # WAV stéréo 48 kHz ramené à 16 kHz
+    print(f"✓ debug_logs: {len(raw.clips)} captures -> {len(grouped.clips)} énoncés "
+          f"({grouped.total_seconds:.1f} s), {len(corpus.clips)} blobs DebugSink relus")
+
+
+def test_sustained_criterion():
+    """Un retard qui croît sans borne fait décrocher le niveau"""
+    print("\n=== Test critère de décrochage ===")
+    steady = [ChunkResult(t, t, t + 0.005, 200, 1024) for t in np.arange(0, 10, 0.032)]
+    behind = [ChunkResult(t, t * 1.5, t * 1.5 + 0.02, 200, 1024) for t in np.arange(0, 10, 0.032)]
+    steps = [summarize_step(level, results, 10.0, {}, {}, 100.0, 0.01, int(level))
+             for level, results in ((1, steady), (2, steady), (4, behind))]
+    assert [step["sustained"] for step in steps] == [True, True, False]
+    assert sustained_level(steps) == 2
+    assert np.isclose(steps[0]["throughput"]["audio_seconds_per_second"], 1.0, atol=0.01)
+    print(f"✓ niveau tenu {sustained_level(steps)}, retard p95 au décrochage {steps[2]['lag_ms']['p95']:.0f} ms")
+
+
+def test_ramp_against_variant():
+    """Montée en charge closed loop contre api_optimized dans un processus dédié"""
+    print("\n=== Test montée en charge ===")
+    process, url = start_variant_process("api_optimized")
+    try:
+        corpus = build_corpus(["debug_logs"])
+        steps = asyncio.run(run_levels(url, corpus, [1, 2], ramp_up=0.5, step_seconds=2.0, think=0.1))
+    finally:
+        process.terminate()
+        process.join(timeout=5)
+
+    assert [step["level"] for step in steps] == [1, 2]
+    assert all(step["errors"] == 0 and step["chunks"] > 0 for step in steps)
+    assert steps[1]["server"]["frames_sent"] > 0
+    print(f"✓ {sum(step['chunks'] for step in steps)} chunks envoyés, niveau tenu {sustained_level(steps)}")
+
+
+def main():
+    test_corpus_index()
+    test_sustained_criterion()
+    test_ramp_against_variant()
+    print("\n✅ Tous les tests passés")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test du ring buffer PCM
+Vérifie les fenêtres sans copie, le débordement et le réveil du consommateur
+"""
+
+import threading
+import time
+
+import numpy as np
+
+from modules.pcm_ring_buffer import PCMRingBuffer, BufferOverflowError
+
+
+def test_windows_across_wrap():
+    """Les fenêtres doivent rester contiguës et exactes après plusieurs tours"""
+    print("=== Test fenêtres circulaires ===")
+    ring = PCMRingBuffer(capacity=1000, window=300)
+    stream = (np.arange(20000) % 251).astype(np.uint8).tobytes()
+
+    written = 0
+    read = 0
+    while read < len(stream) - 300:
+        while written < len(stream) and ring.available + 170 <= ring.capacity:
+            ring.write(stream[written:written + 170])
+            written += 170
+        window = ring.peek(300)
+        if window is None:
+            break
+        assert bytes(window) == stream[read:read + 300]
+        ring.consume(128)
+        read += 128
+
+    assert ring.stats()["bytes_dropped"] == 0
+    print(f"✓ {read} octets lus sans copie ni décalage")
+
+
+def test_drop_oldest():
+    """La politique drop_oldest garde les données les plus récentes"""
+    print("=== Test débordement drop_oldest ===")
+    ring = PCMRingBuffer(capacity=8, window=8)
+    ring.write(b"\x01\x01\x02\x02\x03\x03")
+    ring.write(b"\x04\x04\x05\x05")
+
+    assert ring.read(8) == b"\x02\x02\x03\x03\x04\x04\x05\x05"
+    assert ring.stats()["bytes_dropped"] == 2
+    print("✓ Échantillon le plus ancien abandonné")
+
+
+def test_block_timeout():
+    """La politique block lève BufferOverflowError au timeout"""
+    print("=== Test débordement block ===")
+    ring = PCMRingBuffer(capacity=4, overflow="block")
+    ring.write(b"\x00" * 4)
+
+    try:
+        ring.write(b"\x00\x00", timeout=0.05)
+        assert False, "BufferOverflowError attendue"
+    except BufferOverflowError:
+        pass
+
+    # Le consommateur libère de la place : le producteur repart
+    threading.Timer(0.05, ring.consume, args=(2,)).start()
+    assert ring.write(b"\x01\x01", timeout=1.0) == 2
+    print("✓ Backpressure sur le producteur")
+
+
+def test_consumer_wakeup():
+    """Le consommateur est réveillé dès que la fenêtre est complète"""
+    print("=== Test réveil du consommateur ===")
+    ring = PCMRingBuffer(capacity=4096, window=1024)
+    delays = []
+
+    def consumer():
+        ring.wait_for(1024, timeout=2.0)
+        delays.append(time.perf_counter() - written_at[0])
+
+    written_at = [0.0]
+    thread = threading.Thread(target=consumer)
+    thread.start()
+    time.sleep(0.05)
+    written_at[0] = time.perf_counter()
+    ring.write(b"\x00" * 1024)
+    thread.join()
+
+    assert delays and delays[0] < 0.05
+    print(f"✓ Réveil en {delays[0] * 1000:.3f} ms")
+
+    # Fin d'énoncé : réveil avec moins d'une fenêtre, le reste n'est pas perdu
+    ring.consume(1024)
+    ring.write(b"\x01" * 300)
+    threading.Timer(0.05, ring.mark_end).start()
+    assert ring.wait_for(1024, timeout=2.0)
+    assert ring.pending_end() == 300 and bytes(ring.peek(300)) == b"\x01" * 300
+    ring.consume(300)
+    ring.pop_end()
+    assert ring.pending_end() is None and not ring.wait_for(1024, timeout=0.01)
+    print("✓ Fin d'énoncé : reste de 300 octets rendu au consommateur")
+
+
+def main():
+    test_windows_across_wrap()
+    test_drop_oldest()
+    test_block_timeout()
+    test_consumer_wakeup()
+    print("\n✅ Tous les tests passés")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test de la politique de précision de l'inférence
+Vérifie la résolution par device, la parité bf16/int8 et le repli fp32
+"""
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from modules.precision import (
+    PrecisionPolicy, resolve_precision,
+    PRECISION_FP16, PRECISION_FP32, PRECISION_BF16, PRECISION_INT8
+)
+
+
+class TinySeq2Seq(nn.Module):
+    """Encoder transformer + decoder linéaire, à la manière de NeuroSync"""
+
+    def __init__(self):
+        super().__init__()
+        layer = nn.TransformerEncoderLayer(d_model=64, nhead=4, dim_feedforward=128, batch_first=True)
+        self.encoder = nn.Sequential(nn.Linear(32, 64), nn.TransformerEncoder(layer, num_layers=2))
+        self.decoder = nn.Sequential(nn.Linear(64, 68), nn.Sigmoid())
+
+    def forward(self, x):
+        return self.decoder(self.encoder(x))
+
+
+def make_run():
+    features = torch.randn(1, 50, 32, generator=torch.Generator().manual_seed(0))
+
+    def run(model):
+        # Même enchaînement que decode_audio_chunk de NeuroSync
+        return model.decoder(model.encoder(features)).squeeze(0).cpu().numpy()
+
+    return run
+
+
+def test_resolve_precision():
+    """'auto' suit le device, les modes incompatibles retombent proprement"""
+    print("=== Test résolution ===")
+    assert resolve_precision("auto", "cuda") == PRECISION_FP16
+    assert resolve_precision("auto", "cuda", use_fp16=False) == PRECISION_FP32
+    assert resolve_precision("auto", "cpu") == PRECISION_FP32
+    assert resolve_precision("fp16", "cpu") == PRECISION_FP32
+    assert resolve_precision("int8", "cpu") == PRECISION_INT8
+    try:
+        resolve_precision("fp8", "cpu")
+        raise AssertionError("ValueError attendue")
+    except ValueError:
+        pass
+    print("✓ auto/fp16/int8 résolus selon le device")
+
+
+def test_cpu_precisions_parity():
+    """bf16 et int8 restent proches de fp32 et rendent du float32"""
+    print("\n=== Test parité CPU ===")
+    torch.manual_seed(0)
+    model = TinySeq2Seq().eval()
+    run = make_run()
+    with torch.no_grad():
+        expected = run(model)
+
+    for precision in (PRECISION_BF16, PRECISION_INT8):
+        neurosync_config = {"use_half_precision": True}
+        policy = PrecisionPolicy(precision, "cpu")
+        runner = policy.apply(model, run=run, neurosync_config=neurosync_config)
+
+        output = run(runner)
+        assert output.dtype == np.float32
+        assert policy.precision == precision and not policy.fallback
+        assert np.max(np.abs(output - expected)) < policy.parity_tolerance
+        assert neurosync_config["use_half_precision"] is False
+        # Le fast path MHA n'est coupé que pendant les appels du modèle int8
+        assert torch.backends.mha.get_fastpath_enabled()
+        print(f"✓ {precision}: écart fp32 {policy.parity_error:.4f}")
+
+    # Le modèle d'origine n'est pas modifié par la quantification
+    with torch.no_grad():
+        assert np.allclose(run(model), expected)
+
+
+def test_parity_fallback():
+    """Une tolérance impossible déclenche le repli fp32"""
+    print("\n=== Test repli fp32 ===")
+    torch.manual_seed(0)
+    model = TinySeq2Seq().eval()
+    policy = PrecisionPolicy(PRECISION_INT8, "cpu", parity_tolerance=0.0)
+    runner = policy.apply(model, run=make_run())
+
+    assert policy.fallback
+    assert policy.precision == PRECISION_FP32
+    assert runner.precision == PRECISION_FP32
+    assert policy.stats()["requested"] == PRECISION_INT8
+    assert torch.backends.mha.get_fastpath_enabled()
+    print(f"✓ int8 rejeté (écart {policy.parity_error:.4f}), exécution en fp32")
+
+
+def main():
+    test_resolve_precision()
+    test_cpu_precisions_parity()
+    test_parity_fallback()
+    print("\n✅ Tous les tests passés")
+
+
+if __name__ == "__main__":
+    main()
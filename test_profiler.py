@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test du profileur échantillonné
+Vérifie l'attribution CPU par thread, le format speedscope et la route
+/debug/profile d'une variante streaming pendant qu'elle traite de l'audio
+"""
+
+import json
+import socket
+import threading
+import time
+
+from modules.profiler import SamplingProfiler, ProfilerBusyError
+
+
+def _spin(seconds: float):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(i * i for i in range(500))
+
+
+def test_cpu_mode_attribution():
+    """En mode cpu, le thread qui calcule domine et le thread qui dort disparaît"""
+    print("=== Test mode cpu ===")
+    profiler = SamplingProfiler(rate_hz=200)
+    threads = [threading.Thread(target=_spin, args=(1.0,), name="Spinner"),
+               threading.Thread(target=time.sleep, args=(1.0,), name="Sleeper")]
+    for thread in threads:
+        thread.start()
+    report = profiler.profile(seconds=0.6, mode="cpu")
+    for thread in threads:
+        thread.join()
+
+    assert "Spinner" in report["threads"] and "Sleeper" not in report["threads"]
+    assert report["threads"]["Spinner"]["seconds"] > 0.3
+    assert any("_spin" in entry["frame"] for entry in report["top_self"][:2])
+    lines = report["profile"].splitlines()
+    assert lines and all(line.startswith("Spinner;") and line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    print(f"✓ {report['samples']} relevés, Spinner {report['threads']['Spinner']['seconds']:.2f} s CPU")
+
+
+def test_speedscope_and_busy():
+    """Fichier speedscope cohérent ; un second profil simultané est refusé"""
+    print("\n=== Test speedscope ===")
+    profiler = SamplingProfiler()
+    spinner = threading.Thread(target=_spin, args=(0.5,), name="Spinner")
+    spinner.start()
+    result = {}
+    worker = threading.Thread(target=lambda: result.update(profiler.profile(0.3, "wall", "speedscope",
+                                                                            trace_allocations=True)))
+    worker.start()
+    time.sleep(0.05)
+    try:
+        profiler.profile(0.1)
+        raise AssertionError("Profil concurrent accepté")
+    except ProfilerBusyError:
+        pass
+    worker.join()
+    spinner.join()
+
+    profile = json.loads(json.dumps(result["profile"]))
+    frames = profile["shared"]["frames"]
+    names = [entry["name"] for entry in profile["profiles"]]
+    assert any(name.startswith("Spinner") for name in names)
+    for entry in profile["profiles"]:
+        assert entry["type"] == "sampled" and len(entry["samples"]) == len(entry["weights"])
+        assert all(0 <= index < len(frames) for sample in entry["samples"] for index in sample)
+    assert "top_lines" in result["allocations"] and "collections" in result["gc"]
+    print(f"✓ {len(profile['profiles'])} threads, {len(frames)} frames, profil concurrent refusé")
+
+
+def test_profile_endpoint():
+    """/debug/profile voit le thread de traitement et le cadenceur d'une variante streaming"""
+    print("\n=== Test route /debug/profile ===")
+    from benchmarks.latency_benchmark import load_variant, speech_pcm, start_server, stop_server
+
+    sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sink.bind(("127.0.0.1", 0))
+    module = load_variant("api_pcm_buffer", sink.getsockname())
+    start_server(module, "stream")
+    client = module.app.test_client()
+    pcm = speech_pcm(2.0, seed=3)
+
+    def feed():
+        for offset in range(0, len(pcm), 640):
+            client.post("/audio_to_blendshapes", data=pcm[offset:offset + 640])
+            time.sleep(0.02)
+
+    feeder = threading.Thread(target=feed, name="Feeder")
+    try:
+        feeder.start()
+        response = module.app.test_client().get("/debug/profile?seconds=1&mode=wall&format=collapsed")
+        feeder.join()
+        invalid = client.get("/debug/profile?mode=heap")
+    finally:
+        stop_server(module)
+        sink.close()
+
+    assert response.status_code == 200 and invalid.status_code == 400
+    report = response.get_json()
+    for thread in ("AudioBuffer", "FrameScheduler", "Feeder"):
+        assert thread in report["threads"], (thread, list(report["threads"]))
+    assert any(line.startswith("AudioBuffer;") and "process_audio_buffer" in line
+               for line in report["profile"].splitlines())
+    print(f"✓ threads vus: {', '.join(sorted(report['threads']))}; GC {report['gc']['collections']} collectes")
+
+
+def main():
+    test_cpu_mode_attribution()
+    test_speedscope_and_busy()
+    test_profile_endpoint()
+    print("\n✅ Tous les tests passés")
+
+
+if __name__ == "__main__":
+    main()
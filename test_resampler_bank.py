@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test de la banque de resamplers
+Vérifie la réutilisation des noyaux et l'équivalence du mode streaming
+"""
+
+import time
+
+import torch
+import torchaudio
+
+from modules.resampler_bank import ResamplerBank, StreamSessions
+
+
+def test_kernel_reuse():
+    """Le noyau ne doit être construit qu'une fois par configuration"""
+    print("=== Test réutilisation des noyaux ===")
+    bank = ResamplerBank(max_entries=2)
+
+    first = bank.get(48000, 88200)
+    assert bank.get(48000, 88200) is first
+    bank.get(16000, 88200)
+    bank.get(44100, 88200)  # évince 48000 -> 88200 (LRU)
+
+    stats = bank.stats()
+    assert stats["builds"] == 3
+    assert stats["hits"] == 1
+    assert stats["evictions"] == 1
+    assert bank.get(48000, 88200) is not first
+    print(f"✓ Stats: {stats}")
+
+
+def test_streaming_matches_batch():
+    """Les chunks de 192 ms concaténés doivent égaler le resampling complet"""
+    print("=== Test resampling streaming ===")
+    bank = ResamplerBank()
+    audio = torch.randn(1, 48000)
+    chunk = int(48000 * 0.192)
+
+    expected = torchaudio.functional.resample(audio, 48000, 88200)
+
+    stream = bank.stream(48000, 88200)
+    outputs = [stream.process(audio[:, i:i + chunk]) for i in range(0, audio.shape[-1], chunk)]
+    outputs.append(stream.flush().reshape(1, -1))
+    result = torch.cat(outputs, dim=-1)
+
+    assert result.shape == expected.shape
+    assert torch.allclose(result, expected, atol=1e-5)
+    print(f"✓ {result.shape[-1]} échantillons identiques au resampling complet")
+
+
+def test_stream_sessions():
+    """Deux clients entrelacés gardent chacun leur historique ; la fin vide le filtre"""
+    print("=== Test sessions streaming ===")
+    sessions = StreamSessions(ResamplerBank(), 48000, 88200, idle_seconds=0.05)
+    audio = {"a": torch.randn(1, 24000), "b": torch.randn(1, 24000)}
+    chunk = int(48000 * 0.192)
+    outputs = {"a": [], "b": []}
+
+    for start in range(0, 24000, chunk):
+        final = start + chunk >= 24000
+        for key in ("a", "b"):
+            with sessions.acquire(key) as session:
+                outputs[key].append(session.resample(audio[key][:, start:start + chunk], final))
+    for key in ("a", "b"):
+        expected = torchaudio.functional.resample(audio[key], 48000, 88200)
+        result = torch.cat(outputs[key], dim=-1)
+        assert result.shape == expected.shape and torch.allclose(result, expected, atol=1e-5)
+        with sessions.acquire(key) as session:
+            assert not session.has_tail
+        sessions.end(key)
+    assert sessions.stats()["active"] == 0
+
+    with sessions.acquire("a") as session:
+        session.resample(audio["a"][:, :chunk])
+        assert session.has_tail
+    time.sleep(0.1)
+    with sessions.acquire("b"):
+        pass
+    stats = sessions.stats()
+    assert stats["active"] == 1 and stats["expired"] == 1
+    print(f"✓ {result.shape[-1]} échantillons par client, {stats}")
+
+
+def test_bank_speed():
+    """Comparaison indicative construction par requête vs banque"""
+    print("=== Test performance ===")
+    bank = ResamplerBank()
+    audio = torch.randn(1, int(48000 * 0.192))
+    iterations = 50
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        torchaudio.transforms.Resample(48000, 88200)(audio)
+    fresh_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        bank.resample(audio, 48000, 88200)
+    bank_time = time.perf_counter() - start
+
+    print(f"Par requête: {fresh_time / iterations * 1000:.2f} ms, "
+          f"banque: {bank_time / iterations * 1000:.2f} ms")
+
+
+def main():
+    test_kernel_reuse()
+    test_streaming_matches_batch()
+    test_stream_sessions()
+    test_bank_speed()
+    print("\n✅ Tous les tests passés")
+
+
+if __name__ == "__main__":
+    main()
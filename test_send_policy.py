@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test de la politique d'émission delta / keyframe
+Vérifie la suppression des frames inchangées, les keyframes et la cadence idle
+"""
+
+import socket
+import time
+
+import numpy as np
+
+from modules.frame_scheduler import FrameScheduler
+from modules.layer_compositor import create_idle_compositor
+from modules.livelink_encoder import LiveLinkEncoder, BLENDSHAPE_COUNT
+from modules.send_policy import SendPolicy
+
+
+def test_unchanged_frames_and_keyframes():
+    """Une pose immobile ne part qu'au rythme des keyframes"""
+    print("=== Test frames inchangées ===")
+    policy = SendPolicy(epsilon=1e-3, keyframe_interval=0.5, idle_fps=10)
+    frame = np.full(BLENDSHAPE_COUNT, 0.3, dtype=np.float32)
+
+    sent = [policy.should_send(frame, tick / 60) for tick in range(120)]
+    assert sum(sent) == 4 and sent[0] and sent[30]
+    assert policy.stats()["keyframes"] == 3
+
+    # Une dérive lente sous epsilon par tick finit par être envoyée
+    policy = SendPolicy(epsilon=1e-3, keyframe_interval=10.0, idle_fps=0)
+    drift = [policy.should_send(frame + tick * 4e-4, tick / 60) for tick in range(10)]
+    assert drift == [True, False, False, True, False, False, True, False, False, True]
+    print(f"✓ 2 s immobiles: {sum(sent)} paquets au lieu de 120")
+
+
+def test_idle_rate_and_speech():
+    """Hors parole la cadence descend à idle_fps, la parole la remonte aussitôt"""
+    print("\n=== Test cadence idle / parole ===")
+    policy = SendPolicy(epsilon=1e-3, idle_fps=10, idle_after=0.5)
+    rng = np.random.default_rng(0)
+
+    sent = []
+    for tick in range(180):
+        frame = rng.random(BLENDSHAPE_COUNT, dtype=np.float32)
+        speaking = 60 <= tick < 120
+        sent.append(policy.should_send(frame, tick / 60, active=speaking))
+
+    assert sum(sent[:30]) == 5  # Au démarrage : idle, 1 paquet sur 6
+    assert all(sent[60:120])
+    assert all(sent[120:150])  # Tenue idle_after après la parole
+    assert sum(sent[150:]) == 5
+    print(f"✓ Idle: {sum(sent[:60])}/60 paquets, parole: {sum(sent[60:120])}/60")
+
+
+def test_scheduler_with_idle_compositor():
+    """Le scheduler supprime les paquets idle pré-encodés au-delà de idle_fps"""
+    print("\n=== Test intégration scheduler ===")
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    receiver.settimeout(0.5)
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sender.connect(receiver.getsockname())
+
+    encoder = LiveLinkEncoder("$test-uuid", "GalaFace", fps=60)
+    scheduler = FrameScheduler(sender, LiveLinkEncoder("$test-uuid", "GalaFace", fps=60),
+                               compositor=create_idle_compositor(encoder, seed=1),
+                               send_policy=SendPolicy(idle_fps=10))
+    scheduler.start()
+    time.sleep(1.0)
+    scheduler.stop()
+
+    packets = []
+    try:
+        while True:
+            packets.append(receiver.recv(1024))
+    except socket.timeout:
+        pass
+    sender.close()
+    receiver.close()
+
+    stats = scheduler.stats()
+    assert 8 <= len(packets) <= 13
+    assert stats["frames_suppressed"] > 40
+    assert all(len(packet) == encoder.packet_size for packet in packets)
+    print(f"✓ 1 s d'idle: {len(packets)} paquets, {stats['frames_suppressed']} ticks supprimés")
+
+
+def main():
+    test_unchanged_frames_and_keyframes()
+    test_idle_rate_and_speech()
+    test_scheduler_with_idle_compositor()
+    print("\n✅ Tous les tests passés")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Test du démarrage à froid
+Vérifie le passage vivant -> prêt, le préchauffage sur les chunks courants,
+la lecture des poids par memory-mapping et le 503 des routes audio tant
+qu'une variante du serveur n'est pas prête
+"""
+
+import os
+import socket
+import tempfile
+import threading
+
+import torch
+
+from modules.startup import StartupState, mmap_weights, run_warmup, startup
+
+
+def test_startup_state():
+    """Prêt seulement après chargement + préchauffage ; un échec est exposé"""
+    print("=== Test état de démarrage ===")
+    state = StartupState()
+    release = threading.Event()
+    state.start(lambda: release.wait(5), lambda: [{"chunk_ms": 192}])
+
+    assert not state.ready and state.not_ready()["status"] == "starting"
+    assert state.liveness()["status"] == "alive"
+    release.set()
+    assert state.wait_ready(5)
+    stats = state.stats()
+    assert stats["phase"] == "ready" and stats["warmup"] == [{"chunk_ms": 192}]
+    assert set(stats["durations_s"]) == {"loading", "warmup"} and stats["ready_after_s"] > 0
+
+    def fail():
+        raise RuntimeError("checkpoint absent")
+
+    assert not state.run(fail)
+    assert not state.ready and state.stats()["phase"] == "failed"
+    assert "checkpoint absent" in state.not_ready()["message"]
+    print(f"✓ prêt en {stats['ready_after_s']:.2f}s depuis le lancement, échec exposé")
+
+
+def test_warmup_and_mmap():
+    """Une passe par taille de chunk ; les poids zip sont chargés mappés"""
+    print("\n=== Test préchauffage et mmap ===")
+    calls = []
+    results = run_warmup(lambda pcm, rate: calls.append((len(pcm), rate)), iterations=2)
+    assert calls == [(192 * 16 * 2, 16000)] * 2 + [(200 * 48 * 2, 48000)] * 2
+    assert [(r["chunk_ms"], r["sample_rate"]) for r in results] == [(192, 16000), (200, 48000)]
+
+    calls.clear()
+    run_warmup(lambda pcm, rate: calls.append(rate), sample_rates=(16000,), iterations=1)
+    assert calls == [16000]
+
+    seen = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.pth")
+        torch.save(torch.nn.Linear(64, 8).state_dict(), path)
+        original = torch.load
+        torch.load = lambda f, *args, **kwargs: seen.append(kwargs.get("mmap")) or original(f, *args, **kwargs)
+        try:
+            with mmap_weights():
+                state_dict = torch.load(path, map_location="cpu")
+            with mmap_weights(enabled=False):
+                torch.load(path, map_location="cpu")
+        finally:
+            torch.load = original
+    assert seen == [True, None] and state_dict["weight"].shape == (8, 64)
+    print(f"✓ {len(results)} tailles préchauffées, poids mappés ({results[0]['first_ms']:.2f} ms)")
+
+
+def test_readiness_routes():
+    """Variante : /livez vivant mais /readyz et l'audio en 503 avant le préchauffage"""
+    print("\n=== Test routes /livez et /readyz ===")
+    from benchmarks.latency_benchmark import load_variant, speech_pcm, start_server, stop_server
+
+    sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sink.bind(("127.0.0.1", 0))
+    module = load_variant("api_optimized", sink.getsockname())
+    client = module.app.test_client()
+    try:
+        startup.reset()
+        live, ready = client.get("/livez"), client.get("/readyz")
+        audio = client.post("/audio_to_blendshapes", data=speech_pcm(0.2, seed=4))
+        start_server(module, "request")
+        ready_after = client.get("/readyz")
+        audio_after = client.post("/audio_to_blendshapes", data=speech_pcm(0.2, seed=4))
+    finally:
+        stop_server(module)
+        sink.close()
+
+    assert live.status_code == 200 and ready.status_code == 503
+    assert audio.status_code == 503 and audio.headers["Retry-After"] == "1"
+    assert ready_after.status_code == 200 and audio_after.status_code == 200
+    warmup = ready_after.get_json()["warmup"]
+    assert [(w["chunk_ms"], w["sample_rate"]) for w in warmup] == [(192, 16000), (200, 48000)]
+    print("✓ " + ", ".join(f"{w['chunk_ms']} ms @ {w['sample_rate']} Hz : "
+                           f"{w['first_ms']:.1f} -> {w['last_ms']:.1f} ms" for w in warmup))
+
+
+def test_client_api_readiness():
+    """api_client_neurosync : mêmes routes, chargement et préchauffage en fond"""
+    print("\n=== Test /livez et /readyz des API clientes ===")
+    import api_client_neurosync as module
+
+    client = module.app.test_client()
+    startup.reset()
+    live, ready = client.get("/livez"), client.get("/readyz")
+    audio = client.post("/audio_to_blendshapes", data=b"\0" * 1920)
+    startup.start(module.load_model, module.warmup_model).join(60)
+    ready_after = client.get("/readyz")
+
+    assert live.status_code == 200 and ready.status_code == 503
+    assert audio.status_code == 503 and audio.headers["Retry-After"] == "1"
+    assert ready_after.status_code == 200 and module.model is not None
+    warmup = ready_after.get_json()["warmup"]
+    assert [(w["chunk_ms"], w["sample_rate"]) for w in warmup] == [(192, 16000), (200, 48000)]
+    print(f"✓ prêt après {ready_after.get_json()['ready_after_s']:.1f}s")
+
+
+def main():
+    test_startup_state()
+    test_warmup_and_mmap()
+    test_readiness_routes()
+    test_client_api_readiness()
+    print("\n✅ Tous les tests passés")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test de l'inférence par fenêtre glissante
+Utilise un extracteur/modèle synthétique : la valeur des frames est le temps
+"""
+
+import numpy as np
+
+from modules.streaming_inference import SlidingWindowInference
+
+
+SAMPLE_RATE = 16000
+FEATURE_RATE = 120
+
+
+def extract_features(audio):
+    """Features = moyenne de l'audio par tranche de 1/120 s"""
+    step = SAMPLE_RATE // FEATURE_RATE
+    count = len(audio) // step
+    return audio[:count * step].reshape(count, step).mean(axis=1, keepdims=True)
+
+
+def infer(features):
+    """Modèle factice : une frame de sortie pour deux features, 68 canaux"""
+    frames = features[1::2, 0]
+    return np.repeat(frames[:, None], 68, axis=1)
+
+
+def make_streamer(**kwargs):
+    calls = []
+
+    def counting_extract(audio):
+        calls.append(len(audio))
+        return extract_features(audio)
+
+    streamer = SlidingWindowInference(counting_extract, infer, SAMPLE_RATE, FEATURE_RATE, **kwargs)
+    return streamer, calls
+
+
+def test_frame_count_and_continuity():
+    """Toutes les frames sont émises une seule fois, sans saut aux frontières"""
+    print("=== Test continuité aux frontières ===")
+    streamer, _ = make_streamer(hop_ms=64, lookback_ms=320, crossfade_frames=2)
+    duration = 2.0
+    audio = (np.arange(int(SAMPLE_RATE * duration)) / SAMPLE_RATE).astype(np.float32)
+
+    outputs = []
+    for i in range(0, len(audio), 512):
+        frames = streamer.push(audio[i:i + 512])
+        if len(frames):
+            outputs.append(frames)
+    outputs.append(streamer.flush())
+    result = np.concatenate(outputs, axis=0)
+
+    # La dernière feature peut manquer selon l'arrondi du découpage
+    assert abs(len(result) - int(duration * 60)) <= 1
+    steps = np.diff(result[:, 0])
+    assert np.all(steps > 0) and np.max(np.abs(steps - 1 / 60)) < 0.01
+    print(f"✓ {len(result)} frames, pas max {np.max(steps) * 1000:.2f} ms")
+
+
+def test_features_not_recomputed():
+    """Chaque extraction ne traite que le hop et son court contexte"""
+    print("=== Test réutilisation des features ===")
+    streamer, calls = make_streamer(hop_ms=64, lookback_ms=320, context_ms=20)
+    streamer.push(np.zeros(SAMPLE_RATE, dtype=np.float32))
+
+    assert max(calls) <= streamer.hop_samples + streamer.context_samples
+    assert streamer.stats()["features_reused"] > 0
+    print(f"✓ Extraction max {max(calls)} échantillons, stats: {streamer.stats()}")
+
+
+def main():
+    test_frame_count_and_continuity()
+    test_features_not_recomputed()
+    print("\n✅ Tous les tests passés")
+
+
+if __name__ == "__main__":
+    main()